@@ -1,6 +1,6 @@
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -43,6 +43,11 @@ class ProgressModel(BaseModel):
     is_successful: Optional[bool] = False
 
 
+class ProgressEventModel(ProgressModel):
+    event_time: datetime = Field(default_factory=datetime.utcnow)
+    is_deleted: Optional[bool] = False
+
+
 class EntityModel(BaseModel):
     entity_id: int
     application_name: str
@@ -61,3 +66,9 @@ class EntityObjectModel(BaseModel):
     entity_id: int
     name: str
     size_in_mb: int
+
+
+class PhasePlanModel(BaseModel):
+    entity_ids: List[int] = Field(default_factory=list)
+    include_optional: Optional[bool] = True
+    by_env: Optional[bool] = False
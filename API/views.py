@@ -3,11 +3,47 @@ This file will be used for Registering the Blueprint for the Flask Application.
 to perform the CRUD Operations on the various BigQuery Tables.
 Also, it will be logging the error to the error.log file.
 """
-from flask import Blueprint, request
+from flask import Blueprint, Response, request
 from flask_restful import Resource, Api
-from loggers.logger import Logger
+from loggers.logger import Logger, get_cloud_logging_handler, logging_stats
 from API import pydantics
+import time
+from datetime import date, datetime
+from exceptions import (
+    BatcherFullError,
+    DMLQueueFullError,
+    PhaseTransitionError,
+    QueryCostExceededError,
+    SpoolPendingError,
+    StreamLimitError
+)
+from constants import (
+    ASYNC_DML_DEFAULT,
+    EXPORT_MAX_PAGE_SIZE,
+    EXPORT_PAGE_SIZE,
+    PLAN_MAX_ENTITIES,
+    STORAGE_BACKEND,
+    STREAM_HEARTBEAT_SECONDS,
+    STREAM_RETRY_MS,
+    STREAM_WINDOW_SECONDS,
+    TBL_MIGRATION_ENTITY,
+    TBL_MIGRATION_ENTITY_OBJECTS,
+    TBL_MIGRATION_PROGRESS,
+    TBL_MIGRATION_STEP
+)
 from utils import bq_client
+from utils.admission import limiter_stats
+from utils.analytics import get_analytics
+from utils.batcher import batcher_stats
+from utils.cost_guard import get_cost_guard
+from utils.events import get_event_bus, stream, stream_slots
+from utils.exporter import EXPORT_PARAMETERS, Export
+from utils.importer import import_rows, upload_format
+from utils.metrics import Gauge, registry
+from utils.phase_dag import validate_transition, validate_transitions
+from utils.plan import build_plans
+from utils.snapshot import get_snapshot
+from utils.spool import get_spool
 
 
 # Registering the Flask Restful API Blueprint.
@@ -15,11 +51,149 @@ bp = Blueprint("API", __name__, url_prefix='/')
 apps = Api(bp)
 
 
+def is_async():
+    """
+    The is_async function checks whether the client has asked for the asynchronous mode with ?async=true.
+
+    :return: A boolean value
+    :doc-author: Kaoushik Kumar
+    """
+    return request.args.get('async', str(ASYNC_DML_DEFAULT)).lower() in ('true', '1', 'yes')
+
+
+def spooled(table_class, kind, items):
+    """
+    The spooled function journals the write into the local write-ahead spool, when the spool is enabled.
+        The spool will replay the write into BigQuery in the background.
+
+    :param table_class: The BigQueryTable class of bq_client, i.e: bq_client.PhaseTable
+    :param kind: The kind of the write, i.e: insert, update or delete
+    :param items: The list of the pydantic models (insert and update) or the key tuples (delete)
+    :return: The 'Accepted' response, or None when the spool is disabled
+    :doc-author: Kaoushik Kumar
+    """
+    spool = get_spool()
+    if spool is None:
+        return None
+    return spool.submit(table_class, kind, items)
+
+
+def serialize(value):
+    """
+    The serialize function converts the date and datetime values of the (nested) rows into the ISO format strings.
+
+    :param value: The row dictionary, or a list of the rows, or a value of the row
+    :return: The JSON serializable value
+    :doc-author: Kaoushik Kumar
+    """
+    if isinstance(value, dict):
+        return {name: serialize(item) for name, item in value.items()}
+    if isinstance(value, list):
+        return [serialize(item) for item in value]
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def read(table_name):
+    """
+    The read function returns the rows of the table matching the filters of the query string,
+    served from the in-memory snapshot of the tables.
+
+    :param table_name: Name of the BigQuery table
+    :return: The response in the form of dictionary
+    :doc-author: Kaoushik Kumar
+    """
+    filters = {name: value for name, value in request.args.items() if name != 'async'}
+    rows = get_snapshot().query(table_name, filters)
+    return {'response': 'Success', 'count': len(rows), 'result': [serialize(row) for row in rows]}
+
+
+def throttled(error):
+    """
+    The throttled function returns the response with the status code 429, when the DML could not be admitted,
+    so that the client backs off instead of waiting in the queue of BigQuery.
+
+    :param error: The DMLQueueFullError object
+    :return: The response, along with the status code 429 and the Retry-After header
+    :doc-author: Kaoushik Kumar
+    """
+    return {'response': False, 'result': str(error)}, 429, {'Retry-After': str(error.retry_after)}
+
+
+def too_expensive(error):
+    """
+    The too_expensive function returns the response with the status code 422, when the dry run of the statement
+    has estimated more bytes than the byte budget, so that the client can tell the rejection from a failure.
+    The statements above the budget which have been queued, and not admitted in time, are throttled instead.
+
+    :param error: The QueryCostExceededError object
+    :return: The response with the estimated bytes and the budget, along with the status code 422
+    :doc-author: Kaoushik Kumar
+    """
+    return ({'response': False, 'result': str(error), 'estimated_bytes': error.estimated_bytes,
+             'max_bytes': error.max_bytes}, 422)
+
+
+def unavailable(error):
+    """
+    The unavailable function returns the response with the status code 503, when the write-behind buffer of the
+    table is full or has been shut down, so that the client retries instead of getting a failed write.
+
+    :param error: The BatcherFullError object
+    :return: The response, along with the status code 503 and the Retry-After header
+    :doc-author: Kaoushik Kumar
+    """
+    return {'response': False, 'result': str(error)}, 503, {'Retry-After': str(error.retry_after)}
+
+
+def rejected(error):
+    """
+    The rejected function returns the response with the status code 409, when the progress would be
+    an illegal transition of the phases of the entity, or the cascading delete of the entity would race its
+    spooled writes.
+
+    :param error: The PhaseTransitionError or the SpoolPendingError object
+    :return: The response, along with the status code 409
+    :doc-author: Kaoushik Kumar
+    """
+    return {'response': False, 'result': str(error)}, 409
+
+
+def accepted(response):
+    """
+    The accepted function returns the response with the status code 202, when the job has only been submitted.
+
+    :param response: The response from the BigQuery table
+    :return: The response, along with the status code 202 for the submitted jobs
+    :doc-author: Kaoushik Kumar
+    """
+    if response.get('response') == 'Accepted':
+        return response, 202
+    return response
+
+
 class PhaseTable(Resource):
     """
     This PhaseTable Class will behave as a container which will be used for creating, updating
     and deleting BigQuery's table records.
     """
+    def get(self):
+        """
+        The get function will be used to read the phases from the in-memory snapshot of the BigQuery table.
+            The records can be filtered with the query string, i.e: step_id, name, orders, parent_step_id.
+
+        :param self: Represent the instance of the class
+        :return: The matching records in the form of dictionary
+        :doc-author: Kaoushik Kumar
+        """
+        try:
+            return read(TBL_MIGRATION_STEP)
+        except Exception as e:
+            Logger().logging().error(f'{str(e)}')
+            # If any exception will be occurred in payload, will be returned through exception.
+            return {'response': False, 'result': str(e)}
+
     def post(self):
         """
         The post function will be used to insert the data into Phase table.
@@ -35,8 +209,11 @@ class PhaseTable(Resource):
             # The below line will be used to validate Request Payload using Pydantic BaseModel.
             payload = pydantics.PhaseModel(**request.get_json())
             # The below will take the request payload and send that to dvt-wrapper.
-            response = bq_client.PhaseTable().insert_phase(payload)
-            return response
+            response = (spooled(bq_client.PhaseTable, 'insert', [payload])
+                        or bq_client.PhaseTable().insert_phase(payload))
+            return accepted(response)
+        except BatcherFullError as e:
+            return unavailable(e)
         except Exception as e:
             Logger().logging().error(f'{str(e)}')
             # If any exception will be occurred in payload, will be returned through exception.
@@ -56,8 +233,15 @@ class PhaseTable(Resource):
             # The below line will be used to validate Request Payload using Pydantic BaseModel.
             payload = pydantics.PhaseModel(**request.get_json())
             # The below will take the request payload and send that to dvt-wrapper.
-            response = bq_client.PhaseTable().update_phase(payload)
-            return response
+            response = (spooled(bq_client.PhaseTable, 'update', [payload])
+                        or bq_client.PhaseTable().update_phase(payload, wait=not is_async()))
+            return accepted(response)
+        except QueryCostExceededError as e:
+            return too_expensive(e)
+        except DMLQueueFullError as e:
+            return throttled(e)
+        except BatcherFullError as e:
+            return unavailable(e)
         except Exception as e:
             Logger().logging().error(f'{str(e)}')
             # If any exception will be occurred in payload, will be returned through exception.
@@ -78,8 +262,13 @@ class PhaseTable(Resource):
             # The below line will be used to validate Request Payload using Pydantic BaseModel.
             step_id = request.args.get('step_id')
             # The below will take the request payload and send that to dvt-wrapper.
-            response = bq_client.PhaseTable().delete_phase(int(step_id))
-            return response
+            response = (spooled(bq_client.PhaseTable, 'delete', [(int(step_id),)])
+                        or bq_client.PhaseTable().delete_phase(int(step_id), wait=not is_async()))
+            return accepted(response)
+        except QueryCostExceededError as e:
+            return too_expensive(e)
+        except DMLQueueFullError as e:
+            return throttled(e)
         except Exception as e:
             Logger().logging().error(f'{str(e)}')
             # If any exception will be occurred in payload, will be returned through exception.
@@ -91,6 +280,23 @@ class ProgressTable(Resource):
     This ProgressTable Class will behave as a container which will be used for creating, updating
     and deleting BigQuery's table records.
     """
+    def get(self):
+        """
+        The get function will be used to read the progress from the in-memory snapshot of the BigQuery table.
+            The records can be filtered with the query string, i.e: step_id, entity_id, is_successful,
+            or any entity column (i.e: env).
+
+        :param self: Represent the instance of the class
+        :return: The matching records in the form of dictionary
+        :doc-author: Kaoushik Kumar
+        """
+        try:
+            return read(TBL_MIGRATION_PROGRESS)
+        except Exception as e:
+            Logger().logging().error(f'{str(e)}')
+            # If any exception will be occurred in payload, will be returned through exception.
+            return {'response': False, 'result': str(e)}
+
     def post(self):
         """
         The post function will be used to insert the data into BigQuery table.
@@ -103,9 +309,16 @@ class ProgressTable(Resource):
         try:
             # The below line will be used to validate Request Payload using Pydantic BaseModel.
             payload = pydantics.ProgressModel(**request.get_json())
+            # The below line will reject the illegal transition of the phase, before any BigQuery work.
+            validate_transition(payload)
             # The below will take the request payload and send that to dvt-wrapper.
-            response = bq_client.ProgressTable().insert_progress(payload)
-            return response
+            response = (spooled(bq_client.ProgressTable, 'insert', [payload])
+                        or bq_client.ProgressTable().insert_progress(payload))
+            return accepted(response)
+        except PhaseTransitionError as e:
+            return rejected(e)
+        except BatcherFullError as e:
+            return unavailable(e)
         except Exception as e:
             Logger().logging().error(f'{str(e)}')
             # If any exception will be occurred in payload, will be returned through exception.
@@ -125,9 +338,20 @@ class ProgressTable(Resource):
         try:
             # The below line will be used to validate Request Payload using Pydantic BaseModel.
             payload = pydantics.ProgressModel(**request.get_json())
+            # The below line will reject the illegal transition of the phase, before any BigQuery work.
+            validate_transition(payload)
             # The below will take the request payload and send that to dvt-wrapper.
-            response = bq_client.ProgressTable().update_progress(payload)
-            return response
+            response = (spooled(bq_client.ProgressTable, 'update', [payload])
+                        or bq_client.ProgressTable().update_progress(payload, wait=not is_async()))
+            return accepted(response)
+        except PhaseTransitionError as e:
+            return rejected(e)
+        except QueryCostExceededError as e:
+            return too_expensive(e)
+        except DMLQueueFullError as e:
+            return throttled(e)
+        except BatcherFullError as e:
+            return unavailable(e)
         except Exception as e:
             Logger().logging().error(f'{str(e)}')
             # If any exception will be occurred in payload, will be returned through exception.
@@ -149,8 +373,14 @@ class ProgressTable(Resource):
             step_id = request.args.get('step_id')
             entity_id = request.args.get('entity_id')
             # The below will take the request payload and send that to dvt-wrapper.
-            response = bq_client.ProgressTable().delete_progress(int(step_id), int(entity_id))
-            return response
+            response = (spooled(bq_client.ProgressTable, 'delete', [(int(step_id), int(entity_id))])
+                        or bq_client.ProgressTable().delete_progress(int(step_id), int(entity_id),
+                                                                     wait=not is_async()))
+            return accepted(response)
+        except QueryCostExceededError as e:
+            return too_expensive(e)
+        except DMLQueueFullError as e:
+            return throttled(e)
         except Exception as e:
             Logger().logging().error(f'{str(e)}')
             # If any exception will be occurred in payload, will be returned through exception.
@@ -162,6 +392,23 @@ class EntityTable(Resource):
     This EntityTable Class will behave as a container which will be used for creating, updating
     and deleting BigQuery's table records.
     """
+    def get(self):
+        """
+        The get function will be used to read the entities from the in-memory snapshot of the BigQuery table.
+            The records can be filtered with the query string, i.e: entity_id, application_name, source_server,
+            migrator, env.
+
+        :param self: Represent the instance of the class
+        :return: The matching records in the form of dictionary
+        :doc-author: Kaoushik Kumar
+        """
+        try:
+            return read(TBL_MIGRATION_ENTITY)
+        except Exception as e:
+            Logger().logging().error(f'{str(e)}')
+            # If any exception will be occurred in payload, will be returned through exception.
+            return {'response': False, 'result': str(e)}
+
     def post(self):
         """
         The post function will be used to insert the data into BigQuery table.
@@ -176,8 +423,11 @@ class EntityTable(Resource):
             # The below line will be used to validate Request Payload using Pydantic BaseModel.
             payload = pydantics.EntityModel(**request.get_json())
             # The below will take the request payload and send that to dvt-wrapper.
-            response = bq_client.EntityTable().insert_entity(payload)
-            return response
+            response = (spooled(bq_client.EntityTable, 'insert', [payload])
+                        or bq_client.EntityTable().insert_entity(payload))
+            return accepted(response)
+        except BatcherFullError as e:
+            return unavailable(e)
         except Exception as e:
             Logger().logging().error(f'{str(e)}')
             # If any exception will be occurred in payload, will be returned through exception.
@@ -197,8 +447,15 @@ class EntityTable(Resource):
             # The below line will be used to validate Request Payload using Pydantic BaseModel.
             payload = pydantics.EntityModel(**request.get_json())
             # The below will take the request payload and send that to dvt-wrapper.
-            response = bq_client.EntityTable().update_entity(payload)
-            return response
+            response = (spooled(bq_client.EntityTable, 'update', [payload])
+                        or bq_client.EntityTable().update_entity(payload, wait=not is_async()))
+            return accepted(response)
+        except QueryCostExceededError as e:
+            return too_expensive(e)
+        except DMLQueueFullError as e:
+            return throttled(e)
+        except BatcherFullError as e:
+            return unavailable(e)
         except Exception as e:
             Logger().logging().error(f'{str(e)}')
             # If any exception will be occurred in payload, will be returned through exception.
@@ -218,9 +475,24 @@ class EntityTable(Resource):
         try:
             # The below line will be used to validate Request Payload using Pydantic BaseModel.
             entity_id = request.args.get('entity_id')
+            # With ?cascade=true the objects and the progress of the entity are deleted in the same transaction.
+            if request.args.get('cascade', 'false').lower() in ('true', '1', 'yes'):
+                # The spooled writes of the entity would be replayed after the transaction, and re-create orphans.
+                spool = get_spool()
+                if spool is not None and spool.pending('entity_id', int(entity_id)):
+                    raise SpoolPendingError(f'The write spool still holds writes of the entity {entity_id}, '
+                                            f'retry the cascading delete once they have been replayed')
+                return bq_client.EntityTable().delete_entity(int(entity_id), cascade=True)
             # The below will take the request payload and send that to dvt-wrapper.
-            response = bq_client.EntityTable().delete_entity(int(entity_id))
-            return response
+            response = (spooled(bq_client.EntityTable, 'delete', [(int(entity_id),)])
+                        or bq_client.EntityTable().delete_entity(int(entity_id), wait=not is_async()))
+            return accepted(response)
+        except SpoolPendingError as e:
+            return rejected(e)
+        except QueryCostExceededError as e:
+            return too_expensive(e)
+        except DMLQueueFullError as e:
+            return throttled(e)
         except Exception as e:
             Logger().logging().error(f'{str(e)}')
             # If any exception will be occurred in payload, will be returned through exception.
@@ -232,6 +504,23 @@ class EntityObjectTable(Resource):
     This EntityObjectTable Class will behave as a container which will be used for creating, updating
     and deleting BigQuery's table records.
     """
+    def get(self):
+        """
+        The get function will be used to read the entity objects from the in-memory snapshot of the BigQuery table.
+            The records can be filtered with the query string, i.e: object_id, entity_id, name,
+            or any entity column (i.e: env).
+
+        :param self: Represent the instance of the class
+        :return: The matching records in the form of dictionary
+        :doc-author: Kaoushik Kumar
+        """
+        try:
+            return read(TBL_MIGRATION_ENTITY_OBJECTS)
+        except Exception as e:
+            Logger().logging().error(f'{str(e)}')
+            # If any exception will be occurred in payload, will be returned through exception.
+            return {'response': False, 'result': str(e)}
+
     def post(self):
         """
         The post function will be used to insert the data into Entity Object Table.
@@ -247,8 +536,11 @@ class EntityObjectTable(Resource):
             # The below line will be used to validate Request Payload using Pydantic BaseModel.
             payload = pydantics.EntityObjectModel(**request.get_json())
             # The below will take the request payload and send that to dvt-wrapper.
-            response = bq_client.EntityObjectTable().insert_entity_object(payload)
-            return response
+            response = (spooled(bq_client.EntityObjectTable, 'insert', [payload])
+                        or bq_client.EntityObjectTable().insert_entity_object(payload))
+            return accepted(response)
+        except BatcherFullError as e:
+            return unavailable(e)
         except Exception as e:
             Logger().logging().error(f'{str(e)}')
             # If any exception will be occurred in payload, will be returned through exception.
@@ -268,8 +560,15 @@ class EntityObjectTable(Resource):
             # The below line will be used to validate Request Payload using Pydantic BaseModel.
             payload = pydantics.EntityObjectModel(**request.get_json())
             # The below will take the request payload and send that to dvt-wrapper.
-            response = bq_client.EntityObjectTable().update_entity_object(payload)
-            return response
+            response = (spooled(bq_client.EntityObjectTable, 'update', [payload])
+                        or bq_client.EntityObjectTable().update_entity_object(payload, wait=not is_async()))
+            return accepted(response)
+        except QueryCostExceededError as e:
+            return too_expensive(e)
+        except DMLQueueFullError as e:
+            return throttled(e)
+        except BatcherFullError as e:
+            return unavailable(e)
         except Exception as e:
             Logger().logging().error(f'{str(e)}')
             # If any exception will be occurred in payload, will be returned through exception.
@@ -290,14 +589,682 @@ class EntityObjectTable(Resource):
             # The below line will be used to validate Request Payload using Pydantic BaseModel.
             object_id = request.args.get('object_id')
             # The below will take the request payload and send that to dvt-wrapper.
-            response = bq_client.EntityObjectTable().delete_entity_object(int(object_id))
+            response = (spooled(bq_client.EntityObjectTable, 'delete', [(int(object_id),)])
+                        or bq_client.EntityObjectTable().delete_entity_object(int(object_id), wait=not is_async()))
+            return accepted(response)
+        except QueryCostExceededError as e:
+            return too_expensive(e)
+        except DMLQueueFullError as e:
+            return throttled(e)
+        except Exception as e:
+            Logger().logging().error(f'{str(e)}')
+            # If any exception will be occurred in payload, will be returned through exception.
+            return {'response': False, 'result': str(e)}
+
+
+class BulkResource(Resource):
+    """
+    This BulkResource Class will behave as a container which will be used for creating, updating
+    and deleting many BigQuery's table records with a single HTTP request and a single BigQuery request.
+    The subclasses will set the BigQuery table class and the pydantic model of the records.
+    """
+    table = None
+    model = None
+
+    def _validate(self, items):
+        """
+        The _validate function validates all the items of the request payload against the pydantic model.
+
+        :param self: Represent the instance of the class
+        :param items: The list of the request payload items
+        :return: A list of (index, model) tuples of the valid items and the list of the per-item results
+        :doc-author: Kaoushik Kumar
+        """
+        if not isinstance(items, list):
+            raise ValueError('Request payload must be a JSON array')
+        valid, results = [], []
+        for index, item in enumerate(items):
+            try:
+                valid.append((index, self.model(**item)))
+                results.append({'index': index, 'status': 'Pending'})
+            except Exception as e:
+                results.append({'index': index, 'status': 'Invalid', 'errors': str(e)})
+        return valid, results
+
+    @staticmethod
+    def _response(results):
+        """
+        The _response function builds the response of the bulk request from the per-item results.
+
+        :param results: The list of the per-item results
+        :return: The response in the form of dictionary
+        :doc-author: Kaoushik Kumar
+        """
+        failed = sum(1 for result in results if result['status'] in ('Invalid', 'Failed'))
+        return {'response': 'Success' if not failed else False, 'failed': failed, 'results': results}
+
+    def _failed_response(self, results, error):
+        """
+        The _failed_response function builds the response of the bulk request which has failed, so that the items
+        which were being written are reported as failed, instead of the status they would have had.
+
+        :param self: Represent the instance of the class
+        :param results: The list of the per-item results, which is empty when the payload itself is invalid
+        :param error: The exception of the request
+        :return: The per-item status of the records, along with the error
+        :doc-author: Kaoushik Kumar
+        """
+        Logger().logging().error(f'{str(error)}')
+        for result in results:
+            if result['status'] == 'Pending':
+                result.update(status='Failed', errors=str(error))
+        # If any exception will be occurred in payload, will be returned through exception.
+        return {**self._response(results), 'response': False, 'result': str(error)}
+
+    def _spooled_response(self, indexes, results, spool_response):
+        """
+        The _spooled_response function builds the response of the bulk request which has been journaled
+        into the local write-ahead spool.
+
+        :param self: Represent the instance of the class
+        :param indexes: The indexes of the journaled items
+        :param results: The list of the per-item results
+        :param spool_response: The response of the spool
+        :return: The per-item status of the records, along with the status code 202
+        :doc-author: Kaoushik Kumar
+        """
+        for index in indexes:
+            results[index]['status'] = 'Accepted'
+        response = self._response(results)
+        response['spool_id'] = spool_response['spool_id']
+        if not response['failed']:
+            response['response'] = 'Accepted'
+        return accepted(response)
+
+    def post(self):
+        """
+        The post function will be used to insert all the records of the JSON array into BigQuery table
+        with a single insert_rows call.
+
+        :param self: Represent the instance of the class
+        :return: The per-item status of the records
+        :doc-author: Kaoushik Kumar
+        """
+        results = []
+        try:
+            # The below line will be used to validate all the Request Payload items using Pydantic BaseModel.
+            valid, results = self._validate(request.get_json())
+            spool_response = spooled(self.table, 'insert', [model for _, model in valid])
+            if spool_response:
+                return self._spooled_response([index for index, _ in valid], results, spool_response)
+            table = self.table()
+            errors = table.insert_rows([table.to_row(model) for _, model in valid])
+            row_errors = {error['index']: error['errors'] for error in errors}
+            for position, (index, _) in enumerate(valid):
+                if position in row_errors:
+                    results[index].update(status='Failed', errors=row_errors[position])
+                else:
+                    results[index]['status'] = 'Success'
+            return self._response(results)
+        except Exception as e:
+            return self._failed_response(results, e)
+
+    def put(self):
+        """
+        The put function will be used to update all the records of the JSON array in BigQuery table
+        with a single MERGE statement. If a key is repeated, the last record of the key will be applied.
+
+        :param self: Represent the instance of the class
+        :return: The per-item status of the records and the number of the updated rows
+        :doc-author: Kaoushik Kumar
+        """
+        results = []
+        try:
+            # The below line will be used to validate all the Request Payload items using Pydantic BaseModel.
+            valid, results = self._validate(request.get_json())
+            spool_response = spooled(self.table, 'update', [model for _, model in valid])
+            if spool_response:
+                return self._spooled_response([index for index, _ in valid], results, spool_response)
+            table = self.table()
+            latest, superseded = {}, []
+            for index, model in valid:
+                row = table.to_row(model)
+                key = tuple(getattr(model, name) for name in table.key_columns)
+                if key in latest:
+                    superseded.append(latest[key][0])
+                latest[key] = (index, row)
+            affected_rows = table.merge_rows([row for _, row in latest.values()])
+            # The statuses are set only once the MERGE has been applied.
+            for index in superseded:
+                results[index]['status'] = 'Superseded'
+            for index, _ in latest.values():
+                results[index]['status'] = 'Updated'
+            response = self._response(results)
+            response['affected_rows'] = affected_rows
+            return response
+        except QueryCostExceededError as e:
+            return too_expensive(e)
+        except DMLQueueFullError as e:
+            return throttled(e)
+        except Exception as e:
+            return self._failed_response(results, e)
+
+    def delete(self):
+        """
+        The delete function will be used to delete all the records of the JSON array of ids from BigQuery table
+        with a single DELETE statement. The ids of the composite keys will be the objects of the key columns.
+
+        :param self: Represent the instance of the class
+        :return: The per-item status of the ids and the number of the deleted rows
+        :doc-author: Kaoushik Kumar
+        """
+        results = []
+        try:
+            ids = request.get_json()
+            if not isinstance(ids, list):
+                raise ValueError('Request payload must be a JSON array of ids')
+            table = self.table()
+            keys = []
+            for index, item in enumerate(ids):
+                try:
+                    if isinstance(item, dict):
+                        key = tuple(int(item[name]) for name in table.key_columns)
+                    else:
+                        key = (int(item),)
+                    if len(key) != len(table.key_columns):
+                        raise ValueError(f'Expected the key columns {table.key_columns}')
+                except Exception as e:
+                    results.append({'index': index, 'status': 'Invalid', 'errors': str(e)})
+                    continue
+                keys.append(key)
+                results.append({'index': index, 'status': 'Pending'})
+            spool_response = spooled(self.table, 'delete', keys)
+            if spool_response:
+                indexes = [result['index'] for result in results if result['status'] == 'Pending']
+                return self._spooled_response(indexes, results, spool_response)
+            affected_rows = table.delete_keys(keys)
+            # The statuses are set only once the DELETE has been applied.
+            for result in results:
+                if result['status'] == 'Pending':
+                    result['status'] = 'Deleted'
+            response = self._response(results)
+            response['affected_rows'] = affected_rows
+            return response
+        except QueryCostExceededError as e:
+            return too_expensive(e)
+        except DMLQueueFullError as e:
+            return throttled(e)
+        except Exception as e:
+            return self._failed_response(results, e)
+
+
+class PhaseTableBulk(BulkResource):
+    """
+    This PhaseTableBulk Class will be used for the bulk operations on the Phase table.
+    """
+    table = bq_client.PhaseTable
+    model = pydantics.PhaseModel
+
+
+class ProgressTableBulk(BulkResource):
+    """
+    This ProgressTableBulk Class will be used for the bulk operations on the Progress table.
+    """
+    table = bq_client.ProgressTable
+    model = pydantics.ProgressModel
+
+    def _validate(self, items):
+        """
+        The _validate function validates the items against the pydantic model, and then their transitions
+        against the phases, in the order of the items, so that a step can be completed along with the steps it
+        requires. The items of the illegal transitions are Invalid.
+
+        :param self: Represent the instance of the class
+        :param items: The list of the request payload items
+        :return: A list of (index, model) tuples of the valid items and the list of the per-item results
+        :doc-author: Kaoushik Kumar
+        """
+        valid, results = super()._validate(items)
+        errors = validate_transitions([model for _, model in valid])
+        for (index, _), error in zip(valid, errors):
+            if error:
+                results[index].update(status='Invalid', errors=error)
+        return [item for item, error in zip(valid, errors) if not error], results
+
+
+class EntityTableBulk(BulkResource):
+    """
+    This EntityTableBulk Class will be used for the bulk operations on the Entity table.
+    """
+    table = bq_client.EntityTable
+    model = pydantics.EntityModel
+
+
+class EntityObjectTableBulk(BulkResource):
+    """
+    This EntityObjectTableBulk Class will be used for the bulk operations on the Entity Object table.
+    """
+    table = bq_client.EntityObjectTable
+    model = pydantics.EntityObjectModel
+
+
+class ImportResource(Resource):
+    """
+    This ImportResource Class will be used for importing a large NDJSON or CSV upload into BigQuery table
+    with a single load job. The subclasses will set the BigQuery table class.
+    """
+    table = None
+
+    def post(self):
+        """
+        The post function will be used to import the records of the upload, sent either as the request body
+        or as the 'file' of a multipart form. The format is taken from ?format= (csv or ndjson), or else from the
+        content type. With ?strict=true, nothing is loaded when any record is invalid. An upload sent again with
+        the same Idempotency-Key header (or else the same valid records) is not loaded twice on BigQuery.
+
+        :param self: Represent the instance of the class
+        :return: The row counts and the line-numbered validation errors
+        :doc-author: Kaoushik Kumar
+        """
+        try:
+            form_file = request.files.get('file')
+            # The below line will read the upload from the form file, or else from the request body.
+            upload = form_file.stream if form_file else request.stream
+            content_type = form_file.content_type if form_file else request.content_type
+            upload_type = upload_format(content_type, request.args.get('format'))
+            strict = request.args.get('strict', 'false').lower() in ('true', '1', 'yes')
+            return import_rows(self.table(), upload, upload_type, strict, request.headers.get('Idempotency-Key'))
+        except Exception as e:
+            Logger().logging().error(f'{str(e)}')
+            # If any exception will be occurred in payload, will be returned through exception.
+            return {'response': False, 'result': str(e)}
+
+
+class EntityObjectTableImport(ImportResource):
+    """
+    This EntityObjectTableImport Class will be used for importing the inventory of the Entity Objects.
+    """
+    table = bq_client.EntityObjectTable
+
+
+class ExportResource(Resource):
+    """
+    This ExportResource Class will be used for exporting all the records of BigQuery table as a stream, one page
+    at a time, so that the memory stays bounded whatever the size of the table. The subclasses will set the
+    BigQuery table class.
+    """
+    table = None
+
+    def get(self):
+        """
+        The get function streams the records as the chunked NDJSON (default) or the Arrow IPC (?format=arrow).
+            ?fields= (comma separated) selects the columns, any other parameter of the query string is a filter
+            (i.e: ?entity_id=1), and ?continuation_token= resumes the export from the page after the token.
+
+        :param self: Represent the instance of the class
+        :return: The streaming response
+        :doc-author: Kaoushik Kumar
+        """
+        try:
+            export_format = request.args.get('format', 'ndjson').lower()
+            if export_format not in ('ndjson', 'arrow'):
+                raise ValueError(f'Unsupported format {export_format}, expected ndjson or arrow')
+            fields = [name.strip() for name in request.args.get('fields', '').split(',') if name.strip()]
+            page_size = min(int(request.args.get('page_size', EXPORT_PAGE_SIZE)), EXPORT_MAX_PAGE_SIZE)
+            filters = {name: value for name, value in request.args.items() if name not in EXPORT_PARAMETERS}
+            export = Export(self.table(), fields, filters, page_size, request.args.get('continuation_token'))
+            if export_format == 'arrow':
+                # The Arrow format needs the optional pyarrow package, which is checked before the stream starts.
+                export.arrow_schema()
+                return Response(export.arrow(), mimetype='application/vnd.apache.arrow.stream')
+            return Response(export.ndjson(), mimetype='application/x-ndjson')
+        except ImportError:
+            return {'response': False, 'result': 'The Arrow format needs the pyarrow package'}, 501
+        except QueryCostExceededError as e:
+            return too_expensive(e)
+        except Exception as e:
+            Logger().logging().error(f'{str(e)}')
+            # If any exception will be occurred in payload, will be returned through exception.
+            return {'response': False, 'result': str(e)}, 400
+
+
+class PhaseTableExport(ExportResource):
+    """
+    This PhaseTableExport Class will be used for exporting the Phase table.
+    """
+    table = bq_client.PhaseTable
+
+
+class ProgressTableExport(ExportResource):
+    """
+    This ProgressTableExport Class will be used for exporting the Progress table.
+    """
+    table = bq_client.ProgressTable
+
+
+class EntityTableExport(ExportResource):
+    """
+    This EntityTableExport Class will be used for exporting the Entity table.
+    """
+    table = bq_client.EntityTable
+
+
+class EntityObjectTableExport(ExportResource):
+    """
+    This EntityObjectTableExport Class will be used for exporting the Entity Object table.
+    """
+    table = bq_client.EntityObjectTable
+
+
+class EntityDetail(Resource):
+    """
+    This EntityDetail Class will be used for reading the entity along with all its objects and progress.
+    """
+    def get(self, entity_id):
+        """
+        The get function returns the entity, its objects, its progress with the phase names, the total size
+        of the objects in MB and the current phase. It is served from the in-memory snapshot when the snapshot
+        has been loaded, or else with a single BigQuery query.
+
+        :param self: Represent the instance of the class
+        :param entity_id: The id of the entity
+        :return: The detail of the entity in the form of dictionary
+        :doc-author: Kaoushik Kumar
+        """
+        try:
+            snapshot = get_snapshot()
+            if snapshot.is_loaded(TBL_MIGRATION_ENTITY, TBL_MIGRATION_ENTITY_OBJECTS,
+                                  TBL_MIGRATION_PROGRESS, TBL_MIGRATION_STEP):
+                detail = snapshot.entity_detail(entity_id)
+            else:
+                detail = bq_client.EntityTable().get_entity_detail(entity_id)
+            if detail is None:
+                return {'response': False, 'result': f'Entity {entity_id} not found'}, 404
+            return {'response': 'Success', 'result': serialize(detail)}
+        except Exception as e:
+            Logger().logging().error(f'{str(e)}')
+            # If any exception will be occurred in payload, will be returned through exception.
+            return {'response': False, 'result': str(e)}
+
+
+class EntityPlan(Resource):
+    """
+    This EntityPlan Class will be used for initializing the progress of all the phases of the entities, from the
+    catalog of the phases (tbl_migration_step), with a single write instead of a request per phase.
+    """
+    def post(self, entity_id=None):
+        """
+        The post function creates the Not Started progress of every step of the plan of the entities, in the order
+        of the steps. The steps which already have a progress are left out by the write itself, so that it can be
+        called again, also concurrently, without creating a progress twice.
+            ---
+            tags:
+              - Entity Plan
+
+        :param self: Represent the instance of the class
+        :param entity_id: The id of the entity, or None for the entity_ids of the request payload
+        :return: The per-entity plan in the form of dictionary
+        :doc-author: Kaoushik Kumar
+        """
+        try:
+            # The below line will be used to validate Request Payload using Pydantic BaseModel.
+            payload = pydantics.PhasePlanModel(**(request.get_json(silent=True) or {}))
+            entity_ids = list(dict.fromkeys(payload.entity_ids + ([entity_id] if entity_id is not None else [])))
+            if not entity_ids:
+                return {'response': False, 'result': 'No entity_ids to be planned'}, 400
+            if len(entity_ids) > PLAN_MAX_ENTITIES:
+                message = f'At most {PLAN_MAX_ENTITIES} entities can be planned at once'
+                return {'response': False, 'result': message}, 400
+            snapshot = get_snapshot()
+            entities = {key: snapshot.table(TBL_MIGRATION_ENTITY).get((key,)) for key in entity_ids}
+            missing = [key for key, entity in entities.items() if entity is None]
+            # The snapshot only leaves out the progress known already, the write itself skips the existing keys.
+            progress, plans = build_plans(
+                [entity for entity in entities.values() if entity is not None],
+                snapshot.table(TBL_MIGRATION_STEP).find(),
+                snapshot.table(TBL_MIGRATION_PROGRESS).keys_for('entity_id', entity_ids),
+                payload.include_optional, payload.by_env
+            )
+            response = {'missing_entity_ids': missing, 'plans': plans}
+            spool_response = spooled(bq_client.ProgressTable, 'insert_missing', progress)
+            if spool_response:
+                response.update(response='Accepted', spool_id=spool_response['spool_id'])
+                return accepted(response)
+            table = bq_client.ProgressTable()
+            # The progress of all the entities is written with a single statement, which skips the existing keys.
+            inserted = table.insert_missing([table.to_row(model) for model in progress])
+            created = {}
+            for _, inserted_id in inserted:
+                created[inserted_id] = created.get(inserted_id, 0) + 1
+            for plan in plans:
+                plan['created'] = created.get(plan['entity_id'], 0)
+                plan['existing'] = len(plan['steps']) - plan['created']
+            response.update(response='Success' if not missing else False, created=len(inserted))
             return response
+        except QueryCostExceededError as e:
+            return too_expensive(e)
+        except DMLQueueFullError as e:
+            return throttled(e)
+        except Exception as e:
+            Logger().logging().error(f'{str(e)}')
+            # If any exception will be occurred in payload, will be returned through exception.
+            return {'response': False, 'result': str(e)}
+
+
+class PhaseDurations(Resource):
+    """
+    This PhaseDurations Class will be used for reporting how long every phase takes, i.e: the percentiles of the
+    durations of the completed steps and the regression of the durations against the size of the entity.
+    """
+    def get(self):
+        """
+        The get function returns the statistics of the phases of the entities matching the query string,
+        i.e: ?env=Production&migrator=striim, or of all the entities.
+
+        :param self: Represent the instance of the class
+        :return: The statistics of the phases in the form of dictionary
+        :doc-author: Kaoushik Kumar
+        """
+        try:
+            return {'response': 'Success', **get_analytics().phases(request.args.to_dict())}
         except Exception as e:
             Logger().logging().error(f'{str(e)}')
             # If any exception will be occurred in payload, will be returned through exception.
             return {'response': False, 'result': str(e)}
 
 
+class EntityEta(Resource):
+    """
+    This EntityEta Class will be used for reporting when the entities in flight, and their wave, will finish.
+    """
+    def get(self):
+        """
+        The get function returns the ETA of the entities in flight matching the query string (i.e: the wave),
+        and the ETA of the wave, which is the latest of them.
+
+        :param self: Represent the instance of the class
+        :return: The ETAs in the form of dictionary
+        :doc-author: Kaoushik Kumar
+        """
+        try:
+            return {'response': 'Success', **get_analytics().etas(request.args.to_dict())}
+        except Exception as e:
+            Logger().logging().error(f'{str(e)}')
+            # If any exception will be occurred in payload, will be returned through exception.
+            return {'response': False, 'result': str(e)}
+
+
+class ProgressStream(Resource):
+    """
+    This ProgressStream Class will be used for pushing the writes of the progress, the entities and the phases
+    to the dashboards as the server-sent events, so that they do not have to poll BigQuery. A stream is served
+    for STREAM_WINDOW_SECONDS and then ends, and the EventSource of the client reconnects with its Last-Event-ID.
+    A stream holds a worker thread (or a greenlet of the gevent worker) for its window, and at most
+    STREAM_MAX_CONNECTIONS streams are served at a time.
+    """
+    def get(self):
+        """
+        The get function returns the stream of the events. ?entity_id= (comma separated) and ?env= filter the
+        events, and the Last-Event-ID header (or ?last_event_id=) resumes the stream after that event.
+
+        :param self: Represent the instance of the class
+        :return: The streaming response of the server-sent events
+        :doc-author: Kaoushik Kumar
+        """
+        try:
+            entity_ids = {int(value) for value in request.args.get('entity_id', '').split(',') if value.strip()}
+            env = request.args.get('env') or None
+            bus = get_event_bus()
+            sequence = bus.parse_id(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
+            stream_slots.acquire()
+        except StreamLimitError as e:
+            return {'response': False, 'result': str(e)}, 429, {'Retry-After': str(e.retry_after)}
+        except Exception as e:
+            Logger().logging().error(f'{str(e)}')
+            # If any exception will be occurred in payload, will be returned through exception.
+            return {'response': False, 'result': str(e)}, 400
+        response = Response(
+            stream(bus, sequence, entity_ids or None, env, STREAM_WINDOW_SECONDS, STREAM_HEARTBEAT_SECONDS,
+                   STREAM_RETRY_MS),
+            mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+        # The below line will give the slot back when the stream has ended, or the client has gone away.
+        response.call_on_close(stream_slots.release)
+        return response
+
+
+class JobStatus(Resource):
+    """
+    This JobStatus Class will be used for polling the state of the jobs submitted in the asynchronous mode.
+    """
+    def get(self, job_id):
+        """
+        The get function returns the state, affected row count and errors of the submitted job.
+
+        :param self: Represent the instance of the class
+        :param job_id: The id of the job returned by the PUT/DELETE request
+        :return: The state of the job in the form of dictionary
+        :doc-author: Kaoushik Kumar
+        """
+        status = bq_client.job_tracker.status(job_id)
+        if status is None:
+            return {'response': False, 'result': f'Job {job_id} not found'}, 404
+        return status
+
+
+class SpoolStatus(Resource):
+    """
+    This SpoolStatus Class will be used for reporting the depth and the drain rate of the write-ahead spool.
+    """
+    def get(self):
+        """
+        The get function returns the counters of the write-ahead spool.
+
+        :param self: Represent the instance of the class
+        :return: The counters of the spool in the form of dictionary
+        :doc-author: Kaoushik Kumar
+        """
+        spool = get_spool()
+        if spool is None:
+            return {'response': False, 'result': 'Write-ahead spool is disabled'}, 404
+        return spool.stats()
+
+
+class QueryCosts(Resource):
+    """
+    This QueryCosts Class will be used for reporting the estimated and the actual cost of every shape of the
+    BigQuery statements, along with the endpoints which have run them.
+    """
+    def get(self):
+        """
+        The get function returns the statistics of the statement shapes, the most expensive ones first.
+
+        :param self: Represent the instance of the class
+        :return: The statistics of the shapes in the form of dictionary
+        :doc-author: Kaoushik Kumar
+        """
+        guard = get_cost_guard()
+        if guard is None:
+            return {'response': False, 'result': 'Query cost guard is enabled only on the BigQuery backend'}, 404
+        return {'max_bytes': guard.max_bytes, 'mode': guard.mode, 'shapes': guard.stats()}
+
+
+class Warmup(Resource):
+    """
+    This Warmup Class will be used for preparing a new instance before it gets the traffic, i.e: as the startup
+    probe of Cloud Run. It creates the clients and fills the metadata caches, and the in-memory snapshot with
+    ?snapshot=true.
+    """
+    def get(self):
+        """
+        The get function creates the storage and the Cloud Logging clients, and fills the caches.
+
+        :param self: Represent the instance of the class
+        :return: The time (in milliseconds) taken by every step in the form of dictionary
+        :doc-author: Kaoushik Kumar
+        """
+        try:
+            timings = bq_client.warmup()
+            if STORAGE_BACKEND == 'bigquery':
+                started = time.perf_counter()
+                get_cloud_logging_handler()
+                timings['cloud_logging_client_ms'] = round((time.perf_counter() - started) * 1000, 3)
+            if request.args.get('snapshot', 'false').lower() in ('true', '1', 'yes'):
+                started = time.perf_counter()
+                snapshot = get_snapshot()
+                for table_name in (TBL_MIGRATION_STEP, TBL_MIGRATION_PROGRESS, TBL_MIGRATION_ENTITY,
+                                   TBL_MIGRATION_ENTITY_OBJECTS):
+                    snapshot.table(table_name)
+                timings['snapshot_ms'] = round((time.perf_counter() - started) * 1000, 3)
+            return {'response': 'Success', 'result': timings}
+        except Exception as e:
+            Logger().logging().error(f'{str(e)}')
+            # If any exception will be occurred in warmup, will be returned through exception.
+            return {'response': False, 'result': str(e)}, 503
+
+
+# The gauges of the background subsystems, which are read from their counters at the scrape time.
+registry.register(Gauge('bigquery_async_jobs_pending', 'Number of the asynchronous DML jobs which are not finished.',
+                        collect=lambda: {(): bq_client.job_tracker.stats()['pending']}))
+registry.register(Gauge('write_batcher_pending_rows', 'Number of the rows buffered by the write-behind batchers.',
+                        ('batcher',), lambda: {(name, ): stats['pending'] for name, stats in batcher_stats().items()}))
+registry.register(Gauge('dml_queue_depth', 'Number of the DML statements waiting for a slot of their table.',
+                        ('table',), lambda: {(name, ): stats['waiting'] for name, stats in limiter_stats().items()}))
+registry.register(Gauge('dml_active', 'Number of the DML statements of the table holding a slot.',
+                        ('table',), lambda: {(name, ): stats['active'] for name, stats in limiter_stats().items()}))
+registry.register(Gauge('write_spool_depth', 'Number of the writes waiting in the write-ahead spool.',
+                        collect=lambda: {(): get_spool().stats()['depth']} if get_spool() else {}))
+registry.register(Gauge('log_records', 'Number of the log records queued, dropped and rate-limited.', ('state',),
+                        lambda: {(state, ): value for state, value in logging_stats().items()}))
+registry.register(Gauge('bigquery_shape_estimated_bytes', 'Bytes estimated by the dry run of the statement shape.',
+                        ('shape',), lambda: {(stats['shape'], ): stats['estimated_bytes'] for stats in
+                                             (get_cost_guard().stats() if get_cost_guard() else [])
+                                             if stats['estimated_bytes'] is not None}))
+registry.register(Gauge('progress_stream_events', 'Number of the events published and buffered for the streams.',
+                        ('state',), lambda: {(state, ): value for state, value in get_event_bus().stats().items()}))
+registry.register(Gauge('progress_streams', 'Number of the progress streams active, served and rejected.',
+                        ('state',), lambda: {(state, ): value for state, value in stream_slots.stats().items()}))
+
+# The below line will record the writes from the start, so that the progress streams can be resumed from any of them.
+get_event_bus()
+
+
+class Metrics(Resource):
+    """
+    This Metrics Class will be used for exposing the metrics of the requests and of the BigQuery jobs
+    in the Prometheus text format, so that they can be scraped.
+    """
+    def get(self):
+        """
+        The get function renders all the metrics of the process.
+
+        :param self: Represent the instance of the class
+        :return: The metrics in the Prometheus text format
+        :doc-author: Kaoushik Kumar
+        """
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
 class HealthCheck(Resource):
     def __init__(self):
         """
@@ -329,5 +1296,48 @@ apps.add_resource(ProgressTable, '/api/v1/process-table')
 apps.add_resource(EntityTable, '/api/v1/entity-table')
 apps.add_resource(EntityObjectTable, '/api/v1/entity-object-table')
 
+# Bulk End-Points
+apps.add_resource(PhaseTableBulk, '/api/v1/phase-table/bulk')
+apps.add_resource(ProgressTableBulk, '/api/v1/process-table/bulk')
+apps.add_resource(EntityTableBulk, '/api/v1/entity-table/bulk')
+apps.add_resource(EntityObjectTableBulk, '/api/v1/entity-object-table/bulk')
+
+# Import End-Points
+apps.add_resource(EntityObjectTableImport, '/api/v1/entity-object-table/import')
+
+# Export End-Points
+apps.add_resource(PhaseTableExport, '/api/v1/phase-table/export')
+apps.add_resource(ProgressTableExport, '/api/v1/process-table/export')
+apps.add_resource(EntityTableExport, '/api/v1/entity-table/export')
+apps.add_resource(EntityObjectTableExport, '/api/v1/entity-object-table/export')
+
+# Entity Detail API
+apps.add_resource(EntityDetail, '/api/v1/entities/<int:entity_id>/detail')
+
+# Entity Phase Plan API
+apps.add_resource(EntityPlan, '/api/v1/entities/plan', '/api/v1/entities/<int:entity_id>/plan')
+
+# Phase Analytics APIs
+apps.add_resource(PhaseDurations, '/api/v1/analytics/phases')
+apps.add_resource(EntityEta, '/api/v1/analytics/eta')
+
+# Progress Stream API
+apps.add_resource(ProgressStream, '/api/v1/progress/stream')
+
+# Asynchronous Job Status API
+apps.add_resource(JobStatus, '/api/v1/jobs/<string:job_id>')
+
+# Write-Ahead Spool Status API
+apps.add_resource(SpoolStatus, '/api/v1/spool')
+
+# Query Cost API
+apps.add_resource(QueryCosts, '/api/v1/query-costs')
+
 # Health Check API
 apps.add_resource(HealthCheck, '/health-check')
+
+# Warmup API
+apps.add_resource(Warmup, '/warmup')
+
+# Metrics API
+apps.add_resource(Metrics, '/metrics')
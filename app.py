@@ -1,17 +1,46 @@
 """
 This file will be used for adding all the configurations, end-points, etc... to run the application
 """
+import time
+
+# The start time of the boot, for the startup-time breakdown which is logged once the app is ready.
+_boot_started = time.perf_counter()
+
 from flask import Flask
-from API.views import bp
 from flask_cors import CORS
 from flask_restful import Api
-from google.cloud import logging as cloud_logging
+_flask_imported = time.perf_counter()
 
-client = cloud_logging.Client()
-client.setup_logging()
+from API.views import bp
+from constants import STORAGE_BACKEND
+from loggers.logger import CloudLoggingHandler, add_log_handler, setup_logging, start_request_timer
+from utils import bq_client
+from utils.metrics import observe_request
+_views_imported = time.perf_counter()
+
+# The Cloud Logging is used only with the BigQuery backend, so that the SQLite backend can run without GCP.
+# Its client is created by the log writer thread on the first record (or by /warmup), not at the import.
+if STORAGE_BACKEND == 'bigquery':
+    add_log_handler(CloudLoggingHandler())
 
 app = Flask(__name__)
 app.register_blueprint(bp)
+# The start time of every request is recorded for the latency field of the logs.
+app.before_request(start_request_timer)
+# The below line will record the count, latency and errors of every request for /metrics.
+app.after_request(observe_request)
 
 CORS(app)
 api = Api(app)
+
+# Starting the periodic compaction of the progress event log, if it has been configured.
+bq_client.start_progress_compaction()
+_app_created = time.perf_counter()
+
+# Logging the startup-time breakdown, so that the cold start of the instances can be measured.
+setup_logging('startup', 'INFO').info(
+    f'Startup finished in {(_app_created - _boot_started) * 1000:.1f} ms: '
+    f'flask_imports={(_flask_imported - _boot_started) * 1000:.1f} ms, '
+    f'api_imports={(_views_imported - _flask_imported) * 1000:.1f} ms, '
+    f'app_setup={(_app_created - _views_imported) * 1000:.1f} ms'
+)
@@ -0,0 +1,210 @@
+"""
+This file will be used for the fake BigQuery (and Cloud Logging) client of the benchmarks, which keeps the
+inserted rows in memory and injects the configured latency and errors into every request.
+"""
+import logging
+import random
+import threading
+import time
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+from google.api_core.exceptions import InternalServerError
+from google.cloud import bigquery
+from google.cloud import logging as cloud_logging
+
+
+class FakeQueryJob:
+    """
+    This FakeQueryJob Class will behave like a finished BigQuery QueryJob, affecting one row.
+    """
+    def __init__(self, query):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param query: The SQL statement of the job
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.query = query
+        self.job_id = f'bench_{uuid.uuid4().hex}'
+        self.state = 'DONE'
+        self.num_dml_affected_rows = 1
+        self.total_bytes_processed = 0
+        self.errors = None
+        self.error_result = None
+
+    def result(self, *args, **kwargs):
+        """
+        The result function returns the rows of the job, which are always empty.
+
+        :param self: Represent the instance of the class
+        :return: An empty list
+        :doc-author: Kaoushik Kumar
+        """
+        return []
+
+    def reload(self, *args, **kwargs):
+        """
+        The reload function does nothing, as the job is always finished.
+
+        :param self: Represent the instance of the class
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+
+
+class FakeBigQueryClient:
+    """
+    This FakeBigQueryClient Class will implement the part of the BigQuery client used by the storage backend.
+    Every request sleeps for the latency (with a uniform jitter) and fails with the InternalServerError
+    at the error rate, so that the retry and error paths of the service are exercised as well.
+    """
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=None):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param latency_ms: Latency (in milliseconds) of every request
+        :param jitter_ms: Maximum jitter (in milliseconds) added to the latency
+        :param error_rate: Ratio (0 to 1) of the requests which will fail
+        :param seed: Seed of the random generator, for the reproducible runs
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.project = 'benchmark'
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.schemas = {}
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def _request(self, name):
+        """
+        The _request function simulates the round trip of a request, i.e: sleeps and maybe fails.
+
+        :param self: Represent the instance of the class
+        :param name: Name of the request, used in the error message
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            self.requests += 1
+            delay = (self.latency_ms + self._random.uniform(0, self.jitter_ms)) / 1000
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        if delay:
+            time.sleep(delay)
+        if failed:
+            raise InternalServerError(f'Injected error of the fake {name} request')
+
+    def dataset(self, dataset_name):
+        """
+        The dataset function returns the reference of the dataset.
+
+        :param self: Represent the instance of the class
+        :param dataset_name: Name of the dataset
+        :return: A DatasetReference object
+        :doc-author: Kaoushik Kumar
+        """
+        return bigquery.DatasetReference(self.project, dataset_name)
+
+    def get_table(self, table_ref):
+        """
+        The get_table function returns the metadata of the table, with the number of the stored rows.
+
+        :param self: Represent the instance of the class
+        :param table_ref: The TableReference object
+        :return: A table-like object
+        :doc-author: Kaoushik Kumar
+        """
+        self._request('get_table')
+        with self._lock:
+            num_rows = len(self._rows.get(table_ref.table_id, []))
+        return SimpleNamespace(reference=table_ref, table_id=table_ref.table_id, modified=datetime.utcnow(),
+                               num_rows=num_rows, streaming_buffer=None, schema=[])
+
+    def insert_rows(self, table, rows, **kwargs):
+        """
+        The insert_rows function stores the rows of the table in memory.
+
+        :param self: Represent the instance of the class
+        :param table: The table-like object returned by get_table
+        :param rows: List of the row tuples
+        :return: An empty list of the row errors
+        :doc-author: Kaoushik Kumar
+        """
+        self._request('insert_rows')
+        names = self.schemas.get(table.table_id, [])
+        with self._lock:
+            self._rows.setdefault(table.table_id, []).extend(dict(zip(names, row)) for row in rows)
+        return []
+
+    def list_rows(self, table, **kwargs):
+        """
+        The list_rows function returns the stored rows of the table.
+
+        :param self: Represent the instance of the class
+        :param table: The table-like object returned by get_table
+        :return: A list of the row dictionaries
+        :doc-author: Kaoushik Kumar
+        """
+        self._request('list_rows')
+        with self._lock:
+            return list(self._rows.get(table.table_id, []))
+
+    def query(self, query, job_config=None, **kwargs):
+        """
+        The query function returns a finished job of the query, without applying it to the stored rows.
+
+        :param self: Represent the instance of the class
+        :param query: The SQL statement
+        :param job_config: The QueryJobConfig object
+        :return: A FakeQueryJob object
+        :doc-author: Kaoushik Kumar
+        """
+        self._request('query')
+        return FakeQueryJob(query)
+
+    def get_default_handler(self, *args, **kwargs):
+        """
+        The get_default_handler function returns a handler which drops the records, instead of the Cloud Logging one.
+
+        :param self: Represent the instance of the class
+        :return: A NullHandler object
+        :doc-author: Kaoushik Kumar
+        """
+        return logging.NullHandler()
+
+    def setup_logging(self, *args, **kwargs):
+        """
+        The setup_logging function does nothing, so that the logs stay local during the benchmark.
+
+        :param self: Represent the instance of the class
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+
+
+def install(latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=None):
+    """
+    The install function replaces the BigQuery and the Cloud Logging clients with the single fake client.
+        It must be called before the app has been imported.
+
+    :param latency_ms: Latency (in milliseconds) of every request
+    :param jitter_ms: Maximum jitter (in milliseconds) added to the latency
+    :param error_rate: Ratio (0 to 1) of the requests which will fail
+    :param seed: Seed of the random generator
+    :return: The FakeBigQueryClient object
+    :doc-author: Kaoushik Kumar
+    """
+    client = FakeBigQueryClient(latency_ms, jitter_ms, error_rate, seed)
+    bigquery.Client = lambda *args, **kwargs: client
+    cloud_logging.Client = lambda *args, **kwargs: client
+    return client
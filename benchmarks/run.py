@@ -0,0 +1,321 @@
+"""
+This file will be used for running the load-test and latency benchmark of every endpoint.
+Every (verb, endpoint) scenario is driven in-process through the Flask test client at the configured concurrency,
+against the fake BigQuery client (or the SQLite backend), and the throughput with the p50/p95/p99 latencies
+is reported as JSON, along with the comparison against a saved baseline.
+
+    python -m benchmarks.run --concurrency 8 --requests 200 --latency-ms 20 --output bench.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+# Number of the records of every bulk request.
+BULK_SIZE = 10
+
+
+def phase(key):
+    """
+    The phase function builds the payload of a phase.
+
+    :param key: The step_id of the phase
+    :return: A dictionary
+    :doc-author: Kaoushik Kumar
+    """
+    return {'step_id': key, 'name': 'Dev Data Movement', 'description': f'Step {key}', 'orders': key,
+            'is_optional': False, 'parent_step_id': max(key - 1, 0)}
+
+
+def progress(key):
+    """
+    The progress function builds the payload of a progress.
+
+    :param key: The step_id and the entity_id of the progress
+    :return: A dictionary
+    :doc-author: Kaoushik Kumar
+    """
+    return {'step_id': key, 'entity_id': key, 'start_date_time': '2023-05-01T10:00:00',
+            'end_date_time': '2023-05-01T11:00:00', 'is_successful': key % 2 == 0}
+
+
+def entity(key):
+    """
+    The entity function builds the payload of an entity.
+
+    :param key: The entity_id of the entity
+    :return: A dictionary
+    :doc-author: Kaoushik Kumar
+    """
+    return {'entity_id': key, 'application_name': f'app-{key % 50}', 'source_server': f'src-{key % 20}',
+            'source_database': f'db-{key}', 'target_server': 'target', 'target_database': f'db-{key}',
+            'is_spdb': False, 'migration_type': 'Downtime', 'migrator': f'migrator-{key % 5}',
+            'env': 'Production' if key % 2 else 'Development'}
+
+
+def entity_object(key):
+    """
+    The entity_object function builds the payload of an entity object.
+
+    :param key: The object_id (and the entity_id) of the entity object
+    :return: A dictionary
+    :doc-author: Kaoushik Kumar
+    """
+    return {'object_id': key, 'entity_id': key, 'name': f'object-{key}', 'size_in_mb': key % 1000}
+
+
+def bulk(build):
+    """
+    The bulk function builds the payload of a bulk request out of the payload of a single record.
+
+    :param build: Function which builds the payload of a record from its key
+    :return: Function which builds the JSON array of BULK_SIZE records from a key
+    :doc-author: Kaoushik Kumar
+    """
+    return lambda key: [build(key * BULK_SIZE + index) for index in range(BULK_SIZE)]
+
+
+# The (verb, endpoint, url, payload, keys) of the scenarios, in the order in which they are run.
+# The keys are 'existing' for the seeded records, or 'new' for the records which are not there yet.
+SCENARIOS = [
+    ('GET', '/health-check', lambda key: '/health-check', None, 'existing'),
+    ('GET', '/api/v1/phase-table', lambda key: '/api/v1/phase-table', None, 'existing'),
+    ('GET', '/api/v1/process-table', lambda key: '/api/v1/process-table', None, 'existing'),
+    ('GET', '/api/v1/entity-table', lambda key: '/api/v1/entity-table', None, 'existing'),
+    ('GET', '/api/v1/entity-table?env=', lambda key: '/api/v1/entity-table?env=Production', None, 'existing'),
+    ('GET', '/api/v1/entity-object-table', lambda key: '/api/v1/entity-object-table', None, 'existing'),
+    ('GET', '/api/v1/entities/<entity_id>/detail', lambda key: f'/api/v1/entities/{key}/detail', None, 'existing'),
+    ('POST', '/api/v1/phase-table', lambda key: '/api/v1/phase-table', phase, 'new'),
+    ('POST', '/api/v1/process-table', lambda key: '/api/v1/process-table', progress, 'new'),
+    ('POST', '/api/v1/entity-table', lambda key: '/api/v1/entity-table', entity, 'new'),
+    ('POST', '/api/v1/entity-object-table', lambda key: '/api/v1/entity-object-table', entity_object, 'new'),
+    ('POST', '/api/v1/phase-table/bulk', lambda key: '/api/v1/phase-table/bulk', bulk(phase), 'new'),
+    ('POST', '/api/v1/process-table/bulk', lambda key: '/api/v1/process-table/bulk', bulk(progress), 'new'),
+    ('POST', '/api/v1/entity-table/bulk', lambda key: '/api/v1/entity-table/bulk', bulk(entity), 'new'),
+    ('POST', '/api/v1/entity-object-table/bulk', lambda key: '/api/v1/entity-object-table/bulk',
+     bulk(entity_object), 'new'),
+    ('PUT', '/api/v1/phase-table', lambda key: '/api/v1/phase-table', phase, 'existing'),
+    ('PUT', '/api/v1/process-table', lambda key: '/api/v1/process-table', progress, 'existing'),
+    ('PUT', '/api/v1/entity-table', lambda key: '/api/v1/entity-table', entity, 'existing'),
+    ('PUT', '/api/v1/entity-object-table', lambda key: '/api/v1/entity-object-table', entity_object, 'existing'),
+    ('PUT', '/api/v1/entity-table/bulk', lambda key: '/api/v1/entity-table/bulk', bulk(entity), 'existing'),
+    ('DELETE', '/api/v1/phase-table', lambda key: f'/api/v1/phase-table?step_id={key}', None, 'existing'),
+    ('DELETE', '/api/v1/process-table',
+     lambda key: f'/api/v1/process-table?step_id={key}&entity_id={key}', None, 'existing'),
+    ('DELETE', '/api/v1/entity-table', lambda key: f'/api/v1/entity-table?entity_id={key}', None, 'existing'),
+    ('DELETE', '/api/v1/entity-object-table',
+     lambda key: f'/api/v1/entity-object-table?object_id={key}', None, 'existing'),
+]
+
+# The bulk endpoints and the payloads used to seed the tables before the benchmark.
+SEEDS = [
+    ('/api/v1/phase-table/bulk', phase),
+    ('/api/v1/process-table/bulk', progress),
+    ('/api/v1/entity-table/bulk', entity),
+    ('/api/v1/entity-object-table/bulk', entity_object),
+]
+
+
+def percentile(values, ratio):
+    """
+    The percentile function returns the nearest-rank percentile of the sorted values.
+
+    :param values: The sorted list of the values
+    :param ratio: The percentile, from 0 to 1
+    :return: The value of the percentile, or 0 when there are no values
+    :doc-author: Kaoushik Kumar
+    """
+    if not values:
+        return 0
+    return values[max(0, math.ceil(ratio * len(values)) - 1)]
+
+
+def is_failed(response):
+    """
+    The is_failed function checks whether the response is an error, i.e: an error status, or a JSON body
+    with the response False which is how the resources report the exceptions.
+
+    :param response: The response of the Flask test client
+    :return: A boolean value
+    :doc-author: Kaoushik Kumar
+    """
+    if response.status_code >= 400:
+        return True
+    body = response.get_json(silent=True)
+    return isinstance(body, dict) and body.get('response') is False
+
+
+def run_scenario(app, scenario, base, options):
+    """
+    The run_scenario function sends the requests of the scenario from the concurrent worker threads,
+    and measures the latency of every request and the throughput of the whole run.
+
+    :param app: The Flask application
+    :param scenario: The (verb, endpoint, url, payload, keys) tuple
+    :param base: The first key of the new records of the scenario
+    :param options: The parsed command line arguments
+    :return: A dictionary with the throughput, latency percentiles and error counters
+    :doc-author: Kaoushik Kumar
+    """
+    method, _, url, payload, keys = scenario
+    counter = itertools.count()
+    lock = threading.Lock()
+    latencies, errors = [], [0]
+    total = options.warmup + options.requests
+
+    def key_of(index):
+        return base + index if keys == 'new' else index % options.seed_rows + 1
+
+    def worker():
+        client = app.test_client()
+        while True:
+            index = next(counter)
+            if index >= total:
+                return
+            key = key_of(index)
+            started = time.perf_counter()
+            response = client.open(url(key), method=method, json=payload(key) if payload else None)
+            elapsed = time.perf_counter() - started
+            if index < options.warmup:
+                continue
+            with lock:
+                latencies.append(elapsed)
+                errors[0] += is_failed(response)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(options.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'error_rate': errors[0] / len(latencies) if latencies else 0,
+        'throughput_rps': len(latencies) / wall if wall else 0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': (latencies[-1] if latencies else 0) * 1000,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    The compare function compares the results with the baseline. A scenario has regressed when its p95 latency
+    has grown, or its throughput has dropped, by more than the tolerance.
+
+    :param results: The results of the scenarios
+    :param baseline: The saved report of a previous run
+    :param tolerance: The allowed relative change, i.e: 0.2 for 20%
+    :return: A tuple of the per-scenario changes and the list of the regressed scenarios
+    :doc-author: Kaoushik Kumar
+    """
+    changes, regressions = {}, []
+    for name, current in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous:
+            continue
+        changes[name] = {
+            metric: (current[metric] - previous[metric]) / previous[metric] if previous[metric] else None
+            for metric in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms')
+        }
+        if (current['p95_ms'] > previous['p95_ms'] * (1 + tolerance)
+                or current['throughput_rps'] < previous['throughput_rps'] * (1 - tolerance)):
+            regressions.append(name)
+    return changes, regressions
+
+
+def parse_args(argv=None):
+    """
+    The parse_args function parses the command line arguments of the benchmark.
+
+    :param argv: The list of the arguments, or None for sys.argv
+    :return: The argparse Namespace
+    :doc-author: Kaoushik Kumar
+    """
+    parser = argparse.ArgumentParser(description='Load-test and latency benchmark of every endpoint.')
+    parser.add_argument('--backend', choices=('bigquery', 'sqlite'), default='bigquery',
+                        help='bigquery runs against the fake BigQuery client, sqlite against the SQLite backend')
+    parser.add_argument('--concurrency', type=int, default=8, help='Number of the concurrent clients')
+    parser.add_argument('--requests', type=int, default=200, help='Number of the measured requests per scenario')
+    parser.add_argument('--warmup', type=int, default=10, help='Number of the unmeasured requests per scenario')
+    parser.add_argument('--seed-rows', type=int, default=100, help='Number of the records seeded into every table')
+    parser.add_argument('--latency-ms', type=float, default=20, help='Latency of every fake BigQuery request')
+    parser.add_argument('--jitter-ms', type=float, default=5, help='Maximum jitter added to the latency')
+    parser.add_argument('--error-rate', type=float, default=0, help='Ratio of the failing fake BigQuery requests')
+    parser.add_argument('--seed', type=int, default=42, help='Seed of the injected latency and errors')
+    parser.add_argument('--only', default='', help='Run only the scenarios whose name contains this text')
+    parser.add_argument('--output', default='', help='Path of the JSON report, which is printed when it is empty')
+    parser.add_argument('--baseline', default='', help='Path of the saved report to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative regression of the baseline')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    The main function seeds the tables, runs all the scenarios and writes the report.
+
+    :param argv: The list of the arguments, or None for sys.argv
+    :return: The exit code, which is 1 when a scenario has regressed against the baseline
+    :doc-author: Kaoushik Kumar
+    """
+    options = parse_args(argv)
+    # The configuration is read by the constants on import, so the backend has to be chosen before the app is imported.
+    os.environ['STORAGE_BACKEND'] = options.backend
+    # The progress of the scenarios does not follow the hierarchy of the phases, so its transitions are not validated.
+    os.environ['PHASE_TRANSITION_VALIDATION'] = 'false'
+    fake_client = None
+    if options.backend == 'bigquery':
+        from benchmarks.fake_bigquery import install
+        fake_client = install(options.latency_ms, options.jitter_ms, 0, options.seed)
+    from app import app
+    from utils import bq_client
+    if fake_client is not None:
+        fake_client.schemas = {
+            table.table_name: [name for name, _ in table.columns()]
+            for table in (bq_client.PhaseTable(), bq_client.ProgressTable(), bq_client.ProgressEventTable(),
+                          bq_client.EntityTable(), bq_client.EntityObjectTable())
+        }
+
+    client = app.test_client()
+    for url, build in SEEDS:
+        for start in range(1, options.seed_rows + 1, BULK_SIZE):
+            client.post(url, json=[build(key) for key in range(start, min(start + BULK_SIZE, options.seed_rows + 1))])
+    if fake_client is not None:
+        # The errors are injected only after the seeding, so that every run starts with the same tables.
+        fake_client.error_rate = options.error_rate
+
+    results = {}
+    for index, scenario in enumerate(SCENARIOS):
+        name = f'{scenario[0]} {scenario[1]}'
+        if options.only and options.only not in name:
+            continue
+        results[name] = run_scenario(app, scenario, (index + 1) * 1000000, options)
+
+    report = {
+        'config': {name: value for name, value in vars(options).items() if name not in ('output', 'baseline')},
+        'results': results,
+    }
+    regressions = []
+    if options.baseline:
+        with open(options.baseline) as baseline_file:
+            report['comparison'], regressions = compare(results, json.load(baseline_file), options.tolerance)
+        report['regressions'] = regressions
+    if options.output:
+        with open(options.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
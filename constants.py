@@ -1,3 +1,17 @@
+import os
+
+
+def env_list(name):
+    """
+    The env_list function reads the comma separated values of the environment variable.
+
+    :param name: Name of the environment variable
+    :return: A list of the values
+    :doc-author: Kaoushik Kumar
+    """
+    return [value.strip() for value in os.environ.get(name, '').split(',') if value.strip()]
+
+
 # Added Project ID and BigQuery Table's name.
 PROJECT_ID = "m2m-wayfair-dev"
 DATASET_NAME = "migration_status"
@@ -6,3 +20,128 @@ TBL_MIGRATION_STEP = "tbl_migration_step"
 TBL_MIGRATION_PROGRESS = "tbl_migration_progress"
 TBL_MIGRATION_ENTITY = "tbl_migration_entity"
 TBL_MIGRATION_ENTITY_OBJECTS = "tbl_migration_entity_objects"
+TBL_MIGRATION_PROGRESS_EVENTS = "tbl_migration_progress_events"
+VW_MIGRATION_PROGRESS_LATEST = "vw_migration_progress_latest"
+
+# Storage backend of the tables: 'bigquery', or 'sqlite' to run without GCP (local tests and benchmarks).
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'bigquery').lower()
+# Path of the SQLite database of the sqlite backend, which is in memory by default.
+SQLITE_PATH = os.environ.get('SQLITE_PATH', ':memory:')
+
+# Time (in seconds) for which the BigQuery table metadata will be cached before it is fetched again.
+TABLE_CACHE_TTL_SECONDS = float(os.environ.get('TABLE_CACHE_TTL_SECONDS', 300))
+
+# Maximum number of the attempts of a BigQuery request which has failed with a transient error, the maximum
+# backoff (in seconds) after the first attempt and after any attempt, and the time after which no attempt is started.
+BQ_RETRY_MAX_ATTEMPTS = int(os.environ.get('BQ_RETRY_MAX_ATTEMPTS', 5))
+BQ_RETRY_INITIAL_BACKOFF_SECONDS = float(os.environ.get('BQ_RETRY_INITIAL_BACKOFF_SECONDS', 0.25))
+BQ_RETRY_MAX_BACKOFF_SECONDS = float(os.environ.get('BQ_RETRY_MAX_BACKOFF_SECONDS', 8))
+BQ_RETRY_DEADLINE_SECONDS = float(os.environ.get('BQ_RETRY_DEADLINE_SECONDS', 60))
+# Percentile (0 to 1) of the recent latencies after which an idempotent read will be hedged (0 disables it),
+# and the maximum number of the threads running the hedged reads.
+BQ_HEDGE_PERCENTILE = float(os.environ.get('BQ_HEDGE_PERCENTILE', 0.95))
+BQ_HEDGE_MAX_WORKERS = int(os.environ.get('BQ_HEDGE_MAX_WORKERS', 8))
+
+# Comma separated names of the tables (or *) whose inserts will be micro-batched by the write-behind batcher.
+INSERT_BATCHING_TABLES = env_list('INSERT_BATCHING_TABLES')
+# Number of rows, and the age (in milliseconds) of the oldest row, after which a batch will be flushed.
+INSERT_BATCH_MAX_ROWS = int(os.environ.get('INSERT_BATCH_MAX_ROWS', 500))
+INSERT_BATCH_MAX_WAIT_MS = int(os.environ.get('INSERT_BATCH_MAX_WAIT_MS', 50))
+# Maximum number of rows which can be buffered per table before the callers will have to wait.
+INSERT_BATCH_MAX_PENDING = int(os.environ.get('INSERT_BATCH_MAX_PENDING', 10000))
+
+# Comma separated names of the tables (or *) whose updates will be coalesced into a single MERGE per flush window.
+UPDATE_COALESCING_TABLES = env_list('UPDATE_COALESCING_TABLES')
+# Length (in milliseconds) of the flush window, and the maximum number of keys merged by a single MERGE.
+UPDATE_COALESCE_WINDOW_MS = int(os.environ.get('UPDATE_COALESCE_WINDOW_MS', 200))
+UPDATE_COALESCE_MAX_ROWS = int(os.environ.get('UPDATE_COALESCE_MAX_ROWS', 1000))
+
+# Time (in seconds) between two polls of the DML jobs submitted in the asynchronous mode, and the time after which
+# a job whose state can not be reloaded is given up as UNKNOWN (BigQuery cancels the jobs after 6 hours).
+JOB_POLL_INTERVAL_SECONDS = float(os.environ.get('JOB_POLL_INTERVAL_SECONDS', 1))
+JOB_MAX_POLL_SECONDS = float(os.environ.get('JOB_MAX_POLL_SECONDS', 6 * 3600))
+# Whether the PUT/DELETE requests will be submitted asynchronously (202 + job_id) when ?async= is not given.
+ASYNC_DML_DEFAULT = os.environ.get('ASYNC_DML_DEFAULT', 'false').lower() in ('true', '1', 'yes')
+
+# Maximum number of the DML statements of a table running at a time (0 disables the admission control),
+# the number of the statements which can wait for a slot, and the maximum wait (in seconds). The requests
+# beyond the queue (or the wait) are rejected with 429 and Retry-After.
+DML_MAX_CONCURRENCY = int(os.environ.get('DML_MAX_CONCURRENCY', 2))
+DML_MAX_QUEUE = int(os.environ.get('DML_MAX_QUEUE', 20))
+DML_MAX_WAIT_SECONDS = float(os.environ.get('DML_MAX_WAIT_SECONDS', 30))
+
+# Byte budget of a BigQuery statement, checked against the dry-run estimate of its shape (0 disables the budget,
+# the estimated and the actual bytes of every shape are still recorded), and the time (in seconds) for which the
+# estimate of a shape is cached. The statements above the budget are rejected ('reject'), or run one at a time
+# ('queue') with the given queue length and maximum wait (in seconds), beyond which they are rejected with 429.
+QUERY_MAX_BYTES = int(os.environ.get('QUERY_MAX_BYTES', 0))
+QUERY_COST_MODE = os.environ.get('QUERY_COST_MODE', 'reject').lower()
+QUERY_COST_CACHE_TTL_SECONDS = float(os.environ.get('QUERY_COST_CACHE_TTL_SECONDS', 3600))
+QUERY_COST_QUEUE_CONCURRENCY = int(os.environ.get('QUERY_COST_QUEUE_CONCURRENCY', 1))
+QUERY_COST_MAX_QUEUE = int(os.environ.get('QUERY_COST_MAX_QUEUE', 10))
+QUERY_COST_MAX_WAIT_SECONDS = float(os.environ.get('QUERY_COST_MAX_WAIT_SECONDS', 60))
+
+# Storage mode of the progress: 'dml' updates tbl_migration_progress in place,
+# 'events' appends to the progress event log.
+PROGRESS_STORAGE_MODE = os.environ.get('PROGRESS_STORAGE_MODE', 'dml').lower()
+# Time (in seconds) between two compactions of the progress event log (0 disables it), and the age of the
+# events (in hours) which can be folded. The age must be more than the streaming buffer of BigQuery.
+PROGRESS_COMPACTION_INTERVAL_SECONDS = float(os.environ.get('PROGRESS_COMPACTION_INTERVAL_SECONDS', 0))
+PROGRESS_COMPACTION_MIN_AGE_HOURS = float(os.environ.get('PROGRESS_COMPACTION_MIN_AGE_HOURS', 24))
+
+# Path of the local write-ahead spool (SQLite) of the BigQuery writes. The spool is disabled when it is empty.
+SPOOL_PATH = os.environ.get('SPOOL_PATH', '')
+# Maximum number of items replayed with a single BigQuery request, failed attempts of an entry before it is moved
+# to the dead letters, and the maximum backoff (in seconds) between two attempts.
+SPOOL_BATCH_SIZE = int(os.environ.get('SPOOL_BATCH_SIZE', 500))
+SPOOL_MAX_ATTEMPTS = int(os.environ.get('SPOOL_MAX_ATTEMPTS', 10))
+SPOOL_MAX_BACKOFF_SECONDS = float(os.environ.get('SPOOL_MAX_BACKOFF_SECONDS', 60))
+
+# Maximum number of the validation errors reported by an import, and the size (in bytes) of the staged rows
+# which are kept in memory before they are spilled to a temporary file.
+IMPORT_MAX_ERRORS = int(os.environ.get('IMPORT_MAX_ERRORS', 1000))
+IMPORT_MAX_MEMORY_BYTES = int(os.environ.get('IMPORT_MAX_MEMORY_BYTES', 8 * 1024 * 1024))
+
+# Whether the transitions of the progress are validated against the hierarchy of the phases, i.e: a step can be
+# completed only after its parent and the mandatory steps before it. It is ignored while the spool is enabled.
+PHASE_TRANSITION_VALIDATION = os.environ.get('PHASE_TRANSITION_VALIDATION', 'false').lower() in ('true', '1', 'yes')
+
+# Maximum number of the entities whose phase plan can be initialized with a single request.
+PLAN_MAX_ENTITIES = int(os.environ.get('PLAN_MAX_ENTITIES', 1000))
+
+# Minimum duration (in seconds) of a completed step which is used by the regression and the rate of its phase,
+# so that the steps closed right after they have been opened do not skew them.
+ANALYTICS_MIN_DURATION_SECONDS = float(os.environ.get('ANALYTICS_MIN_DURATION_SECONDS', 60))
+
+# Default and maximum number of the rows of a page of the export.
+EXPORT_PAGE_SIZE = int(os.environ.get('EXPORT_PAGE_SIZE', 1000))
+EXPORT_MAX_PAGE_SIZE = int(os.environ.get('EXPORT_MAX_PAGE_SIZE', 10000))
+
+# Number of the events of the writes kept for resuming the progress streams, and the maximum number of the streams
+# served at a time. A stream holds a thread of the gthread worker, or a greenlet of the opt-in gevent worker
+# (see gunicorn.conf.py), for its window.
+STREAM_BUFFER_SIZE = int(os.environ.get('STREAM_BUFFER_SIZE', 10000))
+STREAM_MAX_CONNECTIONS = int(os.environ.get('STREAM_MAX_CONNECTIONS', 4))
+# Time (in seconds) for which a stream is served before the client reconnects with its Last-Event-ID, the time
+# between two keep-alive comments of an idle stream, and the time (in milliseconds) the client waits to reconnect.
+STREAM_WINDOW_SECONDS = float(os.environ.get('STREAM_WINDOW_SECONDS', 25))
+STREAM_HEARTBEAT_SECONDS = float(os.environ.get('STREAM_HEARTBEAT_SECONDS', 10))
+STREAM_RETRY_MS = int(os.environ.get('STREAM_RETRY_MS', 1000))
+
+# Time (in seconds) between two checks whether a table of the in-memory snapshot has been modified in BigQuery.
+SNAPSHOT_REFRESH_SECONDS = float(os.environ.get('SNAPSHOT_REFRESH_SECONDS', 30))
+# Maximum time (in seconds) between two full reloads of a table whose modifications have all been made by this
+# service (and so applied to the snapshot already), and the overlap (in seconds) of the incremental reads of
+# the progress events, which covers the events streamed late or by an instance whose clock is behind.
+SNAPSHOT_FULL_RELOAD_SECONDS = float(os.environ.get('SNAPSHOT_FULL_RELOAD_SECONDS', 600))
+SNAPSHOT_CHANGES_OVERLAP_SECONDS = float(os.environ.get('SNAPSHOT_CHANGES_OVERLAP_SECONDS', 120))
+# Columns of the in-memory snapshot which have the secondary indexes.
+SNAPSHOT_INDEX_COLUMNS = ('entity_id', 'application_name', 'source_server', 'migrator', 'env')
+
+# Path of the log file, and the level of the records which will be logged.
+LOG_FILE = os.environ.get('LOG_FILE', 'error.log')
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'ERROR').upper()
+# Maximum number of the records waiting for the log writer thread, after which the new records are dropped.
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+# Time (in seconds) for which the repeated identical records will be dropped (0 disables the rate limit).
+LOG_RATE_LIMIT_SECONDS = float(os.environ.get('LOG_RATE_LIMIT_SECONDS', 60))
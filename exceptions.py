@@ -0,0 +1,96 @@
+"""
+This file will be used for the custom exceptions raised by the application.
+"""
+
+
+class BatcherFullError(Exception):
+    """
+    This BatcherFullError will be raised when the write-behind buffer of a table is full
+    and the row could not be queued within the timeout, or the batcher has been shut down.
+    The client should retry after retry_after seconds.
+    """
+    def __init__(self, message, retry_after=1):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param message: The error message
+        :param retry_after: Time (in seconds) after which the client should retry
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DMLQueueFullError(Exception):
+    """
+    This DMLQueueFullError will be raised when the DML admission queue of a table is full, or the DML
+    could not be admitted within the maximum wait. The client should retry after retry_after seconds.
+    """
+    def __init__(self, message, retry_after):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param message: The error message
+        :param retry_after: Time (in seconds) after which the client should retry
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QueryCostExceededError(Exception):
+    """
+    This QueryCostExceededError will be raised when the dry run of a BigQuery statement estimates
+    more bytes than the byte budget of a statement.
+    """
+    def __init__(self, message, estimated_bytes, max_bytes):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param message: The error message
+        :param estimated_bytes: The bytes estimated by the dry run of the statement
+        :param max_bytes: The byte budget of a statement
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        super().__init__(message)
+        self.estimated_bytes = estimated_bytes
+        self.max_bytes = max_bytes
+
+
+class PhaseTransitionError(Exception):
+    """
+    This PhaseTransitionError will be raised when the progress would complete a step before the steps it requires,
+    reopen a step after the steps which require it, or refers to an unknown step or entity.
+    """
+
+
+class StreamLimitError(Exception):
+    """
+    This StreamLimitError will be raised when the maximum number of the progress streams are being served.
+    The client should reconnect after retry_after seconds.
+    """
+    def __init__(self, message, retry_after):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param message: The error message
+        :param retry_after: Time (in seconds) after which the client should reconnect
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SpoolPendingError(Exception):
+    """
+    This SpoolPendingError will be raised when the entity is deleted along with its objects and its progress,
+    while the write spool still holds the writes of the entity, which would re-create the rows after the delete.
+    """
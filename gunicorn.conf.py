@@ -0,0 +1,34 @@
+"""
+This file will be used for configuring gunicorn. The worker is the gthread worker by default, in which every request
+(and every progress stream, for its window) holds one of GUNICORN_THREADS threads. The gevent worker can be opted in
+with GUNICORN_WORKER_CLASS=gevent, where a request waiting on I/O holds a greenlet, so that many progress streams can
+be served. The blocking calls which do not yield to gevent (i.e: the fsync of the spool, the SQLite backend and the
+NumPy analytics) then stall the whole worker for their duration.
+"""
+import os
+
+bind = f":{os.environ.get('PORT_NUMBER', 8080)}"
+workers = 1
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+# Number of the threads of the gthread worker, and the connections served at a time by the gevent worker.
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+timeout = 0
+
+
+def post_worker_init(worker):
+    """
+    The post_worker_init function makes gRPC (used by the Cloud Logging client) cooperative with gevent,
+    once the gevent worker has patched the standard library.
+
+    :param worker: The gunicorn worker
+    :return: Nothing
+    :doc-author: Kaoushik Kumar
+    """
+    if worker_class != 'gevent':
+        return
+    try:
+        from grpc.experimental import gevent as grpc_gevent
+    except ImportError:
+        return
+    grpc_gevent.init_gevent()
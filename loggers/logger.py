@@ -1,7 +1,286 @@
 """
 This file will the Global File, which will be used for log the exceptions to the codes.
+The logging is set up once per process: the request threads only push the records onto a queue, and a single
+listener thread writes them to the file, the stdout and (when it has been added) the Cloud Logging.
 """
+import atexit
 import logging
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from flask import g, has_request_context, request
+from constants import LOG_FILE, LOG_LEVEL, LOG_QUEUE_SIZE, LOG_RATE_LIMIT_SECONDS
+
+# Format of the log lines, with the structured fields of the request.
+LOG_FORMAT = ('%(asctime)s - %(levelname)s - %(message)s - '
+              'endpoint=%(endpoint)s entity_id=%(entity_id)s latency_ms=%(latency_ms)s')
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    This RequestContextFilter Class will add the structured fields of the current request to the record,
+    i.e: the endpoint, the entity_id and the latency of the request so far. It runs in the request thread,
+    before the record is queued, so that the request is still available.
+    """
+    def filter(self, record):
+        """
+        The filter function adds the endpoint, entity_id and latency_ms fields to the record.
+
+        :param self: Represent the instance of the class
+        :param record: The LogRecord object
+        :return: True, the record is never dropped
+        :doc-author: Kaoushik Kumar
+        """
+        record.endpoint = record.entity_id = record.latency_ms = None
+        if has_request_context():
+            record.endpoint = f'{request.method} {request.path}'
+            record.entity_id = (request.view_args or {}).get('entity_id') or request.args.get('entity_id')
+            started = g.get('request_started')
+            if started is not None:
+                record.latency_ms = round((time.perf_counter() - started) * 1000, 3)
+            if record.levelno >= logging.ERROR:
+                # The resources answer the failures with 200, so the error metric of the request is taken from here.
+                g.request_failed = True
+        fields = {'endpoint': record.endpoint, 'entity_id': record.entity_id, 'latency_ms': record.latency_ms}
+        # The json_fields will be written as the structured payload by the Cloud Logging handler.
+        record.json_fields = {**getattr(record, 'json_fields', {}), **fields}
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    This RateLimitFilter Class will let the first of the identical records through and drop the repeated ones
+    for the window, and then report how many times the record has been repeated with the next one.
+    """
+    def __init__(self, window_seconds, max_keys=10000):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param window_seconds: Time (in seconds) for which the identical records will be dropped
+        :param max_keys: Maximum number of the distinct records which will be remembered
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        super().__init__()
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self.suppressed = 0
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        """
+        The filter function drops the record when an identical one has been let through within the window.
+
+        :param self: Represent the instance of the class
+        :param record: The LogRecord object
+        :return: A boolean value, whether the record will be logged
+        :doc-author: Kaoushik Kumar
+        """
+        if self.window_seconds <= 0:
+            return True
+        key = (record.levelno, record.getMessage())
+        now = time.monotonic()
+        with self._lock:
+            last, repeated = self._seen.get(key, (None, 0))
+            if last is not None and now - last < self.window_seconds:
+                self._seen[key] = (last, repeated + 1)
+                self.suppressed += 1
+                return False
+            if len(self._seen) >= self.max_keys:
+                self._seen = {seen_key: value for seen_key, value in self._seen.items()
+                              if now - value[0] < self.window_seconds}
+            self._seen[key] = (now, 0)
+        if repeated:
+            record.msg = f'{record.getMessage()} (repeated {repeated} times)'
+            record.args = None
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    This DroppingQueueHandler Class will never block the request thread: when the queue is full,
+    the record is dropped and counted instead.
+    """
+    def __init__(self, log_queue):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param log_queue: The bounded queue of the records
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        """
+        The enqueue function puts the record onto the queue without waiting.
+
+        :param self: Represent the instance of the class
+        :param record: The prepared LogRecord object
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class CloudLoggingHandler(logging.Handler):
+    """
+    This CloudLoggingHandler Class will send the records to the Cloud Logging. The Cloud Logging client is
+    created on the first record, in the log writer thread, so that neither the import of the app nor a request
+    thread has to wait for the google-cloud-logging import and the credentials.
+    """
+    def __init__(self):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        super().__init__()
+        self.failed = False
+
+    def emit(self, record):
+        """
+        The emit function passes the record to the default handler of the Cloud Logging client.
+            If the client could not be created, the error is reported once and the handler is disabled.
+
+        :param self: Represent the instance of the class
+        :param record: The LogRecord object
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        if self.failed:
+            return
+        try:
+            handler = get_cloud_logging_handler()
+        except Exception:
+            self.failed = True
+            self.handleError(record)
+            return
+        handler.handle(record)
+
+
+# The process-wide Cloud Logging handler, which will be created on the first use.
+_cloud_logging_handler = None
+_cloud_logging_lock = threading.Lock()
+
+
+def get_cloud_logging_handler():
+    """
+    The get_cloud_logging_handler function creates the Cloud Logging client and sets up the Cloud Logging of the
+    root logger once per process, and returns the default handler of the client.
+
+    :return: The Cloud Logging handler
+    :doc-author: Kaoushik Kumar
+    """
+    global _cloud_logging_handler
+    with _cloud_logging_lock:
+        if _cloud_logging_handler is None:
+            from google.cloud import logging as cloud_logging
+            client = cloud_logging.Client()
+            client.setup_logging()
+            _cloud_logging_handler = client.get_default_handler()
+        return _cloud_logging_handler
+
+
+# The process-wide queue handler and listener, which will be set up on the first use.
+_queue_handler = None
+_listener = None
+_setup_lock = threading.Lock()
+
+
+def setup_logging(name=__name__, level=LOG_LEVEL):
+    """
+    The setup_logging function sets up the logging once per process, and attaches the logger to it.
+        The logger only has the queue handler with the structured-fields and rate-limit filters,
+        and the listener thread writes the records to the file and the stdout.
+
+    :param name: Name of the logger
+    :param level: Level of the records which will be logged by the logger
+    :return: The logger
+    :doc-author: Kaoushik Kumar
+    """
+    logger = logging.getLogger(name)
+    with _setup_lock:
+        _start_listener()
+        if _queue_handler not in logger.handlers:
+            # The below line will be for the type of the records needs to be leveled.
+            logger.setLevel(level)
+            logger.addHandler(_queue_handler)
+            # The records are written only by the listener, so they must not be written again by the root handlers.
+            logger.propagate = False
+    return logger
+
+
+def _start_listener():
+    """
+    The _start_listener function creates the queue handler and starts the listener thread, if it is not
+    running already. It must be called while holding the setup lock.
+
+    :return: Nothing
+    :doc-author: Kaoushik Kumar
+    """
+    global _queue_handler, _listener
+    if _queue_handler is None:
+        formatter = logging.Formatter(LOG_FORMAT)
+        file_handler = logging.FileHandler(LOG_FILE)
+        stream_handler = logging.StreamHandler(sys.stdout)
+        for handler in (file_handler, stream_handler):
+            handler.setFormatter(formatter)
+        _queue_handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        _queue_handler.addFilter(RequestContextFilter())
+        _queue_handler.addFilter(RateLimitFilter(LOG_RATE_LIMIT_SECONDS))
+        _listener = QueueListener(_queue_handler.queue, file_handler, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+def add_log_handler(handler):
+    """
+    The add_log_handler function adds a handler to the listener thread, i.e: the Cloud Logging handler.
+
+    :param handler: The logging Handler object
+    :return: Nothing
+    :doc-author: Kaoushik Kumar
+    """
+    with _setup_lock:
+        _start_listener()
+        _listener.handlers = _listener.handlers + (handler,)
+
+
+def start_request_timer():
+    """
+    The start_request_timer function records the start time of the request, which is used for the latency field.
+        It is registered as the before_request function of the app.
+
+    :return: Nothing
+    :doc-author: Kaoushik Kumar
+    """
+    g.request_started = time.perf_counter()
+
+
+def logging_stats():
+    """
+    The logging_stats function returns the counters of the logging subsystem.
+
+    :return: A dictionary with the queued, dropped and rate-limited record counters
+    :doc-author: Kaoushik Kumar
+    """
+    if _queue_handler is None:
+        return {'queued': 0, 'dropped': 0, 'suppressed': 0}
+    rate_limit = next(item for item in _queue_handler.filters if isinstance(item, RateLimitFilter))
+    return {'queued': _queue_handler.queue.qsize(), 'dropped': _queue_handler.dropped,
+            'suppressed': rate_limit.suppressed}
 
 
 class Logger(object):
@@ -17,30 +296,17 @@ class Logger(object):
         """
         self.name = __name__
         self.error = logging.ERROR
-        self.__format__ = '%(asctime)s - %(levelname)s - %(message)s'
+        self.__format__ = LOG_FORMAT
 
     def logging(self):
         """
         The logging function is used for logging the errors in a file.
             The function will be called by the other functions to log their errors.
-            The function takes three arguments: name, error and format.
-
-            Args: name, error and format
+            The logger is set up only once per process, so no handler is added by the later calls.
 
         :param self: Represent the instance of the class
         :return: The logger
         :doc-author: Kaoushik Kumar
         """
         # __name__ have to be registered for the name of the exceptions.
-        logger = logging.getLogger(self.name)
-        # The below line will be for the type of ERROR needs to be leveled.
-        logger.setLevel(self.error)
-        # The below line will be used for assigning the format of the Logs(i.e: Date/Time)
-        formate = logging.Formatter(self.__format__)
-        # The below line will be saved the logs to the corresponding file name.
-        file_name = logging.FileHandler('error.log')
-        # The below file will be used for Registering the Formats of Logs.
-        file_name.setFormatter(formate)
-        # And the last line is for adding the file_name to be FileHandler.
-        logger.addHandler(file_name)
-        return logger
+        return setup_logging(self.name)
@@ -0,0 +1,23 @@
+"""
+This file will be used for the fixtures of the tests. The tests run against the SQLite backend, which has to be
+chosen before the application is imported, because the configuration is read by the constants on import.
+"""
+import os
+import tempfile
+import pytest
+
+os.environ['STORAGE_BACKEND'] = 'sqlite'
+os.environ.setdefault('SQLITE_PATH', os.path.join(tempfile.mkdtemp(prefix='migration-phase-tests-'), 'tests.db'))
+os.environ.setdefault('LOG_FILE', os.path.join(tempfile.gettempdir(), 'migration-phase-tests.log'))
+
+
+@pytest.fixture(scope='session')
+def client():
+    """
+    The client fixture returns the test client of the Flask application, shared by all the tests.
+
+    :return: The FlaskClient object
+    :doc-author: Kaoushik Kumar
+    """
+    from app import app
+    return app.test_client()
@@ -0,0 +1,73 @@
+"""
+This file will be used for testing the analytics of the phases, i.e: the percentiles and the regression computed
+for all the phases at once, the steps too short for the regression, and the ETA of the unestimated entities.
+"""
+from datetime import datetime
+import numpy as np
+import pytest
+from utils.analytics import PERCENTILES, PHASES, get_analytics, phase_model
+
+
+def test_percentiles_and_regression_match_numpy():
+    generator = np.random.default_rng(7)
+    phase = generator.integers(0, 3, 300)
+    size_gb = generator.uniform(1, 100, 300)
+    hours = 2 + 0.5 * size_gb + generator.normal(0, 1, 300) + phase
+    model = phase_model(phase, hours, size_gb)
+    for code in range(3):
+        selected = phase == code
+        slope, intercept = np.polyfit(size_gb[selected], hours[selected], 1)
+        predicted = intercept + slope * size_gb[selected]
+        r2 = 1 - ((hours[selected] - predicted) ** 2).sum() / ((hours[selected] - hours[selected].mean()) ** 2).sum()
+        assert model['count'][code] == selected.sum()
+        assert model['mean_hours'][code] == pytest.approx(hours[selected].mean())
+        assert model['percentiles'][code] == pytest.approx(np.percentile(hours[selected], PERCENTILES))
+        assert (model['hours_per_gb'][code], model['fixed_hours'][code]) == pytest.approx((slope, intercept))
+        assert model['r2'][code] == pytest.approx(r2)
+        assert model['gb_per_hour'][code] == pytest.approx(size_gb[selected].sum() / hours[selected].sum())
+    assert np.isnan(model['mean_hours'][3:]).all()
+    assert np.isnan(model['percentiles'][3:]).all()
+
+
+def test_short_steps_are_left_out_of_the_regression_and_the_rate():
+    phase = np.array([0, 0, 0, 0])
+    size_gb = np.array([9, 1.0, 2.0, 4.0])
+    hours = np.array([0.0001, 1.0, 2.0, 4.0])
+    model = phase_model(phase, hours, size_gb, min_hours=1 / 60)
+    assert (model['count'][0], model['fitted'][0]) == (4, 3)
+    assert model['mean_hours'][0] == pytest.approx(hours.mean())
+    assert (model['hours_per_gb'][0], model['fixed_hours'][0], model['r2'][0]) == pytest.approx((1.0, 0.0, 1.0))
+    assert model['gb_per_hour'][0] == pytest.approx(1.0)
+    # A phase with only the short steps has no regression and no rate.
+    model = phase_model(np.array([1]), np.array([0.0001]), np.array([9.0]), min_hours=1 / 60)
+    assert np.isnan(model['fixed_hours'][1]) and np.isnan(model['gb_per_hour'][1])
+
+
+def test_eta_is_unknown_with_an_unestimated_step(client):
+    client.post('/api/v1/phase-table/bulk', json=[
+        {'step_id': step_id, 'name': name, 'description': 'd', 'orders': step_id, 'is_optional': False,
+         'parent_step_id': 0} for step_id, name in ((701, PHASES[-2]), (702, PHASES[-1]))
+    ])
+    client.post('/api/v1/entity-table/bulk', json=[
+        {'entity_id': entity_id, 'application_name': 'a', 'source_server': 's', 'source_database': 'd',
+         'target_server': 't', 'migrator': 'm', 'env': 'EtaTest'} for entity_id in (801, 802, 803)
+    ])
+    started = datetime(2024, 1, 1, 10)
+    client.post('/api/v1/process-table/bulk', json=[
+        # The first step of the entity 801 took 2 hours, so it is the only phase with a regression.
+        {'step_id': 701, 'entity_id': 801, 'is_successful': True, 'start_date_time': '2024-01-01T08:00:00',
+         'end_date_time': '2024-01-01T10:00:00'},
+        {'step_id': 701, 'entity_id': 802, 'start_date_time': '2024-01-01T09:30:00', 'end_date_time': None},
+        {'step_id': 702, 'entity_id': 801, 'start_date_time': '2024-01-01T10:00:00', 'end_date_time': None},
+    ])
+    etas = get_analytics().etas({'env': 'EtaTest'}, now=started.timestamp())
+    entities = {entity['entity_id']: entity for entity in etas['entities']}
+    assert entities[802]['remaining_hours'] == pytest.approx(1.5)
+    assert entities[802]['eta'] == '2024-01-01T11:30:00'
+    unestimated = entities[801]
+    assert (unestimated['unestimated_steps'], unestimated['remaining_hours'], unestimated['eta']) == (1, None, None)
+    assert [entity['entity_id'] for entity in etas['entities']] == [802, 801]
+    assert etas['wave'] == {'entities': 2, 'unestimated_steps': 1, 'eta': None}
+    for entity_id in (801, 802, 803):
+        client.delete(f'/api/v1/entity-table?entity_id={entity_id}&cascade=true')
+    client.delete('/api/v1/phase-table/bulk', json=[701, 702])
@@ -0,0 +1,156 @@
+"""
+This file will be used for testing the endpoints against the SQLite backend, i.e: the CRUD of the four tables,
+the bulk, import and export endpoints, the detail and the plan of the entities, and the analytics.
+"""
+import json
+
+
+def phase(step_id, orders, name='Dev Schema Conversion', description='Converts the schema'):
+    return {'step_id': step_id, 'name': name, 'description': description, 'orders': orders, 'is_optional': False,
+            'parent_step_id': 0}
+
+
+def entity(entity_id, env='Development'):
+    return {'entity_id': entity_id, 'application_name': 'billing', 'source_server': 'mssql-01',
+            'source_database': 'billing', 'target_server': 'alloydb-01', 'migrator': 'striim', 'env': env}
+
+
+def test_phase_crud(client):
+    assert client.post('/api/v1/phase-table', json=phase(101, 1)).get_json() == {'response': 'Success'}
+    assert client.put('/api/v1/phase-table', json=phase(101, 1, description='Changed')).status_code == 200
+    response = client.get('/api/v1/phase-table?step_id=101').get_json()
+    assert response['count'] == 1
+    assert response['result'][0]['description'] == 'Changed'
+    assert client.delete('/api/v1/phase-table?step_id=101').status_code == 200
+    assert client.get('/api/v1/phase-table?step_id=101').get_json()['count'] == 0
+
+
+def test_entity_and_object_crud(client):
+    assert client.post('/api/v1/entity-table', json=entity(201)).get_json() == {'response': 'Success'}
+    assert client.put('/api/v1/entity-table', json=entity(201, env='Production')).status_code == 200
+    assert client.get('/api/v1/entity-table?entity_id=201').get_json()['result'][0]['env'] == 'Production'
+    object_ = {'object_id': 301, 'entity_id': 201, 'name': 'invoices', 'size_in_mb': 512}
+    assert client.post('/api/v1/entity-object-table', json=object_).get_json() == {'response': 'Success'}
+    # The objects can be filtered by the columns of their entity.
+    assert client.get('/api/v1/entity-object-table?env=Production').get_json()['count'] == 1
+    assert client.get('/api/v1/entity-object-table?env=Development').get_json()['count'] == 0
+    assert client.delete('/api/v1/entity-object-table?object_id=301').status_code == 200
+    assert client.delete('/api/v1/entity-table?entity_id=201').status_code == 200
+    assert client.get('/api/v1/entity-table?entity_id=201').get_json()['count'] == 0
+
+
+def test_bulk_reports_every_item(client):
+    response = client.post('/api/v1/phase-table/bulk', json=[phase(111, 1), {'step_id': 'x'}]).get_json()
+    assert response['failed'] == 1
+    assert [result['status'] for result in response['results']] == ['Success', 'Invalid']
+    response = client.put('/api/v1/phase-table/bulk', json=[phase(111, 1, description='First'),
+                                                              phase(111, 1, description='Last')]).get_json()
+    assert [result['status'] for result in response['results']] == ['Superseded', 'Updated']
+    assert client.get('/api/v1/phase-table?step_id=111').get_json()['result'][0]['description'] == 'Last'
+    response = client.delete('/api/v1/phase-table/bulk', json=[111, 'x']).get_json()
+    assert [result['status'] for result in response['results']] == ['Deleted', 'Invalid']
+    assert client.get('/api/v1/phase-table?step_id=111').get_json()['count'] == 0
+
+
+def test_failed_bulk_write_reports_the_items_as_failed(client, monkeypatch):
+    from utils import bq_client
+
+    def fail(self, rows):
+        raise ConnectionError('connection reset')
+    monkeypatch.setattr(bq_client.PhaseTable, 'merge_rows', fail)
+    monkeypatch.setattr(bq_client.PhaseTable, 'delete_keys', fail)
+    response = client.put('/api/v1/phase-table/bulk', json=[phase(112, 1), phase(112, 1), {'step_id': 'x'}]).get_json()
+    assert (response['response'], response['failed'], response['result']) == (False, 3, 'connection reset')
+    assert [result['status'] for result in response['results']] == ['Failed', 'Failed', 'Invalid']
+    response = client.delete('/api/v1/phase-table/bulk', json=[112, 'x']).get_json()
+    assert [result['status'] for result in response['results']] == ['Failed', 'Invalid']
+    assert response['results'][0]['errors'] == 'connection reset'
+
+
+def test_plan_progress_detail_and_cascade(client):
+    client.post('/api/v1/phase-table/bulk', json=[phase(121, 1), phase(122, 2, name='Dev Data Movement')])
+    client.post('/api/v1/entity-table', json=entity(221))
+    client.post('/api/v1/entity-object-table', json={'object_id': 321, 'entity_id': 221, 'name': 'o', 'size_in_mb': 1})
+    response = client.post('/api/v1/entities/221/plan').get_json()
+    assert response['plans'][0]['steps'][-2:] == [121, 122]
+    # The plan can be called again, and leaves out the steps which already have a progress.
+    assert client.post('/api/v1/entities/221/plan').get_json()['created'] == 0
+    progress = {'step_id': 121, 'entity_id': 221, 'is_successful': True,
+                'start_date_time': '2024-01-01T00:00:00', 'end_date_time': '2024-01-01T02:00:00'}
+    assert client.put('/api/v1/process-table', json=progress).status_code == 200
+    detail = client.get('/api/v1/entities/221/detail').get_json()['result']
+    assert [row['object_id'] for row in detail['objects']] == [321]
+    assert {row['step_id']: row['is_successful'] for row in detail['progress']}[121] is True
+    assert client.get('/api/v1/entities/999999/detail').status_code == 404
+    response = client.delete('/api/v1/entity-table?entity_id=221&cascade=true').get_json()
+    assert response['deleted']['tbl_migration_entity'] == 1
+    assert client.get('/api/v1/process-table?entity_id=221').get_json()['count'] == 0
+    client.delete('/api/v1/phase-table/bulk', json=[121, 122])
+
+
+def test_import_and_export(client):
+    client.post('/api/v1/entity-table', json=entity(231))
+    upload = '\n'.join(json.dumps({'object_id': object_id, 'entity_id': 231, 'name': 'o', 'size_in_mb': 1})
+                       for object_id in (331, 332)) + '\n{"object_id": "x"}\n'
+    response = client.post('/api/v1/entity-object-table/import?format=ndjson', data=upload).get_json()
+    assert (response['rows'], response['loaded'], response['invalid']) == (3, 2, 1)
+    assert response['errors'][0]['line'] == 3
+    lines = client.get('/api/v1/entity-object-table/export?entity_id=231&fields=object_id').get_data(as_text=True)
+    rows = [json.loads(line) for line in lines.splitlines()]
+    assert sorted(row['object_id'] for row in rows[:-1]) == [331, 332]
+    assert rows[-1] == {'_continuation_token': None, '_rows': 2}
+    client.delete('/api/v1/entity-table?entity_id=231&cascade=true')
+
+
+def test_analytics(client):
+    client.post('/api/v1/phase-table', json=phase(141, 1))
+    client.post('/api/v1/entity-table', json=entity(241, env='Analytics'))
+    client.post('/api/v1/entity-object-table', json={'object_id': 341, 'entity_id': 241, 'name': 'o',
+                                                     'size_in_mb': 1024})
+    client.put('/api/v1/process-table', json={'step_id': 141, 'entity_id': 241, 'is_successful': True,
+                                              'start_date_time': '2024-01-01T00:00:00',
+                                              'end_date_time': '2024-01-01T02:00:00'})
+    response = client.get('/api/v1/analytics/phases?env=Analytics').get_json()
+    assert response['completed_steps'] == 1
+    assert response['phases'][0]['p50_hours'] == 2.0
+    assert client.get('/api/v1/analytics/eta?env=Analytics').get_json()['response'] == 'Success'
+    client.delete('/api/v1/entity-table?entity_id=241&cascade=true')
+    client.delete('/api/v1/phase-table?step_id=141')
+
+
+def test_health_check_and_metrics(client):
+    assert client.get('/health-check').get_json() == 'Success'
+    assert 'http_requests_total' in client.get('/metrics').get_data(as_text=True)
+
+
+def test_statement_above_the_byte_budget_is_unprocessable(client, monkeypatch):
+    from exceptions import QueryCostExceededError
+    from utils import bq_client
+
+    def merge_rows(self, rows):
+        raise QueryCostExceededError('MERGE tbl_migration_step is estimated to process 2048 bytes, above the budget '
+                                     'of 1024 bytes', 2048, 1024)
+    monkeypatch.setattr(bq_client.PhaseTable, 'merge_rows', merge_rows)
+    response = client.put('/api/v1/phase-table', json=phase(151, 1))
+    assert response.status_code == 422
+    assert response.get_json()['estimated_bytes'] == 2048
+    assert response.get_json()['max_bytes'] == 1024
+    assert client.put('/api/v1/phase-table/bulk', json=[phase(151, 1)]).status_code == 422
+
+
+def test_concurrent_plans_create_the_progress_once(client):
+    from concurrent.futures import ThreadPoolExecutor
+    from app import app
+    client.post('/api/v1/phase-table/bulk', json=[phase(161, 1), phase(162, 2, name='Dev Data Movement')])
+    client.post('/api/v1/entity-table', json=entity(261))
+
+    def plan(_):
+        return app.test_client().post('/api/v1/entities/261/plan').get_json()
+    with ThreadPoolExecutor(4) as executor:
+        responses = list(executor.map(plan, range(4)))
+    assert sum(response['created'] for response in responses) == len(responses[0]['plans'][0]['steps'])
+    steps = [row['step_id'] for row in client.get('/api/v1/process-table?entity_id=261').get_json()['result']]
+    assert sorted(steps) == sorted(set(steps))
+    assert {161, 162} <= set(steps)
+    client.delete('/api/v1/entity-table?entity_id=261&cascade=true')
+    client.delete('/api/v1/phase-table/bulk', json=[161, 162])
@@ -0,0 +1,105 @@
+"""
+This file will be used for testing the write-behind batchers, i.e: the flush by size and by time, the futures
+of a failed flush and the coalescing of the updates of the same key.
+"""
+import time
+import pytest
+from exceptions import BatcherFullError
+from utils.batcher import InsertBatcher, UpdateCoalescer
+
+
+class Recorder:
+    """
+    This Recorder Class will record the batches written by a batcher, and fail them when asked to.
+    """
+    def __init__(self, error=None, result=None):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param error: The exception raised by every write, or None
+        :param result: The result of every write, or a function of the rows which returns it
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.batches = []
+        self.error = error
+        self.result = result
+
+    def __call__(self, rows):
+        """
+        The __call__ function records the written rows.
+
+        :param self: Represent the instance of the class
+        :param rows: The list of the written rows
+        :return: The result of the write
+        :doc-author: Kaoushik Kumar
+        """
+        self.batches.append(list(rows))
+        if self.error is not None:
+            raise self.error
+        return self.result(rows) if callable(self.result) else self.result
+
+
+def test_insert_batcher_flushes_by_size():
+    recorder = Recorder(result=[])
+    batcher = InsertBatcher('size', recorder, max_batch_size=3, max_wait_seconds=60, max_pending=100)
+    futures = [batcher.submit({'id': index}) for index in range(3)]
+    assert [future.result(timeout=5) for future in futures] == [[], [], []]
+    assert recorder.batches == [[{'id': 0}, {'id': 1}, {'id': 2}]]
+    batcher.shutdown()
+
+
+def test_insert_batcher_flushes_by_time():
+    recorder = Recorder(result=[])
+    batcher = InsertBatcher('time', recorder, max_batch_size=100, max_wait_seconds=0.05, max_pending=100)
+    started = time.monotonic()
+    future = batcher.submit({'id': 1})
+    assert future.result(timeout=5) == []
+    assert 0.04 <= time.monotonic() - started < 2
+    assert recorder.batches == [[{'id': 1}]]
+    batcher.shutdown()
+
+
+def test_insert_batcher_returns_the_errors_of_every_row():
+    recorder = Recorder(result=lambda rows: [{'index': 1, 'errors': ['bad row']}])
+    batcher = InsertBatcher('errors', recorder, max_batch_size=2, max_wait_seconds=60, max_pending=100)
+    first, second = batcher.submit({'id': 1}), batcher.submit({'id': 2})
+    assert first.result(timeout=5) == []
+    assert second.result(timeout=5) == ['bad row']
+    batcher.shutdown()
+
+
+def test_failed_flush_resolves_every_future_with_the_error():
+    recorder = Recorder(error=RuntimeError('insert failed'))
+    batcher = InsertBatcher('failed', recorder, max_batch_size=2, max_wait_seconds=60, max_pending=100)
+    futures = [batcher.submit({'id': index}) for index in range(2)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match='insert failed'):
+            future.result(timeout=5)
+    assert batcher.stats()['failed_batches'] == 1
+    batcher.shutdown()
+
+
+def test_full_and_shut_down_batcher_raise_batcher_full_error():
+    recorder = Recorder(result=[])
+    batcher = InsertBatcher('full', recorder, max_batch_size=10, max_wait_seconds=60, max_pending=1,
+                            submit_timeout=0.05)
+    batcher.submit({'id': 1})
+    with pytest.raises(BatcherFullError) as error:
+        batcher.submit({'id': 2})
+    assert error.value.retry_after >= 1
+    batcher.shutdown()
+    assert recorder.batches == [[{'id': 1}]]
+    with pytest.raises(BatcherFullError, match='shut down'):
+        batcher.submit({'id': 3})
+
+def test_update_coalescer_keeps_the_latest_row_of_a_key():
+    recorder = Recorder(result=2)
+    coalescer = UpdateCoalescer('coalesce', recorder, max_batch_size=100, max_wait_seconds=0.1, max_pending=100)
+    futures = [coalescer.submit(((1,), {'id': 1, 'value': value})) for value in ('a', 'b', 'c')]
+    futures.append(coalescer.submit(((2,), {'id': 2, 'value': 'x'})))
+    assert [future.result(timeout=5) for future in futures] == [2, 2, 2, 2]
+    assert recorder.batches == [[{'id': 1, 'value': 'c'}, {'id': 2, 'value': 'x'}]]
+    assert coalescer.stats()['superseded'] == 2
+    coalescer.shutdown()
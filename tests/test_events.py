@@ -0,0 +1,156 @@
+"""
+This file will be used for testing the progress streams, i.e: a stream is resumed after its Last-Event-ID, and is
+reset when the id is of another bus or its events have been dropped, the streams are capped by their own slots, and
+the opt-in gevent worker serves them without a thread per stream.
+"""
+import itertools
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import pytest
+from constants import TBL_MIGRATION_PROGRESS
+from exceptions import StreamLimitError
+from utils.admission import limiter_stats
+from utils.events import EventBus, StreamSlots, stream
+
+
+def publish(bus, *entity_ids):
+    bus.on_write(TBL_MIGRATION_PROGRESS, 'upsert', [{'entity_id': entity_id, 'step_id': 1, 'env': 'Production'}
+                                                    for entity_id in entity_ids])
+
+
+def served(bus, sequence, entity_ids=None):
+    """
+    The served function returns the events of a single pass of the stream, whose window is over right away.
+
+    :param bus: The EventBus object
+    :param sequence: The sequence of the Last-Event-ID, or None
+    :param entity_ids: The set of the entity ids of the stream, or None for all the entities
+    :return: A list of the (id, event, data) tuples
+    :doc-author: Kaoushik Kumar
+    """
+    chunks = list(stream(bus, sequence, entity_ids, None, 0, 10, 1000))
+    assert chunks[0] == 'retry: 1000\n\n'
+    events = []
+    for message in ''.join(chunks[1:]).split('\n\n'):
+        if message:
+            fields = dict(line.split(': ', 1) for line in message.split('\n'))
+            events.append((fields['id'], fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def test_new_stream_starts_with_reset():
+    bus = EventBus(size=4)
+    publish(bus, 1, 2)
+    assert served(bus, None) == [(bus.event_id(2), 'reset', {})]
+
+
+def test_stream_resumes_after_last_event_id():
+    bus = EventBus(size=4)
+    publish(bus, 1, 2)
+    last_event_id = served(bus, None)[-1][0]
+    publish(bus, 3, 4)
+    events = served(bus, bus.parse_id(last_event_id))
+    assert [(event_id, name, data['entity_id']) for event_id, name, data in events] == [
+        (bus.event_id(3), 'progress', 3), (bus.event_id(4), 'progress', 4)]
+    # The filtered stream skips the events of the other entities, but is still resumed after them.
+    assert [data['entity_id'] for _, _, data in served(bus, bus.parse_id(last_event_id), {4})] == [4]
+    assert served(bus, bus.parse_id(events[-1][0])) == []
+
+
+def test_stream_of_foreign_id_is_reset():
+    bus = EventBus(size=4)
+    publish(bus, 1, 2)
+    other = EventBus(size=4)
+    for event_id in (other.event_id(1), 'malformed', f'{bus.bus_id}-x'):
+        assert bus.parse_id(event_id) is None
+        assert served(bus, bus.parse_id(event_id)) == [(bus.event_id(2), 'reset', {})]
+
+
+def test_stream_after_missed_events_is_reset():
+    bus = EventBus(size=2)
+    publish(bus, 1)
+    publish(bus, 2, 3, 4, 5)
+    # Only the last two events are kept, so the stream after the first one has missed the events 2 and 3.
+    events = served(bus, bus.parse_id(bus.event_id(1)))
+    assert events[0] == (bus.event_id(3), 'reset', {'missed': True})
+    assert [(event_id, data['entity_id']) for event_id, _, data in events[1:]] == [
+        (bus.event_id(4), 4), (bus.event_id(5), 5)]
+    assert bus.stats() == {'published': 5, 'buffered': 2}
+
+
+def test_stream_slots_are_apart_from_dml_admission():
+    slots = StreamSlots(max_streams=2, retry_after=25)
+    slots.acquire()
+    slots.acquire()
+    with pytest.raises(StreamLimitError) as error:
+        slots.acquire()
+    assert error.value.retry_after == 25
+    slots.release()
+    slots.acquire()
+    assert slots.stats() == {'active': 2, 'served': 3, 'rejected': 1}
+    assert not any('stream' in name for name in limiter_stats())
+
+
+def test_stream_beyond_slots_is_rejected(client, monkeypatch):
+    from utils.events import stream_slots
+    monkeypatch.setattr(stream_slots, 'max_streams', stream_slots.stats()['active'] + 1)
+    response = client.get('/api/v1/progress/stream')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('text/event-stream')
+    rejected = client.get('/api/v1/progress/stream')
+    assert rejected.status_code == 429
+    assert int(rejected.headers['Retry-After']) >= 1
+    # The slot is given back when the stream is closed.
+    response.close()
+    assert stream_slots.stats()['active'] == 0
+    metrics = client.get('/metrics').get_data(as_text=True)
+    assert 'progress_streams{state="rejected"}' in metrics
+    assert 'dml_queue_depth{table="progress-stream"}' not in metrics
+
+
+def test_gevent_worker_serves_streams_without_threads(tmp_path):
+    pytest.importorskip('gevent')
+    requests = pytest.importorskip('requests')
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    # A single thread, which the gthread worker would give to the first stream, while the gevent worker ignores it.
+    env = dict(os.environ, GUNICORN_WORKER_CLASS='gevent', GUNICORN_THREADS='1', PORT_NUMBER=str(port),
+               STORAGE_BACKEND='sqlite', SQLITE_PATH=str(tmp_path / 'gevent.db'), LOG_FILE=str(tmp_path / 'error.log'),
+               STREAM_MAX_CONNECTIONS='10', STREAM_WINDOW_SECONDS='10')
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', 'app:app'], cwd=root,
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                requests.get(f'{url}/health-check', timeout=1)
+                break
+            except requests.ConnectionError:
+                assert time.monotonic() < deadline and server.poll() is None
+                time.sleep(0.2)
+        streams = [requests.get(f'{url}/api/v1/progress/stream', stream=True, timeout=5) for _ in range(3)]
+        lines = [response.iter_lines(decode_unicode=True) for response in streams]
+        for stream_lines in lines:
+            assert 'event: reset' in itertools.takewhile(lambda line: line != 'data: {}', stream_lines)
+        # The API is still served while the three streams are waiting for the events.
+        assert requests.get(f'{url}/health-check', timeout=5).status_code == 200
+        phase = {'step_id': 9601, 'name': 'Dev Cutover', 'description': 'd', 'orders': 1, 'is_optional': False,
+                 'parent_step_id': 0}
+        assert requests.post(f'{url}/api/v1/phase-table', json=phase, timeout=5).json() == {'response': 'Success'}
+        for stream_lines in lines:
+            assert 'event: phase' in itertools.takewhile(lambda line: not line.startswith('data: {"event"'),
+                                                          stream_lines)
+        for response in streams:
+            response.close()
+    finally:
+        # The below line will shut gunicorn down without waiting for the windows of the streams.
+        server.send_signal(signal.SIGQUIT)
+        server.wait(10)
@@ -0,0 +1,61 @@
+"""
+This file will be used for testing the export of the progress in the events mode, i.e: the pages follow the
+order of the keys, and a continuation token resumes the export without skipping or repeating a key, and the
+Arrow stream which fails mid-way still ends with the error and the last continuation token.
+"""
+from datetime import datetime
+import pytest
+from API.pydantics import ProgressModel
+from utils import bq_client
+from utils.exporter import Export
+
+
+def exported_keys(pages):
+    return [(row['entity_id'], row['step_id']) for rows, _ in pages for row in rows]
+
+
+def test_events_mode_pages_by_key(monkeypatch):
+    monkeypatch.setattr(bq_client, 'PROGRESS_STORAGE_MODE', 'events')
+    table = bq_client.ProgressTable()
+    started = datetime(2024, 1, 1)
+    rows = [table.to_row(ProgressModel(step_id=step_id, entity_id=entity_id, start_date_time=started,
+                                       end_date_time=started))
+            for entity_id in (8103, 8101, 8102) for step_id in (2, 1)]
+    events = bq_client.ProgressEventTable()
+    events.append_rows(rows)
+    # The progress written again, and the deleted one, are exported once and not at all.
+    events.append_rows(rows[:1])
+    events.append_rows([table.to_row(ProgressModel(step_id=1, entity_id=8102))], is_deleted=True)
+    pages = list(Export(table, ['entity_id', 'step_id'], page_size=2).pages())
+    keys = exported_keys(pages)
+    assert keys == sorted(set(keys))
+    assert [key for key in keys if 8101 <= key[0] <= 8103] == [(8101, 1), (8101, 2), (8102, 2), (8103, 1), (8103, 2)]
+    assert all(len(rows) == 2 for rows, _ in pages[:-1])
+    assert pages[-1][1] is None
+    # Every continuation token resumes the export right after the last key of its page.
+    for index, (_, token) in enumerate(pages[:-1]):
+        resumed = Export(table, ['entity_id', 'step_id'], page_size=2, continuation_token=token).pages()
+        assert exported_keys(resumed) == keys[2 * (index + 1):]
+
+
+def test_arrow_stream_ends_with_the_error_and_the_last_token(monkeypatch):
+    pyarrow = pytest.importorskip('pyarrow')
+    table = bq_client.PhaseTable()
+
+    def read_pages(selected_fields=None, page_token=None, page_size=1000):
+        yield [{'step_id': 1, 'name': 'Dev Cutover'}], 'page-2'
+        raise ConnectionError('connection reset')
+    monkeypatch.setattr(table, 'read_pages', read_pages)
+    export = Export(table, ['step_id', 'name'])
+    reader = pyarrow.ipc.open_stream(b''.join(export.arrow()))
+    batches = []
+    while True:
+        try:
+            batches.append(reader.read_next_batch_with_custom_metadata())
+        except StopIteration:
+            break
+    assert [batch.num_rows for batch, _ in batches] == [1, 0]
+    token = batches[0][1][b'continuation_token']
+    assert batches[-1][1][b'continuation_token'] == token
+    assert batches[-1][1][b'error'] == b'connection reset'
+    assert Export(table, continuation_token=token.decode()).page_token == 'page-2'
@@ -0,0 +1,109 @@
+"""
+This file will be used for testing the tracker of the asynchronous DML jobs, i.e: a finished job gives its DML slot
+back and notifies the write listeners, and a job whose state can not be reloaded does not hold its slot forever.
+"""
+import time
+from utils import bq_client
+from utils.jobs import JobTracker
+
+
+class FakeJob:
+    """
+    This FakeJob Class will stand for the QueryJob, which fails the given number of reloads and then runs for
+    the given number of polls before it is DONE.
+    """
+    def __init__(self, job_id, failed_reloads=0, running_polls=0):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param job_id: The id of the job
+        :param failed_reloads: Number of the reloads which fail before the job can be reloaded
+        :param running_polls: Number of the reloads after which the job is DONE
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.job_id = job_id
+        self.failed_reloads = failed_reloads
+        self.running_polls = running_polls
+        self.state = 'RUNNING'
+        self.error_result = None
+        self.errors = None
+        self.num_dml_affected_rows = 1
+
+    def reload(self):
+        """
+        The reload function fails, or moves the job on towards DONE.
+
+        :param self: Represent the instance of the class
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        if self.failed_reloads is None or self.failed_reloads > 0:
+            if self.failed_reloads:
+                self.failed_reloads -= 1
+            raise ConnectionError('connection reset')
+        if self.running_polls:
+            self.running_polls -= 1
+            return
+        self.state = 'DONE'
+
+
+def wait_for(condition, seconds=5):
+    deadline = time.monotonic() + seconds
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_done_job_releases_and_notifies_once():
+    tracker = JobTracker(0.01)
+    calls = []
+    tracker.track(FakeJob('job-done', running_polls=2), 'update:t', on_finished=lambda: calls.append('released'),
+                  on_done=lambda: calls.append('written'))
+    assert wait_for(lambda: tracker.status('job-done')['state'] == 'DONE')
+    assert calls == ['released', 'written']
+    assert tracker.stats() == {'pending': 0, 'finished': 1}
+
+
+def test_unreachable_job_releases_its_slot_and_is_still_polled():
+    tracker = JobTracker(0.01)
+    calls = []
+    tracker.track(FakeJob('job-flaky', failed_reloads=3), 'update:t', on_finished=lambda: calls.append('released'),
+                  on_done=lambda: calls.append('written'))
+    assert wait_for(lambda: calls == ['released'])
+    assert wait_for(lambda: tracker.status('job-flaky')['state'] == 'DONE')
+    assert calls == ['released', 'written']
+    assert tracker.status('job-flaky')['errors'] is None
+
+
+def test_job_is_given_up_after_the_deadline():
+    tracker = JobTracker(0.01, max_poll_seconds=0.1)
+    calls = []
+    tracker.track(FakeJob('job-lost', failed_reloads=None), 'delete:t', on_finished=lambda: calls.append('released'),
+                  on_done=lambda: calls.append('written'))
+    assert wait_for(lambda: tracker.status('job-lost')['state'] == 'UNKNOWN')
+    assert calls == ['released']
+    assert tracker.status('job-lost')['errors'] == [{'message': 'connection reset'}]
+    assert tracker.stats()['pending'] == 0
+
+
+def test_async_write_notifies_the_write_listeners_when_done():
+    table = bq_client.PhaseTable()
+    written = []
+
+    def listener(table_name, operation, rows):
+        written.append((table_name, operation, rows))
+
+    bq_client.add_write_listener(listener)
+    try:
+        limiter = table._get_dml_limiter()
+        active = limiter.active
+        response = table._submit_async(lambda: FakeJob('job-async'), 'delete:' + table.table_name, 'delete',
+                                       [(9101, )])
+        assert response == {'response': 'Accepted', 'job_id': 'job-async'}
+        assert wait_for(lambda: written)
+        assert written == [(table.table_name, 'delete', [{'step_id': 9101}])]
+        assert limiter.active == active
+    finally:
+        bq_client.write_listeners.remove(listener)
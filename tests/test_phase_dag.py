@@ -0,0 +1,72 @@
+"""
+This file will be used for testing the validation of the transitions of the progress, i.e: the compiled hierarchy
+of the phases, the unknown keys, and the validation being off by default and while the spool is enabled.
+"""
+import pytest
+from API.pydantics import ProgressModel
+from utils import phase_dag
+from utils.phase_dag import PhaseDag, validate_transitions
+
+
+def phase(step_id, parent_step_id, orders, is_optional=False):
+    return {'step_id': step_id, 'name': 'Dev Data Movement', 'description': 'd', 'orders': orders,
+            'is_optional': is_optional, 'parent_step_id': parent_step_id}
+
+
+def test_dag_requires_the_parent_and_the_mandatory_steps_before():
+    dag = PhaseDag([phase(1, 0, 1), phase(2, 1, 1), phase(3, 1, 2, is_optional=True), phase(4, 1, 3)])
+    assert dag.step_ids(dag.required[4]) == [1, 2]
+    assert dag.check(4, True, dag.bits[1]) == 'Step 4 can not be completed before the steps [2]'
+    assert dag.check(4, True, dag.bits[1] | dag.bits[2]) is None
+    completed = dag.bits[1] | dag.bits[2] | dag.bits[4]
+    assert dag.check(2, False, completed) == 'Step 2 can not be reopened after the steps [4] have been completed'
+    assert dag.check(9, True, completed) == 'Unknown step_id 9'
+
+
+@pytest.fixture
+def validation(monkeypatch, client):
+    """
+    The validation fixture enables the validation of the transitions, and writes the phases and the entity.
+
+    :param monkeypatch: The monkeypatch fixture
+    :param client: The test client of the application
+    :return: The id of the entity
+    :doc-author: Kaoushik Kumar
+    """
+    monkeypatch.setattr(phase_dag, 'PHASE_TRANSITION_VALIDATION', True)
+    client.post('/api/v1/phase-table/bulk', json=[phase(501, 0, 0), phase(502, 501, 1)])
+    client.post('/api/v1/entity-table', json={'entity_id': 601, 'application_name': 'a', 'source_server': 's',
+                                              'source_database': 'd', 'target_server': 't', 'migrator': 'm'})
+    yield 601
+    client.delete('/api/v1/entity-table?entity_id=601&cascade=true')
+    client.delete('/api/v1/phase-table/bulk', json=[501, 502])
+
+
+def test_transitions_are_checked(client, validation):
+    response = client.post('/api/v1/process-table', json={'step_id': 502, 'entity_id': 601, 'is_successful': True})
+    assert response.status_code == 409
+    assert response.get_json()['result'] == 'Step 502 can not be completed before the steps [501]'
+    # A step can be completed along with the steps it requires, in the order of the bulk request.
+    progress = [{'step_id': step_id, 'entity_id': 601, 'is_successful': True} for step_id in (501, 502)]
+    response = client.post('/api/v1/process-table/bulk', json=progress)
+    assert response.get_json()['failed'] == 0
+
+
+def test_unknown_keys_are_rejected(client, validation):
+    response = client.post('/api/v1/process-table', json={'step_id': 501, 'entity_id': 699})
+    assert (response.status_code, response.get_json()['result']) == (409, 'Unknown entity_id 699')
+    response = client.post('/api/v1/process-table', json={'step_id': 599, 'entity_id': 601})
+    assert (response.status_code, response.get_json()['result']) == (409, 'Unknown step_id 599')
+
+
+def test_unknown_keys_are_accepted_while_the_spool_is_enabled(monkeypatch, validation):
+    # The entity might have been spooled along with its progress, and not replayed into the snapshot yet.
+    monkeypatch.setattr(phase_dag, 'SPOOL_PATH', '/tmp/spool.db')
+    assert validate_transitions([ProgressModel(step_id=599, entity_id=699, is_successful=True)]) == [None]
+
+
+def test_validation_is_off_by_default(client):
+    assert phase_dag.PHASE_TRANSITION_VALIDATION is False
+    response = client.post('/api/v1/process-table', json={'step_id': 599, 'entity_id': 698})
+    assert response.status_code == 200
+    client.delete('/api/v1/process-table?step_id=599&entity_id=698')
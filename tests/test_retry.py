@@ -0,0 +1,176 @@
+"""
+This file will be used for testing the retries and the hedging of the BigQuery requests, i.e: which errors are
+retried, the bounds of the backoff, and the cancellation of the hedged call which is not needed anymore, along with
+the retries of the library nested in the policy, and the insertIds of the retried rows.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from google.api_core import exceptions
+from google.cloud.bigquery.retry import DEFAULT_JOB_RETRY, DEFAULT_RETRY
+from utils import retry
+from utils.retry import Hedger, RetryPolicy, is_retryable, is_retryable_row_error
+from utils.storage import BigQueryBackend
+
+
+@pytest.mark.parametrize('error, expected', [
+    (exceptions.ServiceUnavailable('unavailable'), True),
+    (exceptions.TooManyRequests('slow down'), True),
+    (exceptions.BadRequest('quota', errors=[{'reason': 'rateLimitExceeded'}]), True),
+    (exceptions.BadRequest('Could not serialize access to table due to concurrent update'), True),
+    (exceptions.BadRequest('invalid', errors=[{'reason': 'invalidQuery'}]), False),
+    (exceptions.NotFound('missing'), False),
+    (ConnectionError('reset'), True),
+    (ValueError('bad value'), False),
+])
+def test_is_retryable(error, expected):
+    assert is_retryable(error) is expected
+
+
+def test_is_retryable_row_error():
+    assert is_retryable_row_error({'index': 0, 'errors': [{'reason': 'backendError'}, {'reason': 'stopped'}]})
+    assert not is_retryable_row_error({'index': 0, 'errors': [{'reason': 'invalid'}]})
+    assert not is_retryable_row_error({'index': 0, 'errors': []})
+
+
+def test_backoff_is_bounded(monkeypatch):
+    policy = RetryPolicy(10, 0.1, 0.5, 60)
+    monkeypatch.setattr(retry.random, 'uniform', lambda low, high: high)
+    assert [policy.backoff(attempt) for attempt in range(1, 6)] == pytest.approx([0.1, 0.2, 0.4, 0.5, 0.5])
+    monkeypatch.undo()
+    assert all(0 <= policy.backoff(attempt) <= 0.5 for attempt in range(1, 50))
+
+
+def test_call_retries_only_the_retryable_errors():
+    policy = RetryPolicy(3, 0.001, 0.001, 60)
+    calls = []
+
+    def flaky(error):
+        calls.append(1)
+        if len(calls) < 3:
+            raise error
+        return 'done'
+    assert policy.call('query', flaky, exceptions.ServiceUnavailable('unavailable')) == 'done'
+    calls.clear()
+    with pytest.raises(exceptions.BadRequest):
+        policy.call('query', flaky, exceptions.BadRequest('invalid'))
+    assert len(calls) == 1
+    calls.clear()
+    with pytest.raises(exceptions.ServiceUnavailable):
+        RetryPolicy(2, 0.001, 0.001, 60).call('query', flaky, exceptions.ServiceUnavailable('unavailable'))
+    assert len(calls) == 2
+
+
+def test_call_stops_at_the_deadline():
+    calls = []
+
+    def failing():
+        calls.append(1)
+        raise exceptions.ServiceUnavailable('unavailable')
+    with pytest.raises(exceptions.ServiceUnavailable):
+        RetryPolicy(10, 5, 5, 0.01).call('query', failing)
+    assert len(calls) <= 2
+
+
+def test_hedge_returns_the_faster_call():
+    release = threading.Event()
+    calls = []
+
+    def read():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(5)
+            return 'slow'
+        return 'fast'
+    hedger = Hedger('list_rows', 0.95, ThreadPoolExecutor(max_workers=2))
+    hedger._delay = 0.01
+    assert hedger.call(read) == 'fast'
+    release.set()
+
+
+def test_hedge_not_started_is_cancelled():
+    calls = []
+
+    def read():
+        calls.append(1)
+        time.sleep(0.1)
+        return 'first'
+    # The single thread is busy with the first call, so the hedge waits in the queue of the executor.
+    executor = ThreadPoolExecutor(max_workers=1)
+    hedger = Hedger('list_rows', 0.95, executor)
+    hedger._delay = 0.01
+    assert hedger.call(read) == 'first'
+    executor.shutdown(wait=True)
+    assert len(calls) == 1
+
+
+class QueryRecorder:
+    """
+    This QueryRecorder Class will record the retry and the job_retry of the queries, instead of submitting them.
+    """
+    def __init__(self):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.job_retries = []
+        self.retries = []
+
+    def query(self, query, job_config=None, job_retry=DEFAULT_JOB_RETRY, retry=DEFAULT_RETRY):
+        """
+        The query function records the retry and the job_retry of the query.
+
+        :param self: Represent the instance of the class
+        :param query: The SQL statement
+        :param job_config: The QueryJobConfig object
+        :param job_retry: The job_retry of the query
+        :param retry: The retry of the API request of the query
+        :return: The recorder, which has no result to wait for
+        :doc-author: Kaoushik Kumar
+        """
+        self.job_retries.append(job_retry)
+        self.retries.append(retry)
+        return self
+
+
+@pytest.mark.parametrize('max_attempts, expected', [(5, None), (1, DEFAULT_JOB_RETRY)])
+def test_job_retry_is_off_while_the_policy_retries(max_attempts, expected):
+    backend = BigQueryBackend.__new__(BigQueryBackend)
+    backend.client = QueryRecorder()
+    backend.retry_policy = RetryPolicy(max_attempts, 1, 1, 60)
+    backend._submit_query('SELECT 1', None, wait=False)
+    assert backend.client.job_retries == [expected]
+    # The API request is not retried by the library either, or only within the deadline of the policy.
+    retry, = backend.client.retries
+    assert retry is None if max_attempts > 1 else retry._deadline == 60
+
+
+def test_identical_rows_get_their_own_insert_ids_kept_across_retries():
+    backend = BigQueryBackend.__new__(BigQueryBackend)
+    backend.retry_policy = RetryPolicy(3, 0, 0, 60)
+    sent = []
+
+    def insert_rows(table, rows, row_ids):
+        sent.append(row_ids)
+        # The second row is rejected by a transient error once, and sent again with its insertId.
+        return [{'index': 1, 'errors': [{'reason': 'backendError'}]}] if len(sent) == 1 else []
+    backend._insert_rows = insert_rows
+    row = (1, 2, None, None, True)
+    assert backend._insert_with_retries(None, [row, row]) == []
+    first, retried = sent
+    assert first[0] != first[1]
+    assert retried == [first[1]]
+
+
+def test_only_the_metadata_reads_are_hedged(monkeypatch):
+    from utils import storage
+    monkeypatch.setattr(storage, 'BQ_HEDGE_PERCENTILE', 0.95)
+    monkeypatch.setattr(storage, 'QueryCostGuard', lambda *args: None)
+    monkeypatch.setattr(storage, 'set_cost_guard', lambda cost_guard: None)
+    monkeypatch.setattr('google.cloud.bigquery.Client', lambda project: None)
+    backend = BigQueryBackend('project', 'dataset', 60)
+    assert list(backend.hedgers) == ['get_table']
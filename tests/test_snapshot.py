@@ -0,0 +1,95 @@
+"""
+This file will be used for testing the refresh of the in-memory snapshot, i.e: the writes of this service are not
+read again, the writes of another writer are (even along with the writes of this service), and the progress events
+are read incrementally.
+"""
+from datetime import datetime
+from API.pydantics import PhaseModel, ProgressModel
+from constants import TBL_MIGRATION_PROGRESS, TBL_MIGRATION_STEP
+from utils import bq_client
+from utils.snapshot import Snapshot
+from utils.storage import get_backend
+
+
+def count_reads(snapshot, table_name):
+    """
+    The count_reads function counts the full reads of the table by the snapshot.
+
+    :param snapshot: The Snapshot object
+    :param table_name: Name of the table
+    :return: A list, which gets an item for every full read
+    :doc-author: Kaoushik Kumar
+    """
+    table = snapshot.tables[table_name].table
+    reads, read_rows = [], table.read_rows
+    table.read_rows = lambda: reads.append(1) or read_rows()
+    return reads
+
+
+def phase(step_id):
+    return PhaseModel(step_id=step_id, name='Dev Cutover', description='d', orders=1, is_optional=False,
+                      parent_step_id=0)
+
+
+def test_own_writes_are_not_read_again():
+    snapshot = Snapshot(3600)
+    table = snapshot.tables[TBL_MIGRATION_STEP].table
+    snapshot.refresh(TBL_MIGRATION_STEP, force=True)
+    reads = count_reads(snapshot, TBL_MIGRATION_STEP)
+    table.insert_rows([table.to_row(phase(8001))])
+    assert snapshot.refresh(TBL_MIGRATION_STEP) is False
+    assert reads == []
+    assert snapshot.tables[TBL_MIGRATION_STEP].get((8001,))['step_id'] == 8001
+
+
+def test_writes_of_another_writer_are_read_again():
+    snapshot = Snapshot(3600)
+    table = snapshot.tables[TBL_MIGRATION_STEP].table
+    snapshot.refresh(TBL_MIGRATION_STEP, force=True)
+    reads = count_reads(snapshot, TBL_MIGRATION_STEP)
+    # The below line will write through the backend, so that the write is not applied to the snapshot.
+    get_backend().insert_rows(table, [table.to_row(phase(8002))])
+    assert snapshot.refresh(TBL_MIGRATION_STEP) is True
+    assert reads == [1]
+    assert snapshot.tables[TBL_MIGRATION_STEP].get((8002,))['step_id'] == 8002
+
+
+def test_writes_of_another_writer_along_with_own_writes_are_read_again():
+    snapshot = Snapshot(3600)
+    table = snapshot.tables[TBL_MIGRATION_STEP].table
+    snapshot.refresh(TBL_MIGRATION_STEP, force=True)
+    reads = count_reads(snapshot, TBL_MIGRATION_STEP)
+    # The insert of another writer changes the row count which the own writes would have made.
+    table.insert_rows([table.to_row(phase(8004))])
+    get_backend().insert_rows(table, [table.to_row(phase(8005))])
+    assert snapshot.refresh(TBL_MIGRATION_STEP) is True
+    assert reads == [1]
+    assert snapshot.tables[TBL_MIGRATION_STEP].get((8005,))['step_id'] == 8005
+    # The update of another writer after the own writes keeps the row count, but changes the modified time.
+    table.insert_rows([table.to_row(phase(8006))])
+    changed = phase(8004)
+    changed.description = 'changed by another instance'
+    get_backend().merge_rows(table, [table.to_row(changed)])
+    assert snapshot.refresh(TBL_MIGRATION_STEP) is True
+    assert reads == [1, 1]
+    assert snapshot.tables[TBL_MIGRATION_STEP].get((8004,))['description'] == 'changed by another instance'
+
+
+def test_progress_events_are_read_incrementally(monkeypatch):
+    monkeypatch.setattr(bq_client, 'PROGRESS_STORAGE_MODE', 'events')
+    snapshot = Snapshot(3600)
+    snapshot.refresh(TBL_MIGRATION_PROGRESS, force=True)
+    reads = count_reads(snapshot, TBL_MIGRATION_PROGRESS)
+    events = bq_client.ProgressEventTable()
+    started = datetime(2024, 1, 1)
+    rows = [snapshot.tables[TBL_MIGRATION_PROGRESS].table.to_row(
+        ProgressModel(step_id=step_id, entity_id=8003, start_date_time=started, end_date_time=started,
+                      is_successful=True)
+    ) for step_id in (1, 2)]
+    events.append_rows(rows)
+    events.append_rows([rows[1]], is_deleted=True)
+    assert snapshot.refresh(TBL_MIGRATION_PROGRESS) is True
+    assert reads == []
+    progress = snapshot.tables[TBL_MIGRATION_PROGRESS]
+    assert progress.get((1, 8003))['is_successful'] is True
+    assert progress.get((2, 8003)) is None
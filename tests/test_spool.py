@@ -0,0 +1,125 @@
+"""
+This file will be used for testing the write-ahead spool, i.e: a failing entry is bisected out of its group,
+so that only that entry is dead-lettered, and the entries grouped with it are still written in order, while
+a retryable error backs off the whole drain without dead-lettering anything, and the pending writes of an entity
+block its cascading delete.
+"""
+import os
+import sqlite3
+import tempfile
+import time
+from google.api_core.exceptions import ServiceUnavailable
+from API.pydantics import PhaseModel
+from utils import bq_client
+from utils.spool import WriteSpool
+
+
+class FailingSpool(WriteSpool):
+    """
+    This FailingSpool Class will record the replayed items instead of writing them, and fail every request
+    which contains the step_id 2.
+    """
+    replayed = []
+
+    def _replay(self, table_name, kind, items):
+        """
+        The _replay function records the step ids of the written items.
+
+        :param self: Represent the instance of the class
+        :param table_name: Name of the BigQueryTable class of bq_client
+        :param kind: The kind of the write
+        :param items: The list of the item dictionaries
+        :return: The indexes of the rejected items, i.e: none
+        :doc-author: Kaoushik Kumar
+        """
+        step_ids = [item['step_id'] for item in items]
+        if 2 in step_ids:
+            raise ValueError('step 2 is invalid')
+        self.replayed.append(step_ids)
+        return set()
+
+
+class UnavailableSpool(WriteSpool):
+    """
+    This UnavailableSpool Class will fail the first requests with a retryable error, as during an outage of BigQuery,
+    and record the replayed items afterwards.
+    """
+    outages = 4
+    replayed = []
+
+    def _replay(self, table_name, kind, items):
+        """
+        The _replay function fails while the outage lasts, and then records the step ids of the written items.
+
+        :param self: Represent the instance of the class
+        :param table_name: Name of the BigQueryTable class of bq_client
+        :param kind: The kind of the write
+        :param items: The list of the item dictionaries
+        :return: The indexes of the rejected items, i.e: none
+        :doc-author: Kaoushik Kumar
+        """
+        if UnavailableSpool.outages:
+            UnavailableSpool.outages -= 1
+            raise ServiceUnavailable('backend error')
+        self.replayed.append([item['step_id'] for item in items])
+        return set()
+
+
+def phase(step_id):
+    return PhaseModel(step_id=step_id, name='Dev Cutover', description='d', orders=step_id, is_optional=False,
+                      parent_step_id=0)
+
+
+def test_only_the_failing_entry_is_dead_lettered():
+    path = os.path.join(tempfile.mkdtemp(), 'spool.db')
+    connection = sqlite3.connect(path)
+    spool = FailingSpool.__new__(FailingSpool)
+    # The entries are journaled before the drainer starts, so that they are replayed as a single group.
+    WriteSpool.__init__(spool, path, batch_size=10, max_attempts=2, max_backoff_seconds=0.1)
+    for step_id in (1, 2, 3):
+        spool.submit(bq_client.PhaseTable, 'insert', [phase(step_id)])
+    deadline = time.monotonic() + 10
+    while spool.stats()['depth'] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    dead = connection.execute('SELECT seq, items, error FROM spool_dead').fetchall()
+    assert [seq for seq, _, _ in dead] == [2]
+    assert dead[0][2] == 'step 2 is invalid'
+    assert [step_id for step_ids in FailingSpool.replayed for step_id in step_ids] == [1, 3]
+    assert spool.stats()['dead_letters'] == 1
+
+
+def test_retryable_error_is_not_dead_lettered():
+    path = os.path.join(tempfile.mkdtemp(), 'spool.db')
+    connection = sqlite3.connect(path)
+    spool = UnavailableSpool(path, batch_size=10, max_attempts=2, max_backoff_seconds=0.1)
+    for step_id in (1, 2, 3):
+        spool.submit(bq_client.PhaseTable, 'insert', [phase(step_id)])
+    deadline = time.monotonic() + 10
+    while spool.stats()['depth'] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    # The outage has outlasted max_attempts, and still every entry has been written in order.
+    assert connection.execute('SELECT COUNT(*) FROM spool_dead').fetchone() == (0, )
+    assert [step_id for step_ids in UnavailableSpool.replayed for step_id in step_ids] == [1, 2, 3]
+    assert spool.stats()['failures'] >= 2
+    assert spool.stats()['last_error'] == '503 backend error'
+
+
+def test_pending_writes_of_an_entity_block_its_cascading_delete(client, monkeypatch):
+    from API import views
+    from API.pydantics import EntityObjectModel
+    spool = WriteSpool(os.path.join(tempfile.mkdtemp(), 'spool.db'), max_backoff_seconds=60)
+
+    def unavailable(table_name, kind, items):
+        raise ServiceUnavailable('backend error')
+    # The outage outlasts the test, so the entries stay in the journal.
+    monkeypatch.setattr(spool, '_replay', unavailable)
+    spool.submit(bq_client.EntityObjectTable, 'insert', [EntityObjectModel(object_id=351, entity_id=251, name='o',
+                                                                           size_in_mb=1)])
+    spool.submit(bq_client.ProgressTable, 'delete', [(1, 252)])
+    assert (spool.pending('entity_id', 251), spool.pending('entity_id', 252), spool.pending('entity_id', 253)) == (
+        1, 1, 0)
+    monkeypatch.setattr(views, 'get_spool', lambda: spool)
+    response = client.delete('/api/v1/entity-table?entity_id=251&cascade=true')
+    assert response.status_code == 409
+    assert 'spool' in response.get_json()['result']
+    assert client.delete('/api/v1/entity-table?entity_id=253&cascade=true').status_code == 200
@@ -0,0 +1,161 @@
+"""
+This file will be used for testing the storage backends, i.e: the ids of the load jobs of the imports, and the
+counts and the atomicity of the cascading deletes.
+"""
+import io
+import sqlite3
+import pytest
+from google.api_core.exceptions import Conflict
+from API.pydantics import EntityModel
+from constants import TBL_MIGRATION_ENTITY, TBL_MIGRATION_ENTITY_OBJECTS, TBL_MIGRATION_PROGRESS
+from utils import bq_client
+from utils.retry import RetryPolicy
+from utils.storage import BigQueryBackend, get_backend
+
+
+class LoadJob:
+    """
+    This LoadJob Class will stand for a finished BigQuery load job.
+    """
+    def __init__(self, job_id, failed=False):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param job_id: The id of the job
+        :param failed: Whether the job has failed
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.job_id = job_id
+        self.error_result = {'reason': 'backendError'} if failed else None
+        self.output_rows = 0 if failed else 2
+
+    def done(self):
+        return True
+
+    def result(self, retry=None):
+        return self
+
+
+class LoadRecorder:
+    """
+    This LoadRecorder Class will keep the load jobs by their id, and reject a job whose id has been used already,
+    in the same way as BigQuery.
+    """
+    def __init__(self, failed=()):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param failed: The ids of the jobs which will fail
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.jobs = {}
+        self.failed = set(failed)
+
+    def dataset(self, dataset_name):
+        return self
+
+    def table(self, table_name):
+        return table_name
+
+    def load_table_from_file(self, staged, table_ref, job_id, rewind, num_retries, job_config):
+        if job_id in self.jobs:
+            raise Conflict(f'Already Exists: Job {job_id}')
+        self.jobs[job_id] = LoadJob(job_id, job_id in self.failed)
+        return self.jobs[job_id]
+
+    def get_job(self, job_id, retry=None):
+        return self.jobs[job_id]
+
+
+def backend(client):
+    """
+    The backend function returns the BigQueryBackend which sends its requests to the client.
+
+    :param client: The LoadRecorder object
+    :return: A BigQueryBackend object
+    :doc-author: Kaoushik Kumar
+    """
+    backend_ = BigQueryBackend.__new__(BigQueryBackend)
+    backend_.client = client
+    backend_.dataset_name = 'dataset'
+    backend_.retry_policy = RetryPolicy(1, 1, 1, 60)
+    return backend_
+
+
+def test_load_job_id_is_derived_from_the_upload():
+    table = bq_client.EntityObjectTable()
+    staged = io.BytesIO(b'{"object_id": 1}\n')
+    job_id = BigQueryBackend.load_job_id(table, staged)
+    assert staged.tell() == 0
+    assert BigQueryBackend.load_job_id(table, io.BytesIO(b'{"object_id": 1}\n')) == job_id
+    assert BigQueryBackend.load_job_id(table, io.BytesIO(b'{"object_id": 2}\n')) != job_id
+    assert BigQueryBackend.load_job_id(table, staged, 'upload-1') != job_id
+    assert BigQueryBackend.load_job_id(table, io.BytesIO(b'other'), 'upload-1') == \
+        BigQueryBackend.load_job_id(table, staged, 'upload-1')
+
+
+def test_retried_upload_is_loaded_once():
+    client = LoadRecorder()
+    table = bq_client.EntityObjectTable()
+    for _ in range(2):
+        assert backend(client).load_ndjson(table, io.BytesIO(b'{"object_id": 1}\n')) == 2
+    assert len(client.jobs) == 1
+
+
+def test_failed_load_job_is_loaded_by_the_next_job_id():
+    table = bq_client.EntityObjectTable()
+    job_id = BigQueryBackend.load_job_id(table, io.BytesIO(b'{"object_id": 1}\n'))
+    client = LoadRecorder(failed={job_id})
+    client.jobs[job_id] = LoadJob(job_id, failed=True)
+    for _ in range(2):
+        assert backend(client).load_ndjson(table, io.BytesIO(b'{"object_id": 1}\n')) == 2
+    assert sorted(client.jobs) == [job_id, f'{job_id}_1']
+
+
+def cascade_rows(entity_id):
+    """
+    The cascade_rows function writes an entity along with two objects and a progress.
+
+    :param entity_id: The id of the entity
+    :return: The list of the tables of the cascade, the children first
+    :doc-author: Kaoushik Kumar
+    """
+    objects, progress, entities = bq_client.EntityObjectTable(), bq_client.ProgressTable(), bq_client.EntityTable()
+    objects.insert_rows([(entity_id * 10 + index, entity_id, 'o', 1) for index in (1, 2)])
+    progress.insert_rows([(1, entity_id, None, None, False)])
+    entities.insert_rows([entities.to_row(EntityModel(entity_id=entity_id, application_name='a', source_server='s',
+                                                      source_database='d', target_server='t', migrator='m'))])
+    return [objects, progress, entities]
+
+
+def count(table, entity_id):
+    return sum(1 for row in get_backend().read_rows(table) if row['entity_id'] == entity_id)
+
+
+def test_delete_cascade_counts_the_rows_of_every_table():
+    tables = cascade_rows(8201)
+    deleted = get_backend().delete_cascade(tables, 'entity_id', 8201)
+    assert deleted == {TBL_MIGRATION_ENTITY_OBJECTS: 2, TBL_MIGRATION_PROGRESS: 1, TBL_MIGRATION_ENTITY: 1}
+    assert [count(table, 8201) for table in tables] == [0, 0, 0]
+
+
+def test_delete_cascade_is_rolled_back_when_a_table_fails():
+    tables = cascade_rows(8202)
+    backend = get_backend()
+    # The trigger fails the delete of the entity, after the objects and the progress have been deleted.
+    with backend._connection:
+        backend._connection.execute(f"""
+            CREATE TRIGGER fail_entity_delete BEFORE DELETE ON "{TBL_MIGRATION_ENTITY}"
+            WHEN OLD.entity_id = 8202 BEGIN SELECT RAISE(ABORT, 'entity is locked'); END
+            """)
+    try:
+        with pytest.raises(sqlite3.IntegrityError):
+            backend.delete_cascade(tables, 'entity_id', 8202)
+    finally:
+        with backend._connection:
+            backend._connection.execute('DROP TRIGGER fail_entity_delete')
+    assert [count(table, 8202) for table in tables] == [2, 1, 1]
@@ -0,0 +1,193 @@
+"""
+This file will be used for the admission control of the DML statements. BigQuery runs only a few mutating DML
+statements of a table at a time and queues the rest, so the service admits only as many statements per table,
+and the requests beyond them wait in a bounded local queue, or are rejected with 429 when the queue is full.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from exceptions import DMLQueueFullError
+from utils.metrics import DML_ADMISSION_WAIT, DML_REJECTED
+
+
+class ConcurrencyLimiter:
+    """
+    This ConcurrencyLimiter Class will let at most max_concurrent callers hold a slot at a time.
+    The other callers wait for a slot, up to max_queue of them and for at most max_wait_seconds.
+    """
+    def __init__(self, name, max_concurrent, max_queue, max_wait_seconds):
+        """
+        The __init__ function is called when the class is instantiated.
+        It sets up the condition used by the waiting callers and the counters.
+
+        :param self: Represent the instance of the class
+        :param name: Name of the limiter, i.e: the name of the table
+        :param max_concurrent: Maximum number of the callers holding a slot (0 disables the limit)
+        :param max_queue: Maximum number of the callers waiting for a slot
+        :param max_wait_seconds: Maximum time (in seconds) a caller will wait for a slot
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self._condition = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.max_waiting = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.hold_seconds_total = 0.0
+        self.released = 0
+
+    def retry_after(self):
+        """
+        The retry_after function estimates the time after which the queue will have room again,
+        from the average time a slot is held. It must be called while holding the condition.
+
+        :param self: Represent the instance of the class
+        :return: The time (in whole seconds, at least 1)
+        :doc-author: Kaoushik Kumar
+        """
+        average_hold = self.hold_seconds_total / self.released if self.released else 1.0
+        return max(1, math.ceil(average_hold * (self.waiting + 1) / max(1, self.max_concurrent)))
+
+    def _reject(self, message):
+        """
+        The _reject function counts the rejected caller and raises the DMLQueueFullError.
+            It must be called while holding the condition.
+
+        :param self: Represent the instance of the class
+        :param message: The error message
+        :return: Nothing, it always raises
+        :doc-author: Kaoushik Kumar
+        """
+        self.rejected += 1
+        DML_REJECTED.inc((self.name,))
+        raise DMLQueueFullError(message, self.retry_after())
+
+    def acquire(self):
+        """
+        The acquire function takes a slot, waiting in the queue when all the slots are held.
+            The DMLQueueFullError is raised when the queue is full, or when no slot is free within the wait.
+
+        :param self: Represent the instance of the class
+        :return: The time (time.monotonic) at which the slot has been taken, to be passed to release
+        :doc-author: Kaoushik Kumar
+        """
+        started = time.monotonic()
+        with self._condition:
+            if self.max_concurrent > 0 and (self.active >= self.max_concurrent or self.waiting):
+                if self.waiting >= self.max_queue:
+                    self._reject(f'DML queue of {self.name} is full ({self.waiting} waiting)')
+                self.waiting += 1
+                self.max_waiting = max(self.max_waiting, self.waiting)
+                try:
+                    deadline = started + self.max_wait_seconds
+                    while self.active >= self.max_concurrent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.timed_out += 1
+                            self._reject(f'DML of {self.name} has not been admitted within '
+                                         f'{self.max_wait_seconds} seconds')
+                        self._condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            self.admitted += 1
+            acquired_at = time.monotonic()
+            waited = acquired_at - started
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        DML_ADMISSION_WAIT.observe((self.name,), waited)
+        return acquired_at
+
+    def release(self, acquired_at=None):
+        """
+        The release function gives the slot back, and wakes up the next waiting caller.
+
+        :param self: Represent the instance of the class
+        :param acquired_at: The time returned by acquire, used for the average hold time
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        with self._condition:
+            self.active -= 1
+            if acquired_at is not None:
+                self.hold_seconds_total += time.monotonic() - acquired_at
+                self.released += 1
+            self._condition.notify()
+
+    @contextmanager
+    def slot(self):
+        """
+        The slot function holds a slot for the duration of the with block.
+
+        :param self: Represent the instance of the class
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        acquired_at = self.acquire()
+        try:
+            yield
+        finally:
+            self.release(acquired_at)
+
+    def stats(self):
+        """
+        The stats function returns the counters of the limiter.
+
+        :param self: Represent the instance of the class
+        :return: A dictionary with the queue depth, wait time and rejection counters
+        :doc-author: Kaoushik Kumar
+        """
+        with self._condition:
+            return {
+                'active': self.active,
+                'waiting': self.waiting,
+                'max_waiting': self.max_waiting,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'avg_wait_seconds': self.wait_seconds_total / self.admitted if self.admitted else 0,
+                'max_wait_seconds': self.wait_seconds_max,
+                'avg_hold_seconds': self.hold_seconds_total / self.released if self.released else 0,
+            }
+
+
+# Registry of the DML limiters of the process, one per table.
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name, factory):
+    """
+    The get_limiter function returns the limiter registered with the name, and creates it
+    through the factory when it is not registered yet.
+
+    :param name: Name of the limiter
+    :param factory: Function which creates the limiter
+    :return: The ConcurrencyLimiter object
+    :doc-author: Kaoushik Kumar
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = factory()
+        return _limiters[name]
+
+
+def limiter_stats():
+    """
+    The limiter_stats function returns the counters of all the registered limiters.
+
+    :return: A dictionary of the limiter name and its counters
+    :doc-author: Kaoushik Kumar
+    """
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {name: limiter.stats() for name, limiter in limiters.items()}
@@ -0,0 +1,519 @@
+"""
+This file will be used for the analytics of the durations of the phases, i.e: the percentiles of the durations of
+every phase, the regression of the durations against the size of the entities and the ETA of the entities in flight.
+The progress is kept in the columnar NumPy arrays, which are built from the in-memory snapshot once and then updated
+in place by the writes of this service, so that every statistic is computed with a few vectorized passes.
+"""
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from API.pydantics import Phase
+from constants import (
+    ANALYTICS_MIN_DURATION_SECONDS,
+    TBL_MIGRATION_ENTITY,
+    TBL_MIGRATION_ENTITY_OBJECTS,
+    TBL_MIGRATION_PROGRESS,
+    TBL_MIGRATION_STEP
+)
+from utils import bq_client
+from utils.snapshot import get_snapshot
+
+# Names of the phases, in the order of the migration. The code of a phase is its position in the list.
+PHASES = [phase.value for phase in Phase]
+# Percentiles of the durations which are reported for every phase.
+PERCENTILES = (50, 90, 95)
+MB_PER_GB = 1024
+SECONDS_PER_HOUR = 3600
+
+
+def _epoch(value):
+    """
+    The _epoch function converts the DATETIME value into the seconds since the epoch.
+
+    :param value: The datetime object, its ISO format string or None
+    :return: The seconds since the epoch, or NaN when there is no value
+    :doc-author: Kaoushik Kumar
+    """
+    if value is None:
+        return np.nan
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+class ProgressColumns:
+    """
+    This ProgressColumns Class will keep the progress rows in the columnar NumPy arrays. A written row is updated
+    in place at the position of its key (or appended), and a deleted row is only marked as not live, so that
+    a write never copies the arrays. The arrays double their capacity when they are full.
+    """
+    def __init__(self, capacity=1024):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param capacity: The initial number of the rows of the arrays
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.size = 0
+        self._positions = {}
+        self.step_id = np.zeros(capacity, np.int64)
+        self.entity_id = np.zeros(capacity, np.int64)
+        self.start = np.full(capacity, np.nan)
+        self.end = np.full(capacity, np.nan)
+        self.is_successful = np.zeros(capacity, bool)
+        self.live = np.zeros(capacity, bool)
+
+    def _grow(self):
+        """
+        The _grow function doubles the capacity of the arrays.
+
+        :param self: Represent the instance of the class
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        for name in ('step_id', 'entity_id', 'start', 'end', 'is_successful', 'live'):
+            column = getattr(self, name)
+            grown = np.full(len(column) * 2, np.nan) if column.dtype == np.float64 else np.zeros(len(column) * 2,
+                                                                                                 column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def upsert(self, row):
+        """
+        The upsert function writes the progress row at the position of its key, or appends it.
+
+        :param self: Represent the instance of the class
+        :param row: The progress row dictionary
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        key = (row['step_id'], row['entity_id'])
+        position = self._positions.get(key)
+        if position is None:
+            if self.size == len(self.live):
+                self._grow()
+            position = self._positions[key] = self.size
+            self.size += 1
+        self.step_id[position], self.entity_id[position] = key
+        self.start[position] = _epoch(row.get('start_date_time'))
+        self.end[position] = _epoch(row.get('end_date_time'))
+        self.is_successful[position] = bool(row.get('is_successful'))
+        self.live[position] = True
+
+    def delete(self, key):
+        """
+        The delete function marks the progress row of the key as not live.
+
+        :param self: Represent the instance of the class
+        :param key: The (step_id, entity_id) key tuple
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        position = self._positions.pop(key, None)
+        if position is not None:
+            self.live[position] = False
+
+    def delete_entity(self, entity_id):
+        """
+        The delete_entity function marks all the progress rows of the entity as not live.
+
+        :param self: Represent the instance of the class
+        :param entity_id: The id of the entity
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        for position in np.flatnonzero(self.live[:self.size] & (self.entity_id[:self.size] == entity_id)):
+            self.delete((int(self.step_id[position]), entity_id))
+
+    def frame(self):
+        """
+        The frame function returns the copies of the columns of the live rows.
+
+        :param self: Represent the instance of the class
+        :return: A dictionary of the column names and the arrays
+        :doc-author: Kaoushik Kumar
+        """
+        live = self.live[:self.size]
+        return {name: getattr(self, name)[:self.size][live]
+                for name in ('step_id', 'entity_id', 'start', 'end', 'is_successful')}
+
+
+def lookup(keys, sorted_keys, values, default):
+    """
+    The lookup function maps every key to its value, through the binary search of the sorted keys.
+
+    :param keys: The array of the keys to be mapped
+    :param sorted_keys: The sorted array of the known keys
+    :param values: The array of the values of the sorted keys
+    :param default: The value of the unknown keys
+    :return: The array of the values
+    :doc-author: Kaoushik Kumar
+    """
+    if not len(sorted_keys):
+        return np.full(len(keys), default, dtype=np.asarray(values).dtype)
+    positions = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return np.where(sorted_keys[positions] == keys, values[positions], default)
+
+
+def phase_model(phase, hours, size_gb, min_hours=0.0):
+    """
+    The phase_model function computes the statistics of the durations of every phase in vectorized passes:
+    the count, the mean, the percentiles and the least squares regression of the duration against the size
+    of the entity, i.e: hours = fixed_hours + hours_per_gb * size_gb. The regression and the rate leave out
+    the durations shorter than min_hours, which would make the rate of a phase explode.
+
+    :param phase: The array of the phase codes of the completed steps
+    :param hours: The array of the durations (in hours) of the completed steps
+    :param size_gb: The array of the sizes (in GB) of the entities of the completed steps
+    :param min_hours: Minimum duration (in hours) of the steps used by the regression and the rate
+    :return: A dictionary of the statistic names and the arrays, indexed by the phase code
+    :doc-author: Kaoushik Kumar
+    """
+    phases = len(PHASES)
+    count = np.bincount(phase, minlength=phases).astype(np.float64)
+    known = count > 0
+    mean = np.divide(np.bincount(phase, hours, minlength=phases), count, out=np.full(phases, np.nan), where=known)
+    # The below lines will fit the regression of every phase at once, from the sums of the long enough steps.
+    fit = hours >= min_hours
+    x, y, fit_phase = size_gb[fit], hours[fit], phase[fit]
+    fitted = np.bincount(fit_phase, minlength=phases).astype(np.float64)
+    sum_x = np.bincount(fit_phase, x, minlength=phases)
+    sum_y = np.bincount(fit_phase, y, minlength=phases)
+    sum_xx = np.bincount(fit_phase, x * x, minlength=phases)
+    sum_xy = np.bincount(fit_phase, x * y, minlength=phases)
+    sum_yy = np.bincount(fit_phase, y * y, minlength=phases)
+    has_fit = fitted > 0
+    denominator = fitted * sum_xx - sum_x * sum_x
+    slope = np.divide(fitted * sum_xy - sum_x * sum_y, denominator, out=np.zeros(phases), where=denominator > 0)
+    intercept = np.divide(sum_y - slope * sum_x, fitted, out=np.full(phases, np.nan), where=has_fit)
+    total = sum_yy - np.divide(sum_y * sum_y, fitted, out=np.zeros(phases), where=has_fit)
+    residual = sum_yy - intercept * sum_y - slope * sum_xy
+    r2 = np.divide(total - residual, total, out=np.full(phases, np.nan), where=has_fit & (total > 0))
+    # The below lines will take the percentiles of every phase at once, from the durations sorted by phase.
+    sorted_hours = hours[np.lexsort((hours, phase))]
+    starts = np.cumsum(count) - count
+    positions = starts[:, None] + np.array(PERCENTILES) / 100 * np.maximum(count - 1, 0)[:, None]
+    percentiles = np.full(positions.shape, np.nan)
+    if len(sorted_hours):
+        lower = np.minimum(np.floor(positions).astype(np.int64), len(sorted_hours) - 1)
+        upper = np.minimum(np.ceil(positions).astype(np.int64), len(sorted_hours) - 1)
+        percentiles = sorted_hours[lower] + (sorted_hours[upper] - sorted_hours[lower]) * (positions - lower)
+        percentiles[~known] = np.nan
+    return {
+        'count': count,
+        'fitted': fitted,
+        'mean_hours': mean,
+        'percentiles': percentiles,
+        'hours_per_gb': slope,
+        'fixed_hours': intercept,
+        'r2': r2,
+        'gb_per_hour': np.divide(sum_x, sum_y, out=np.full(phases, np.nan), where=has_fit & (sum_y > 0)),
+    }
+
+
+def _number(value):
+    """
+    The _number function returns the rounded value, or None for NaN, so that it can be serialized into JSON.
+
+    :param value: The NumPy number
+    :return: The float, or None
+    :doc-author: Kaoushik Kumar
+    """
+    return None if np.isnan(value) else round(float(value), 4)
+
+
+class PhaseAnalytics:
+    """
+    This PhaseAnalytics Class will keep the progress columns, updated by the write listener, along with the
+    lookups of the phases of the steps and the sizes of the entities, and cache the results till the data changes.
+    Everything is built again when the snapshot has been reloaded from BigQuery.
+    """
+    def __init__(self, snapshot):
+        """
+        The __init__ function is called when the class is instantiated.
+        It registers the write listener after the one of the snapshot, so that the snapshot is always updated first.
+
+        :param self: Represent the instance of the class
+        :param snapshot: The Snapshot object
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.snapshot = snapshot
+        self._columns = None
+        self._progress_loaded_at = None
+        self._version = 0
+        self._lookups = {}
+        self._cache = {}
+        self._cache_version = None
+        self._lock = threading.Lock()
+        bq_client.add_write_listener(self.on_write)
+
+    def on_write(self, table_name, operation, rows):
+        """
+        The on_write function is the write listener, which applies the writes of the progress to the columns.
+
+        :param self: Represent the instance of the class
+        :param table_name: Name of the written table
+        :param operation: The operation, i.e: upsert, delete or delete_matching
+        :param rows: The list of the written rows (or keys)
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        if table_name != TBL_MIGRATION_PROGRESS:
+            return
+        with self._lock:
+            if self._columns is None:
+                return
+            for row in rows:
+                if operation == 'upsert':
+                    self._columns.upsert(row)
+                elif operation == 'delete':
+                    self._columns.delete((row['step_id'], row['entity_id']))
+                elif set(row) == {'entity_id'}:
+                    self._columns.delete_entity(row['entity_id'])
+                else:
+                    # The other matched deletes are rare, so the columns are simply built again.
+                    self._columns = None
+                    break
+            self._version += 1
+
+    def _lookup(self, name, snapshot, build):
+        """
+        The _lookup function returns the lookup arrays built from the table snapshot, and builds them again
+        when the snapshot has changed.
+
+        :param self: Represent the instance of the class
+        :param name: Name of the lookup
+        :param snapshot: The TableSnapshot object the lookup is built from
+        :param build: Function which builds the (sorted keys, values) arrays from the rows of the snapshot
+        :return: A tuple of the sorted keys and the values arrays
+        :doc-author: Kaoushik Kumar
+        """
+        version, arrays = self._lookups.get(name, (None, None))
+        if version != (snapshot.refreshed_at, snapshot.version):
+            arrays = build(snapshot.find())
+            self._lookups[name] = ((snapshot.refreshed_at, snapshot.version), arrays)
+        return arrays
+
+    @staticmethod
+    def _step_phases(steps):
+        """
+        The _step_phases function builds the lookup of the phase code of every step.
+
+        :param steps: The list of the step row dictionaries
+        :return: A tuple of the sorted step ids and their phase codes (-1 for an unknown phase)
+        :doc-author: Kaoushik Kumar
+        """
+        steps = sorted(steps, key=lambda step: step['step_id'])
+        codes = [PHASES.index(step['name']) if step.get('name') in PHASES else -1 for step in steps]
+        return np.array([step['step_id'] for step in steps], np.int64), np.array(codes, np.int64)
+
+    @staticmethod
+    def _entity_sizes(objects):
+        """
+        The _entity_sizes function builds the lookup of the total size (in GB) of the objects of every entity.
+
+        :param objects: The list of the entity object row dictionaries
+        :return: A tuple of the sorted entity ids and their sizes
+        :doc-author: Kaoushik Kumar
+        """
+        entity_ids = np.array([row['entity_id'] for row in objects], np.int64)
+        sizes = np.array([row.get('size_in_mb') or 0 for row in objects], np.float64)
+        keys, inverse = np.unique(entity_ids, return_inverse=True)
+        return keys, np.bincount(inverse, sizes, minlength=len(keys)) / MB_PER_GB
+
+    def _frame(self):
+        """
+        The _frame function returns the columns of the live progress rows along with the phase code and the size
+        of the entity of every row, and the version of the data, which changes along with any of the tables.
+
+        :param self: Represent the instance of the class
+        :return: A tuple of the dictionary of the column names and the arrays, and the version tuple
+        :doc-author: Kaoushik Kumar
+        """
+        progress = self.snapshot.table(TBL_MIGRATION_PROGRESS)
+        steps = self.snapshot.table(TBL_MIGRATION_STEP)
+        objects = self.snapshot.table(TBL_MIGRATION_ENTITY_OBJECTS)
+        with self._lock:
+            if self._columns is None or self._progress_loaded_at != progress.refreshed_at:
+                rows = progress.find()
+                self._columns = ProgressColumns(max(1024, len(rows)))
+                for row in rows:
+                    self._columns.upsert(row)
+                self._progress_loaded_at = progress.refreshed_at
+                self._version += 1
+            frame = self._columns.frame()
+            step_ids, codes = self._lookup(TBL_MIGRATION_STEP, steps, self._step_phases)
+            entity_ids, sizes = self._lookup(TBL_MIGRATION_ENTITY_OBJECTS, objects, self._entity_sizes)
+            version = (self._version, steps.refreshed_at, steps.version, objects.refreshed_at, objects.version)
+        frame['phase'] = lookup(frame['step_id'], step_ids, codes, -1)
+        frame['size_gb'] = lookup(frame['entity_id'], entity_ids, sizes, 0.0)
+        return frame, version
+
+    def _cached(self, name, filters, version, compute):
+        """
+        The _cached function returns the cached result, or computes it when the data has changed.
+
+        :param self: Represent the instance of the class
+        :param name: Name of the result
+        :param filters: The dictionary of the filters of the entities
+        :param version: The version of the data
+        :param compute: Function which computes the result
+        :return: The result
+        :doc-author: Kaoushik Kumar
+        """
+        key = (name, tuple(sorted(filters.items())))
+        with self._lock:
+            if self._cache_version != version:
+                self._cache, self._cache_version = {}, version
+            if key in self._cache:
+                return self._cache[key]
+        result = compute()
+        with self._lock:
+            if self._cache_version == version:
+                self._cache[key] = result
+        return result
+
+    def _entity_mask(self, entity_id, filters):
+        """
+        The _entity_mask function returns the mask of the rows of the entities matching the filters,
+        i.e: the columns of the entity (env, migrator, application_name, ...) of a wave.
+
+        :param self: Represent the instance of the class
+        :param entity_id: The array of the entity ids of the rows
+        :param filters: The dictionary of the column names and the values of the query string
+        :return: The boolean array, or None when there are no filters
+        :doc-author: Kaoushik Kumar
+        """
+        if not filters:
+            return None
+        entity_ids = [row['entity_id'] for row in self.snapshot.query(TBL_MIGRATION_ENTITY, filters)]
+        return np.isin(entity_id, np.array(entity_ids, np.int64))
+
+    @staticmethod
+    def _model(frame, mask=None):
+        """
+        The _model function computes the phase model from the completed steps of the frame.
+
+        :param frame: The dictionary of the column names and the arrays
+        :param mask: The boolean array of the rows to be used, or None for all of them
+        :return: A tuple of the phase model dictionary and the number of the completed steps
+        :doc-author: Kaoushik Kumar
+        """
+        hours = (frame['end'] - frame['start']) / SECONDS_PER_HOUR
+        completed = frame['is_successful'] & (frame['phase'] >= 0) & np.isfinite(hours) & (hours >= 0)
+        if mask is not None:
+            completed &= mask
+        model = phase_model(frame['phase'][completed], hours[completed], frame['size_gb'][completed],
+                            ANALYTICS_MIN_DURATION_SECONDS / SECONDS_PER_HOUR)
+        return model, int(completed.sum())
+
+    def phases(self, filters=None):
+        """
+        The phases function returns the statistics of the durations of every phase, of the entities matching
+        the filters.
+
+        :param self: Represent the instance of the class
+        :param filters: The dictionary of the column names and the values of the query string
+        :return: A dictionary with the number of the completed steps and the statistics of the phases
+        :doc-author: Kaoushik Kumar
+        """
+        filters = dict(filters or {})
+        frame, version = self._frame()
+
+        def compute():
+            model, completed = self._model(frame, self._entity_mask(frame['entity_id'], filters))
+            phases = []
+            for code in np.flatnonzero(model['count']):
+                phases.append({
+                    'phase': PHASES[code],
+                    'count': int(model['count'][code]),
+                    'fitted': int(model['fitted'][code]),
+                    'mean_hours': _number(model['mean_hours'][code]),
+                    **{f'p{percentile}_hours': _number(model['percentiles'][code][index])
+                       for index, percentile in enumerate(PERCENTILES)},
+                    'hours_per_gb': _number(model['hours_per_gb'][code]),
+                    'fixed_hours': _number(model['fixed_hours'][code]),
+                    'r2': _number(model['r2'][code]),
+                    'gb_per_hour': _number(model['gb_per_hour'][code]),
+                })
+            return {'completed_steps': completed, 'phases': phases}
+        return self._cached('phases', filters, version, compute)
+
+    def etas(self, filters=None, now=None):
+        """
+        The etas function returns the ETA of every entity in flight (i.e: with a started or completed step and
+        a step which is not completed yet) matching the filters, along with the ETA of the whole wave.
+        The remaining duration of a step is predicted by the regression of its phase on the size of the entity,
+        fitted on the completed steps of all the entities, less the time the step has been running for.
+        The steps of the phases which have never been completed are reported as unestimated, and the ETA of their
+        entity (and so of the wave) is unknown, i.e: None. These entities come last.
+
+        :param self: Represent the instance of the class
+        :param filters: The dictionary of the column names and the values of the query string
+        :param now: The current time (in seconds since the epoch), or None for the current time
+        :return: A dictionary with the ETAs of the entities and the wave
+        :doc-author: Kaoushik Kumar
+        """
+        filters = dict(filters or {})
+        now = time.time() if now is None else now
+        frame, version = self._frame()
+        model = self._cached('model', {}, version, lambda: self._model(frame)[0])
+        mask = self._entity_mask(frame['entity_id'], filters)
+        if mask is not None:
+            frame = {name: column[mask] for name, column in frame.items()}
+        phase = np.maximum(frame['phase'], 0)
+        predicted = model['fixed_hours'][phase] + model['hours_per_gb'][phase] * frame['size_gb']
+        predicted[frame['phase'] < 0] = np.nan
+        pending = ~frame['is_successful']
+        started = pending & np.isfinite(frame['start']) & (frame['start'] <= now)
+        elapsed = np.where(started, (now - frame['start']) / SECONDS_PER_HOUR, 0)
+        remaining = np.where(pending, np.maximum(predicted - elapsed, 0), 0)
+        unestimated = pending & np.isnan(remaining)
+        # The below lines will sum the remaining hours and the steps of every entity at once.
+        entity_ids, inverse = np.unique(frame['entity_id'], return_inverse=True)
+        remaining_hours = np.bincount(inverse, np.nan_to_num(remaining), minlength=len(entity_ids))
+        open_steps = np.bincount(inverse, pending, minlength=len(entity_ids))
+        unestimated_steps = np.bincount(inverse, unestimated, minlength=len(entity_ids))
+        active = np.bincount(inverse, started | frame['is_successful'], minlength=len(entity_ids))
+        in_flight = np.flatnonzero((open_steps > 0) & (active > 0))
+        remaining_hours[unestimated_steps > 0] = np.nan
+        etas = now + remaining_hours * SECONDS_PER_HOUR
+        entities = [{
+            'entity_id': int(entity_ids[index]),
+            'open_steps': int(open_steps[index]),
+            'unestimated_steps': int(unestimated_steps[index]),
+            'remaining_hours': _number(remaining_hours[index]),
+            'eta': None if np.isnan(etas[index]) else datetime.fromtimestamp(etas[index]).isoformat(timespec='seconds'),
+        } for index in in_flight[np.argsort(etas[in_flight], kind='stable')]]
+        return {
+            'entities': entities,
+            'wave': {
+                'entities': len(entities),
+                'unestimated_steps': int(unestimated_steps[in_flight].sum()),
+                # The below line will take the latest ETA, which is unknown when any ETA of the wave is unknown.
+                'eta': entities[-1]['eta'] if entities else None,
+            },
+        }
+
+
+# The process-wide analytics, which are created on the first request.
+_analytics = None
+_analytics_lock = threading.Lock()
+
+
+def get_analytics():
+    """
+    The get_analytics function returns the process-wide analytics of the phases.
+
+    :return: A PhaseAnalytics object
+    :doc-author: Kaoushik Kumar
+    """
+    global _analytics
+    with _analytics_lock:
+        if _analytics is None:
+            _analytics = PhaseAnalytics(get_snapshot())
+        return _analytics
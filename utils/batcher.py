@@ -0,0 +1,402 @@
+"""
+This file will be used for gathering the writes from all the request threads and flushing them
+to BigQuery as a single request, once the size or the age threshold of the batch has been hit.
+"""
+import atexit
+import math
+import threading
+import time
+from concurrent.futures import Future
+from exceptions import BatcherFullError
+
+
+class MicroBatcher:
+    """
+    This MicroBatcher Class will contain the common buffering, flushing and counting logic.
+    The subclasses will decide how the pending items will be written with the _flush_items function.
+    """
+    def __init__(self, name, max_batch_size, max_wait_seconds, max_pending, submit_timeout=30):
+        """
+        The __init__ function is called when the class is instantiated.
+        It sets up the buffer, the condition used by the flusher thread and the counters.
+
+        :param self: Represent the instance of the class
+        :param name: Name of the batcher, i.e: the name of the table
+        :param max_batch_size: Number of items after which the batch will be flushed
+        :param max_wait_seconds: Age of the oldest item after which the batch will be flushed
+        :param max_pending: Maximum number of items which can be buffered at a time
+        :param submit_timeout: Time (in seconds) a caller will wait for room in a full buffer
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.max_pending = max_pending
+        self.submit_timeout = submit_timeout
+        self._pending = []
+        self._oldest = None
+        self._condition = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self.batches = 0
+        self.items = 0
+        self.max_flushed_batch = 0
+        self.flush_seconds_total = 0.0
+        self.flush_seconds_max = 0.0
+        self.failed_batches = 0
+
+    def _start(self):
+        """
+        The _start function starts the flusher thread, if it is not running already.
+            It must be called while holding the condition.
+
+        :param self: Represent the instance of the class
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=f'batcher-{self.name}', daemon=True)
+            self._thread.start()
+
+    def _pending_count(self):
+        """
+        The _pending_count function returns the number of buffered items.
+
+        :param self: Represent the instance of the class
+        :return: An integer
+        :doc-author: Kaoushik Kumar
+        """
+        return len(self._pending)
+
+    def _add(self, item, future):
+        """
+        The _add function adds the item to the buffer.
+
+        :param self: Represent the instance of the class
+        :param item: The item to be written
+        :param future: The future which will be resolved with the result of the item
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self._pending.append((item, future))
+
+    def _take(self):
+        """
+        The _take function removes one batch of items from the buffer.
+
+        :param self: Represent the instance of the class
+        :return: A list of (item, future) tuples
+        :doc-author: Kaoushik Kumar
+        """
+        batch = self._pending[:self.max_batch_size]
+        del self._pending[:self.max_batch_size]
+        return batch
+
+    def _flush_items(self, batch):
+        """
+        The _flush_items function writes one batch to BigQuery and resolves the futures of the batch.
+
+        :param self: Represent the instance of the class
+        :param batch: A list of (item, future) tuples
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        raise NotImplementedError
+
+    def submit(self, item):
+        """
+        The submit function queues the item for the next flush and returns a future of its result.
+            If the buffer is full, the caller will wait for the room till the submit_timeout.
+
+        :param self: Represent the instance of the class
+        :param item: The item to be written
+        :return: A future which will be resolved once the item has been flushed
+        :doc-author: Kaoushik Kumar
+        """
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise BatcherFullError(f'Batcher {self.name} has been shut down')
+            deadline = time.monotonic() + self.submit_timeout
+            while self._pending_count() >= self.max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise BatcherFullError(f'Batcher {self.name} is full ({self.max_pending} pending rows)',
+                                           max(1, math.ceil(self.max_wait_seconds)))
+                self._condition.wait(remaining)
+            if not self._pending_count():
+                self._oldest = time.monotonic()
+            self._add(item, future)
+            self._start()
+            self._condition.notify_all()
+        return future
+
+    def _run(self):
+        """
+        The _run function is the loop of the flusher thread. It waits till the batch is full or
+        the oldest item is old enough, and then flushes the batch.
+
+        :param self: Represent the instance of the class
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        while True:
+            with self._condition:
+                while not self._pending_count() and not self._closed:
+                    self._condition.wait()
+                if not self._pending_count():
+                    return
+                while (not self._closed and self._pending_count() < self.max_batch_size
+                       and time.monotonic() - self._oldest < self.max_wait_seconds):
+                    self._condition.wait(self.max_wait_seconds - (time.monotonic() - self._oldest))
+                batch = self._take()
+                self._oldest = time.monotonic()
+                self._condition.notify_all()
+            self._flush(batch)
+
+    def _flush(self, batch):
+        """
+        The _flush function flushes one batch and records the batch size and flush latency.
+            If the write fails as a whole, every future of the batch will get the exception.
+
+        :param self: Represent the instance of the class
+        :param batch: A list of (item, future) tuples
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        started = time.monotonic()
+        try:
+            self._flush_items(batch)
+        except Exception as e:
+            with self._condition:
+                self.failed_batches += 1
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        elapsed = time.monotonic() - started
+        with self._condition:
+            self.batches += 1
+            self.items += len(batch)
+            self.max_flushed_batch = max(self.max_flushed_batch, len(batch))
+            self.flush_seconds_total += elapsed
+            self.flush_seconds_max = max(self.flush_seconds_max, elapsed)
+
+    def flush(self):
+        """
+        The flush function writes all the buffered items right away, in the caller's thread.
+
+        :param self: Represent the instance of the class
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        while True:
+            with self._condition:
+                if not self._pending_count():
+                    return
+                batch = self._take()
+                self._condition.notify_all()
+            self._flush(batch)
+
+    def shutdown(self):
+        """
+        The shutdown function stops accepting new items and flushes the remaining buffer.
+
+        :param self: Represent the instance of the class
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self.flush()
+
+    def stats(self):
+        """
+        The stats function returns the counters of the batcher.
+
+        :param self: Represent the instance of the class
+        :return: A dictionary with the batch size and flush latency counters
+        :doc-author: Kaoushik Kumar
+        """
+        with self._condition:
+            return {
+                'pending': self._pending_count(),
+                'batches': self.batches,
+                'items': self.items,
+                'avg_batch_size': self.items / self.batches if self.batches else 0,
+                'max_batch_size': self.max_flushed_batch,
+                'avg_flush_seconds': self.flush_seconds_total / self.batches if self.batches else 0,
+                'max_flush_seconds': self.flush_seconds_max,
+                'failed_batches': self.failed_batches,
+            }
+
+
+class InsertBatcher(MicroBatcher):
+    """
+    This InsertBatcher Class will flush the buffered rows of a table with a single insert_rows call,
+    and give every caller the errors of its own row back.
+    """
+    def __init__(self, name, insert_rows, **kwargs):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param name: Name of the table
+        :param insert_rows: Function which inserts a list of rows and returns the row errors
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        super().__init__(name, **kwargs)
+        self.insert_rows = insert_rows
+
+    def _flush_items(self, batch):
+        """
+        The _flush_items function inserts the rows of the batch and maps the returned errors
+        back to the row which caused them, using the index of the row in the batch.
+
+        :param self: Represent the instance of the class
+        :param batch: A list of (row, future) tuples
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        errors = self.insert_rows([row for row, _ in batch])
+        row_errors = {error['index']: error['errors'] for error in errors or []}
+        for index, (_, future) in enumerate(batch):
+            future.set_result(row_errors.get(index, []))
+
+
+class UpdateCoalescer(MicroBatcher):
+    """
+    This UpdateCoalescer Class will gather the pending updates of a table, keep only the latest row
+    per primary key and apply them with a single MERGE statement. Every waiting caller is released
+    with the result of the flush which contained its update.
+    """
+    def __init__(self, name, merge_rows, **kwargs):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param name: Name of the table
+        :param merge_rows: Function which updates a list of rows with unique keys and returns the updated row count
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        super().__init__(name, **kwargs)
+        self.merge_rows = merge_rows
+        self._pending = {}
+        self.superseded = 0
+
+    def _add(self, item, future):
+        """
+        The _add function adds the (key, row) item to the buffer, replacing the pending row of the same key.
+            The futures of the replaced rows will be released along with the latest row of the key.
+
+        :param self: Represent the instance of the class
+        :param item: A (key, row) tuple
+        :param future: The future which will be resolved with the result of the update
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        key, row = item
+        futures = [future]
+        if key in self._pending:
+            futures = self._pending.pop(key)[1] + futures
+            self.superseded += 1
+        self._pending[key] = (row, futures)
+
+    def _take(self):
+        """
+        The _take function removes the oldest keys of the buffer, up to the max_batch_size.
+
+        :param self: Represent the instance of the class
+        :return: A list of (row, futures) tuples
+        :doc-author: Kaoushik Kumar
+        """
+        keys = list(self._pending)[:self.max_batch_size]
+        return [self._pending.pop(key) for key in keys]
+
+    def _flush(self, batch):
+        """
+        The _flush function flushes one batch, where every item of the batch has the list of futures.
+
+        :param self: Represent the instance of the class
+        :param batch: A list of (row, futures) tuples
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        super()._flush([(row, future) for row, futures in batch for future in futures])
+
+    def _flush_items(self, batch):
+        """
+        The _flush_items function applies the latest rows with a single MERGE and releases all the callers.
+
+        :param self: Represent the instance of the class
+        :param batch: A list of (row, future) tuples
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        rows = list({id(row): row for row, _ in batch}.values())
+        affected_rows = self.merge_rows(rows)
+        for _, future in batch:
+            future.set_result(affected_rows)
+
+    def stats(self):
+        """
+        The stats function returns the counters of the coalescer, including the number of superseded updates.
+
+        :param self: Represent the instance of the class
+        :return: A dictionary with the batch size, flush latency and superseded counters
+        :doc-author: Kaoushik Kumar
+        """
+        stats = super().stats()
+        stats['superseded'] = self.superseded
+        return stats
+
+
+# Registry of all the batchers of the process, so that they can be flushed on the shutdown.
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(name, factory):
+    """
+    The get_batcher function returns the batcher registered with the name, and creates it
+    through the factory when it is not registered yet.
+
+    :param name: Name of the batcher
+    :param factory: Function which creates the batcher
+    :return: The batcher object
+    :doc-author: Kaoushik Kumar
+    """
+    with _batchers_lock:
+        if name not in _batchers:
+            _batchers[name] = factory()
+        return _batchers[name]
+
+
+def batcher_stats():
+    """
+    The batcher_stats function returns the counters of all the registered batchers.
+
+    :return: A dictionary of the batcher name and its counters
+    :doc-author: Kaoushik Kumar
+    """
+    with _batchers_lock:
+        batchers = dict(_batchers)
+    return {name: batcher.stats() for name, batcher in batchers.items()}
+
+
+@atexit.register
+def shutdown_batchers():
+    """
+    The shutdown_batchers function flushes all the registered batchers, so that no buffered row
+    will be lost when the worker is shutting down.
+
+    :return: Nothing
+    :doc-author: Kaoushik Kumar
+    """
+    with _batchers_lock:
+        batchers = list(_batchers.values())
+    for batcher in batchers:
+        batcher.shutdown()
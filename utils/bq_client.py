@@ -1,30 +1,129 @@
 """
 This file will be used for performing the DML operations over the BigQuery.
 """
-from google.cloud import bigquery
+import json
+import threading
+import time
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+from enum import Enum
 from API.pydantics import (
     EntityModel,
     EntityObjectModel,
     PhaseModel,
+    ProgressEventModel,
     ProgressModel
 )
 from constants import (
     DATASET_NAME,
+    DML_MAX_CONCURRENCY,
+    DML_MAX_QUEUE,
+    DML_MAX_WAIT_SECONDS,
+    INSERT_BATCH_MAX_PENDING,
+    INSERT_BATCH_MAX_ROWS,
+    INSERT_BATCH_MAX_WAIT_MS,
+    INSERT_BATCHING_TABLES,
+    JOB_MAX_POLL_SECONDS,
+    JOB_POLL_INTERVAL_SECONDS,
+    PROGRESS_COMPACTION_INTERVAL_SECONDS,
+    PROGRESS_COMPACTION_MIN_AGE_HOURS,
+    PROGRESS_STORAGE_MODE,
     PROJECT_ID,
     TBL_MIGRATION_ENTITY,
     TBL_MIGRATION_ENTITY_OBJECTS,
     TBL_MIGRATION_STEP,
-    TBL_MIGRATION_PROGRESS
+    TBL_MIGRATION_PROGRESS,
+    TBL_MIGRATION_PROGRESS_EVENTS,
+    UPDATE_COALESCE_MAX_ROWS,
+    UPDATE_COALESCE_WINDOW_MS,
+    UPDATE_COALESCING_TABLES,
+    VW_MIGRATION_PROGRESS_LATEST
 )
+from loggers.logger import Logger
+from utils.admission import ConcurrencyLimiter, get_limiter
+from utils.batcher import InsertBatcher, UpdateCoalescer, get_batcher
+from utils.jobs import JobTracker
+from utils.storage import get_backend
 
-# Accessing the PROJECT_ID from constants.
-client = bigquery.Client(project=PROJECT_ID)
+# Process-wide tracker of the DML jobs submitted in the asynchronous mode.
+job_tracker = JobTracker(JOB_POLL_INTERVAL_SECONDS, max_poll_seconds=JOB_MAX_POLL_SECONDS)
+# Functions which will be called after every successful write, i.e: to keep the in-memory snapshot up to date.
+write_listeners = []
+# BigQuery types of the Python types used in the pydantic models.
+BQ_TYPES = {
+    bool: 'BOOL',
+    datetime: 'DATETIME',
+    float: 'FLOAT64',
+    int: 'INT64',
+    str: 'STRING',
+}
+
+
+def bq_type(field):
+    """
+    The bq_type function returns the BigQuery type of a pydantic model field.
+        The Enum fields (i.e: Phase) will be stored with their values, so they are STRING columns.
+
+    :param field: The pydantic ModelField
+    :return: The name of the BigQuery type
+    :doc-author: Kaoushik Kumar
+    """
+    if isinstance(field.type_, type) and issubclass(field.type_, Enum):
+        return 'STRING'
+    return BQ_TYPES[field.type_]
+
+
+def add_write_listener(listener):
+    """
+    The add_write_listener function registers the function which will be called after every successful write,
+    with the name of the table, the operation (upsert, delete or delete_matching) and the list of the written rows
+    (or keys).
+
+    :param listener: The function to be called
+    :return: Nothing
+    :doc-author: Kaoushik Kumar
+    """
+    write_listeners.append(listener)
+
+
+def entity_detail(entity, objects, progress):
+    """
+    The entity_detail function builds the detail of the migration entity from its objects and its progress,
+    where every progress row has the phase_name and the orders of its step.
+        The current phase is the first (by orders) step which is not successful yet,
+        or the last step when all the steps are successful.
+
+    :param entity: The entity row dictionary
+    :param objects: The list of the entity object row dictionaries
+    :param progress: The list of the progress row dictionaries, joined with the steps
+    :return: A dictionary with the entity, objects, progress, total size and current phase
+    :doc-author: Kaoushik Kumar
+    """
+    progress = sorted(progress, key=lambda row: (row.get('orders') is None, row.get('orders') or 0, row['step_id']))
+    pending = [row for row in progress if not row.get('is_successful')]
+    current = pending[0] if pending else (progress[-1] if progress else None)
+    return {
+        'entity': entity,
+        'objects': sorted(objects, key=lambda row: row['object_id']),
+        'progress': progress,
+        'total_size_in_mb': sum(row.get('size_in_mb') or 0 for row in objects),
+        'current_phase': current.get('phase_name') if current else None,
+        'current_step_id': current['step_id'] if current else None,
+    }
 
 
 class BigQueryTable:
     """
     This Big Query Class will contain all the function to perform CRUD operation using Bigquery API.
     """
+    # The pydantic model of the rows and the primary key columns, which will be set by the subclasses.
+    model = None
+    key_columns = ()
+    # The DATETIME column by which the table is partitioned (by day) and the clustering columns of the table,
+    # which will be set by the subclasses and provisioned by utils.schema.
+    partition_column = None
+    cluster_columns = ()
+
     def __init__(self, table_name):
         """
         The __init__ function is called when the class is instantiated.
@@ -36,17 +135,241 @@ class BigQueryTable:
         :doc-author: Kaoushik Kumar
         """
         self.table_name = table_name
+        # The storage backend (BigQuery or SQLite) chosen by the STORAGE_BACKEND, shared by all the tables.
+        self.backend = get_backend()
+
+    def columns(self):
+        """
+        The columns function returns the columns of the table along with their BigQuery types,
+        in the same order as the fields of the pydantic model.
+
+        :param self: Represent the instance of the class
+        :return: A list of (column name, BigQuery type) tuples
+        :doc-author: Kaoushik Kumar
+        """
+        return [(name, bq_type(field)) for name, field in self.model.__fields__.items()]
 
-    def _get_table(self):
+    def to_row(self, model):
         """
-        The _get_table function is a helper function that returns the table object from BigQuery.
+        The to_row function converts the pydantic model into the row tuple of the table.
 
         :param self: Represent the instance of the class
-        :return: A table object from the bigquery api
+        :param model: The pydantic model object
+        :return: A tuple of the column values
         :doc-author: Kaoushik Kumar
         """
-        table_ref = client.dataset(DATASET_NAME).table(self.table_name)
-        return client.get_table(table_ref)
+        values = (getattr(model, name) for name in self.model.__fields__)
+        return tuple(value.value if isinstance(value, Enum) else value for value in values)
+
+    def _written(self, operation, rows):
+        """
+        The _written function notifies the write listeners about the rows written by this service.
+
+        :param self: Represent the instance of the class
+        :param operation: The operation, i.e: upsert, delete or delete_matching
+        :param rows: List of the row tuples (upsert), the key tuples (delete) or the column dictionaries
+            which the deleted rows have matched (delete_matching)
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        if not write_listeners or not rows:
+            return
+        names = [name for name, _ in self.columns()] if operation == 'upsert' else list(self.key_columns)
+        records = [row if isinstance(row, dict) else dict(zip(names, row)) for row in rows]
+        for listener in write_listeners:
+            try:
+                listener(self.table_name, operation, records)
+            except Exception as e:
+                Logger().logging().error(f'Write listener failed for {self.table_name}: {str(e)}')
+
+    def fingerprint(self):
+        """
+        The fingerprint function returns the version of the table data, which changes when the table has been
+        modified, i.e: by the DML or the streaming inserts. It costs one metadata request and no query.
+
+        :param self: Represent the instance of the class
+        :return: A tuple which can be compared with the previous fingerprint
+        :doc-author: Kaoushik Kumar
+        """
+        return self.backend.fingerprint(self)
+
+    def fingerprint_info(self, fingerprint):
+        """
+        The fingerprint_info function returns the modified time and the row count of the table as of the fingerprint.
+
+        :param self: Represent the instance of the class
+        :param fingerprint: The fingerprint returned by the fingerprint function
+        :return: A tuple of the modified time (POSIX timestamp) and the row count, either of which can be None
+        :doc-author: Kaoushik Kumar
+        """
+        return self.backend.fingerprint_info(fingerprint)
+
+    def read_rows(self):
+        """
+        The read_rows function reads all the rows of the table, through the tabledata API (which is not billed)
+        on BigQuery.
+
+        :param self: Represent the instance of the class
+        :return: A list of the row dictionaries
+        :doc-author: Kaoushik Kumar
+        """
+        return self.backend.read_rows(self)
+
+    def read_changes(self, since):
+        """
+        The read_changes function reads the rows modified since the time, for the tables which record the time of
+        every write. The other tables can only be read again in full.
+
+        :param self: Represent the instance of the class
+        :param since: The datetime (UTC) of the oldest write to be read
+        :return: A tuple of the list of the upserted row dictionaries and the list of the deleted key dictionaries,
+            or None when the table can not be read incrementally
+        :doc-author: Kaoushik Kumar
+        """
+        return None
+
+    def read_pages(self, selected_fields=None, page_token=None, page_size=1000):
+        """
+        The read_pages function reads the rows of the table one page at a time, starting at the page token.
+
+        :param self: Represent the instance of the class
+        :param selected_fields: Names of the columns to be read, or None for all of them
+        :param page_token: The token of the page to start at, or None for the first page
+        :param page_size: Maximum number of the rows of a page
+        :return: A generator of (list of the row dictionaries, token of the next page or None) tuples
+        :doc-author: Kaoushik Kumar
+        """
+        return self.backend.read_pages(self, selected_fields, page_token, page_size)
+
+    def _run_query(self, query, query_parameters=None, wait=True):
+        """
+        The _run_query function submits the query to BigQuery and waits till it is finished.
+            The BigQuery SQL is supported only by the BigQuery backend.
+
+        :param self: Represent the instance of the class
+        :param query: The SQL statement to be executed
+        :param query_parameters: The list of the query parameters of the statement
+        :param wait: Whether to wait till the job is finished
+        :return: The QueryJob object
+        :doc-author: Kaoushik Kumar
+        """
+        return self.backend.query(query, query_parameters, wait)
+
+    def _insert_rows(self, rows):
+        """
+        The _insert_rows function inserts the rows into the table through the storage backend.
+
+        :param self: Represent the instance of the class
+        :param rows: List of the rows to be inserted
+        :return: The list of row errors, with the index of the row
+        :doc-author: Kaoushik Kumar
+        """
+        return self.backend.insert_rows(self, rows)
+
+    @property
+    def batch_inserts(self):
+        """
+        The batch_inserts property tells whether the inserts of the table go through the write-behind batcher.
+
+        :param self: Represent the instance of the class
+        :return: A boolean value
+        :doc-author: Kaoushik Kumar
+        """
+        return self.table_name in INSERT_BATCHING_TABLES or '*' in INSERT_BATCHING_TABLES
+
+    @property
+    def coalesce_updates(self):
+        """
+        The coalesce_updates property tells whether the updates of the table go through the update coalescer.
+
+        :param self: Represent the instance of the class
+        :return: A boolean value
+        :doc-author: Kaoushik Kumar
+        """
+        return self.table_name in UPDATE_COALESCING_TABLES or '*' in UPDATE_COALESCING_TABLES
+
+    def _get_batcher(self):
+        """
+        The _get_batcher function returns the process-wide write-behind batcher of the table.
+
+        :param self: Represent the instance of the class
+        :return: An InsertBatcher object
+        :doc-author: Kaoushik Kumar
+        """
+        return get_batcher(self.table_name, lambda: InsertBatcher(
+            self.table_name,
+            self._insert_rows,
+            max_batch_size=INSERT_BATCH_MAX_ROWS,
+            max_wait_seconds=INSERT_BATCH_MAX_WAIT_MS / 1000,
+            max_pending=INSERT_BATCH_MAX_PENDING,
+        ))
+
+    def _get_coalescer(self):
+        """
+        The _get_coalescer function returns the process-wide update coalescer of the table.
+
+        :param self: Represent the instance of the class
+        :return: An UpdateCoalescer object
+        :doc-author: Kaoushik Kumar
+        """
+        return get_batcher(f'{self.table_name}:update', lambda: UpdateCoalescer(
+            f'{self.table_name}:update',
+            self.merge_rows,
+            max_batch_size=UPDATE_COALESCE_MAX_ROWS,
+            max_wait_seconds=UPDATE_COALESCE_WINDOW_MS / 1000,
+            max_pending=UPDATE_COALESCE_MAX_ROWS * 10,
+        ))
+
+    def _get_dml_limiter(self):
+        """
+        The _get_dml_limiter function returns the process-wide admission limiter of the DML of the table.
+
+        :param self: Represent the instance of the class
+        :return: A ConcurrencyLimiter object
+        :doc-author: Kaoushik Kumar
+        """
+        return get_limiter(self.table_name, lambda: ConcurrencyLimiter(
+            self.table_name, DML_MAX_CONCURRENCY, DML_MAX_QUEUE, DML_MAX_WAIT_SECONDS))
+
+    def _submit_async(self, submit, kind, operation, rows):
+        """
+        The _submit_async function submits the DML job without waiting for it. The DML slot of the table
+        is held till the job is finished, and released by the job_tracker, which also notifies the write listeners
+        of the rows (or keys) of the job once it has succeeded.
+
+        :param self: Represent the instance of the class
+        :param submit: Function which submits the job and returns the QueryJob object
+        :param kind: The kind of the job, i.e: the operation and the table name
+        :param operation: The operation of the write listeners, i.e: upsert or delete
+        :param rows: List of the row tuples (upsert) or the key tuples (delete) of the job
+        :return: A dictionary with a key 'response' and value 'Accepted', along with the job_id
+        :doc-author: Kaoushik Kumar
+        """
+        limiter = self._get_dml_limiter()
+        acquired_at = limiter.acquire()
+        try:
+            query_job = submit()
+        except Exception:
+            limiter.release(acquired_at)
+            raise
+        # The job will be tracked by the job_tracker, and the client can poll for its state with the job_id.
+        job_id = job_tracker.track(query_job, kind, on_finished=lambda: limiter.release(acquired_at),
+                                   on_done=lambda: self._written(operation, rows))
+        return {'response': 'Accepted', 'job_id': job_id}
+
+    def coalesce_update(self, model):
+        """
+        The coalesce_update function queues the update for the next flush window of the table and
+        waits till the MERGE containing it (or a later update of the same key) has been applied.
+
+        :param self: Represent the instance of the class
+        :param model: The pydantic model object to be updated
+        :return: A dictionary with a key 'response' and value 'Updated'
+        :doc-author: Kaoushik Kumar
+        """
+        key = tuple(getattr(model, name) for name in self.key_columns)
+        self._get_coalescer().submit((key, self.to_row(model))).result()
+        return {'response': 'Updated'}
 
     def insert_row(self, row):
         """
@@ -59,45 +382,155 @@ class BigQueryTable:
         :return: A dictionary with a key 'response' and value 'success'
         :doc-author: Kaoushik Kumar
         """
-        table = self._get_table()
-        client.insert_rows(table, [row])
+        if self.batch_inserts:
+            # The row will be flushed along with the rows of the other threads, and only its own errors are returned.
+            errors = self._get_batcher().submit(row).result()
+        else:
+            errors = self._insert_rows([row])
+        if errors:
+            return {'response': False, 'result': errors}
+        self._written('upsert', [row])
         return {'response': 'Success'}
 
-    def update_row(self, query):
+    def update_row(self, row, wait=True):
         """
-        The update_row function takes a query as an argument and updates the row in the database.
+        The update_row function updates the row of the table, matched by the key columns.
             Args:
-                query (str): The SQL update statement to be executed.
+                row (tuple): The updated row tuple, in the order of the columns.
 
         :param self: Represent the instance of the class
-        :param query: Specify the query to be executed
-        :return: The string 'updated'
+        :param row: The updated row tuple
+        :param wait: Whether to wait for the job, or return the job_id right away
+        :return: A dictionary with a key 'response' and value 'Updated'
         :doc-author: Kaoushik Kumar
         """
-        query_job = client.query(query)
-        query_job.result()
+        if not wait and self.backend.supports_sql:
+            return self._submit_async(lambda: self.backend.merge_rows(self, [row], wait=False),
+                                      'update:' + self.table_name, 'upsert', [row])
+        self.merge_rows([row])
         return {'response': 'Updated'}
 
-    def delete_row(self, query):
+    def delete_row(self, key, wait=True):
         """
-        The delete_row function deletes a row from the table.
+        The delete_row function deletes the row of the key from the table.
             Args:
-                query (str): The Bigquery to delete a row from the table.
+                key (tuple): The values of the key columns of the row to be deleted.
 
         :param self: Represent the instance of the class
-        :param query: Specify the query to be executed
+        :param key: The key tuple, in the order of the key_columns
+        :param wait: Whether to wait for the job, or return the job_id right away
         :return: A dictionary with a key of response and a value of 'deleted'
         :doc-author: Kaoushik Kumar
         """
-        query_job = client.query(query)
-        query_job.result()
+        if not wait and self.backend.supports_sql:
+            return self._submit_async(lambda: self.backend.delete_keys(self, [key], wait=False),
+                                      'delete:' + self.table_name, 'delete', [key])
+        self.delete_keys([key])
         return {'response': 'Deleted'}
 
+    def insert_rows(self, rows):
+        """
+        The insert_rows function inserts all the rows into the table with a single insert_rows call.
+
+        :param self: Represent the instance of the class
+        :param rows: List of the row tuples to be inserted
+        :return: The list of row errors, with the index of the row
+        :doc-author: Kaoushik Kumar
+        """
+        if not rows:
+            return []
+        errors = self._insert_rows(rows)
+        failed = {error['index'] for error in errors}
+        self._written('upsert', [row for index, row in enumerate(rows) if index not in failed])
+        return errors
+
+    def load_file(self, staged, chunk_size=1000, idempotency_key=None):
+        """
+        The load_file function appends all the rows of the staged NDJSON file to the table with a single
+        load job, and then notifies the write listeners about the rows, chunk by chunk.
+
+        :param self: Represent the instance of the class
+        :param staged: The binary file of the rows, one JSON object per line
+        :param chunk_size: Number of the rows passed to the write listeners at a time
+        :param idempotency_key: The key of the upload given by the client, or None
+        :return: The number of the loaded rows
+        :doc-author: Kaoushik Kumar
+        """
+        loaded = self.backend.load_ndjson(self, staged, idempotency_key)
+        if write_listeners:
+            staged.seek(0)
+            columns = self.columns()
+            chunk = []
+            for record in map(json.loads, staged):
+                chunk.append(tuple(datetime.fromisoformat(record[name]) if type_ == 'DATETIME' and record[name]
+                                   else record[name] for name, type_ in columns))
+                if len(chunk) >= chunk_size:
+                    self._written('upsert', chunk)
+                    chunk = []
+            self._written('upsert', chunk)
+        return loaded
+
+    def insert_missing(self, rows):
+        """
+        The insert_missing function inserts only the rows whose keys are not in the table yet, checking the keys
+        within the same write (a single transaction on BigQuery), instead of against a snapshot read before it.
+
+        :param self: Represent the instance of the class
+        :param rows: List of the row tuples to be inserted, with unique keys
+        :return: The list of the key tuples of the inserted rows
+        :doc-author: Kaoushik Kumar
+        """
+        if not rows:
+            return []
+        with self._get_dml_limiter().slot():
+            inserted = self.backend.insert_missing(self, rows)
+        keys = set(inserted)
+        names = [name for name, _ in self.columns()]
+        self._written('upsert', [row for row in rows if tuple(row[names.index(name)] for name in self.key_columns)
+                                 in keys])
+        return inserted
+
+    def merge_rows(self, rows):
+        """
+        The merge_rows function updates all the rows of the table, matched by the key columns,
+        with a single statement (a MERGE reading the new values from an array parameter on BigQuery).
+
+        :param self: Represent the instance of the class
+        :param rows: List of the row tuples to be updated, with unique keys
+        :return: The number of the updated rows
+        :doc-author: Kaoushik Kumar
+        """
+        if not rows:
+            return 0
+        with self._get_dml_limiter().slot():
+            affected_rows = self.backend.merge_rows(self, rows)
+        self._written('upsert', rows)
+        return affected_rows
+
+    def delete_keys(self, keys):
+        """
+        The delete_keys function deletes all the rows of the given keys with a single DELETE statement.
+
+        :param self: Represent the instance of the class
+        :param keys: List of the key tuples, in the order of the key_columns
+        :return: The number of the deleted rows
+        :doc-author: Kaoushik Kumar
+        """
+        if not keys:
+            return 0
+        with self._get_dml_limiter().slot():
+            affected_rows = self.backend.delete_keys(self, keys)
+        self._written('delete', keys)
+        return affected_rows
+
 
 class PhaseTable(BigQueryTable):
     """
     This PhaseTable Class will contain all the function to perform CRUD operation using Bigquery API.
     """
+    model = PhaseModel
+    key_columns = ('step_id',)
+
     def __init__(self):
         """
         The __init__ function is called when the class is instantiated.
@@ -130,51 +563,42 @@ class PhaseTable(BigQueryTable):
         )
         return self.insert_row(row)
 
-    def update_phase(self, phase: PhaseModel):
+    def update_phase(self, phase: PhaseModel, wait: bool = True):
         """
         The update_phase function updates the phase table in BigQuery with a new PhaseModel object.
 
         :param self: Reference the object that is calling the function
         :param phase: PhaseModel: Pass the phase object to the function
+        :param wait: bool: Whether to wait for the job, or return the job_id right away
         :return: A boolean value
         :doc-author: Kaoushik Kumar
         """
-        query = f"""
-            UPDATE 
-                `{PROJECT_ID}.{DATASET_NAME}.{self.table_name}`
-            SET 
-                name = '{phase.name.value}', 
-                description = '{phase.description}',
-                orders = {phase.orders},
-                is_optional = {phase.is_optional},
-                parent_step_id = {phase.parent_step_id}
-            WHERE 
-                step_id = {phase.step_id}
-            """
-        return self.update_row(query)
+        if self.coalesce_updates and wait:
+            return self.coalesce_update(phase)
+        return self.update_row(self.to_row(phase), wait)
 
-    def delete_phase(self, step_id: int):
+    def delete_phase(self, step_id: int, wait: bool = True):
         """
         The delete_phase function deletes a phase from the database.
 
         :param self: Represent the instance of the class
         :param step_id: int: Specify the phase_id of the row to be deleted
+        :param wait: bool: Whether to wait for the job, or return the job_id right away
         :return: The number of rows deleted
         :doc-author: Kaoushik Kumar
         """
-        query = f"""
-            DELETE 
-                FROM `{PROJECT_ID}.{DATASET_NAME}.{self.table_name}`
-            WHERE 
-                step_id = {step_id}
-            """
-        return self.delete_row(query)
+        return self.delete_row((step_id,), wait)
 
 
 class ProgressTable(BigQueryTable):
     """
     This ProgressTable Class will contain all the function to perform CRUD operation using Bigquery API.
     """
+    model = ProgressModel
+    key_columns = ('step_id', 'entity_id')
+    partition_column = 'start_date_time'
+    cluster_columns = ('entity_id', 'step_id')
+
     def __init__(self):
         """
         The __init__ function is called when the class is instantiated.
@@ -189,6 +613,181 @@ class ProgressTable(BigQueryTable):
         """
         super().__init__(TBL_MIGRATION_PROGRESS)
 
+    @property
+    def events_mode(self):
+        """
+        The events_mode property tells whether the progress is stored as an append-only event log.
+
+        :param self: Represent the instance of the class
+        :return: A boolean value
+        :doc-author: Kaoushik Kumar
+        """
+        return PROGRESS_STORAGE_MODE == 'events'
+
+    def insert_rows(self, rows):
+        """
+        The insert_rows function inserts the progress rows, as the events when the events mode is enabled.
+
+        :param self: Represent the instance of the class
+        :param rows: List of the progress row tuples
+        :return: The list of row errors returned by BigQuery
+        :doc-author: Kaoushik Kumar
+        """
+        if self.events_mode:
+            errors = ProgressEventTable().append_rows(rows)
+            failed = {error['index'] for error in errors}
+            self._written('upsert', [row for index, row in enumerate(rows) if index not in failed])
+            return errors
+        return super().insert_rows(rows)
+
+    def merge_rows(self, rows):
+        """
+        The merge_rows function updates the progress rows, as the events when the events mode is enabled.
+
+        :param self: Represent the instance of the class
+        :param rows: List of the progress row tuples, with unique keys
+        :return: The number of the updated (or appended) rows
+        :doc-author: Kaoushik Kumar
+        """
+        if self.events_mode:
+            errors = ProgressEventTable().append_rows(rows)
+            if errors:
+                raise ValueError(f'Failed to append the progress events: {errors}')
+            self._written('upsert', rows)
+            return len(rows)
+        return super().merge_rows(rows)
+
+    def insert_missing(self, rows):
+        """
+        The insert_missing function inserts the progress rows whose keys have no progress yet, as the events when
+        the events mode is enabled. In the events mode a key which has any event is left out, also when its latest
+        event is the tombstone of a deleted progress.
+
+        :param self: Represent the instance of the class
+        :param rows: List of the progress row tuples, with unique keys
+        :return: The list of the (step_id, entity_id) tuples of the inserted rows
+        :doc-author: Kaoushik Kumar
+        """
+        if self.events_mode:
+            event_time = datetime.utcnow()
+            inserted = ProgressEventTable().insert_missing([tuple(row) + (event_time, False) for row in rows])
+            keys = set(inserted)
+            self._written('upsert', [row for row in rows if (row[0], row[1]) in keys])
+            return inserted
+        return super().insert_missing(rows)
+
+    def delete_keys(self, keys):
+        """
+        The delete_keys function deletes the progress rows, as the tombstone events when the events mode is enabled.
+
+        :param self: Represent the instance of the class
+        :param keys: List of the (step_id, entity_id) tuples
+        :return: The number of the deleted (or appended) rows
+        :doc-author: Kaoushik Kumar
+        """
+        if self.events_mode:
+            errors = ProgressEventTable().append_rows(
+                [(step_id, entity_id, None, None, False) for step_id, entity_id in keys], is_deleted=True
+            )
+            if errors:
+                raise ValueError(f'Failed to append the progress events: {errors}')
+            self._written('delete', keys)
+            return len(keys)
+        return super().delete_keys(keys)
+
+    def _append_event(self, progress: ProgressModel, is_deleted: bool = False):
+        """
+        The _append_event function appends the progress (or its tombstone) to the progress event log.
+
+        :param self: Represent the instance of the class
+        :param progress: ProgressModel: Pass the progress object to the function
+        :param is_deleted: bool: Whether the progress has been deleted
+        :return: A dictionary with a key 'response' and value 'success'
+        :doc-author: Kaoushik Kumar
+        """
+        response = ProgressEventTable().append(progress, is_deleted)
+        if response['response']:
+            if is_deleted:
+                self._written('delete', [(progress.step_id, progress.entity_id)])
+            else:
+                self._written('upsert', [self.to_row(progress)])
+        return response
+
+    def fingerprint(self):
+        """
+        The fingerprint function returns the version of the progress, read from the event log in the events mode.
+
+        :param self: Represent the instance of the class
+        :return: A tuple of the last modified time and the row counts
+        :doc-author: Kaoushik Kumar
+        """
+        if self.events_mode:
+            return ProgressEventTable().fingerprint()
+        return super().fingerprint()
+
+    def read_rows(self):
+        """
+        The read_rows function reads all the progress rows, through the latest-state query in the events mode.
+
+        :param self: Represent the instance of the class
+        :return: A list of the row dictionaries
+        :doc-author: Kaoushik Kumar
+        """
+        if self.events_mode:
+            return ProgressEventTable().latest_rows()
+        return super().read_rows()
+
+    def read_changes(self, since):
+        """
+        The read_changes function reads the progress written since the time, from the event log in the events mode.
+        The latest event of every key is applied, i.e: the key is upserted or (for a tombstone) deleted.
+
+        :param self: Represent the instance of the class
+        :param since: The datetime (UTC) of the oldest event to be read
+        :return: A tuple of the list of the upserted row dictionaries and the list of the deleted key dictionaries,
+            or None out of the events mode
+        :doc-author: Kaoushik Kumar
+        """
+        if not self.events_mode:
+            return None
+        latest = {}
+        for event in ProgressEventTable().events_since(since):
+            latest[(event['step_id'], event['entity_id'])] = event
+        upserted = [{name: value for name, value in event.items() if name not in ('event_time', 'is_deleted')}
+                    for event in latest.values() if not event['is_deleted']]
+        deleted = [{'step_id': step_id, 'entity_id': entity_id}
+                   for (step_id, entity_id), event in latest.items() if event['is_deleted']]
+        return upserted, deleted
+
+    def read_pages(self, selected_fields=None, page_token=None, page_size=1000):
+        """
+        The read_pages function reads the progress rows one page at a time. In the events mode every page is
+        the latest state of the keys after the last key of the previous page, in the order of the keys, and the
+        page token is that last key, so that a page neither skips nor repeats a key and only a page is in memory.
+
+        :param self: Represent the instance of the class
+        :param selected_fields: Names of the columns to be read, or None for all of them
+        :param page_token: The token of the page to start at, or None for the first page
+        :param page_size: Maximum number of the rows of a page
+        :return: A generator of (list of the row dictionaries, token of the next page or None) tuples
+        :doc-author: Kaoushik Kumar
+        """
+        if not self.events_mode:
+            yield from super().read_pages(selected_fields, page_token, page_size)
+            return
+        events = ProgressEventTable()
+        after = tuple(int(value) for value in page_token.split(',')) if page_token else None
+        while True:
+            # One more row than the page is read, to tell whether there is a next page.
+            rows = events.latest_page(after, page_size + 1, selected_fields)
+            page = [{name: value for name, value in row.items() if not selected_fields or name in selected_fields}
+                    for row in rows[:page_size]]
+            if len(rows) <= page_size:
+                yield page, None
+                return
+            after = (rows[page_size - 1]['entity_id'], rows[page_size - 1]['step_id'])
+            yield page, f'{after[0]},{after[1]}'
+
     def insert_progress(self, progress: ProgressModel):
         """
         The insert_progress function inserts a new row into the Progress table.
@@ -198,6 +797,8 @@ class ProgressTable(BigQueryTable):
         :return: The row data of the progress that was inserted into the database
         :doc-author: Kaoushik Kumar
         """
+        if self.events_mode:
+            return self._append_event(progress)
         row = (
             progress.step_id,
             progress.entity_id,
@@ -207,7 +808,7 @@ class ProgressTable(BigQueryTable):
         )
         return self.insert_row(row)
 
-    def update_progress(self, progress: ProgressModel):
+    def update_progress(self, progress: ProgressModel, wait: bool = True):
         """
         The update_progress function updates the progress table with a new ProgressModel.
             Args:
@@ -215,48 +816,291 @@ class ProgressTable(BigQueryTable):
 
         :param self: Refer to the current instance of a class
         :param progress: ProgressModel: Update the progress table in bigquery
+        :param wait: bool: Whether to wait for the job, or return the job_id right away
         :return: A boolean value
         :doc-author: Kaoushik Kumar
         """
-        query = f"""
-            UPDATE 
-                `{PROJECT_ID}.{DATASET_NAME}.{self.table_name}`
-            SET 
-                start_date_time = '{progress.start_date_time}',
-                end_date_time = '{progress.end_date_time}',
-                is_successful = {progress.is_successful}
-            WHERE 
-                step_id = {progress.step_id} 
-            AND 
-                entity_id = {progress.entity_id}
-            """
-        return self.update_row(query)
+        if self.events_mode:
+            return self._append_event(progress)
+        if self.coalesce_updates and wait:
+            return self.coalesce_update(progress)
+        return self.update_row(self.to_row(progress), wait)
 
-    def delete_progress(self, step_id: int, entity_id: int):
+    def delete_progress(self, step_id: int, entity_id: int, wait: bool = True):
         """
         The delete_progress function deletes a row from the progress table.
 
         :param self: Refer to the class itself
         :param step_id: int: Specify the phase_id of the row to be deleted
         :param entity_id: int: Specify the entity that is being deleted
+        :param wait: bool: Whether to wait for the job, or return the job_id right away
         :return: A boolean value
         :doc-author: Kaoushik Kumar
         """
+        if self.events_mode:
+            return self._append_event(ProgressModel(step_id=step_id, entity_id=entity_id,
+                                                    start_date_time=None, end_date_time=None), is_deleted=True)
+        return self.delete_row((step_id, entity_id), wait)
+
+
+class ProgressEventTable(BigQueryTable):
+    """
+    This ProgressEventTable Class will contain all the function to append the progress events using Bigquery API.
+    Every write of the progress becomes a new event, and the current state of every (step_id, entity_id) is
+    the latest event of the key, which will be read through the deduplicating latest-state view.
+    """
+    model = ProgressEventModel
+    key_columns = ('step_id', 'entity_id')
+    partition_column = 'event_time'
+    cluster_columns = ('entity_id', 'step_id')
+
+    def __init__(self):
+        """
+        The __init__ function is called when the class is instantiated.
+        It sets up the instance of the class with the progress event table.
+
+        :param self: Represent the instance of the class
+        :return: The object itself
+        :doc-author: Kaoushik Kumar
+        """
+        super().__init__(TBL_MIGRATION_PROGRESS_EVENTS)
+
+    def append(self, progress: ProgressModel, is_deleted: bool = False):
+        """
+        The append function appends the progress as a new event through the streaming insert.
+
+        :param self: Represent the instance of the class
+        :param progress: ProgressModel: Pass the progress object to the function
+        :param is_deleted: bool: Whether the event is the tombstone of the progress
+        :return: A dictionary with a key 'response' and value 'success'
+        :doc-author: Kaoushik Kumar
+        """
+        event = ProgressEventModel(**progress.dict(), is_deleted=is_deleted)
+        return self.insert_row(self.to_row(event))
+
+    def append_rows(self, rows, is_deleted=False):
+        """
+        The append_rows function appends all the progress rows as the events with a single insert_rows call.
+
+        :param self: Represent the instance of the class
+        :param rows: List of the progress row tuples
+        :param is_deleted: Whether the events are the tombstones of the progress
+        :return: The list of row errors returned by BigQuery
+        :doc-author: Kaoushik Kumar
+        """
+        event_time = datetime.utcnow()
+        return self.insert_rows([tuple(row) + (event_time, is_deleted) for row in rows])
+
+    def latest_state_query(self):
+        """
+        The latest_state_query function returns the query of the current state of the progress,
+        i.e: the latest event of every (step_id, entity_id) which has not been deleted.
+
+        :param self: Represent the instance of the class
+        :return: The SQL query
+        :doc-author: Kaoushik Kumar
+        """
+        return f"""
+            SELECT 
+                * EXCEPT (event_time, is_deleted)
+            FROM (
+                SELECT 
+                    *
+                FROM 
+                    `{PROJECT_ID}.{DATASET_NAME}.{self.table_name}`
+                WHERE 
+                    TRUE
+                QUALIFY 
+                    ROW_NUMBER() OVER (PARTITION BY step_id, entity_id ORDER BY event_time DESC) = 1
+            )
+            WHERE 
+                NOT is_deleted
+            """
+
+    def latest_rows(self):
+        """
+        The latest_rows function reads the current state of the progress, through the latest-state query on
+        BigQuery, or by folding all the events of the table on the backends which do not run the BigQuery SQL.
+
+        :param self: Represent the instance of the class
+        :return: A list of the progress row dictionaries
+        :doc-author: Kaoushik Kumar
+        """
+        if self.backend.supports_sql:
+            return [dict(row.items()) for row in self._run_query(self.latest_state_query()).result()]
+        latest = {}
+        for event in sorted(self.read_rows(), key=lambda row: row['event_time']):
+            latest[(event['step_id'], event['entity_id'])] = event
+        return [{name: value for name, value in event.items() if name not in ('event_time', 'is_deleted')}
+                for event in latest.values() if not event['is_deleted']]
+
+    def events_since(self, since):
+        """
+        The events_since function reads the events appended since the time, in the order of their time.
+        The event log is partitioned by the event_time, so only the partitions since the time are scanned.
+
+        :param self: Represent the instance of the class
+        :param since: The datetime (UTC) of the oldest event to be read
+        :return: A list of the event row dictionaries
+        :doc-author: Kaoushik Kumar
+        """
+        if not self.backend.supports_sql:
+            return sorted((row for row in self.read_rows() if row['event_time'] >= since),
+                          key=lambda row: row['event_time'])
+        query = f"""
+            SELECT 
+                *
+            FROM 
+                `{PROJECT_ID}.{DATASET_NAME}.{self.table_name}`
+            WHERE 
+                event_time >= @since
+            ORDER BY 
+                event_time
+            """
+        from google.cloud import bigquery
+        query_job = self._run_query(query, [bigquery.ScalarQueryParameter('since', 'DATETIME', since)])
+        return [dict(row.items()) for row in query_job.result()]
+
+    def latest_page(self, after=None, limit=1000, selected_fields=None):
+        """
+        The latest_page function reads the current state of the progress of the keys after the given key, in the
+        order of the (entity_id, step_id), which is the clustering of the event log. On BigQuery the condition on
+        the keys is applied before the deduplication, so that the blocks of the keys before it are pruned.
+
+        :param self: Represent the instance of the class
+        :param after: The (entity_id, step_id) tuple of the last key of the previous page, or None for the first page
+        :param limit: Maximum number of the rows
+        :param selected_fields: Names of the columns to be read along with the keys, or None for all of them
+        :return: A list of the progress row dictionaries
+        :doc-author: Kaoushik Kumar
+        """
+        if not self.backend.supports_sql:
+            rows = sorted(self.latest_rows(), key=lambda row: (row['entity_id'], row['step_id']))
+            return [row for row in rows if after is None or (row['entity_id'], row['step_id']) > after][:limit]
+        from google.cloud import bigquery
+        names = [name for name in ProgressModel.__fields__ if not selected_fields or name in selected_fields]
+        columns = ', '.join(dict.fromkeys(['entity_id', 'step_id'] + names))
+        condition, query_parameters = 'TRUE', [bigquery.ScalarQueryParameter('limit', 'INT64', limit)]
+        if after is not None:
+            condition = '(entity_id > @entity_id OR (entity_id = @entity_id AND step_id > @step_id))'
+            query_parameters += [bigquery.ScalarQueryParameter('entity_id', 'INT64', after[0]),
+                                 bigquery.ScalarQueryParameter('step_id', 'INT64', after[1])]
+        query = f"""
+            SELECT 
+                {columns}
+            FROM (
+                SELECT 
+                    {columns}, is_deleted
+                FROM 
+                    `{PROJECT_ID}.{DATASET_NAME}.{self.table_name}`
+                WHERE 
+                    {condition}
+                QUALIFY 
+                    ROW_NUMBER() OVER (PARTITION BY step_id, entity_id ORDER BY event_time DESC) = 1
+            )
+            WHERE 
+                NOT is_deleted
+            ORDER BY 
+                entity_id, step_id
+            LIMIT 
+                @limit
+            """
+        return [dict(row.items()) for row in self._run_query(query, query_parameters).result()]
+
+    def create_latest_view(self):
+        """
+        The create_latest_view function creates (or replaces) the latest-state view of the progress.
+
+        :param self: Represent the instance of the class
+        :return: A dictionary with a key 'response' and value 'Created'
+        :doc-author: Kaoushik Kumar
+        """
+        self._run_query(f"""
+            CREATE OR REPLACE VIEW 
+                `{PROJECT_ID}.{DATASET_NAME}.{VW_MIGRATION_PROGRESS_LATEST}`
+            AS {self.latest_state_query()}
+            """)
+        return {'response': 'Created'}
+
+    def compact(self, min_age_hours: float = PROGRESS_COMPACTION_MIN_AGE_HOURS):
+        """
+        The compact function folds the old events, i.e: deletes the events older than min_age_hours which have
+        been superseded by a newer event of the same key, along with the old tombstones.
+
+        :param self: Represent the instance of the class
+        :param min_age_hours: float: Age (in hours) of the events which can be folded
+        :return: A dictionary with the number of the deleted events
+        :doc-author: Kaoushik Kumar
+        """
         query = f"""
             DELETE 
-                FROM `{PROJECT_ID}.{DATASET_NAME}.{self.table_name}`
+                FROM `{PROJECT_ID}.{DATASET_NAME}.{self.table_name}` E
             WHERE 
-                step_id = {step_id} 
-            AND 
-                entity_id = {entity_id}
+                E.event_time < @cutoff
+            AND (
+                E.is_deleted
+                OR EXISTS (
+                    SELECT 1 FROM `{PROJECT_ID}.{DATASET_NAME}.{self.table_name}` N
+                    WHERE N.step_id = E.step_id AND N.entity_id = E.entity_id AND N.event_time > E.event_time
+                )
+            )
             """
-        return self.delete_row(query)
+        from google.cloud import bigquery
+        cutoff = datetime.utcnow() - timedelta(hours=min_age_hours)
+        with self._get_dml_limiter().slot():
+            query_job = self._run_query(query, [bigquery.ScalarQueryParameter('cutoff', 'DATETIME', cutoff)])
+        return {'response': 'Compacted', 'deleted_events': query_job.num_dml_affected_rows or 0}
+
+
+# The thread which compacts the progress event log periodically, started by start_progress_compaction.
+_compaction_thread = None
+_compaction_lock = threading.Lock()
+
+
+def _compact_progress_events():
+    """
+    The _compact_progress_events function is the loop of the compaction thread.
+
+    :return: Nothing
+    :doc-author: Kaoushik Kumar
+    """
+    while True:
+        time.sleep(PROGRESS_COMPACTION_INTERVAL_SECONDS)
+        try:
+            ProgressEventTable().compact()
+        except Exception as e:
+            Logger().logging().error(f'Progress event compaction failed: {str(e)}')
+
+
+def start_progress_compaction():
+    """
+    The start_progress_compaction function starts the periodic compaction of the progress event log,
+    when the events mode and the compaction interval are configured.
+
+    :return: Nothing
+    :doc-author: Kaoushik Kumar
+    """
+    global _compaction_thread
+    if PROGRESS_STORAGE_MODE != 'events' or PROGRESS_COMPACTION_INTERVAL_SECONDS <= 0:
+        return
+    if not get_backend().supports_sql:
+        # The events are folded on every read by the backends which do not run the BigQuery SQL.
+        return
+    with _compaction_lock:
+        if _compaction_thread is None:
+            _compaction_thread = threading.Thread(target=_compact_progress_events, name='progress-compaction',
+                                                  daemon=True)
+            _compaction_thread.start()
 
 
 class EntityTable(BigQueryTable):
     """
     This EntityTable Class will contain all the function to perform CRUD operation using Bigquery API.
     """
+    model = EntityModel
+    key_columns = ('entity_id',)
+    cluster_columns = ('entity_id',)
+
     def __init__(self):
         """
         The __init__ function is called when the class is instantiated.
@@ -293,55 +1137,134 @@ class EntityTable(BigQueryTable):
         )
         return self.insert_row(row)
 
-    def update_entity(self, entity: EntityModel):
+    def update_entity(self, entity: EntityModel, wait: bool = True):
         """
         The update_entity function updates an existing entity in the entities table.
 
         :param self: Bind the method to the object
         :param entity: EntityModel: Pass in the entity object that is to be updated
+        :param wait: bool: Whether to wait for the job, or return the job_id right away
         :return: A boolean value
         :doc-author: Kaoushik Kumar
         """
+        if self.coalesce_updates and wait:
+            return self.coalesce_update(entity)
+        return self.update_row(self.to_row(entity), wait)
+
+    def get_entity_detail(self, entity_id: int):
+        """
+        The get_entity_detail function reads the entity, all its objects and all its progress (joined with the
+        steps for the phase names) with a single query, nesting the objects and the progress as the STRUCT arrays.
+
+        :param self: Represent the instance of the class
+        :param entity_id: int: Identify the entity
+        :return: The detail of the entity, or None when the entity does not exist
+        :doc-author: Kaoushik Kumar
+        """
+        progress = ProgressTable()
+        if not self.backend.supports_sql:
+            return self._entity_detail_from_rows(entity_id, progress)
+        if progress.events_mode:
+            progress_source = f'({ProgressEventTable().latest_state_query()})'
+        else:
+            progress_source = f'`{PROJECT_ID}.{DATASET_NAME}.{progress.table_name}`'
         query = f"""
-            UPDATE 
-                `{PROJECT_ID}.{DATASET_NAME}.{self.table_name}`
-            SET 
-                application_name = '{entity.application_name}',
-                source_server = '{entity.source_server}',
-                source_database = '{entity.source_database}',
-                target_server = '{entity.target_server}',
-                target_database = '{entity.target_database}',
-                is_spdb = {entity.is_spdb},
-                migration_type = '{entity.migration_type}',
-                migrator = '{entity.migrator}',
-                env = '{entity.env}'
+            SELECT 
+                E AS entity,
+                ARRAY(
+                    SELECT AS STRUCT O.* 
+                    FROM `{PROJECT_ID}.{DATASET_NAME}.{TBL_MIGRATION_ENTITY_OBJECTS}` O
+                    WHERE O.entity_id = E.entity_id
+                ) AS objects,
+                ARRAY(
+                    SELECT AS STRUCT P.*, S.name AS phase_name, S.orders 
+                    FROM {progress_source} P
+                    LEFT JOIN `{PROJECT_ID}.{DATASET_NAME}.{TBL_MIGRATION_STEP}` S USING (step_id)
+                    WHERE P.entity_id = E.entity_id
+                ) AS progress
+            FROM 
+                `{PROJECT_ID}.{DATASET_NAME}.{self.table_name}` E
             WHERE 
-                entity_id = {entity.entity_id}
+                E.entity_id = @entity_id
             """
-        return self.update_row(query)
+        from google.cloud import bigquery
+        query_job = self._run_query(query, [bigquery.ScalarQueryParameter('entity_id', 'INT64', entity_id)])
+        for row in query_job.result():
+            return entity_detail(dict(row['entity']), [dict(item) for item in row['objects']],
+                                 [dict(item) for item in row['progress']])
+        return None
+
+    def _entity_detail_from_rows(self, entity_id: int, progress):
+        """
+        The _entity_detail_from_rows function builds the detail of the entity from the rows of the tables, on the
+        backends which do not run the BigQuery SQL.
 
-    def delete_entity(self, entity_id: int):
+        :param self: Represent the instance of the class
+        :param entity_id: int: Identify the entity
+        :param progress: The ProgressTable object
+        :return: The detail of the entity, or None when the entity does not exist
+        :doc-author: Kaoushik Kumar
+        """
+        entities = [row for row in self.read_rows() if row['entity_id'] == entity_id]
+        if not entities:
+            return None
+        steps = {row['step_id']: row for row in PhaseTable().read_rows()}
+        objects = [row for row in EntityObjectTable().read_rows() if row['entity_id'] == entity_id]
+        progress_rows = [
+            dict(row, phase_name=steps.get(row['step_id'], {}).get('name'),
+                 orders=steps.get(row['step_id'], {}).get('orders'))
+            for row in progress.read_rows() if row['entity_id'] == entity_id
+        ]
+        return entity_detail(entities[0], objects, progress_rows)
+
+    def delete_entity(self, entity_id: int, wait: bool = True, cascade: bool = False):
         """
         The delete_entity function deletes a row from the table.
 
         :param self: Refer to the object itself
         :param entity_id: int: Identify the row to be deleted
+        :param wait: bool: Whether to wait for the job, or return the job_id right away
+        :param cascade: bool: Whether to delete the objects and the progress of the entity as well
         :return: The number of rows deleted
         :doc-author: Kaoushik Kumar
         """
-        query = f"""
-            DELETE 
-                FROM `{PROJECT_ID}.{DATASET_NAME}.{self.table_name}`
-            WHERE 
-                entity_id = {entity_id}
-            """
-        return self.delete_row(query)
+        if cascade:
+            return self.delete_entity_cascade(entity_id)
+        return self.delete_row((entity_id,), wait)
+
+    def delete_entity_cascade(self, entity_id: int):
+        """
+        The delete_entity_cascade function deletes the entity along with all its objects and all its progress,
+        with a single transaction (a single multi-statement job on BigQuery), so that no orphan is left behind.
+            The DML slots of all the tables are held meanwhile, taken in the order of the table names.
+
+        :param self: Refer to the object itself
+        :param entity_id: int: Identify the entity to be deleted
+        :return: A dictionary with a key 'response' and the number of the deleted rows of every table
+        :doc-author: Kaoushik Kumar
+        """
+        progress = ProgressTable()
+        tables = [EntityObjectTable(), ProgressEventTable() if progress.events_mode else progress, self]
+        with ExitStack() as stack:
+            for table in sorted(tables, key=lambda table: table.table_name):
+                stack.enter_context(table._get_dml_limiter().slot())
+            deleted = self.backend.delete_cascade(tables, 'entity_id', entity_id)
+        for table in tables:
+            table._written('delete_matching', [{'entity_id': entity_id}])
+        # The snapshot keeps the progress by its own table, also in the events mode.
+        if progress.events_mode:
+            progress._written('delete_matching', [{'entity_id': entity_id}])
+        return {'response': 'Deleted', 'deleted': deleted}
 
 
 class EntityObjectTable(BigQueryTable):
     """
     This EntityObjectTable Class will contain all the function to perform CRUD operation using Bigquery API.
     """
+    model = EntityObjectModel
+    key_columns = ('object_id',)
+    cluster_columns = ('entity_id',)
+
     def __init__(self):
         """
         The __init__ function is called when the class is instantiated.
@@ -372,40 +1295,48 @@ class EntityObjectTable(BigQueryTable):
         )
         return self.insert_row(row)
 
-    def update_entity_object(self, entity_object: EntityObjectModel):
+    def update_entity_object(self, entity_object: EntityObjectModel, wait: bool = True):
         """
         The update_entity_object function updates an existing entity object in the database.
 
         :param self: Keep track of the instance of the class
         :param entity_object: EntityObjectModel: Pass the object to be updated
+        :param wait: bool: Whether to wait for the job, or return the job_id right away
         :return: The number of rows that were updated
         :doc-author: Kaoushik Kumar
         """
-        query = f"""
-            UPDATE 
-                `{PROJECT_ID}.{DATASET_NAME}.{self.table_name}`
-            SET 
-                entity_id = {entity_object.entity_id}, 
-                name = '{entity_object.name}',
-                size_in_mb = {entity_object.size_in_mb}
-            WHERE 
-                object_id = {entity_object.object_id}
-            """
-        return self.update_row(query)
+        if self.coalesce_updates and wait:
+            return self.coalesce_update(entity_object)
+        return self.update_row(self.to_row(entity_object), wait)
 
-    def delete_entity_object(self, object_id: int):
+    def delete_entity_object(self, object_id: int, wait: bool = True):
         """
         The delete_entity_object function deletes a row from the entity table.
 
         :param self: Refer to the object itself
         :param object_id: int: Identify the row to be deleted
+        :param wait: bool: Whether to wait for the job, or return the job_id right away
         :return: The number of rows deleted
         :doc-author: Kaoushik Kumar
         """
-        query = f"""
-            DELETE 
-                FROM `{PROJECT_ID}.{DATASET_NAME}.{self.table_name}`
-            WHERE 
-                object_id = {object_id}
-            """
-        return self.delete_row(query)
+        return self.delete_row((object_id,), wait)
+
+
+def warmup():
+    """
+    The warmup function creates the storage backend (i.e: the BigQuery client) and fills the metadata cache
+    of all the tables, so that the first requests of a new instance do not have to.
+
+    :return: A dictionary with the time (in milliseconds) taken by every step
+    :doc-author: Kaoushik Kumar
+    """
+    started = time.perf_counter()
+    backend = get_backend()
+    client_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    tables = [PhaseTable(), ProgressTable(), EntityTable(), EntityObjectTable()]
+    if PROGRESS_STORAGE_MODE == 'events':
+        tables.append(ProgressEventTable())
+    backend.warmup(tables)
+    table_metadata_ms = (time.perf_counter() - started) * 1000
+    return {'storage_client_ms': round(client_ms, 3), 'table_metadata_ms': round(table_metadata_ms, 3)}
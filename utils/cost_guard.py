@@ -0,0 +1,254 @@
+"""
+This file will be used for guarding the cost of the BigQuery statements. The statements of the service are
+parameterized, so the text of a statement is its shape, and the few shapes are dry-run once (per TTL) to estimate
+the bytes they process. A statement whose estimate is above the byte budget is rejected, or queued to run one at
+a time, and the estimated and the actual bytes and the latency are recorded per shape along with the endpoints.
+"""
+import hashlib
+import re
+import threading
+import time
+from contextlib import contextmanager
+from flask import has_request_context, request
+from exceptions import QueryCostExceededError
+from loggers.logger import Logger
+from utils.admission import ConcurrencyLimiter, get_limiter
+from utils.metrics import BQ_SHAPE_BYTES_PROCESSED, BQ_SHAPE_DURATION, BQ_SHAPE_REJECTED
+
+# Name of the limiter of the statements above the budget, in the queue mode.
+EXPENSIVE_QUERIES = 'expensive-queries'
+
+
+def statement_shape(query):
+    """
+    The statement_shape function returns the shape of the statement, i.e: its text with the whitespace collapsed,
+    and its label made of the statement type, the first table and the hash of the shape, i.e: MERGE tbl_x#1a2b3c4d.
+
+    :param query: The SQL statement
+    :return: A tuple of the shape and its label
+    :doc-author: Kaoushik Kumar
+    """
+    shape = ' '.join(query.split())
+    verb = shape.split(' ', 1)[0].upper() if shape else 'UNKNOWN'
+    table = re.search(r'`[^`]*?([^.`]+)`', shape)
+    digest = hashlib.sha1(shape.encode()).hexdigest()[:8]
+    return shape, f'{verb} {table.group(1) if table else "-"}#{digest}'
+
+
+class QueryCostGuard:
+    """
+    This QueryCostGuard Class will keep the estimate and the actual cost of every statement shape, and admit
+    the statements within the byte budget. The estimate of a shape is cached for ttl_seconds, so that the tables
+    which have grown are estimated again, and only one thread dry-runs the same shape at a time.
+    """
+    def __init__(self, estimator, max_bytes, mode, ttl_seconds, limiter_factory=None):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param estimator: Function which dry-runs the statement, called with the query and its parameters
+        :param max_bytes: The byte budget of a statement (0 disables it, the costs are still recorded)
+        :param mode: 'reject' raises the QueryCostExceededError, 'queue' runs the statements one at a time
+        :param ttl_seconds: Time (in seconds) for which the estimate of a shape will be cached
+        :param limiter_factory: Function which creates the ConcurrencyLimiter of the queue mode
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.estimator = estimator
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.ttl_seconds = ttl_seconds
+        self.limiter_factory = limiter_factory
+        self._shapes = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def _entry(self, shape, label):
+        """
+        The _entry function returns the statistics of the shape, and creates them on its first statement.
+            It must be called while holding the lock.
+
+        :param self: Represent the instance of the class
+        :param shape: The shape of the statement
+        :param label: The label of the shape
+        :return: A dictionary of the statistics of the shape
+        :doc-author: Kaoushik Kumar
+        """
+        entry = self._shapes.get(shape)
+        if entry is None:
+            entry = self._shapes[shape] = {
+                'shape': label,
+                'query': shape[:300],
+                'estimated_bytes': None,
+                'estimated_until': 0.0,
+                'runs': 0,
+                'bytes_processed': 0,
+                'bytes_billed': 0,
+                'slot_millis': 0,
+                'seconds_total': 0.0,
+                'seconds_max': 0.0,
+                'rejected': 0,
+                'queued': 0,
+                'endpoints': {},
+            }
+        return entry
+
+    def estimate(self, query, query_parameters=None):
+        """
+        The estimate function returns the bytes which the statement is estimated to process, from the cache,
+        or else from the dry run of the statement. The statement is not guarded when its dry run fails,
+        so that BigQuery reports the error of the statement itself.
+
+        :param self: Represent the instance of the class
+        :param query: The SQL statement
+        :param query_parameters: The list of the query parameters of the statement
+        :return: A tuple of the shape, its label and the estimated bytes (or None)
+        :doc-author: Kaoushik Kumar
+        """
+        shape, label = statement_shape(query)
+        with self._lock:
+            entry = self._entry(shape, label)
+            if entry['estimated_until'] > time.monotonic():
+                return shape, label, entry['estimated_bytes']
+            key_lock = self._key_locks.setdefault(shape, threading.Lock())
+        with key_lock:
+            # The other thread might have estimated the same shape while we were waiting for the lock.
+            with self._lock:
+                if entry['estimated_until'] > time.monotonic():
+                    return shape, label, entry['estimated_bytes']
+            try:
+                estimated = self.estimator(query, query_parameters)
+            except Exception as e:
+                Logger().logging().warning(f'Dry run of {label} failed: {str(e)}')
+                estimated = None
+            with self._lock:
+                entry['estimated_bytes'] = estimated
+                entry['estimated_until'] = time.monotonic() + self.ttl_seconds
+        return shape, label, estimated
+
+    @contextmanager
+    def admit(self, query, query_parameters=None):
+        """
+        The admit function admits the statement for the duration of the with block. A statement above the budget
+        is rejected in the reject mode, and holds a slot of the expensive statements in the queue mode.
+
+        :param self: Represent the instance of the class
+        :param query: The SQL statement
+        :param query_parameters: The list of the query parameters of the statement
+        :return: Whether the statement holds a slot of the expensive statements, which must be waited for
+        :doc-author: Kaoushik Kumar
+        """
+        shape, label, estimated = self.estimate(query, query_parameters)
+        endpoint = (request.endpoint or 'unmatched') if has_request_context() else 'background'
+        expensive = bool(self.max_bytes) and estimated is not None and estimated > self.max_bytes
+        with self._lock:
+            entry = self._shapes[shape]
+            entry['endpoints'][endpoint] = entry['endpoints'].get(endpoint, 0) + 1
+            if expensive:
+                entry['rejected' if self.mode == 'reject' else 'queued'] += 1
+        if not expensive:
+            yield False
+            return
+        if self.mode == 'reject':
+            BQ_SHAPE_REJECTED.inc((label,))
+            raise QueryCostExceededError(
+                f'{label} is estimated to process {estimated} bytes, above the budget of {self.max_bytes} bytes',
+                estimated, self.max_bytes
+            )
+        with get_limiter(EXPENSIVE_QUERIES, self.limiter_factory).slot():
+            yield True
+
+    def record(self, query_job, seconds):
+        """
+        The record function records the actual bytes, slot milliseconds and latency of the finished job
+        against its shape.
+
+        :param self: Represent the instance of the class
+        :param query_job: The finished QueryJob object
+        :param seconds: The latency of the job (in seconds)
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        query = getattr(query_job, 'query', None)
+        if not query:
+            return
+        shape, label = statement_shape(query)
+        processed = getattr(query_job, 'total_bytes_processed', None) or 0
+        with self._lock:
+            entry = self._entry(shape, label)
+            entry['runs'] += 1
+            entry['bytes_processed'] += processed
+            entry['bytes_billed'] += getattr(query_job, 'total_bytes_billed', None) or 0
+            entry['slot_millis'] += getattr(query_job, 'slot_millis', None) or 0
+            entry['seconds_total'] += seconds
+            entry['seconds_max'] = max(entry['seconds_max'], seconds)
+        BQ_SHAPE_BYTES_PROCESSED.inc((label,), processed)
+        BQ_SHAPE_DURATION.observe((label,), seconds)
+
+    def stats(self):
+        """
+        The stats function returns the statistics of all the shapes, the most expensive ones first.
+
+        :param self: Represent the instance of the class
+        :return: A list of the dictionaries of the statistics of the shapes
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            shapes = [dict(entry, endpoints=dict(entry['endpoints'])) for entry in self._shapes.values()]
+        for entry in shapes:
+            entry.pop('estimated_until')
+            entry['avg_seconds'] = entry['seconds_total'] / entry['runs'] if entry['runs'] else 0
+        return sorted(shapes, key=lambda entry: (entry['bytes_processed'], entry['estimated_bytes'] or 0),
+                      reverse=True)
+
+
+# The process-wide cost guard, created by the BigQuery backend.
+_cost_guard = None
+
+
+def set_cost_guard(guard):
+    """
+    The set_cost_guard function registers the process-wide cost guard.
+
+    :param guard: The QueryCostGuard object
+    :return: Nothing
+    :doc-author: Kaoushik Kumar
+    """
+    global _cost_guard
+    _cost_guard = guard
+
+
+def get_cost_guard():
+    """
+    The get_cost_guard function returns the process-wide cost guard.
+
+    :return: The QueryCostGuard object, or None when the BigQuery backend has not been created
+    :doc-author: Kaoushik Kumar
+    """
+    return _cost_guard
+
+
+def record_job(query_job, seconds):
+    """
+    The record_job function records the finished job against its shape, when the cost guard is enabled.
+
+    :param query_job: The finished QueryJob object
+    :param seconds: The latency of the job (in seconds)
+    :return: Nothing
+    :doc-author: Kaoushik Kumar
+    """
+    if _cost_guard is not None:
+        _cost_guard.record(query_job, seconds)
+
+
+def expensive_limiter_factory(max_concurrent, max_queue, max_wait_seconds):
+    """
+    The expensive_limiter_factory function returns the factory of the limiter of the expensive statements.
+
+    :param max_concurrent: Maximum number of the expensive statements running at a time
+    :param max_queue: Maximum number of the expensive statements waiting for a slot
+    :param max_wait_seconds: Maximum time (in seconds) an expensive statement will wait for a slot
+    :return: Function which creates the ConcurrencyLimiter
+    :doc-author: Kaoushik Kumar
+    """
+    return lambda: ConcurrencyLimiter(EXPENSIVE_QUERIES, max_concurrent, max_queue, max_wait_seconds)
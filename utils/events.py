@@ -0,0 +1,321 @@
+"""
+This file will be used for publishing the writes of this service as the server-sent events. Every accepted write of
+the progress, the entities and the phases becomes an event in a bounded in-memory ring buffer, from which the streams
+are served and resumed with the Last-Event-ID. An event is serialized once, when it is published, and every stream
+only filters and forwards the serialized events. A write is published once it has been applied, i.e: an asynchronous
+job once it is DONE, and a spooled write once it has been replayed. A stream holds a thread of the gthread worker (or a
+greenlet of the opt-in gevent worker, see gunicorn.conf.py) for its window, and the number of the streams is capped by
+their own slots, apart from the DML admission control.
+"""
+import json
+import math
+import threading
+import time
+import uuid
+from datetime import date, datetime
+from constants import (
+    STREAM_BUFFER_SIZE,
+    STREAM_MAX_CONNECTIONS,
+    STREAM_WINDOW_SECONDS,
+    TBL_MIGRATION_ENTITY,
+    TBL_MIGRATION_PROGRESS,
+    TBL_MIGRATION_STEP,
+)
+from exceptions import StreamLimitError
+from utils import bq_client
+from utils.snapshot import get_snapshot
+
+# Names of the events of the written tables.
+EVENT_NAMES = {TBL_MIGRATION_PROGRESS: 'progress', TBL_MIGRATION_ENTITY: 'entity', TBL_MIGRATION_STEP: 'phase'}
+
+
+def _json_value(value):
+    """
+    The _json_value function converts the date and datetime values of the events into the ISO format strings.
+
+    :param value: The value of the row
+    :return: The JSON serializable value
+    :doc-author: Kaoushik Kumar
+    """
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+class EventBus:
+    """
+    This EventBus Class will keep the last events in a ring buffer and wake up the streams waiting for them.
+    The ids of the events are made of the id of the bus and a sequence, so that an id of another instance
+    (or of the instance before a restart) is recognized, and its stream is reset.
+    """
+    def __init__(self, size):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param size: Maximum number of the events kept in the ring buffer
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.size = size
+        self.bus_id = uuid.uuid4().hex[:8]
+        self._events = []
+        self._start = 0
+        self._sequence = 0
+        self._condition = threading.Condition()
+
+    def event_id(self, sequence):
+        """
+        The event_id function returns the id of the event of the sequence.
+
+        :param self: Represent the instance of the class
+        :param sequence: The sequence of the event
+        :return: The event id, i.e: 1a2b3c4d-42
+        :doc-author: Kaoushik Kumar
+        """
+        return f'{self.bus_id}-{sequence}'
+
+    def parse_id(self, event_id):
+        """
+        The parse_id function returns the sequence of the Last-Event-ID of the client.
+
+        :param self: Represent the instance of the class
+        :param event_id: The Last-Event-ID, or None for a new stream
+        :return: The sequence, or None when the id is missing or is not of this bus
+        :doc-author: Kaoushik Kumar
+        """
+        bus_id, _, sequence = (event_id or '').partition('-')
+        if bus_id != self.bus_id or not sequence.isdigit():
+            return None
+        return min(int(sequence), self._sequence)
+
+    def on_write(self, table_name, operation, rows):
+        """
+        The on_write function is the write listener, which publishes an event for every written row.
+        The env of the entity of the row comes from the snapshot of the entities, when it has been loaded.
+
+        :param self: Represent the instance of the class
+        :param table_name: Name of the written table
+        :param operation: The operation, i.e: upsert, delete or delete_matching
+        :param rows: The list of the written rows (or keys)
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        name = EVENT_NAMES.get(table_name)
+        if name is None:
+            return
+        snapshot = get_snapshot()
+        entities = snapshot.tables[TBL_MIGRATION_ENTITY] if snapshot.is_loaded(TBL_MIGRATION_ENTITY) else None
+        published_at = datetime.utcnow().isoformat()
+        events = []
+        for row in rows:
+            entity_id = row.get('entity_id')
+            env = row.get('env')
+            if env is None and entity_id is not None and entities is not None:
+                env = (entities.get((entity_id,)) or {}).get('env')
+            event = {'event': name, 'operation': operation, 'entity_id': entity_id, 'env': env,
+                     'time': published_at, 'row': row}
+            # The below line will serialize the event once, instead of once for every stream it is sent to.
+            events.append((event, json.dumps(event, default=_json_value)))
+        with self._condition:
+            self._events.extend(events)
+            self._sequence += len(events)
+            # The below lines will drop the oldest events, once the buffer has grown to twice its size.
+            if len(self._events) >= 2 * self.size:
+                dropped = len(self._events) - self.size
+                del self._events[:dropped]
+                self._start += dropped
+            self._condition.notify_all()
+
+    def since(self, sequence):
+        """
+        The since function returns the events after the sequence.
+
+        :param self: Represent the instance of the class
+        :param sequence: The sequence of the last event of the stream
+        :return: A tuple of the list of the (sequence, event, data) tuples, where data is the serialized event,
+            and whether the events after the sequence have already been dropped from the buffer
+        :doc-author: Kaoushik Kumar
+        """
+        with self._condition:
+            first = max(sequence, self._sequence - self.size, self._start)
+            events = self._events[first - self._start:]
+            return [(number, event, data) for number, (event, data) in enumerate(events, first + 1)], first > sequence
+
+    def wait(self, sequence, timeout):
+        """
+        The wait function waits till there are events after the sequence, or the timeout.
+
+        :param self: Represent the instance of the class
+        :param sequence: The sequence of the last event of the stream
+        :param timeout: Maximum time (in seconds) to wait
+        :return: A boolean value, whether there are new events
+        :doc-author: Kaoushik Kumar
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._sequence > sequence, timeout)
+
+    def latest(self):
+        """
+        The latest function returns the sequence of the last published event.
+
+        :param self: Represent the instance of the class
+        :return: The sequence
+        :doc-author: Kaoushik Kumar
+        """
+        with self._condition:
+            return self._sequence
+
+    def stats(self):
+        """
+        The stats function returns the counters of the bus.
+
+        :param self: Represent the instance of the class
+        :return: A dictionary with the number of the published and the buffered events
+        :doc-author: Kaoushik Kumar
+        """
+        with self._condition:
+            return {'published': self._sequence, 'buffered': min(len(self._events), self.size)}
+
+
+def matches(event, entity_ids, env):
+    """
+    The matches function checks whether the event is of the filters of the stream. The events of the phases
+    (which are not of an entity) and the events whose env is unknown are of every stream.
+
+    :param event: The event dictionary
+    :param entity_ids: The set of the entity ids of the stream, or None for all the entities
+    :param env: The env of the stream, or None for all the environments
+    :return: A boolean value
+    :doc-author: Kaoushik Kumar
+    """
+    if event['entity_id'] is None:
+        return True
+    if entity_ids is not None and event['entity_id'] not in entity_ids:
+        return False
+    return env is None or event['env'] is None or event['env'] == env
+
+
+def stream(bus, sequence, entity_ids, env, window_seconds, heartbeat_seconds, retry_ms):
+    """
+    The stream function returns the server-sent events of the stream, from the sequence till the end of the window.
+    A new stream, or a stream whose Last-Event-ID is of another instance or whose events have already been dropped,
+    starts with a reset event, after which the client should read the current state again. A comment is sent every
+    heartbeat_seconds, so that the idle connection stays open.
+
+    :param bus: The EventBus object
+    :param sequence: The sequence of the Last-Event-ID, or None
+    :param entity_ids: The set of the entity ids of the stream, or None for all the entities
+    :param env: The env of the stream, or None for all the environments
+    :param window_seconds: Time (in seconds) after which the stream ends, and the client reconnects
+    :param heartbeat_seconds: Time (in seconds) between two comments of the idle stream
+    :param retry_ms: Time (in milliseconds) after which the client reconnects
+    :return: A generator of the chunks (str) of the stream
+    :doc-author: Kaoushik Kumar
+    """
+    deadline = time.monotonic() + window_seconds
+    yield f'retry: {retry_ms}\n\n'
+    if sequence is None:
+        sequence = bus.latest()
+        yield f'id: {bus.event_id(sequence)}\nevent: reset\ndata: {{}}\n\n'
+    while True:
+        events, missed = bus.since(sequence)
+        if missed:
+            yield f'id: {bus.event_id(events[0][0] - 1)}\nevent: reset\ndata: {{"missed": true}}\n\n'
+        chunks = [
+            f'id: {bus.event_id(number)}\nevent: {event["event"]}\ndata: {data}\n\n'
+            for number, event, data in events if matches(event, entity_ids, env)
+        ]
+        if events:
+            sequence = events[-1][0]
+            if chunks:
+                yield ''.join(chunks)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        if not bus.wait(sequence, min(heartbeat_seconds, remaining)):
+            yield ': keep-alive\n\n'
+
+
+class StreamSlots:
+    """
+    This StreamSlots Class will cap the number of the progress streams served at a time. It is kept apart from the
+    DML admission control, because a stream holds its slot for the whole window and never runs a DML statement.
+    """
+    def __init__(self, max_streams, retry_after):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param max_streams: Maximum number of the streams served at a time (0 disables the cap)
+        :param retry_after: Time (in seconds) after which a rejected client should reconnect
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.max_streams = max_streams
+        self.retry_after = retry_after
+        self._active = 0
+        self._served = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        The acquire function takes a slot for a new stream.
+
+        :param self: Represent the instance of the class
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            if self.max_streams and self._active >= self.max_streams:
+                self._rejected += 1
+                raise StreamLimitError(f'At most {self.max_streams} progress streams are served at a time',
+                                       self.retry_after)
+            self._active += 1
+            self._served += 1
+
+    def release(self):
+        """
+        The release function gives the slot of an ended stream back.
+
+        :param self: Represent the instance of the class
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            self._active -= 1
+
+    def stats(self):
+        """
+        The stats function returns the counters of the slots.
+
+        :param self: Represent the instance of the class
+        :return: A dictionary with the number of the active, the served and the rejected streams
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            return {'active': self._active, 'served': self._served, 'rejected': self._rejected}
+
+
+# The process-wide stream slots. A rejected client retries after a window, by when the oldest stream has ended.
+stream_slots = StreamSlots(STREAM_MAX_CONNECTIONS, max(1, math.ceil(STREAM_WINDOW_SECONDS)))
+
+# The process-wide event bus, which is created along with the views, so that every write is recorded.
+_event_bus = None
+_event_bus_lock = threading.Lock()
+
+
+def get_event_bus():
+    """
+    The get_event_bus function returns the process-wide event bus, and registers its write listener.
+
+    :return: An EventBus object
+    :doc-author: Kaoushik Kumar
+    """
+    global _event_bus
+    with _event_bus_lock:
+        if _event_bus is None:
+            _event_bus = EventBus(STREAM_BUFFER_SIZE)
+            bq_client.add_write_listener(_event_bus.on_write)
+        return _event_bus
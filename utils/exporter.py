@@ -0,0 +1,246 @@
+"""
+This file will be used for exporting the tables one page at a time, as the chunked NDJSON or the Arrow IPC stream.
+Only a single page is held in memory, and every page carries the continuation token from which the export can be
+resumed. The pages are read through the tabledata API, which is not billed, so the filters (which are applied to
+the pages) and the column projection do not scan any bytes.
+"""
+import base64
+import io
+import json
+from datetime import date, datetime
+from loggers.logger import Logger
+from utils.snapshot import coerce_value
+
+# Query string parameters of the export, which are not the filters.
+EXPORT_PARAMETERS = ('format', 'fields', 'page_size', 'continuation_token')
+# Arrow types of the BigQuery types of the columns.
+ARROW_TYPES = {
+    'BOOL': 'bool_',
+    'DATETIME': 'timestamp',
+    'FLOAT64': 'float64',
+    'INT64': 'int64',
+    'STRING': 'string',
+}
+
+
+def encode_token(table_name, page_token):
+    """
+    The encode_token function returns the continuation token of the page of the table.
+
+    :param table_name: Name of the table
+    :param page_token: The page token of the storage backend
+    :return: The URL safe continuation token
+    :doc-author: Kaoushik Kumar
+    """
+    return base64.urlsafe_b64encode(json.dumps({'table': table_name, 'page': page_token}).encode()).decode()
+
+
+def decode_token(table_name, token):
+    """
+    The decode_token function returns the page token of the continuation token, which must be of the same table.
+
+    :param table_name: Name of the table
+    :param token: The continuation token, or None
+    :return: The page token of the storage backend, or None for the first page
+    :doc-author: Kaoushik Kumar
+    """
+    if not token:
+        return None
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except ValueError:
+        raise ValueError('Invalid continuation token')
+    if not isinstance(decoded, dict) or decoded.get('table') != table_name:
+        raise ValueError(f'Continuation token is not of {table_name}')
+    return decoded.get('page')
+
+
+def _json_value(value):
+    """
+    The _json_value function converts the date and datetime values of the rows into the ISO format strings.
+
+    :param value: The value of the row
+    :return: The JSON serializable value
+    :doc-author: Kaoushik Kumar
+    """
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+class ChunkSink(io.RawIOBase):
+    """
+    This ChunkSink Class will collect the bytes written by the Arrow stream writer till they are drained.
+    """
+    def __init__(self):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        """
+        The writable function tells that the sink can be written.
+
+        :param self: Represent the instance of the class
+        :return: True
+        :doc-author: Kaoushik Kumar
+        """
+        return True
+
+    def write(self, data):
+        """
+        The write function keeps the written bytes.
+
+        :param self: Represent the instance of the class
+        :param data: The bytes to be written
+        :return: The number of the written bytes
+        :doc-author: Kaoushik Kumar
+        """
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        """
+        The tell function returns the number of the bytes written so far, which the writer uses for the alignment.
+
+        :param self: Represent the instance of the class
+        :return: The position of the stream
+        :doc-author: Kaoushik Kumar
+        """
+        return self.position
+
+    def drain(self):
+        """
+        The drain function returns the bytes written since the last drain, and forgets them.
+
+        :param self: Represent the instance of the class
+        :return: The bytes
+        :doc-author: Kaoushik Kumar
+        """
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class Export:
+    """
+    This Export Class will contain the validated parameters of the export of a table, and produce its stream.
+    The parameters are validated when the class is instantiated, so that a wrong request gets the error response
+    before the stream has been started.
+    """
+    def __init__(self, table, fields=None, filters=None, page_size=1000, continuation_token=None):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :param fields: Names of the columns to be exported, or None for all of them
+        :param filters: The dictionary of the column names and the values of the query string
+        :param page_size: Maximum number of the rows of a page
+        :param continuation_token: The continuation token to resume from, or None
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.table = table
+        self.column_types = dict(table.columns())
+        unknown = [name for name in list(fields or []) + list(filters or {}) if name not in self.column_types]
+        if unknown:
+            raise ValueError(f'Unknown columns {unknown} for {table.table_name}')
+        self.fields = [name for name in self.column_types if name in fields] if fields else list(self.column_types)
+        self.filters = {name: coerce_value(value, self.column_types[name]) for name, value in (filters or {}).items()}
+        self.page_size = page_size
+        self.page_token = decode_token(table.table_name, continuation_token)
+
+    def pages(self):
+        """
+        The pages function reads the pages of the table, and keeps the rows matching the filters.
+            The filtered columns are read along with the exported ones, and dropped after the filtering.
+
+        :param self: Represent the instance of the class
+        :return: A generator of (list of the row dictionaries, continuation token or None) tuples
+        :doc-author: Kaoushik Kumar
+        """
+        read_fields = set(self.fields) | set(self.filters)
+        selected = None if len(read_fields) == len(self.column_types) else read_fields
+        for rows, next_page_token in self.table.read_pages(selected, self.page_token, self.page_size):
+            rows = [{name: row.get(name) for name in self.fields} for row in rows
+                    if all(row.get(name) == value for name, value in self.filters.items())]
+            yield rows, encode_token(self.table.table_name, next_page_token) if next_page_token else None
+
+    def ndjson(self):
+        """
+        The ndjson function returns the stream of the rows, one JSON object per line. Every page is followed
+        by a line with its continuation token, i.e: {"_continuation_token": "..."}, which is null after the
+        last page, along with the number of the exported rows. When a page could not be read, the stream ends
+        with an {"_error": "..."} line, and the export can be resumed from the last continuation token.
+
+        :param self: Represent the instance of the class
+        :return: A generator of the chunks (bytes), one per page
+        :doc-author: Kaoushik Kumar
+        """
+        exported = 0
+        try:
+            for rows, token in self.pages():
+                exported += len(rows)
+                lines = [json.dumps(row, default=_json_value) for row in rows]
+                if token:
+                    lines.append(json.dumps({'_continuation_token': token}))
+                yield ('\n'.join(lines) + '\n').encode() if lines else b''
+        except Exception as e:
+            Logger().logging().error(f'Export of {self.table.table_name} failed: {str(e)}')
+            yield (json.dumps({'_error': str(e)}) + '\n').encode()
+            return
+        yield (json.dumps({'_continuation_token': None, '_rows': exported}) + '\n').encode()
+
+    def arrow_schema(self):
+        """
+        The arrow_schema function returns the Arrow schema of the exported columns.
+
+        :param self: Represent the instance of the class
+        :return: A pyarrow Schema object
+        :doc-author: Kaoushik Kumar
+        """
+        import pyarrow
+        types = {name: getattr(pyarrow, ARROW_TYPES[type_]) for name, type_ in self.column_types.items()}
+        return pyarrow.schema([
+            (name, types[name]('us') if self.column_types[name] == 'DATETIME' else types[name]())
+            for name in self.fields
+        ])
+
+    def arrow(self):
+        """
+        The arrow function returns the Arrow IPC stream of the rows, with a record batch per page.
+            The continuation token of the page is the custom metadata of its record batch. When a page could not
+            be read, the stream ends with an empty record batch, whose metadata has the error along with the last
+            continuation token, from which the export can be resumed.
+
+        :param self: Represent the instance of the class
+        :return: A generator of the chunks (bytes), one per page
+        :doc-author: Kaoushik Kumar
+        """
+        import pyarrow
+        schema = self.arrow_schema()
+        sink = ChunkSink()
+        writer = pyarrow.ipc.new_stream(sink, schema)
+        last_token = encode_token(self.table.table_name, self.page_token) if self.page_token else ''
+        try:
+            for rows, token in self.pages():
+                batch = pyarrow.RecordBatch.from_pylist(rows, schema=schema)
+                writer.write_batch(batch, custom_metadata={'continuation_token': token or ''})
+                last_token = token or ''
+                # The bytes written for the page are sent right away, so that only a single page is held in memory.
+                yield sink.drain()
+        except Exception as e:
+            Logger().logging().error(f'Export of {self.table.table_name} failed: {str(e)}')
+            writer.write_batch(pyarrow.RecordBatch.from_pylist([], schema=schema),
+                               custom_metadata={'continuation_token': last_token, 'error': str(e)})
+        writer.close()
+        yield sink.drain()
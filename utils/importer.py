@@ -0,0 +1,123 @@
+"""
+This file will be used for importing the large NDJSON or CSV uploads into a table. The upload is parsed and
+validated one line at a time, and the valid rows are staged into a temporary file, so that the memory stays
+constant whatever the size of the upload. The staged rows are then written with a single load job.
+"""
+import csv
+import io
+import json
+import tempfile
+from datetime import date, datetime
+from constants import IMPORT_MAX_ERRORS, IMPORT_MAX_MEMORY_BYTES
+
+# Formats of the uploads, and their content types.
+FORMATS = {'application/x-ndjson': 'ndjson', 'application/json': 'ndjson', 'text/csv': 'csv'}
+
+
+def upload_format(content_type, requested=None):
+    """
+    The upload_format function returns the format of the upload, from the ?format= or else from the content type.
+
+    :param content_type: The content type of the upload, i.e: text/csv
+    :param requested: The format asked with ?format=, i.e: csv or ndjson
+    :return: The format, i.e: csv or ndjson
+    :doc-author: Kaoushik Kumar
+    """
+    if requested:
+        if requested.lower() not in ('csv', 'ndjson'):
+            raise ValueError(f'Unsupported format {requested}, expected csv or ndjson')
+        return requested.lower()
+    return FORMATS.get((content_type or '').split(';')[0].strip().lower(), 'ndjson')
+
+
+def read_records(stream, upload_type):
+    """
+    The read_records function reads the records of the upload one line at a time.
+        A line which could not be parsed is yielded along with its error instead of the record.
+
+    :param stream: The binary stream of the upload
+    :param upload_type: The format of the upload, i.e: csv or ndjson
+    :return: A generator of (line number, record dictionary or error) tuples
+    :doc-author: Kaoushik Kumar
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    if upload_type == 'csv':
+        reader = csv.DictReader(text)
+        for record in reader:
+            if None in record:
+                yield reader.line_num, ValueError(f'Expected {len(reader.fieldnames)} values')
+                continue
+            # The empty CSV values are the missing ones, so that the optional fields get their defaults.
+            yield reader.line_num, {name: value for name, value in record.items() if value not in ('', None)}
+        return
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, e
+            continue
+        if not isinstance(record, dict):
+            yield line_number, ValueError('Expected a JSON object')
+            continue
+        yield line_number, record
+
+
+def _json_value(value):
+    """
+    The _json_value function converts the date and datetime values of the staged rows into the ISO format strings.
+
+    :param value: The value of the row
+    :return: The JSON serializable value
+    :doc-author: Kaoushik Kumar
+    """
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def import_rows(table, stream, upload_type, strict=False, idempotency_key=None):
+    """
+    The import_rows function validates the records of the upload against the model of the table, and writes
+    the valid ones with a single load job, which is atomic: either all the staged rows are loaded, or none.
+        With strict, nothing is loaded when any record is invalid.
+
+    :param table: The BigQueryTable object
+    :param stream: The binary stream of the upload
+    :param upload_type: The format of the upload, i.e: csv or ndjson
+    :param strict: Whether to load nothing when any record is invalid
+    :param idempotency_key: The key of the upload given by the client, or None
+    :return: The row counts and the line-numbered validation errors in the form of dictionary
+    :doc-author: Kaoushik Kumar
+    """
+    names = [name for name, _ in table.columns()]
+    total = invalid = 0
+    errors = []
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_MAX_MEMORY_BYTES, mode='w+b') as staged:
+        for line_number, record in read_records(stream, upload_type):
+            total += 1
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                row = table.to_row(table.model(**record))
+            except Exception as e:
+                invalid += 1
+                # Only the first errors are reported, so that a wrong upload does not build a huge response.
+                if len(errors) < IMPORT_MAX_ERRORS:
+                    errors.append({'line': line_number, 'errors': str(e)})
+                continue
+            staged.write(json.dumps(dict(zip(names, row)), default=_json_value).encode() + b'\n')
+        valid = total - invalid
+        loaded = 0
+        if valid and not (strict and invalid):
+            staged.seek(0)
+            loaded = table.load_file(staged, idempotency_key=idempotency_key)
+    return {
+        'response': 'Success' if not invalid else False,
+        'rows': total,
+        'loaded': loaded,
+        'invalid': invalid,
+        'errors': errors,
+        'errors_truncated': invalid > len(errors),
+    }
@@ -0,0 +1,188 @@
+"""
+This file will be used for tracking the DML jobs which have been submitted to BigQuery without waiting
+for them, so that the clients can poll for the state, affected row count and errors of the jobs.
+"""
+import threading
+import time
+from collections import OrderedDict
+from utils.cost_guard import record_job
+from utils.metrics import observe_query_job
+
+
+class JobTracker:
+    """
+    This JobTracker Class will keep the submitted jobs and poll them from a single background thread,
+    so that no request thread will be blocked till the job is finished.
+    """
+    def __init__(self, poll_interval_seconds, max_finished=10000, max_poll_seconds=6 * 3600):
+        """
+        The __init__ function is called when the class is instantiated.
+        It sets up the pending and the finished jobs, and the lock which guards them.
+
+        :param self: Represent the instance of the class
+        :param poll_interval_seconds: Time (in seconds) between two polls of the pending jobs
+        :param max_finished: Maximum number of the finished jobs which will be remembered
+        :param max_poll_seconds: Time (in seconds) after which a job which is not finished is given up as UNKNOWN
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.poll_interval_seconds = poll_interval_seconds
+        self.max_finished = max_finished
+        self.max_poll_seconds = max_poll_seconds
+        self._pending = {}
+        self._finished = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def _start(self):
+        """
+        The _start function starts the poller thread, if it is not running already.
+            It must be called while holding the lock.
+
+        :param self: Represent the instance of the class
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='job-poller', daemon=True)
+            self._thread.start()
+
+    def track(self, query_job, kind, on_finished=None, on_done=None):
+        """
+        The track function registers the submitted job, so that it will be polled till it is finished.
+
+        :param self: Represent the instance of the class
+        :param query_job: The QueryJob object which has been submitted to BigQuery
+        :param kind: The kind of the job, i.e: the operation and the table name
+        :param on_finished: Function which will be called once, when the job is finished, when its state could not be
+            reloaded, or when it has been given up, i.e: to release its DML slot
+        :param on_done: Function which will be called when the job has succeeded, i.e: to notify the write listeners
+        :return: The id of the job
+        :doc-author: Kaoushik Kumar
+        """
+        record = {
+            'job_id': query_job.job_id,
+            'kind': kind,
+            'state': 'RUNNING',
+            'submitted_at': time.time(),
+            'finished_at': None,
+            'affected_rows': None,
+            'errors': None,
+        }
+        with self._lock:
+            self._pending[query_job.job_id] = [query_job, record, on_finished, on_done]
+            self._start()
+        self._wakeup.set()
+        return query_job.job_id
+
+    def status(self, job_id):
+        """
+        The status function returns the state of the job.
+
+        :param self: Represent the instance of the class
+        :param job_id: The id of the job
+        :return: A dictionary of the job state, or None when the job is not known
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            if job_id in self._pending:
+                return dict(self._pending[job_id][1])
+            if job_id in self._finished:
+                return dict(self._finished[job_id])
+        return None
+
+    def _poll(self, query_job, record):
+        """
+        The _poll function reloads the job from BigQuery and records its result once it is finished.
+            The job is reloaded without the lock, and its record is updated while holding the lock.
+
+        :param self: Represent the instance of the class
+        :param query_job: The QueryJob object
+        :param record: The state of the job
+        :return: The state of the job, i.e: RUNNING, DONE, FAILED or UNKNOWN (given up),
+            or None when the job could not be reloaded
+        :doc-author: Kaoushik Kumar
+        """
+        try:
+            query_job.reload()
+        except Exception as e:
+            with self._lock:
+                record['errors'] = [{'message': str(e)}]
+                if time.time() - record['submitted_at'] < self.max_poll_seconds:
+                    return None
+                record['state'] = 'UNKNOWN'
+                record['finished_at'] = time.time()
+                return record['state']
+        if query_job.state != 'DONE':
+            return 'RUNNING'
+        finished_at = time.time()
+        with self._lock:
+            record['finished_at'] = finished_at
+            if query_job.error_result:
+                record['state'] = 'FAILED'
+                record['errors'] = query_job.errors or [query_job.error_result]
+            else:
+                record['state'] = 'DONE'
+                record['errors'] = None
+                record['affected_rows'] = query_job.num_dml_affected_rows
+            state = record['state']
+        observe_query_job(query_job, finished_at - record['submitted_at'])
+        record_job(query_job, finished_at - record['submitted_at'])
+        return state
+
+    def _release(self, entry):
+        """
+        The _release function calls the on_finished function of the job, once.
+
+        :param self: Represent the instance of the class
+        :param entry: The [query_job, record, on_finished, on_done] list of the pending job
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            on_finished, entry[2] = entry[2], None
+        if on_finished is not None:
+            on_finished()
+
+    def _run(self):
+        """
+        The _run function is the loop of the poller thread. It polls all the pending jobs, and moves
+        the finished ones to the bounded list of the finished jobs. A job whose state could not be reloaded gives
+        its DML slot back right away (it is still polled for its result), so that a job can not hold a slot forever.
+
+        :param self: Represent the instance of the class
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        while True:
+            self._wakeup.wait(self.poll_interval_seconds)
+            self._wakeup.clear()
+            with self._lock:
+                pending = list(self._pending.values())
+            for entry in pending:
+                query_job, record, _, on_done = entry
+                state = self._poll(query_job, record)
+                if state == 'RUNNING':
+                    continue
+                self._release(entry)
+                if state is None:
+                    continue
+                with self._lock:
+                    self._pending.pop(record['job_id'], None)
+                    self._finished[record['job_id']] = record
+                    while len(self._finished) > self.max_finished:
+                        self._finished.popitem(last=False)
+                if state == 'DONE' and on_done is not None:
+                    on_done()
+
+    def stats(self):
+        """
+        The stats function returns the number of the pending and the remembered finished jobs.
+
+        :param self: Represent the instance of the class
+        :return: A dictionary with the pending and finished counters
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            return {'pending': len(self._pending), 'finished': len(self._finished)}
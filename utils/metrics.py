@@ -0,0 +1,353 @@
+"""
+This file will be used for the metrics of the service, which are exposed in the Prometheus text format on /metrics.
+The metrics are kept in the memory of the process, and every update is a dictionary lookup under a lock,
+so that the instrumentation costs only a few microseconds per request.
+"""
+import threading
+import time
+from bisect import bisect_left
+from flask import current_app, g, request
+
+# Upper bounds (in seconds) of the latency histogram buckets.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _labels(label_names, values, extra=''):
+    """
+    The _labels function formats the labels of a sample, i.e: {resource="PhaseTable",verb="GET"}.
+
+    :param label_names: The names of the labels
+    :param values: The values of the labels
+    :param extra: The extra label, already formatted, i.e: le="0.5"
+    :return: The formatted labels, or an empty string when there are none
+    :doc-author: Kaoushik Kumar
+    """
+    pairs = ['%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+             for name, value in zip(label_names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    """
+    This Metric Class will contain the name, help and labels which are common to all the kinds of metrics.
+    """
+    kind = None
+
+    def __init__(self, name, documentation, label_names=()):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param name: Name of the metric
+        :param documentation: Help text of the metric
+        :param label_names: Names of the labels of the metric
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def samples(self):
+        """
+        The samples function returns the lines of the samples of the metric.
+
+        :param self: Represent the instance of the class
+        :return: A list of the sample lines
+        :doc-author: Kaoushik Kumar
+        """
+        raise NotImplementedError
+
+    def render(self):
+        """
+        The render function returns the metric in the Prometheus text format.
+
+        :param self: Represent the instance of the class
+        :return: The text of the metric
+        :doc-author: Kaoushik Kumar
+        """
+        return '\n'.join([f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+                         + self.samples())
+
+
+class Counter(Metric):
+    """
+    This Counter Class will keep the monotonically increasing value of every label set.
+    """
+    kind = 'counter'
+
+    def __init__(self, name, documentation, label_names=()):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param name: Name of the metric
+        :param documentation: Help text of the metric
+        :param label_names: Names of the labels of the metric
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        super().__init__(name, documentation, label_names)
+        self._values = {}
+
+    def inc(self, labels=(), amount=1):
+        """
+        The inc function increases the value of the label set.
+
+        :param self: Represent the instance of the class
+        :param labels: The tuple of the label values, in the order of the label names
+        :param amount: The amount to be added
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        """
+        The samples function returns the lines of the values of all the label sets.
+
+        :param self: Represent the instance of the class
+        :return: A list of the sample lines
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            values = list(self._values.items())
+        return [f'{self.name}{_labels(self.label_names, labels)} {value}' for labels, value in values]
+
+
+class Histogram(Metric):
+    """
+    This Histogram Class will keep the bucket counts, the sum and the count of the observed values of every label set.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param name: Name of the metric
+        :param documentation: Help text of the metric
+        :param label_names: Names of the labels of the metric
+        :param buckets: The sorted upper bounds of the buckets
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+
+    def observe(self, labels, value):
+        """
+        The observe function adds the value to the bucket it falls in, and to the sum and the count.
+
+        :param self: Represent the instance of the class
+        :param labels: The tuple of the label values, in the order of the label names
+        :param value: The observed value
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        """
+        The samples function returns the lines of the cumulative buckets, the sum and the count of all the label sets.
+
+        :param self: Represent the instance of the class
+        :return: A list of the sample lines
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        lines = []
+        for labels, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                bucket_labels = _labels(self.label_names, labels, 'le="%s"' % bound)
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, labels)} {total}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, labels)} {count}')
+        return lines
+
+
+class Gauge(Metric):
+    """
+    This Gauge Class will read its values from a function at the scrape time, i.e: the depth of a queue.
+    """
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, label_names=(), collect=None):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param name: Name of the metric
+        :param documentation: Help text of the metric
+        :param label_names: Names of the labels of the metric
+        :param collect: Function which returns a dictionary of the label value tuples and their values
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        super().__init__(name, documentation, label_names)
+        self.collect = collect
+
+    def samples(self):
+        """
+        The samples function returns the lines of the values returned by the collect function.
+
+        :param self: Represent the instance of the class
+        :return: A list of the sample lines
+        :doc-author: Kaoushik Kumar
+        """
+        return [f'{self.name}{_labels(self.label_names, labels)} {value}' for labels, value in self.collect().items()]
+
+
+class MetricsRegistry:
+    """
+    This MetricsRegistry Class will keep all the metrics of the process and render them for the scrape.
+    """
+    def __init__(self):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """
+        The register function adds the metric to the registry, replacing the metric of the same name.
+
+        :param self: Represent the instance of the class
+        :param metric: The Metric object
+        :return: The metric
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        """
+        The render function returns all the metrics in the Prometheus text format.
+            A gauge whose collect function fails is skipped, so that it does not break the scrape.
+
+        :param self: Represent the instance of the class
+        :return: The text of all the metrics
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        texts = []
+        for metric in metrics:
+            try:
+                texts.append(metric.render())
+            except Exception:
+                continue
+        return '\n'.join(texts) + '\n'
+
+
+# The process-wide registry and the metrics of the HTTP requests and the BigQuery requests.
+registry = MetricsRegistry()
+REQUESTS = registry.register(Counter(
+    'http_requests_total', 'Number of the HTTP requests.', ('resource', 'verb', 'status')))
+REQUEST_ERRORS = registry.register(Counter(
+    'http_request_errors_total', 'Number of the HTTP requests which have failed.', ('resource', 'verb')))
+REQUEST_LATENCY = registry.register(Histogram(
+    'http_request_duration_seconds', 'Latency of the HTTP requests.', ('resource', 'verb')))
+BQ_JOB_LATENCY = registry.register(Histogram(
+    'bigquery_job_duration_seconds', 'Latency of the BigQuery query jobs.', ('statement_type',)))
+BQ_JOB_QUEUE = registry.register(Histogram(
+    'bigquery_job_queue_seconds', 'Time the BigQuery query jobs have waited before they started.', ('statement_type',)))
+BQ_BYTES_PROCESSED = registry.register(Counter(
+    'bigquery_job_bytes_processed_total', 'Bytes processed by the BigQuery query jobs.', ('statement_type',)))
+BQ_SLOT_MILLIS = registry.register(Counter(
+    'bigquery_job_slot_milliseconds_total', 'Slot milliseconds used by the BigQuery query jobs.', ('statement_type',)))
+BQ_AFFECTED_ROWS = registry.register(Counter(
+    'bigquery_dml_affected_rows_total', 'Rows affected by the BigQuery DML jobs.', ('statement_type',)))
+BQ_INSERT_LATENCY = registry.register(Histogram(
+    'bigquery_insert_rows_duration_seconds', 'Latency of the BigQuery streaming inserts.', ('table',)))
+BQ_INSERTED_ROWS = registry.register(Counter(
+    'bigquery_inserted_rows_total', 'Rows sent with the BigQuery streaming inserts.', ('table',)))
+BQ_INSERT_ERRORS = registry.register(Counter(
+    'bigquery_insert_row_errors_total', 'Rows rejected by the BigQuery streaming inserts.', ('table',)))
+BQ_REQUEST_ERRORS = registry.register(Counter(
+    'bigquery_request_errors_total', 'Number of the BigQuery requests which have raised an error.', ('method',)))
+BQ_RETRIES = registry.register(Counter(
+    'bigquery_retries_total', 'Number of the BigQuery requests sent again after an error.', ('method',)))
+BQ_HEDGED_REQUESTS = registry.register(Counter(
+    'bigquery_hedged_requests_total', 'Number of the BigQuery reads which have been hedged.', ('method',)))
+BQ_SHAPE_BYTES_PROCESSED = registry.register(Counter(
+    'bigquery_shape_bytes_processed_total', 'Bytes processed by the BigQuery jobs, per statement shape.', ('shape',)))
+BQ_SHAPE_DURATION = registry.register(Histogram(
+    'bigquery_shape_duration_seconds', 'Latency of the BigQuery jobs, per statement shape.', ('shape',)))
+BQ_SHAPE_REJECTED = registry.register(Counter(
+    'bigquery_shape_rejected_total', 'Number of the statements rejected above the byte budget.', ('shape',)))
+DML_ADMISSION_WAIT = registry.register(Histogram(
+    'dml_admission_wait_seconds', 'Time the DML statements have waited for a slot of their table.', ('table',)))
+DML_REJECTED = registry.register(Counter(
+    'dml_rejected_total', 'Number of the DML statements rejected by the admission control.', ('table',)))
+
+# Names of the resource classes of the Flask endpoints, filled on the first request of every endpoint.
+_resources = {}
+
+
+def observe_query_job(query_job, seconds):
+    """
+    The observe_query_job function records the latency, the queueing time, the bytes processed, the slot
+    milliseconds and the DML affected rows of a finished query job.
+
+    :param query_job: The finished QueryJob object
+    :param seconds: The latency of the job (in seconds)
+    :return: Nothing
+    :doc-author: Kaoushik Kumar
+    """
+    labels = (getattr(query_job, 'statement_type', None) or 'UNKNOWN',)
+    BQ_JOB_LATENCY.observe(labels, seconds)
+    created, started = getattr(query_job, 'created', None), getattr(query_job, 'started', None)
+    if created and started:
+        BQ_JOB_QUEUE.observe(labels, max(0.0, (started - created).total_seconds()))
+    BQ_BYTES_PROCESSED.inc(labels, getattr(query_job, 'total_bytes_processed', None) or 0)
+    BQ_SLOT_MILLIS.inc(labels, getattr(query_job, 'slot_millis', None) or 0)
+    BQ_AFFECTED_ROWS.inc(labels, getattr(query_job, 'num_dml_affected_rows', None) or 0)
+
+
+def observe_request(response):
+    """
+    The observe_request function records the count, the latency and the errors of the request.
+        It is registered as the after_request function of the app. A request has failed when its status
+        is an error, or when an error has been logged while handling it (the resources return 200 then).
+
+    :param response: The Flask response object
+    :return: The response
+    :doc-author: Kaoushik Kumar
+    """
+    endpoint = request.endpoint
+    resource = _resources.get(endpoint)
+    if resource is None:
+        view = current_app.view_functions.get(endpoint)
+        resource = getattr(getattr(view, 'view_class', None), '__name__', None) or endpoint or 'unmatched'
+        _resources[endpoint] = resource
+    verb = request.method
+    REQUESTS.inc((resource, verb, response.status_code))
+    started = g.get('request_started')
+    if started is not None:
+        REQUEST_LATENCY.observe((resource, verb), time.perf_counter() - started)
+    if response.status_code >= 400 or g.get('request_failed'):
+        REQUEST_ERRORS.inc((resource, verb))
+    return response
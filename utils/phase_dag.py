@@ -0,0 +1,265 @@
+"""
+This file will be used for validating the transitions of the progress against the hierarchy of the phases
+(tbl_migration_step) without any BigQuery query. The hierarchy is compiled into a bit per step along with the mask
+of the steps which must be completed before it, and the completed steps of every entity into a bitset, so that
+a transition is checked with a few bit operations.
+"""
+import threading
+from constants import (
+    PHASE_TRANSITION_VALIDATION,
+    SPOOL_PATH,
+    TBL_MIGRATION_ENTITY,
+    TBL_MIGRATION_PROGRESS,
+    TBL_MIGRATION_STEP
+)
+from exceptions import PhaseTransitionError
+from utils import bq_client
+from utils.plan import ordered_steps
+from utils.snapshot import get_snapshot
+
+
+class PhaseDag:
+    """
+    This PhaseDag Class will keep the compiled hierarchy of the phases. A step requires its parent and the steps
+    before it (by orders) under the same parent, and so on up to the root. The optional steps can be skipped,
+    so they are left out of the required masks.
+    """
+    def __init__(self, steps):
+        """
+        The __init__ function is called when the class is instantiated.
+        It assigns a bit to every step, and compiles the required and the dependent masks of the steps.
+
+        :param self: Represent the instance of the class
+        :param steps: The list of the step row dictionaries of the catalog
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        ordered = ordered_steps(steps)
+        by_id = {step['step_id']: step for step in ordered}
+        self.bits = {step['step_id']: 1 << position for position, step in enumerate(ordered)}
+        mandatory = {step_id: 0 if by_id[step_id].get('is_optional') else bit for step_id, bit in self.bits.items()}
+        parents = {}
+        siblings = {}
+        for step in ordered:
+            parent = step.get('parent_step_id')
+            parents[step['step_id']] = parent if parent in by_id and parent != step['step_id'] else None
+            siblings.setdefault(parents[step['step_id']], []).append(step['step_id'])
+        self.required = {}
+        for step_id in self.bits:
+            mask, node = 0, step_id
+            while node is not None:
+                parent = parents[node]
+                for sibling in siblings[parent][:siblings[parent].index(node)]:
+                    mask |= mandatory[sibling]
+                if parent is not None:
+                    mask |= mandatory[parent]
+                node = parent
+            self.required[step_id] = mask
+        self.dependents = {step_id: 0 for step_id in self.bits}
+        for step_id, mask in self.required.items():
+            for required in self.step_ids(mask):
+                self.dependents[required] |= self.bits[step_id]
+
+    def step_ids(self, mask):
+        """
+        The step_ids function returns the ids of the steps of the mask.
+
+        :param self: Represent the instance of the class
+        :param mask: The bit mask of the steps
+        :return: The list of the step ids, in the order of the steps
+        :doc-author: Kaoushik Kumar
+        """
+        return [step_id for step_id, bit in self.bits.items() if mask & bit]
+
+    def check(self, step_id, is_successful, completed):
+        """
+        The check function checks the transition of the step of an entity. A step can be completed only after
+        all the steps it requires, and a completed step can not be reopened after a step which requires it.
+
+        :param self: Represent the instance of the class
+        :param step_id: The id of the step
+        :param is_successful: Whether the step is being completed
+        :param completed: The bitset of the completed steps of the entity
+        :return: The reason of the rejection, or None when the transition is legal
+        :doc-author: Kaoushik Kumar
+        """
+        bit = self.bits.get(step_id)
+        if bit is None:
+            return f'Unknown step_id {step_id}'
+        if is_successful:
+            missing = self.required[step_id] & ~completed
+            if missing:
+                return f'Step {step_id} can not be completed before the steps {self.step_ids(missing)}'
+        elif completed & bit and completed & self.dependents[step_id]:
+            later = self.step_ids(completed & self.dependents[step_id])
+            return f'Step {step_id} can not be reopened after the steps {later} have been completed'
+        return None
+
+
+class PhaseIndex:
+    """
+    This PhaseIndex Class will keep the compiled PhaseDag and the completed steps of every entity, built from
+    the in-memory snapshot. The index is compiled again after the writes of PhaseTable, and the bitsets are updated
+    by the writes of the progress. Both are built again when the snapshot has been reloaded from BigQuery.
+    """
+    def __init__(self, snapshot):
+        """
+        The __init__ function is called when the class is instantiated.
+        It registers the write listener after the one of the snapshot, so that the snapshot is always updated first.
+
+        :param self: Represent the instance of the class
+        :param snapshot: The Snapshot object
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.snapshot = snapshot
+        self._dag = None
+        self._completed = None
+        self._steps_loaded_at = None
+        self._progress_loaded_at = None
+        self._lock = threading.Lock()
+        bq_client.add_write_listener(self.on_write)
+
+    def on_write(self, table_name, operation, rows):
+        """
+        The on_write function is the write listener, which invalidates the index after the writes of the phases,
+        and sets (or clears) the bits of the completed steps after the writes of the progress.
+
+        :param self: Represent the instance of the class
+        :param table_name: Name of the written table
+        :param operation: The operation, i.e: upsert, delete or delete_matching
+        :param rows: The list of the written rows (or keys)
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            if table_name == TBL_MIGRATION_STEP:
+                self._dag = self._completed = None
+                return
+            if table_name != TBL_MIGRATION_PROGRESS or self._completed is None:
+                return
+            for row in rows:
+                if operation == 'delete_matching' and 'step_id' not in row:
+                    self._completed.pop(row.get('entity_id'), None)
+                    continue
+                bit = self._dag.bits.get(row.get('step_id'), 0)
+                completed = self._completed.get(row.get('entity_id'), 0)
+                if operation == 'upsert' and row.get('is_successful'):
+                    self._completed[row['entity_id']] = completed | bit
+                elif completed & bit:
+                    self._completed[row['entity_id']] = completed & ~bit
+
+    def _state(self):
+        """
+        The _state function returns the compiled index and the bitsets, and builds them again when they have been
+        invalidated or the snapshot has been reloaded.
+
+        :param self: Represent the instance of the class
+        :return: A tuple of the PhaseDag object and the dictionary of the entity_id and its bitset
+        :doc-author: Kaoushik Kumar
+        """
+        steps = self.snapshot.table(TBL_MIGRATION_STEP)
+        progress = self.snapshot.table(TBL_MIGRATION_PROGRESS)
+        with self._lock:
+            if self._dag is None or self._steps_loaded_at != steps.refreshed_at:
+                self._dag = PhaseDag(steps.find())
+                self._steps_loaded_at = steps.refreshed_at
+                self._completed = None
+            if self._completed is None or self._progress_loaded_at != progress.refreshed_at:
+                self._completed = {}
+                for row in progress.find({'is_successful': True}):
+                    bit = self._dag.bits.get(row['step_id'], 0)
+                    self._completed[row['entity_id']] = self._completed.get(row['entity_id'], 0) | bit
+                self._progress_loaded_at = progress.refreshed_at
+            return self._dag, self._completed
+
+    def check(self, progress):
+        """
+        The check function checks the transitions of the progress, in the order of the list, so that a step
+        completed by an earlier progress of the list counts for the later ones.
+
+        :param self: Represent the instance of the class
+        :param progress: The list of the ProgressModel objects
+        :return: The list of the reasons of the rejection (or None for the legal transitions)
+        :doc-author: Kaoushik Kumar
+        """
+        dag, completed = self._state()
+        entities = self.snapshot.table(TBL_MIGRATION_ENTITY)
+        pending, errors = {}, []
+        for model in progress:
+            if entities.get((model.entity_id,)) is None:
+                errors.append(f'Unknown entity_id {model.entity_id}')
+                continue
+            mask = pending.get(model.entity_id, completed.get(model.entity_id, 0))
+            error = dag.check(model.step_id, model.is_successful, mask)
+            if error is None:
+                bit = dag.bits[model.step_id]
+                pending[model.entity_id] = mask | bit if model.is_successful else mask & ~bit
+            errors.append(error)
+        return errors
+
+    def validate(self, progress):
+        """
+        The validate function checks the transitions of the progress. The other instances of the service might
+        have written the tables since the last refresh, so the snapshot is refreshed (i.e: a metadata request
+        per table, and a read only of the modified ones) before a transition is rejected.
+
+        :param self: Represent the instance of the class
+        :param progress: The list of the ProgressModel objects
+        :return: The list of the reasons of the rejection (or None for the legal transitions)
+        :doc-author: Kaoushik Kumar
+        """
+        errors = self.check(progress)
+        if any(errors):
+            refreshed = [self.snapshot.refresh(table_name)
+                         for table_name in (TBL_MIGRATION_STEP, TBL_MIGRATION_ENTITY, TBL_MIGRATION_PROGRESS)]
+            if any(refreshed):
+                errors = self.check(progress)
+        return errors
+
+
+# The process-wide phase index, which is created on the first validation.
+_phase_index = None
+_phase_index_lock = threading.Lock()
+
+
+def get_phase_index():
+    """
+    The get_phase_index function returns the process-wide phase index.
+
+    :return: A PhaseIndex object
+    :doc-author: Kaoushik Kumar
+    """
+    global _phase_index
+    with _phase_index_lock:
+        if _phase_index is None:
+            _phase_index = PhaseIndex(get_snapshot())
+        return _phase_index
+
+
+def validate_transitions(progress):
+    """
+    The validate_transitions function checks the transitions of the progress, when the validation is enabled.
+    The transitions are not checked while the spool is enabled, because the spooled writes (i.e: a new entity, or
+    a completed step) have already been accepted, but are not in the snapshot until they have been replayed.
+
+    :param progress: The list of the ProgressModel objects
+    :return: The list of the reasons of the rejection (or None for the legal transitions)
+    :doc-author: Kaoushik Kumar
+    """
+    if not PHASE_TRANSITION_VALIDATION or SPOOL_PATH or not progress:
+        return [None] * len(progress)
+    return get_phase_index().validate(progress)
+
+
+def validate_transition(progress):
+    """
+    The validate_transition function checks the transition of a single progress.
+
+    :param progress: The ProgressModel object
+    :return: Nothing
+    :doc-author: Kaoushik Kumar
+    """
+    error = validate_transitions([progress])[0]
+    if error:
+        raise PhaseTransitionError(error)
@@ -0,0 +1,117 @@
+"""
+This file will be used for building the progress plan of the entities from the catalog of the phases
+(tbl_migration_step), so that the progress rows of all the steps of many entities are written at once.
+"""
+from API.pydantics import ProgressModel
+
+# Prefixes of the names of the phases of every environment, keyed by the prefix of the env of the entity.
+ENV_PHASE_PREFIXES = {'dev': 'Dev ', 'prod': 'Prod '}
+
+
+def _step_order(step):
+    """
+    The _step_order function returns the sort key of the sibling steps, i.e: by their orders and step_id.
+
+    :param step: The step row dictionary
+    :return: The sort key tuple
+    :doc-author: Kaoushik Kumar
+    """
+    return step.get('orders') is None, step.get('orders') or 0, step['step_id']
+
+
+def ordered_steps(steps):
+    """
+    The ordered_steps function orders the steps of the catalog, so that every step comes after its parent step,
+    and the sibling steps come by their orders. A step whose parent is itself, 0 or not in the catalog is a root.
+
+    :param steps: The list of the step row dictionaries
+    :return: The ordered list of the step row dictionaries
+    :doc-author: Kaoushik Kumar
+    """
+    by_id = {step['step_id']: step for step in steps}
+    children = {}
+    roots = []
+    for step in by_id.values():
+        parent = step.get('parent_step_id')
+        if parent in by_id and parent != step['step_id']:
+            children.setdefault(parent, []).append(step)
+        else:
+            roots.append(step)
+    ordered = []
+    pending = sorted(roots, key=_step_order, reverse=True)
+    while pending:
+        step = pending.pop()
+        ordered.append(step)
+        pending.extend(sorted(children.get(step['step_id'], []), key=_step_order, reverse=True))
+    if len(ordered) != len(by_id):
+        cycle = sorted(set(by_id) - {step['step_id'] for step in ordered})
+        raise ValueError(f'The parent_step_id of the steps {cycle} form a cycle')
+    return ordered
+
+
+def env_prefix(env):
+    """
+    The env_prefix function returns the prefix of the names of the phases of the env of the entity.
+
+    :param env: The env of the entity, i.e: Development or Production
+    :return: The prefix, i.e: 'Prod ', or None when the env is neither Dev nor Prod
+    :doc-author: Kaoushik Kumar
+    """
+    env = (env or '').strip().lower()
+    return next((prefix for key, prefix in ENV_PHASE_PREFIXES.items() if env.startswith(key)), None)
+
+
+def phase_plan(ordered, env=None, include_optional=True):
+    """
+    The phase_plan function returns the steps of the plan of an entity. The optional steps are left out
+    without include_optional, and the phases of the other environment are left out when the env is given.
+    The steps of neither environment (i.e: Not Started) are always kept. The steps keep the order of their
+    parents, also when a parent has been left out, i.e: the first Prod phase below the last Dev phase.
+
+    :param ordered: The ordered list of the step row dictionaries, returned by ordered_steps
+    :param env: The env of the entity, or None to keep the phases of all the environments
+    :param include_optional: Whether to keep the optional steps
+    :return: The ordered list of the step row dictionaries of the plan
+    :doc-author: Kaoushik Kumar
+    """
+    prefix = env_prefix(env) if env is not None else None
+    other_prefixes = tuple(other for other in ENV_PHASE_PREFIXES.values() if prefix and other != prefix)
+    return [
+        step for step in ordered
+        if not (other_prefixes and str(step.get('name') or '').startswith(other_prefixes))
+        and (include_optional or not step.get('is_optional'))
+    ]
+
+
+def build_plans(entities, steps, existing_keys, include_optional=True, by_env=False):
+    """
+    The build_plans function builds the progress of all the steps of the plan of every entity, in the Not Started
+    state, i.e: without the start and end date times. The steps which already have a progress are left out,
+    so that the plan can be initialized again.
+
+    :param entities: The list of the entity row dictionaries
+    :param steps: The list of the step row dictionaries of the catalog
+    :param existing_keys: The set of the (step_id, entity_id) keys which already have a progress
+    :param include_optional: Whether to plan the optional steps
+    :param by_env: Whether to plan only the phases of the env of every entity
+    :return: A tuple of the list of the ProgressModel objects and the per-entity plan
+    :doc-author: Kaoushik Kumar
+    """
+    ordered = ordered_steps(steps)
+    plans = {}
+    progress, report = [], []
+    for entity in entities:
+        env = entity.get('env') if by_env else None
+        key = env_prefix(env) if by_env else None
+        if key not in plans:
+            plans[key] = phase_plan(ordered, env, include_optional)
+        planned = [step['step_id'] for step in plans[key]]
+        created = [step_id for step_id in planned if (step_id, entity['entity_id']) not in existing_keys]
+        progress.extend(
+            ProgressModel(step_id=step_id, entity_id=entity['entity_id'], start_date_time=None, end_date_time=None,
+                          is_successful=False)
+            for step_id in created
+        )
+        report.append({'entity_id': entity['entity_id'], 'steps': planned, 'created': len(created),
+                       'existing': len(planned) - len(created)})
+    return progress, report
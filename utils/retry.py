@@ -0,0 +1,251 @@
+"""
+This file will be used for retrying the BigQuery requests which have failed with a transient error, with the
+jittered exponential backoff, and for hedging the idempotent reads which are slower than usual.
+"""
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from utils.metrics import BQ_HEDGED_REQUESTS, BQ_RETRIES
+
+# Reasons of the BigQuery errors (and of the row errors of the streaming inserts) which are worth retrying.
+RETRYABLE_REASONS = {'backendError', 'internalError', 'rateLimitExceeded', 'jobRateLimitExceeded', 'timeout'}
+# Messages of the BigQuery errors which are worth retrying, although they are reported as 400.
+RETRYABLE_MESSAGES = ('Could not serialize access', 'concurrent update')
+
+
+def is_retryable(error):
+    """
+    The is_retryable function tells whether the request may succeed when it is sent again, i.e: the 5xx and
+    the rate-limit errors, the connection resets and the timeouts. The other errors (i.e: 400, 403, 404) are fatal.
+
+    :param error: The exception raised by the request
+    :return: A boolean value
+    :doc-author: Kaoushik Kumar
+    """
+    from google.api_core import exceptions
+    from google.auth.exceptions import TransportError
+    from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
+    if isinstance(error, (ConnectionError, TimeoutError, RequestsConnectionError, Timeout, TransportError)):
+        return True
+    if isinstance(error, (exceptions.InternalServerError, exceptions.BadGateway, exceptions.ServiceUnavailable,
+                          exceptions.GatewayTimeout, exceptions.TooManyRequests)):
+        return True
+    if isinstance(error, exceptions.GoogleAPICallError):
+        reasons = {item.get('reason') for item in error.errors or [] if isinstance(item, dict)}
+        return bool(reasons & RETRYABLE_REASONS) or any(message in str(error) for message in RETRYABLE_MESSAGES)
+    return False
+
+
+def is_retryable_row_error(row_error):
+    """
+    The is_retryable_row_error function tells whether the row of the streaming insert has been rejected
+    by a transient error, so that it can be inserted again with the same insertId.
+
+    :param row_error: The row error returned by the insert, i.e: {'index': 0, 'errors': [{'reason': ...}]}
+    :return: A boolean value
+    :doc-author: Kaoushik Kumar
+    """
+    reasons = {item.get('reason') for item in row_error.get('errors') or []}
+    # The 'stopped' rows are valid ones which have not been inserted, as another row of the request was invalid.
+    return bool(reasons) and reasons <= RETRYABLE_REASONS | {'stopped'}
+
+
+class RetryPolicy:
+    """
+    This RetryPolicy Class will call the function again after the jittered exponential backoff, while the error
+    is retryable and neither the attempts nor the deadline have been used up.
+    """
+    def __init__(self, max_attempts, initial_backoff_seconds, max_backoff_seconds, deadline_seconds, multiplier=2.0):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param max_attempts: Maximum number of the attempts, including the first one
+        :param initial_backoff_seconds: Maximum backoff (in seconds) after the first attempt
+        :param max_backoff_seconds: Maximum backoff (in seconds) after any attempt
+        :param deadline_seconds: Time (in seconds) after which no more attempt will be started
+        :param multiplier: Factor by which the maximum backoff grows after every attempt
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.max_attempts = max_attempts
+        self.initial_backoff_seconds = initial_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.deadline_seconds = deadline_seconds
+        self.multiplier = multiplier
+
+    def backoff(self, attempt):
+        """
+        The backoff function returns the time to sleep after the attempt, with the full jitter, so that
+        the retries of the threads which have failed together are spread out.
+
+        :param self: Represent the instance of the class
+        :param attempt: The number of the failed attempt, starting with 1
+        :return: The time (in seconds)
+        :doc-author: Kaoushik Kumar
+        """
+        ceiling = min(self.max_backoff_seconds, self.initial_backoff_seconds * self.multiplier ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+    def call(self, method, function, *args, retryable=is_retryable, **kwargs):
+        """
+        The call function calls the function, and calls it again when it has raised a retryable error.
+
+        :param self: Represent the instance of the class
+        :param method: Name of the request, used for the metrics, i.e: query
+        :param function: The function to be called
+        :param retryable: Function which tells whether the error is retryable
+        :return: The result of the function
+        :doc-author: Kaoushik Kumar
+        """
+        deadline = time.monotonic() + self.deadline_seconds
+        attempt = 1
+        while True:
+            try:
+                return function(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_attempts or not retryable(e):
+                    raise
+                delay = self.backoff(attempt)
+                if time.monotonic() + delay > deadline:
+                    raise
+            BQ_RETRIES.inc((method,))
+            time.sleep(delay)
+            attempt += 1
+
+
+class Hedger:
+    """
+    This Hedger Class will send a second copy of an idempotent read when the first one has not answered
+    within the recent p95 latency of the reads, and return whichever answers first. It only pays for the
+    duplicate request on the slowest few percent of the reads, and cuts their tail latency.
+    """
+    def __init__(self, name, percentile, executor, window=200, min_samples=20, min_delay_seconds=0.01):
+        """
+        The __init__ function is called when the class is instantiated.
+
+        :param self: Represent the instance of the class
+        :param name: Name of the read, used for the metrics, i.e: list_rows
+        :param percentile: Percentile (0 to 1) of the recent latencies after which the read will be hedged
+        :param executor: The ThreadPoolExecutor which runs the reads
+        :param window: Number of the recent latencies which will be kept
+        :param min_samples: Number of the latencies needed before the reads will be hedged
+        :param min_delay_seconds: Minimum time (in seconds) before the read will be hedged
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.name = name
+        self.percentile = percentile
+        self.executor = executor
+        self.min_samples = min_samples
+        self.min_delay_seconds = min_delay_seconds
+        self._latencies = deque(maxlen=window)
+        self._samples = 0
+        self._delay = None
+        self._lock = threading.Lock()
+
+    def _timed(self, function, args, kwargs):
+        """
+        The _timed function calls the function and records its latency, when it has succeeded.
+
+        :param self: Represent the instance of the class
+        :param function: The function to be called
+        :param args: The positional arguments of the function
+        :param kwargs: The keyword arguments of the function
+        :return: The result of the function
+        :doc-author: Kaoushik Kumar
+        """
+        started = time.perf_counter()
+        result = function(*args, **kwargs)
+        with self._lock:
+            self._latencies.append(time.perf_counter() - started)
+            self._samples += 1
+            # The delay is computed again every tenth sample, so that the latencies are not sorted for every read.
+            if self._delay is None or self._samples % 10 == 0:
+                self._delay = self._compute_delay()
+        return result
+
+    def _compute_delay(self):
+        """
+        The _compute_delay function returns the percentile of the recent latencies, or None when there
+        are not enough of them yet. It must be called while holding the lock.
+
+        :param self: Represent the instance of the class
+        :return: The delay (in seconds) or None
+        :doc-author: Kaoushik Kumar
+        """
+        if len(self._latencies) < self.min_samples:
+            return None
+        latencies = sorted(self._latencies)
+        return max(self.min_delay_seconds, latencies[min(len(latencies) - 1, int(len(latencies) * self.percentile))])
+
+    def _hedge(self, first, function, args, kwargs):
+        """
+        The _hedge function is the second call of the function, which is skipped when the first call has already
+        succeeded by the time the second one starts, i.e: after it has waited for a thread of the executor.
+
+        :param self: Represent the instance of the class
+        :param first: The Future of the first call
+        :param function: The function to be called
+        :param args: The positional arguments of the function
+        :param kwargs: The keyword arguments of the function
+        :return: The result of the function
+        :doc-author: Kaoushik Kumar
+        """
+        if first.done() and first.exception() is None:
+            return first.result()
+        return self._timed(function, args, kwargs)
+
+    def call(self, function, *args, **kwargs):
+        """
+        The call function calls the function, and calls it a second time when the first call is slower than the
+        delay. The first successful result is returned, and the error only when both calls have failed.
+        The second call is cancelled (or skipped once it starts) when the first one has succeeded meanwhile.
+
+        :param self: Represent the instance of the class
+        :param function: The idempotent function to be called
+        :return: The result of the function
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            delay = self._delay
+        if delay is None:
+            return self._timed(function, args, kwargs)
+        first = self.executor.submit(self._timed, function, args, kwargs)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+        BQ_HEDGED_REQUESTS.inc((self.name,))
+        pending = {first, self.executor.submit(self._hedge, first, function, args, kwargs)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                error = future.exception()
+        raise error
+
+
+# The threads which run the hedged reads, shared by all the hedgers of the process.
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+
+
+def get_hedge_executor(max_workers):
+    """
+    The get_hedge_executor function returns the process-wide executor of the hedged reads.
+
+    :param max_workers: Maximum number of the threads of the executor
+    :return: A ThreadPoolExecutor object
+    :doc-author: Kaoushik Kumar
+    """
+    global _hedge_executor
+    with _hedge_executor_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hedged-read')
+        return _hedge_executor
@@ -0,0 +1,331 @@
+"""
+This file will be used for provisioning the tables in BigQuery from the pydantic models. A missing table is created
+with its partitioning and clustering, and an existing one is evolved: the missing columns are added and the
+clustering is updated in place, while a change of the partitioning needs the table to be rebuilt (--rebuild).
+The bytes processed by the standard DML statements of every table are reported before and after the changes.
+
+    python -m utils.schema                      # Reports the planned changes, without applying them
+    python -m utils.schema --apply              # Creates the missing tables and evolves the existing ones
+    python -m utils.schema --apply --rebuild    # Also rebuilds the tables whose partitioning has changed
+    python -m utils.schema --apply --measure    # Also runs the statements in a rolled-back transaction
+
+The dry run gives the upper bound of the bytes, as the blocks pruned by the clustering are known only when the
+statement runs, so --measure runs every statement in a transaction which is rolled back, which is billed.
+The rebuild rewrites the table with CREATE OR REPLACE TABLE ... AS SELECT, so the writes must be paused meanwhile.
+"""
+import argparse
+import json
+import sys
+from datetime import datetime
+from constants import PROGRESS_STORAGE_MODE
+
+# Values of the sample row of the statements, when the table has no row yet.
+SAMPLE_VALUES = {
+    'BOOL': False,
+    'DATETIME': datetime(2023, 1, 1),
+    'FLOAT64': 0.0,
+    'INT64': 0,
+    'STRING': '',
+}
+# Standard SQL names of the legacy type names, which the tables created through the API may report.
+LEGACY_TYPES = {'BOOLEAN': 'BOOL', 'FLOAT': 'FLOAT64', 'INTEGER': 'INT64'}
+# Statement types of the DML jobs, i.e: the child jobs of the measuring transaction.
+DML_STATEMENT_TYPES = ('DELETE', 'INSERT', 'MERGE', 'UPDATE')
+
+
+def schema_fields(table):
+    """
+    The schema_fields function returns the BigQuery schema of the table, from the fields of its pydantic model.
+
+    :param table: The BigQueryTable object
+    :return: A list of SchemaField objects
+    :doc-author: Kaoushik Kumar
+    """
+    from google.cloud import bigquery
+    return [
+        bigquery.SchemaField(name, type_, mode='REQUIRED' if table.model.__fields__[name].required else 'NULLABLE')
+        for name, type_ in table.columns()
+    ]
+
+
+def plan(backend, table):
+    """
+    The plan function compares the table in BigQuery with its model and layout, and returns the changes.
+
+    :param backend: The BigQueryBackend object
+    :param table: The BigQueryTable object
+    :return: A dictionary with the planned changes of the table
+    :doc-author: Kaoushik Kumar
+    """
+    from google.api_core.exceptions import NotFound
+    table_plan = {
+        'table': table.table_name,
+        'exists': True,
+        'add_columns': [],
+        'type_mismatches': [],
+        'clustering': None,
+        'partitioning': None,
+    }
+    try:
+        bq_table = backend._get_table(table.table_name, fresh=True)
+    except NotFound:
+        table_plan['exists'] = False
+        return table_plan
+    existing = {field.name: field.field_type for field in bq_table.schema}
+    for field in schema_fields(table):
+        if field.name not in existing:
+            table_plan['add_columns'].append(field.name)
+        elif LEGACY_TYPES.get(existing[field.name], existing[field.name]) != field.field_type:
+            table_plan['type_mismatches'].append(f'{field.name}: {existing[field.name]} != {field.field_type}')
+    clustering = list(bq_table.clustering_fields or [])
+    if clustering != list(table.cluster_columns):
+        table_plan['clustering'] = {'from': clustering, 'to': list(table.cluster_columns)}
+    partitioning = bq_table.time_partitioning.field if bq_table.time_partitioning else None
+    if partitioning != table.partition_column:
+        table_plan['partitioning'] = {'from': partitioning, 'to': table.partition_column}
+    return table_plan
+
+
+def create_table(backend, table):
+    """
+    The create_table function creates the table with its schema, partitioning and clustering.
+
+    :param backend: The BigQueryBackend object
+    :param table: The BigQueryTable object
+    :return: Nothing
+    :doc-author: Kaoushik Kumar
+    """
+    from google.cloud import bigquery
+    bq_table = bigquery.Table(f'{backend.project_id}.{backend.dataset_name}.{table.table_name}', schema_fields(table))
+    if table.partition_column:
+        bq_table.time_partitioning = bigquery.TimePartitioning(
+            type_=bigquery.TimePartitioningType.DAY, field=table.partition_column
+        )
+    bq_table.clustering_fields = list(table.cluster_columns) or None
+    backend.client.create_table(bq_table)
+
+
+def rebuild_table(backend, table):
+    """
+    The rebuild_table function rewrites the table with its new partitioning and clustering, keeping its rows.
+        The existing columns keep their modes, and the missing ones are added as NULLABLE columns of NULLs.
+
+    :param backend: The BigQueryBackend object
+    :param table: The BigQueryTable object
+    :return: Nothing
+    :doc-author: Kaoushik Kumar
+    """
+    modes = {field.name: field.mode for field in backend._get_table(table.table_name, fresh=True).schema}
+    columns, values = [], []
+    for field in schema_fields(table):
+        columns.append(f'{field.name} {field.field_type}{" NOT NULL" if modes.get(field.name) == "REQUIRED" else ""}')
+        values.append(field.name if field.name in modes else f'CAST(NULL AS {field.field_type}) AS {field.name}')
+    partition = f'PARTITION BY DATETIME_TRUNC({table.partition_column}, DAY)' if table.partition_column else ''
+    cluster = f'CLUSTER BY {", ".join(table.cluster_columns)}' if table.cluster_columns else ''
+    backend.query(f"""
+        CREATE OR REPLACE TABLE
+            {backend.table_id(table.table_name)} ({', '.join(columns)})
+        {partition}
+        {cluster}
+        AS SELECT {', '.join(values)} FROM {backend.table_id(table.table_name)}
+        """, guarded=False)
+
+
+def apply(backend, table, table_plan, rebuild=False):
+    """
+    The apply function applies the planned changes to the table.
+        The change of the partitioning is applied only with rebuild, and reported as pending otherwise.
+
+    :param backend: The BigQueryBackend object
+    :param table: The BigQueryTable object
+    :param table_plan: The planned changes returned by the plan function
+    :param rebuild: Whether to rebuild the table when its partitioning has changed
+    :return: A list of the applied changes
+    :doc-author: Kaoushik Kumar
+    """
+    from google.cloud import bigquery
+    if not table_plan['exists']:
+        create_table(backend, table)
+        return ['created']
+    applied = []
+    if table_plan['partitioning'] and rebuild:
+        # The rebuild adds the missing columns and sets the clustering as well.
+        rebuild_table(backend, table)
+        applied.append('rebuilt')
+    else:
+        bq_table = backend._get_table(table.table_name, fresh=True)
+        fields = []
+        if table_plan['add_columns']:
+            # The columns added to an existing table have to be NULLABLE.
+            bq_table.schema = list(bq_table.schema) + [
+                bigquery.SchemaField(field.name, field.field_type, mode='NULLABLE')
+                for field in schema_fields(table) if field.name in table_plan['add_columns']
+            ]
+            fields.append('schema')
+            applied.append(f'added columns {table_plan["add_columns"]}')
+        if table_plan['clustering']:
+            bq_table.clustering_fields = list(table.cluster_columns) or None
+            fields.append('clustering_fields')
+            applied.append(f'clustered by {list(table.cluster_columns)}')
+        if fields:
+            backend.client.update_table(bq_table, fields)
+    # The table metadata cached by the service is stale now.
+    backend.table_cache.invalidate(backend.dataset_name, table.table_name)
+    return applied
+
+
+def sample_row(backend, table):
+    """
+    The sample_row function returns a row of the table, used as the values of the standard statements, so that
+    the measured statements touch the blocks of an existing key. It is read through the tabledata API.
+
+    :param backend: The BigQueryBackend object
+    :param table: The BigQueryTable object
+    :return: The row tuple
+    :doc-author: Kaoushik Kumar
+    """
+    existing = {}
+    try:
+        for row in backend.client.list_rows(backend._get_table(table.table_name), max_results=1):
+            existing = dict(row.items())
+    except Exception:
+        existing = {}
+    return tuple(SAMPLE_VALUES[type_] if existing.get(name) is None else existing[name]
+                 for name, type_ in table.columns())
+
+
+def standard_statements(backend, table):
+    """
+    The standard_statements function returns the DML statements which the service runs against the table,
+    i.e: the update and the delete of a row by its key.
+
+    :param backend: The BigQueryBackend object
+    :param table: The BigQueryTable object
+    :return: A list of (name, SQL statement, query parameters) tuples
+    :doc-author: Kaoushik Kumar
+    """
+    row = sample_row(backend, table)
+    names = [name for name, _ in table.columns()]
+    key = tuple(row[names.index(name)] for name in table.key_columns)
+    return [
+        ('update', *backend.merge_statement(table, [row])),
+        ('delete', *backend.delete_statement(table, [key])),
+    ]
+
+
+def measured_bytes(backend, query, query_parameters):
+    """
+    The measured_bytes function runs the statement in a transaction which is rolled back, and returns
+    the bytes it has processed, which are lower than the dry run estimate when the clustering prunes the blocks.
+
+    :param backend: The BigQueryBackend object
+    :param query: The SQL statement
+    :param query_parameters: The list of the query parameters of the statement
+    :return: The number of the bytes
+    :doc-author: Kaoushik Kumar
+    """
+    script = f'BEGIN TRANSACTION;\n{query};\nROLLBACK TRANSACTION;'
+    script_job = backend.query(script, query_parameters, guarded=False)
+    return sum(job.total_bytes_processed or 0 for job in backend.client.list_jobs(parent_job=script_job.job_id)
+               if getattr(job, 'statement_type', None) in DML_STATEMENT_TYPES)
+
+
+def measure(backend, table, run=False):
+    """
+    The measure function returns the bytes processed by every standard statement of the table.
+
+    :param backend: The BigQueryBackend object
+    :param table: The BigQueryTable object
+    :param run: Whether to also run the statements in the rolled-back transactions
+    :return: A dictionary of the statement name and its bytes
+    :doc-author: Kaoushik Kumar
+    """
+    result = {}
+    for name, query, query_parameters in standard_statements(backend, table):
+        result[name] = {'estimated_bytes': backend.dry_run(query, query_parameters)}
+        if run:
+            result[name]['measured_bytes'] = measured_bytes(backend, query, query_parameters)
+    return result
+
+
+def compare(before, after):
+    """
+    The compare function returns the difference of the bytes of every statement, before and after the changes.
+
+    :param before: The bytes of the statements before the changes, or None when the table did not exist
+    :param after: The bytes of the statements after the changes
+    :return: A dictionary of the statement name and its before, after and saved bytes
+    :doc-author: Kaoushik Kumar
+    """
+    comparison = {}
+    for name, bytes_after in after.items():
+        bytes_before = (before or {}).get(name, {})
+        comparison[name] = {'before': bytes_before, 'after': bytes_after}
+        for kind, value in bytes_after.items():
+            if kind in bytes_before:
+                comparison[name][f'saved_{kind}'] = bytes_before[kind] - value
+    return comparison
+
+
+def parse_args(argv=None):
+    """
+    The parse_args function parses the command line arguments of the provisioning.
+
+    :param argv: The list of the arguments, or None for sys.argv
+    :return: The argparse Namespace
+    :doc-author: Kaoushik Kumar
+    """
+    parser = argparse.ArgumentParser(description='Creates or evolves the BigQuery tables from the pydantic models.')
+    parser.add_argument('--apply', action='store_true', help='Apply the changes, which are only reported otherwise')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild the tables whose partitioning has changed')
+    parser.add_argument('--measure', action='store_true',
+                        help='Run the standard statements in a rolled-back transaction (billed) besides the dry run')
+    parser.add_argument('--output', default='', help='Path of the JSON report, which is printed when it is empty')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    The main function plans (and applies) the changes of all the tables and writes the report.
+
+    :param argv: The list of the arguments, or None for sys.argv
+    :return: The exit code, which is 1 when a change is still pending
+    :doc-author: Kaoushik Kumar
+    """
+    options = parse_args(argv)
+    from utils import bq_client
+    backend = bq_client.get_backend()
+    if not backend.supports_sql:
+        print(f'The tables are provisioned only on BigQuery, not on {backend.name}', file=sys.stderr)
+        return 2
+    tables = [bq_client.PhaseTable(), bq_client.ProgressTable(), bq_client.EntityTable(),
+              bq_client.EntityObjectTable()]
+    if PROGRESS_STORAGE_MODE == 'events':
+        tables.append(bq_client.ProgressEventTable())
+
+    report, pending = [], False
+    for table in tables:
+        table_plan = plan(backend, table)
+        before = measure(backend, table, options.measure) if table_plan['exists'] else None
+        entry = {'plan': table_plan, 'applied': []}
+        if options.apply:
+            entry['applied'] = apply(backend, table, table_plan, options.rebuild)
+            entry['statements'] = compare(before, measure(backend, table, options.measure))
+            table_plan = plan(backend, table)
+        else:
+            entry['statements'] = before or {}
+        entry['pending'] = [change for change in ('add_columns', 'type_mismatches', 'clustering', 'partitioning')
+                            if table_plan[change]] + ([] if table_plan['exists'] else ['create'])
+        pending = pending or bool(entry['pending'])
+        report.append(entry)
+
+    if options.output:
+        with open(options.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2, default=str)
+    else:
+        print(json.dumps(report, indent=2, default=str))
+    return 1 if pending else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,507 @@
+"""
+This file will be used for serving the reads from an in-process snapshot of the BigQuery tables.
+The snapshot is loaded once, refreshed in the background only when a table has been modified, and updated
+right away by the writes of this service, so the reads will not cost any BigQuery query. A refresh reads only the
+progress events since the last one in the events mode, and skips the modifications which match the writes of this
+service (which have already been applied), so a busy table is not read again in full on every check.
+"""
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from constants import (
+    SNAPSHOT_CHANGES_OVERLAP_SECONDS,
+    SNAPSHOT_FULL_RELOAD_SECONDS,
+    SNAPSHOT_INDEX_COLUMNS,
+    SNAPSHOT_REFRESH_SECONDS,
+    TBL_MIGRATION_ENTITY,
+    TBL_MIGRATION_ENTITY_OBJECTS,
+    TBL_MIGRATION_PROGRESS,
+    TBL_MIGRATION_STEP
+)
+from loggers.logger import Logger
+from utils import bq_client
+
+
+def coerce_value(value, type_):
+    """
+    The coerce_value function converts the value of the query string into the type of the column.
+
+    :param value: The value of the query string
+    :param type_: The BigQuery type of the column
+    :return: The converted value
+    :doc-author: Kaoushik Kumar
+    """
+    if type_ == 'INT64':
+        return int(value)
+    if type_ == 'FLOAT64':
+        return float(value)
+    if type_ == 'BOOL':
+        return value.lower() in ('true', '1', 'yes')
+    if type_ == 'DATETIME':
+        return datetime.fromisoformat(value)
+    return value
+
+
+class TableSnapshot:
+    """
+    This TableSnapshot Class will keep the rows of a table by their primary key, along with the
+    secondary indexes of the indexed columns.
+    """
+    def __init__(self, table):
+        """
+        The __init__ function is called when the class is instantiated.
+        It sets up the rows, the secondary indexes and the lock of the snapshot.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object of the table
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.table = table
+        self.key_columns = table.key_columns
+        self.column_types = dict(table.columns())
+        self.index_columns = [name for name in SNAPSHOT_INDEX_COLUMNS if name in self.column_types]
+        self._rows = {}
+        self._indexes = {name: defaultdict(set) for name in self.index_columns}
+        self._lock = threading.RLock()
+        self.fingerprint = None
+        self.loaded = False
+        self.refreshed_at = None
+        self.loaded_at = None
+        self.read_at = None
+        self.written = False
+        self.written_at = None
+        self.row_offset = None
+        self.version = 0
+
+    def _key(self, row):
+        """
+        The _key function returns the primary key of the row.
+
+        :param self: Represent the instance of the class
+        :param row: The row dictionary
+        :return: The key tuple
+        :doc-author: Kaoushik Kumar
+        """
+        return tuple(row[name] for name in self.key_columns)
+
+    def _unindex(self, key):
+        """
+        The _unindex function removes the row of the key from the snapshot and the secondary indexes.
+            It must be called while holding the lock.
+
+        :param self: Represent the instance of the class
+        :param key: The key tuple
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        for name in self.index_columns:
+            keys = self._indexes[name].get(row.get(name))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._indexes[name][row.get(name)]
+
+    def _index(self, row):
+        """
+        The _index function adds the row to the snapshot and the secondary indexes.
+            It must be called while holding the lock.
+
+        :param self: Represent the instance of the class
+        :param row: The row dictionary
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        key = self._key(row)
+        self._unindex(key)
+        self._rows[key] = row
+        for name in self.index_columns:
+            self._indexes[name][row.get(name)].add(key)
+
+    def _count(self, fingerprint):
+        """
+        The _count function records the difference between the row count of the table as of the fingerprint and the
+        number of the keys of the snapshot (i.e: the duplicate keys of the table), against which a later row count
+        is matched. It must be called while holding the lock.
+
+        :param self: Represent the instance of the class
+        :param fingerprint: The fingerprint of the table the rows have been read at
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        _, row_count = self.table.fingerprint_info(fingerprint) if fingerprint is not None else (None, None)
+        self.row_offset = row_count - len(self._rows) if row_count is not None else None
+
+    def load(self, rows, fingerprint=None, read_at=None):
+        """
+        The load function replaces all the rows of the snapshot.
+
+        :param self: Represent the instance of the class
+        :param rows: The list of the row dictionaries
+        :param fingerprint: The fingerprint of the table the rows have been read at
+        :param read_at: The datetime (UTC) at which the reading of the rows has started
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            self._rows = {}
+            self._indexes = {name: defaultdict(set) for name in self.index_columns}
+            for row in rows:
+                self._index(row)
+            self.fingerprint = fingerprint
+            self._count(fingerprint)
+            self.loaded = True
+            self.refreshed_at = self.loaded_at = time.time()
+            self.read_at = read_at
+            self.written = False
+            self.version += 1
+
+    def merge(self, upserted, deleted, fingerprint, read_at):
+        """
+        The merge function applies the rows modified since the last refresh, which have been read incrementally.
+        The refreshed_at is bumped as well, so that the indexes built from the snapshot are built again.
+
+        :param self: Represent the instance of the class
+        :param upserted: The list of the upserted row dictionaries
+        :param deleted: The list of the deleted key dictionaries
+        :param fingerprint: The fingerprint of the table the rows have been read at
+        :param read_at: The datetime (UTC) at which the reading of the rows has started
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            for row in upserted:
+                self._index(dict(row))
+            for key in deleted:
+                self._unindex(self._key(key))
+            self.fingerprint = fingerprint
+            self._count(fingerprint)
+            self.refreshed_at = time.time()
+            self.read_at = read_at
+            self.version += 1
+
+    def skip(self, fingerprint, max_age):
+        """
+        The skip function accepts the new fingerprint without reading the table, when the modification matches the
+        writes of this service since the last refresh (which have already been applied to the snapshot), i.e: the row
+        count of the table is the one the snapshot expects, and the table has not been modified after the last write
+        of this service. The inserts of another writer change the row count, and its later writes the modified time,
+        so they are read again. The last full load must not be older than max_age, which bounds the modifications
+        which can not be told apart (i.e: an update of another writer before a write of this service).
+
+        :param self: Represent the instance of the class
+        :param fingerprint: The new fingerprint of the table
+        :param max_age: Maximum time (in seconds) since the last full load
+        :return: A boolean value, whether the new fingerprint has been accepted
+        :doc-author: Kaoushik Kumar
+        """
+        modified, row_count = self.table.fingerprint_info(fingerprint)
+        with self._lock:
+            if not self.written or time.time() - self.loaded_at >= max_age:
+                return False
+            if row_count is None or self.row_offset is None or row_count != len(self._rows) + self.row_offset:
+                return False
+            if modified is not None and modified > self.written_at:
+                return False
+            self.fingerprint = fingerprint
+            self.written = False
+            return True
+
+    def apply(self, operation, rows):
+        """
+        The apply function applies the rows written by this service to the snapshot.
+
+        :param self: Represent the instance of the class
+        :param operation: The operation, i.e: upsert, delete or delete_matching
+        :param rows: The list of the row dictionaries (upsert), the key dictionaries (delete)
+            or the column dictionaries which the deleted rows have matched (delete_matching)
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            if not self.loaded:
+                return
+            for row in rows:
+                if operation == 'delete_matching':
+                    for matched in self.find(row):
+                        self._unindex(self._key(matched))
+                elif operation == 'delete':
+                    self._unindex(self._key(row))
+                else:
+                    self._index(dict(row))
+            self.written = True
+            self.written_at = time.time()
+            self.version += 1
+
+    def get(self, key):
+        """
+        The get function returns the row of the primary key.
+
+        :param self: Represent the instance of the class
+        :param key: The key tuple
+        :return: The row dictionary or None
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            row = self._rows.get(key)
+            return dict(row) if row is not None else None
+
+    def find(self, filters=None, keys=None):
+        """
+        The find function returns the rows matching all the filters. The indexed filters are resolved through the
+        secondary indexes (smallest first), and the rest of the filters are checked on the remaining rows.
+
+        :param self: Represent the instance of the class
+        :param filters: The dictionary of the column names and values
+        :param keys: The optional set of the primary keys the rows must belong to
+        :return: A list of the row dictionaries
+        :doc-author: Kaoushik Kumar
+        """
+        filters = dict(filters or {})
+        with self._lock:
+            if len(self.key_columns) == 1 and self.key_columns[0] in filters:
+                key = (filters.pop(self.key_columns[0]),)
+                candidates = {key} if key in self._rows else set()
+            else:
+                indexed = sorted((self._indexes[name].get(filters.pop(name), set())
+                                  for name in list(filters) if name in self._indexes), key=len)
+                candidates = set(indexed[0]) if indexed else None
+                for keys_ in indexed[1:]:
+                    candidates &= keys_
+            if keys is not None:
+                candidates = keys if candidates is None else candidates & keys
+            if candidates is None:
+                rows = self._rows.values()
+            else:
+                rows = (self._rows[key] for key in candidates if key in self._rows)
+            return [dict(row) for row in rows if all(row.get(name) == value for name, value in filters.items())]
+
+    def keys_for(self, name, values):
+        """
+        The keys_for function returns the primary keys of the rows having any of the values in the indexed column.
+
+        :param self: Represent the instance of the class
+        :param name: Name of the indexed column
+        :param values: The values of the column
+        :return: A set of the key tuples
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            return set().union(*(self._indexes[name].get(value, set()) for value in values))
+
+    def stats(self):
+        """
+        The stats function returns the size and the freshness of the snapshot.
+
+        :param self: Represent the instance of the class
+        :return: A dictionary with the counters of the snapshot
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            return {
+                'rows': len(self._rows),
+                'loaded': self.loaded,
+                'version': self.version,
+                'refreshed_at': self.refreshed_at,
+            }
+
+
+class Snapshot:
+    """
+    This Snapshot Class will keep the snapshots of the four tables, load them on the first read and
+    refresh them from a single background thread.
+    """
+    def __init__(self, refresh_seconds):
+        """
+        The __init__ function is called when the class is instantiated.
+        It sets up the snapshots of the tables and registers the write listener.
+
+        :param self: Represent the instance of the class
+        :param refresh_seconds: Time (in seconds) between two checks whether a table has been modified
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.refresh_seconds = refresh_seconds
+        self.tables = {
+            table.table_name: TableSnapshot(table)
+            for table in (bq_client.PhaseTable(), bq_client.ProgressTable(),
+                          bq_client.EntityTable(), bq_client.EntityObjectTable())
+        }
+        self._lock = threading.Lock()
+        self._thread = None
+        bq_client.add_write_listener(self.on_write)
+
+    def on_write(self, table_name, operation, rows):
+        """
+        The on_write function is the write listener, which applies the writes of this service to the snapshot.
+
+        :param self: Represent the instance of the class
+        :param table_name: Name of the written table
+        :param operation: The operation, i.e: upsert or delete
+        :param rows: The list of the written rows (or keys)
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        snapshot = self.tables.get(table_name)
+        if snapshot is not None:
+            snapshot.apply(operation, rows)
+
+    def refresh(self, table_name, force=False):
+        """
+        The refresh function refreshes the table, when its fingerprint has changed since the last refresh.
+            The rows modified since the last refresh are read, when the table records the time of every write
+            (i.e: the progress events). Otherwise the modification is skipped when it matches the writes of this
+            service since the last refresh, because they have already been applied, and the table is read again in
+            full when it has been modified by another writer, or every SNAPSHOT_FULL_RELOAD_SECONDS.
+
+        :param self: Represent the instance of the class
+        :param table_name: Name of the table
+        :param force: Whether to read the table again in full, even if it has not been modified
+        :return: A boolean value, whether the table has been read again
+        :doc-author: Kaoushik Kumar
+        """
+        snapshot = self.tables[table_name]
+        fingerprint = snapshot.table.fingerprint()
+        if not force and snapshot.loaded and fingerprint == snapshot.fingerprint:
+            return False
+        read_at = datetime.utcnow()
+        if not force and snapshot.loaded:
+            since = snapshot.read_at - timedelta(seconds=SNAPSHOT_CHANGES_OVERLAP_SECONDS)
+            changes = snapshot.table.read_changes(since)
+            if changes is not None:
+                snapshot.merge(*changes, fingerprint, read_at)
+                return True
+            if snapshot.skip(fingerprint, SNAPSHOT_FULL_RELOAD_SECONDS):
+                return False
+        snapshot.load(snapshot.table.read_rows(), fingerprint, read_at)
+        return True
+
+    def table(self, table_name):
+        """
+        The table function returns the loaded snapshot of the table, loading it on the first read.
+
+        :param self: Represent the instance of the class
+        :param table_name: Name of the table
+        :return: A TableSnapshot object
+        :doc-author: Kaoushik Kumar
+        """
+        snapshot = self.tables[table_name]
+        if not snapshot.loaded:
+            with self._lock:
+                if not snapshot.loaded:
+                    self.refresh(table_name, force=True)
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='snapshot-refresh', daemon=True)
+                    self._thread.start()
+        return snapshot
+
+    def query(self, table_name, filters):
+        """
+        The query function returns the rows of the table matching all the filters of the query string.
+            The objects and the progress can also be filtered by the columns of their entity
+            (i.e: env or migrator), which are resolved through the entity snapshot.
+
+        :param self: Represent the instance of the class
+        :param table_name: Name of the table
+        :param filters: The dictionary of the column names and the values of the query string
+        :return: A list of the row dictionaries
+        :doc-author: Kaoushik Kumar
+        """
+        snapshot = self.table(table_name)
+        own, entity_filters = {}, {}
+        entity_types = self.tables[TBL_MIGRATION_ENTITY].column_types
+        for name, value in filters.items():
+            if name in snapshot.column_types:
+                own[name] = coerce_value(value, snapshot.column_types[name])
+            elif name in entity_types and 'entity_id' in snapshot.column_types:
+                entity_filters[name] = coerce_value(value, entity_types[name])
+            else:
+                raise ValueError(f'Unknown filter {name} for {table_name}')
+        keys = None
+        if entity_filters:
+            entity_ids = {row['entity_id'] for row in self.table(TBL_MIGRATION_ENTITY).find(entity_filters)}
+            keys = snapshot.keys_for('entity_id', entity_ids)
+        return snapshot.find(own, keys)
+
+    def is_loaded(self, *table_names):
+        """
+        The is_loaded function checks whether the snapshots of all the given tables have been loaded.
+
+        :param self: Represent the instance of the class
+        :param table_names: Names of the tables
+        :return: A boolean value
+        :doc-author: Kaoushik Kumar
+        """
+        return all(self.tables[table_name].loaded for table_name in table_names)
+
+    def entity_detail(self, entity_id):
+        """
+        The entity_detail function builds the detail of the entity from the snapshot, through the entity_id indexes.
+
+        :param self: Represent the instance of the class
+        :param entity_id: The id of the entity
+        :return: The detail of the entity, or None when the entity does not exist
+        :doc-author: Kaoushik Kumar
+        """
+        entity = self.table(TBL_MIGRATION_ENTITY).get((entity_id,))
+        if entity is None:
+            return None
+        objects = self.table(TBL_MIGRATION_ENTITY_OBJECTS).find({'entity_id': entity_id})
+        phases = self.table(TBL_MIGRATION_STEP)
+        progress = self.table(TBL_MIGRATION_PROGRESS).find({'entity_id': entity_id})
+        for row in progress:
+            phase = phases.get((row['step_id'],)) or {}
+            row['phase_name'] = phase.get('name')
+            row['orders'] = phase.get('orders')
+        return bq_client.entity_detail(entity, objects, progress)
+
+    def _run(self):
+        """
+        The _run function is the loop of the refresh thread, which refreshes the loaded tables.
+
+        :param self: Represent the instance of the class
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        while True:
+            time.sleep(self.refresh_seconds)
+            for table_name, snapshot in self.tables.items():
+                if not snapshot.loaded:
+                    continue
+                try:
+                    self.refresh(table_name)
+                except Exception as e:
+                    Logger().logging().error(f'Snapshot refresh of {table_name} failed: {str(e)}')
+
+    def stats(self):
+        """
+        The stats function returns the counters of all the table snapshots.
+
+        :param self: Represent the instance of the class
+        :return: A dictionary of the table name and its counters
+        :doc-author: Kaoushik Kumar
+        """
+        return {table_name: snapshot.stats() for table_name, snapshot in self.tables.items()}
+
+
+# The process-wide snapshot, which is created on the first read.
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot():
+    """
+    The get_snapshot function returns the process-wide snapshot of the tables.
+
+    :return: A Snapshot object
+    :doc-author: Kaoushik Kumar
+    """
+    global _snapshot
+    with _snapshot_lock:
+        if _snapshot is None:
+            _snapshot = Snapshot(SNAPSHOT_REFRESH_SECONDS)
+        return _snapshot
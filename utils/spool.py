@@ -0,0 +1,357 @@
+"""
+This file will be used for the local durable write-ahead spool of the BigQuery writes.
+The accepted writes are journaled (and fsync'd) into a SQLite file, and the callers are acknowledged right away.
+A background drainer replays the journal into BigQuery in order and in batches, with retry and backoff.
+"""
+import fcntl
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from constants import SPOOL_BATCH_SIZE, SPOOL_MAX_ATTEMPTS, SPOOL_MAX_BACKOFF_SECONDS, SPOOL_PATH
+from loggers.logger import Logger
+from utils import bq_client
+from utils.retry import is_retryable
+
+
+class WriteSpool:
+    """
+    This WriteSpool Class will contain all the function to journal the writes and drain them into BigQuery.
+    Every entry of the journal is a (table, kind, items) write, where the kind is insert, insert_missing (the rows
+    whose keys are not in the table yet), update or delete, the items of the inserts and the update are the pydantic
+    models, and the items of the delete are the keys.
+    """
+    def __init__(self, path, batch_size=500, max_attempts=10, max_backoff_seconds=60):
+        """
+        The __init__ function is called when the class is instantiated.
+        It creates the journal tables, if they are not there already, and starts the drainer thread.
+
+        :param self: Represent the instance of the class
+        :param path: Path of the SQLite journal file
+        :param batch_size: Maximum number of the items replayed with a single BigQuery request
+        :param max_attempts: Number of the failed attempts after which an entry is moved to the dead letters
+        :param max_backoff_seconds: Maximum time (in seconds) to wait between two attempts
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.max_backoff_seconds = max_backoff_seconds
+        self._sqlite = None
+        self._connection_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._drained = deque()
+        self.drained_total = 0
+        self.dead_total = 0
+        self.failures = 0
+        self.last_error = None
+        with self._connection() as connection, connection:
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS spool (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    table_name TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    items TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0
+                )''')
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS spool_dead (
+                    seq INTEGER PRIMARY KEY,
+                    table_name TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    items TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    error TEXT
+                )''')
+        self._thread = threading.Thread(target=self._run, name='spool-drainer', daemon=True)
+        self._thread.start()
+
+    @contextmanager
+    def _connection(self):
+        """
+        The _connection function holds the single SQLite connection of the spool, which is shared by the request
+        threads and the drainer under a lock, instead of a connection per thread (or per greenlet).
+            The journal is in the WAL mode with the FULL synchronous, so every commit is fsync'd.
+
+        :param self: Represent the instance of the class
+        :return: A context manager of the sqlite3 connection object
+        :doc-author: Kaoushik Kumar
+        """
+        with self._connection_lock:
+            if self._sqlite is None:
+                self._sqlite = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+                self._sqlite.execute('PRAGMA journal_mode=WAL')
+                self._sqlite.execute('PRAGMA synchronous=FULL')
+            yield self._sqlite
+
+    def submit(self, table_class, kind, items):
+        """
+        The submit function journals the write, and returns once it has been fsync'd to the local disk.
+
+        :param self: Represent the instance of the class
+        :param table_class: The BigQueryTable class of bq_client, i.e: bq_client.PhaseTable
+        :param kind: The kind of the write, i.e: insert, insert_missing, update or delete
+        :param items: The list of the pydantic models (inserts and update) or the key tuples (delete)
+        :return: A dictionary with a key 'response' and value 'Accepted', along with the spool_id
+        :doc-author: Kaoushik Kumar
+        """
+        if kind == 'delete':
+            payload = [list(key) for key in items]
+        else:
+            payload = [json.loads(item.json()) for item in items]
+        with self._connection() as connection, connection:
+            cursor = connection.execute(
+                'INSERT INTO spool (table_name, kind, items, created_at) VALUES (?, ?, ?, ?)',
+                (table_class.__name__, kind, json.dumps(payload), time.time())
+            )
+        self._wakeup.set()
+        return {'response': 'Accepted', 'spool_id': cursor.lastrowid}
+
+    def pending(self, column, value):
+        """
+        The pending function counts the entries of the journal which write a row with the given value of the column,
+        i.e: the entries of an entity which have not been replayed yet. An entry which is being replayed right now
+        is still in the journal, so it is counted as well. The items of the delete are matched by their key columns.
+
+        :param self: Represent the instance of the class
+        :param column: Name of the column, i.e: entity_id
+        :param value: Value of the column
+        :return: Number of the matching entries
+        :doc-author: Kaoushik Kumar
+        """
+        with self._connection() as connection:
+            rows = connection.execute('SELECT table_name, kind, items FROM spool').fetchall()
+        count = 0
+        for table_name, kind, items in rows:
+            key_columns = getattr(bq_client, table_name).key_columns
+            for item in json.loads(items):
+                if (dict(zip(key_columns, item)) if kind == 'delete' else item).get(column) == value:
+                    count += 1
+                    break
+        return count
+
+    def _head(self):
+        """
+        The _head function reads the oldest entries of the journal which belong to the same (table, kind),
+        so that they can be replayed with a single BigQuery request.
+
+        :param self: Represent the instance of the class
+        :return: A list of (seq, table_name, kind, items, attempts) tuples
+        :doc-author: Kaoushik Kumar
+        """
+        with self._connection() as connection:
+            rows = connection.execute(
+                'SELECT seq, table_name, kind, items, attempts FROM spool ORDER BY seq LIMIT ?', (self.batch_size,)
+            ).fetchall()
+        group, count = [], 0
+        for seq, table_name, kind, items, attempts in rows:
+            items = json.loads(items)
+            if group and ((table_name, kind) != group[0][1:3] or count + len(items) > self.batch_size):
+                break
+            group.append((seq, table_name, kind, items, attempts))
+            count += len(items)
+        return group
+
+    @staticmethod
+    def _replay(table_name, kind, items):
+        """
+        The _replay function writes the items of the same (table, kind) into BigQuery with a single request.
+            The consecutive updates (and the inserts of the missing rows) of the same key are folded,
+            keeping the latest one.
+
+        :param table_name: Name of the BigQueryTable class of bq_client
+        :param kind: The kind of the write, i.e: insert, insert_missing, update or delete
+        :param items: The list of the item dictionaries (inserts and update) or the key lists (delete)
+        :return: The indexes of the items which have been rejected by BigQuery
+        :doc-author: Kaoushik Kumar
+        """
+        table = getattr(bq_client, table_name)()
+        if kind == 'delete':
+            table.delete_keys([tuple(key) for key in items])
+            return set()
+        rows = [table.to_row(table.model(**item)) for item in items]
+        if kind in ('insert_missing', 'update'):
+            latest = {row_key: row for row_key, row in
+                      ((tuple(item[name] for name in table.key_columns), row) for item, row in zip(items, rows))}
+            if kind == 'update':
+                table.merge_rows(list(latest.values()))
+            else:
+                table.insert_missing(list(latest.values()))
+            return set()
+        return {error['index'] for error in table.insert_rows(rows)}
+
+    def _replay_entries(self, group):
+        """
+        The _replay_entries function replays the entries with a single request. When the request fails with a fatal
+        error, the entries are bisected, so that the entries before the failing one are still written in order, and
+        only the entry which fails on its own is reported, instead of the whole group. A retryable error (i.e: a 5xx
+        or an outage) is not bisected, and is reported against the first entry which has not been written.
+
+        :param self: Represent the instance of the class
+        :param group: A list of (seq, table_name, kind, items, attempts) tuples of the same (table, kind)
+        :return: A tuple of the list of the (entry, indexes of its rejected items) tuples of the written entries,
+            and the (entry, exception) tuple of the failing entry, or None when all the entries have been written
+        :doc-author: Kaoushik Kumar
+        """
+        try:
+            rejected = self._replay(group[0][1], group[0][2], [item for entry in group for item in entry[3]])
+        except Exception as e:
+            if len(group) == 1 or is_retryable(e):
+                return [], (group[0], e)
+            half = len(group) // 2
+            written, failed = self._replay_entries(group[:half])
+            if failed is not None:
+                return written, failed
+            more, failed = self._replay_entries(group[half:])
+            return written + more, failed
+        written, offset = [], 0
+        for entry in group:
+            written.append((entry, {index - offset for index in rejected if offset <= index < offset + len(entry[3])}))
+            offset += len(entry[3])
+        return written, None
+
+    def _drain_once(self):
+        """
+        The _drain_once function replays the head of the journal, and removes the replayed entries.
+            Only the entry which fails on its own with a fatal error counts the failed attempt, and it is moved to
+            the dead letters after max_attempts, while the entries after it wait in the journal to keep the order.
+            A retryable error backs off the whole drain, without counting against the attempts of any entry.
+
+        :param self: Represent the instance of the class
+        :return: Number of the replayed entries, or None when the replay has failed
+        :doc-author: Kaoushik Kumar
+        """
+        group = self._head()
+        if not group:
+            return 0
+        written, failed = self._replay_entries(group)
+        with self._connection() as connection, connection:
+            for (seq, table_name, kind, entry_items, _), rejected in written:
+                dead = [item for index, item in enumerate(entry_items) if index in rejected]
+                if dead:
+                    self._dead_letter(connection, seq, table_name, kind, dead, 'Rejected by BigQuery')
+                else:
+                    connection.execute('DELETE FROM spool WHERE seq = ?', (seq,))
+            if failed is not None and not is_retryable(failed[1]):
+                (seq, table_name, kind, entry_items, attempts), error = failed
+                connection.execute('UPDATE spool SET attempts = attempts + 1 WHERE seq = ?', (seq,))
+                if attempts + 1 >= self.max_attempts:
+                    self._dead_letter(connection, seq, table_name, kind, entry_items, str(error))
+        replayed = sum(len(entry[3]) for entry, _ in written)
+        with self._lock:
+            self.drained_total += replayed
+            self._drained.append((time.monotonic(), replayed))
+        if failed is not None:
+            self.failures += 1
+            self.last_error = str(failed[1])
+            Logger().logging().error(f'Spool replay of entry {failed[0][0]} of {failed[0][1]}.{failed[0][2]} failed: '
+                                     f'{str(failed[1])}')
+            return None
+        return len(group)
+
+    def _dead_letter(self, connection, seq, table_name, kind, items, error):
+        """
+        The _dead_letter function moves the entry out of the journal into the dead letters.
+
+        :param self: Represent the instance of the class
+        :param connection: The sqlite3 connection, inside of a transaction
+        :param seq: The sequence number of the entry
+        :param table_name: Name of the BigQueryTable class of bq_client
+        :param kind: The kind of the write
+        :param items: The items of the entry which could not be written
+        :param error: The last error of the entry
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        connection.execute(
+            'INSERT OR REPLACE INTO spool_dead (seq, table_name, kind, items, created_at, error) '
+            'SELECT seq, table_name, kind, ?, created_at, ? FROM spool WHERE seq = ?',
+            (json.dumps(items), error, seq)
+        )
+        connection.execute('DELETE FROM spool WHERE seq = ?', (seq,))
+        with self._lock:
+            self.dead_total += len(items)
+        Logger().logging().error(f'Spool entry {seq} of {table_name}.{kind} moved to the dead letters: {error}')
+
+    def _run(self):
+        """
+        The _run function is the loop of the drainer thread. Only one process drains the journal at a time,
+        which is guarded by an exclusive lock on the <path>.lock file. The failed replays are retried
+        with the jittered exponential backoff, keeping the order of the journal.
+
+        :param self: Represent the instance of the class
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        with open(f'{self.path}.lock', 'a') as lock_file:
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except OSError:
+                    time.sleep(5)
+            backoff = 0
+            while True:
+                drained = self._drain_once()
+                if drained is None:
+                    backoff = min(self.max_backoff_seconds, max(0.5, backoff * 2))
+                    time.sleep(random.uniform(backoff / 2, backoff))
+                    continue
+                backoff = 0
+                if not drained:
+                    self._wakeup.wait(1)
+                    self._wakeup.clear()
+
+    def stats(self):
+        """
+        The stats function returns the depth of the journal and the drain rate of the last minute.
+
+        :param self: Represent the instance of the class
+        :return: A dictionary with the depth, drain rate and failure counters
+        :doc-author: Kaoushik Kumar
+        """
+        with self._connection() as connection:
+            depth, oldest = connection.execute('SELECT COUNT(*), MIN(created_at) FROM spool').fetchone()
+        now = time.monotonic()
+        with self._lock:
+            while self._drained and now - self._drained[0][0] > 60:
+                self._drained.popleft()
+            drained_last_minute = sum(count for _, count in self._drained)
+        return {
+            'depth': depth,
+            'oldest_age_seconds': time.time() - oldest if oldest else 0,
+            'drain_rate_per_second': drained_last_minute / 60,
+            'drained_total': self.drained_total,
+            'dead_letters': self.dead_total,
+            'failures': self.failures,
+            'last_error': self.last_error,
+        }
+
+
+# The process-wide spool, which is enabled only when the SPOOL_PATH has been configured.
+_spool = None
+_spool_lock = threading.Lock()
+
+
+def get_spool():
+    """
+    The get_spool function returns the process-wide write spool, or None when the spool is disabled.
+
+    :return: A WriteSpool object or None
+    :doc-author: Kaoushik Kumar
+    """
+    global _spool
+    if not SPOOL_PATH:
+        return None
+    with _spool_lock:
+        if _spool is None:
+            os.makedirs(os.path.dirname(os.path.abspath(SPOOL_PATH)), exist_ok=True)
+            _spool = WriteSpool(SPOOL_PATH, SPOOL_BATCH_SIZE, SPOOL_MAX_ATTEMPTS, SPOOL_MAX_BACKOFF_SECONDS)
+        return _spool
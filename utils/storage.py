@@ -0,0 +1,1248 @@
+"""
+This file will be used for the storage backends of the tables, i.e: BigQuery, or the embedded SQLite
+which runs the service without GCP for the local integration tests and the benchmarks.
+Every backend gives the same semantics for the insert, update (by the key columns) and delete of the rows.
+"""
+import hashlib
+import itertools
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from constants import (
+    BQ_HEDGE_MAX_WORKERS,
+    BQ_HEDGE_PERCENTILE,
+    BQ_RETRY_DEADLINE_SECONDS,
+    BQ_RETRY_INITIAL_BACKOFF_SECONDS,
+    BQ_RETRY_MAX_ATTEMPTS,
+    BQ_RETRY_MAX_BACKOFF_SECONDS,
+    DATASET_NAME,
+    PROJECT_ID,
+    QUERY_COST_CACHE_TTL_SECONDS,
+    QUERY_COST_MAX_QUEUE,
+    QUERY_COST_MAX_WAIT_SECONDS,
+    QUERY_COST_MODE,
+    QUERY_COST_QUEUE_CONCURRENCY,
+    QUERY_MAX_BYTES,
+    SQLITE_PATH,
+    STORAGE_BACKEND,
+    TABLE_CACHE_TTL_SECONDS
+)
+from utils.cost_guard import QueryCostGuard, expensive_limiter_factory, set_cost_guard
+from utils.metrics import (BQ_INSERT_ERRORS, BQ_INSERT_LATENCY, BQ_INSERTED_ROWS, BQ_JOB_LATENCY, BQ_REQUEST_ERRORS,
+                           BQ_RETRIES, observe_query_job)
+from utils.retry import Hedger, RetryPolicy, get_hedge_executor, is_retryable_row_error
+from utils.table_cache import TableCache
+
+# SQLite types of the BigQuery types used by the tables.
+SQLITE_TYPES = {
+    'BOOL': 'INTEGER',
+    'DATETIME': 'TEXT',
+    'FLOAT64': 'REAL',
+    'INT64': 'INTEGER',
+    'STRING': 'TEXT',
+}
+
+
+def _is_schema_mismatch(errors):
+    """
+    The _is_schema_mismatch function checks whether the errors returned by insert_rows are caused
+    by the cached schema being different from the schema of the table in BigQuery.
+
+    :param errors: The list of row errors returned by insert_rows
+    :return: A boolean value
+    :doc-author: Kaoushik Kumar
+    """
+    for row_error in errors:
+        for error in row_error.get('errors', []):
+            if error.get('reason') == 'invalid' and 'no such field' in error.get('message', ''):
+                return True
+    return False
+
+
+class StorageBackend:
+    """
+    This StorageBackend Class will define the operations which every storage backend has to implement.
+    The table passed to the operations is the BigQueryTable object, which gives the name, the columns
+    (in the order of the row tuples) and the key columns of the table.
+    """
+    name = None
+    # Whether the backend runs the BigQuery SQL, i.e: the asynchronous jobs, the views and the nested queries.
+    supports_sql = False
+
+    def insert_rows(self, table, rows):
+        """
+        The insert_rows function inserts the rows into the table.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :param rows: List of the row tuples to be inserted
+        :return: The list of the row errors, with the index of the row
+        :doc-author: Kaoushik Kumar
+        """
+        raise NotImplementedError
+
+    def load_ndjson(self, table, staged, idempotency_key=None):
+        """
+        The load_ndjson function appends all the rows of the NDJSON file to the table atomically,
+        i.e: either all the rows are loaded, or none.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :param staged: The binary file of the rows, one JSON object per line
+        :param idempotency_key: The key of the upload given by the client, or None
+        :return: The number of the loaded rows
+        :doc-author: Kaoushik Kumar
+        """
+        raise NotImplementedError
+
+    def insert_missing(self, table, rows):
+        """
+        The insert_missing function inserts only the rows whose keys are not in the table yet, checking the keys
+        within the same write, so that the concurrent calls can not insert the same key twice.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :param rows: List of the row tuples to be inserted, with unique keys
+        :return: The list of the key tuples of the inserted rows
+        :doc-author: Kaoushik Kumar
+        """
+        raise NotImplementedError
+
+    def merge_rows(self, table, rows, wait=True):
+        """
+        The merge_rows function updates all the rows of the table matched by the key columns.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :param rows: List of the row tuples to be updated, with unique keys
+        :param wait: Whether to wait till the update is finished
+        :return: The number of the updated rows, or the submitted job when wait is False
+        :doc-author: Kaoushik Kumar
+        """
+        raise NotImplementedError
+
+    def delete_keys(self, table, keys, wait=True):
+        """
+        The delete_keys function deletes all the rows of the given keys.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :param keys: List of the key tuples, in the order of the key_columns
+        :param wait: Whether to wait till the delete is finished
+        :return: The number of the deleted rows, or the submitted job when wait is False
+        :doc-author: Kaoushik Kumar
+        """
+        raise NotImplementedError
+
+    def delete_cascade(self, tables, column, value):
+        """
+        The delete_cascade function deletes the rows of all the tables whose column has the value, in a single
+        transaction, so that either the rows of all the tables are deleted, or none.
+
+        :param self: Represent the instance of the class
+        :param tables: List of the BigQueryTable objects, in the order of the deletes (the children first)
+        :param column: Name of the column, i.e: entity_id
+        :param value: The value of the column
+        :return: A dictionary of the table name and the number of its deleted rows
+        :doc-author: Kaoushik Kumar
+        """
+        raise NotImplementedError
+
+    def read_rows(self, table):
+        """
+        The read_rows function reads all the rows of the table.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :return: A list of the row dictionaries
+        :doc-author: Kaoushik Kumar
+        """
+        raise NotImplementedError
+
+    def read_pages(self, table, selected_fields=None, page_token=None, page_size=1000):
+        """
+        The read_pages function reads the rows of the table one page at a time, starting at the page token,
+        so that only a single page is held in memory.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :param selected_fields: Names of the columns to be read, or None for all of them
+        :param page_token: The token of the page to start at, or None for the first page
+        :param page_size: Maximum number of the rows of a page
+        :return: A generator of (list of the row dictionaries, token of the next page or None) tuples
+        :doc-author: Kaoushik Kumar
+        """
+        raise NotImplementedError
+
+    def fingerprint(self, table):
+        """
+        The fingerprint function returns the version of the table data, which changes when the table has been modified.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :return: A tuple which can be compared with the previous fingerprint
+        :doc-author: Kaoushik Kumar
+        """
+        raise NotImplementedError
+
+    def fingerprint_info(self, fingerprint):
+        """
+        The fingerprint_info function returns the time of the last modification and the number of the rows of the
+        table as of the fingerprint, so that a modification can be matched against the writes of this service.
+
+        :param self: Represent the instance of the class
+        :param fingerprint: The fingerprint returned by the fingerprint function
+        :return: A tuple of the modified time (POSIX timestamp) and the row count, either of which can be None
+        :doc-author: Kaoushik Kumar
+        """
+        return None, None
+
+    def warmup(self, tables):
+        """
+        The warmup function prepares the tables, so that the first requests do not have to.
+
+        :param self: Represent the instance of the class
+        :param tables: List of the BigQueryTable objects
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+
+    def query(self, query, query_parameters=None, wait=True):
+        """
+        The query function runs the BigQuery SQL statement, which is supported only by the BigQuery backend.
+
+        :param self: Represent the instance of the class
+        :param query: The SQL statement to be executed
+        :param query_parameters: The list of the query parameters of the statement
+        :param wait: Whether to wait till the job is finished
+        :return: The QueryJob object
+        :doc-author: Kaoushik Kumar
+        """
+        raise NotImplementedError(f'The {self.name} storage backend does not support the BigQuery SQL')
+
+
+class BigQueryBackend(StorageBackend):
+    """
+    This BigQueryBackend Class will store the tables in BigQuery, with the streaming inserts and the DML statements.
+    """
+    name = 'bigquery'
+    supports_sql = True
+
+    def __init__(self, project_id, dataset_name, table_cache_ttl_seconds):
+        """
+        The __init__ function is called when the class is instantiated.
+        It creates the BigQuery client and the cache of the table metadata.
+
+        :param self: Represent the instance of the class
+        :param project_id: The GCP project of the dataset
+        :param dataset_name: The BigQuery dataset of the tables
+        :param table_cache_ttl_seconds: Time (in seconds) for which the table metadata will be cached
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        # The google-cloud packages are imported on the first use, to keep them out of the cold start.
+        from google.cloud import bigquery
+        self.project_id = project_id
+        self.dataset_name = dataset_name
+        self.client = bigquery.Client(project=project_id)
+        # Process-wide cache of the table metadata, shared by all the tables and threads.
+        self.table_cache = TableCache(table_cache_ttl_seconds)
+        # Every request is retried on the transient errors, and the metadata reads (which are not billed, and are
+        # answered in a single response) are hedged once they are slower than the recent percentile.
+        self.retry_policy = RetryPolicy(BQ_RETRY_MAX_ATTEMPTS, BQ_RETRY_INITIAL_BACKOFF_SECONDS,
+                                        BQ_RETRY_MAX_BACKOFF_SECONDS, BQ_RETRY_DEADLINE_SECONDS)
+        self.hedgers = {}
+        if BQ_HEDGE_PERCENTILE > 0:
+            executor = get_hedge_executor(BQ_HEDGE_MAX_WORKERS)
+            self.hedgers = {'get_table': Hedger('get_table', BQ_HEDGE_PERCENTILE, executor)}
+        # Every shape of the statements is dry-run once (per TTL), and checked against the byte budget.
+        self.cost_guard = QueryCostGuard(
+            self.dry_run, QUERY_MAX_BYTES, QUERY_COST_MODE, QUERY_COST_CACHE_TTL_SECONDS,
+            expensive_limiter_factory(QUERY_COST_QUEUE_CONCURRENCY, QUERY_COST_MAX_QUEUE, QUERY_COST_MAX_WAIT_SECONDS)
+        )
+        set_cost_guard(self.cost_guard)
+
+    def _read(self, name, function, *args):
+        """
+        The _read function calls the idempotent read with the retries, hedged when it is enabled.
+
+        :param self: Represent the instance of the class
+        :param name: Name of the read, i.e: get_table
+        :param function: The function which reads from BigQuery
+        :return: The result of the function
+        :doc-author: Kaoushik Kumar
+        """
+        hedger = self.hedgers.get(name)
+        if hedger is None:
+            return self.retry_policy.call(name, function, *args)
+        return hedger.call(self.retry_policy.call, name, function, *args)
+
+    @staticmethod
+    def row_id():
+        """
+        The row_id function returns a new insertId for a row. The id is generated once per row, and sent again with
+        every retry of the row, so that BigQuery drops the copies of the retried row within its deduplication window,
+        while two identical rows (i.e: the same progress event written twice) are both kept.
+
+        :return: The insertId string
+        :doc-author: Kaoushik Kumar
+        """
+        return uuid.uuid4().hex
+
+    def request_retry(self):
+        """
+        The request_retry function returns the retry of the API requests of the library for the calls which are
+        wrapped by the retry policy. It is turned off while the policy retries, so that their attempts do not
+        multiply, and bounded by the deadline of the policy otherwise.
+
+        :param self: Represent the instance of the class
+        :return: A google.api_core.retry.Retry object, or None
+        :doc-author: Kaoushik Kumar
+        """
+        if self.retry_policy.max_attempts > 1:
+            return None
+        return self.poll_retry()
+
+    def poll_retry(self):
+        """
+        The poll_retry function returns the retry of the API requests of the library which are not wrapped by the
+        retry policy (i.e: the polls of a running job, the pages of an export), bounded by the deadline of the policy.
+
+        :param self: Represent the instance of the class
+        :return: A google.api_core.retry.Retry object
+        :doc-author: Kaoushik Kumar
+        """
+        from google.cloud.bigquery.retry import DEFAULT_RETRY
+        return DEFAULT_RETRY.with_deadline(self.retry_policy.deadline_seconds)
+
+    def table_id(self, table_name):
+        """
+        The table_id function returns the fully qualified name of the table, to be used in the SQL statements.
+
+        :param self: Represent the instance of the class
+        :param table_name: Name of the table
+        :return: The quoted project.dataset.table string
+        :doc-author: Kaoushik Kumar
+        """
+        return f'`{self.project_id}.{self.dataset_name}.{table_name}`'
+
+    @staticmethod
+    def struct_param(row, columns):
+        """
+        The struct_param function converts the row into a STRUCT query parameter.
+
+        :param row: The row tuple
+        :param columns: The (column name, BigQuery type) tuples of the row
+        :return: A StructQueryParameter object
+        :doc-author: Kaoushik Kumar
+        """
+        from google.cloud import bigquery
+        return bigquery.StructQueryParameter(
+            None, *[bigquery.ScalarQueryParameter(name, type_, value) for (name, type_), value in zip(columns, row)]
+        )
+
+    def _get_table(self, table_name, fresh=False):
+        """
+        The _get_table function is a helper function that returns the table object from BigQuery.
+            The table will be served from the table_cache, and fetched from BigQuery only when it is
+            not cached yet or the cached one has been expired.
+
+        :param self: Represent the instance of the class
+        :param table_name: Name of the table
+        :param fresh: Whether to skip the cache, i.e: to read the latest modified time of the table
+        :return: A table object from the bigquery api
+        :doc-author: Kaoushik Kumar
+        """
+        table_ref = self.client.dataset(self.dataset_name).table(table_name)
+        retry = self.request_retry()
+        if fresh:
+            return self._read('get_table', lambda: self.client.get_table(table_ref, retry=retry))
+        return self.table_cache.get(self.dataset_name, table_name,
+                                    lambda: self._read('get_table', lambda: self.client.get_table(table_ref,
+                                                                                                  retry=retry)))
+
+    def warmup(self, tables):
+        """
+        The warmup function fills the table_cache with the metadata of the tables.
+
+        :param self: Represent the instance of the class
+        :param tables: List of the BigQueryTable objects
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        for table in tables:
+            self._get_table(table.table_name)
+
+    def dry_run(self, query, query_parameters=None):
+        """
+        The dry_run function returns the bytes which the statement would process, without running it.
+            The dry run is not billed, and it does not account for the blocks pruned by the clustering.
+
+        :param self: Represent the instance of the class
+        :param query: The SQL statement
+        :param query_parameters: The list of the query parameters of the statement
+        :return: The number of the bytes
+        :doc-author: Kaoushik Kumar
+        """
+        from google.cloud import bigquery
+        job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False,
+                                             query_parameters=query_parameters or [])
+        query_job = self.retry_policy.call('dry_run', self.client.query, query, job_config=job_config,
+                                           retry=self.request_retry())
+        return query_job.total_bytes_processed or 0
+
+    def query(self, query, query_parameters=None, wait=True, guarded=True):
+        """
+        The query function submits the query to BigQuery and waits till it is finished.
+            The metrics of the job are recorded here when it is waited for, else by the job tracker.
+            The statement is admitted by the cost guard, and an expensive one is always waited for in the queue mode,
+            so that it holds its slot till it is finished.
+
+        :param self: Represent the instance of the class
+        :param query: The SQL statement to be executed
+        :param query_parameters: The list of the query parameters of the statement
+        :param wait: Whether to wait till the job is finished
+        :param guarded: Whether to check the statement against the byte budget, i.e: not for the provisioning
+        :return: The QueryJob object
+        :doc-author: Kaoushik Kumar
+        """
+        if not guarded:
+            return self._query(query, query_parameters, wait)
+        with self.cost_guard.admit(query, query_parameters) as queued:
+            query_job = self._query(query, query_parameters, wait)
+            if queued and not wait:
+                try:
+                    query_job.result(retry=self.poll_retry())
+                except Exception:
+                    # The error of the job is reported by the job tracker, along with its metrics.
+                    pass
+            return query_job
+
+    def _query(self, query, query_parameters, wait):
+        """
+        The _query function submits the query with the retries, and records the metrics of the finished job.
+
+        :param self: Represent the instance of the class
+        :param query: The SQL statement to be executed
+        :param query_parameters: The list of the query parameters of the statement
+        :param wait: Whether to wait till the job is finished
+        :return: The QueryJob object
+        :doc-author: Kaoushik Kumar
+        """
+        started = time.perf_counter()
+        try:
+            query_job = self.retry_policy.call('query', self._submit_query, query, query_parameters, wait)
+        except Exception:
+            BQ_REQUEST_ERRORS.inc(('query',))
+            raise
+        if wait:
+            seconds = time.perf_counter() - started
+            observe_query_job(query_job, seconds)
+            self.cost_guard.record(query_job, seconds)
+        return query_job
+
+    def _submit_query(self, query, query_parameters, wait):
+        """
+        The _submit_query function submits the query as a new job, and waits till it is finished.
+            A failed job is sent again as a new job by the retry policy, which is safe as the statements
+            of the service are idempotent (the MERGE sets the values, the DELETE removes the keys). The retry and
+            the job_retry of the library are turned off while the policy retries, so that their attempts do not
+            multiply, and the polls of the job are retried within the deadline of the policy.
+
+        :param self: Represent the instance of the class
+        :param query: The SQL statement to be executed
+        :param query_parameters: The list of the query parameters of the statement
+        :param wait: Whether to wait till the job is finished
+        :return: The QueryJob object
+        :doc-author: Kaoushik Kumar
+        """
+        from google.cloud import bigquery
+        from google.cloud.bigquery.retry import DEFAULT_JOB_RETRY
+        job_config = bigquery.QueryJobConfig(query_parameters=query_parameters or [])
+        job_retry = None if self.retry_policy.max_attempts > 1 else DEFAULT_JOB_RETRY
+        query_job = self.client.query(query, job_config=job_config, job_retry=job_retry, retry=self.request_retry())
+        if wait:
+            query_job.result(retry=self.poll_retry())
+        return query_job
+
+    def insert_rows(self, table, rows):
+        """
+        The insert_rows function inserts the rows into the BigQuery table using the cached table.
+            If the cached schema does not match the table anymore, the table will be invalidated
+            from the cache and the insert will be retried once with the fresh table.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :param rows: List of the rows to be inserted
+        :return: The list of row errors returned by BigQuery
+        :doc-author: Kaoushik Kumar
+        """
+        labels = (table.table_name,)
+        started = time.perf_counter()
+        try:
+            errors = self._insert_with_retries(table, rows)
+        except Exception:
+            BQ_REQUEST_ERRORS.inc(('insert_rows',))
+            raise
+        BQ_INSERT_LATENCY.observe(labels, time.perf_counter() - started)
+        BQ_INSERTED_ROWS.inc(labels, len(rows))
+        if errors:
+            BQ_INSERT_ERRORS.inc(labels, len(errors))
+        return errors
+
+    def _insert_with_retries(self, table, rows):
+        """
+        The _insert_with_retries function sends the streaming insert with the retry policy, and sends again
+        the rows which have been rejected by a transient error, with their same insertIds.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :param rows: List of the rows to be inserted
+        :return: The list of row errors, with the index of the row in the rows
+        :doc-author: Kaoushik Kumar
+        """
+        row_ids = [self.row_id() for _ in rows]
+        indexes = list(range(len(rows)))
+        final_errors = []
+        attempt = 1
+        while True:
+            errors = self.retry_policy.call('insert_rows', self._insert_rows, table,
+                                            [rows[index] for index in indexes], [row_ids[index] for index in indexes])
+            errors = [{**error, 'index': indexes[error['index']]} for error in errors]
+            retryable = [error for error in errors if is_retryable_row_error(error)]
+            if not retryable or attempt >= self.retry_policy.max_attempts:
+                return sorted(final_errors + errors, key=lambda error: error['index'])
+            final_errors.extend(error for error in errors if not is_retryable_row_error(error))
+            indexes = [error['index'] for error in retryable]
+            BQ_RETRIES.inc(('insert_rows',))
+            time.sleep(self.retry_policy.backoff(attempt))
+            attempt += 1
+
+    def _insert_rows(self, table, rows, row_ids):
+        """
+        The _insert_rows function sends the streaming insert, retrying it once with the fresh table.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :param rows: List of the rows to be inserted
+        :param row_ids: List of the insertIds of the rows
+        :return: The list of row errors returned by BigQuery
+        :doc-author: Kaoushik Kumar
+        """
+        from google.api_core.exceptions import BadRequest, NotFound
+        retry = self.request_retry()
+        try:
+            errors = self.client.insert_rows(self._get_table(table.table_name), rows, row_ids=row_ids, retry=retry)
+        except (BadRequest, NotFound):
+            self.table_cache.invalidate(self.dataset_name, table.table_name)
+            return self.client.insert_rows(self._get_table(table.table_name), rows, row_ids=row_ids, retry=retry)
+        if errors and _is_schema_mismatch(errors):
+            self.table_cache.invalidate(self.dataset_name, table.table_name)
+            errors = self.client.insert_rows(self._get_table(table.table_name), rows, row_ids=row_ids, retry=retry)
+        return errors
+
+    @staticmethod
+    def load_job_id(table, staged, idempotency_key=None):
+        """
+        The load_job_id function returns the id of the load job of the upload, which is derived from the
+        idempotency key given by the client, or else from the hash of the staged rows. An upload sent again
+        (i.e: after its response has been lost) gets the same id, so BigQuery rejects its second load job.
+
+        :param table: The BigQueryTable object
+        :param staged: The binary file of the rows, one JSON object per line
+        :param idempotency_key: The key of the upload given by the client, or None
+        :return: The id of the load job
+        :doc-author: Kaoushik Kumar
+        """
+        digest = hashlib.sha256(table.table_name.encode())
+        if idempotency_key:
+            digest.update(b'key:' + idempotency_key.encode())
+        else:
+            for chunk in iter(lambda: staged.read(1 << 20), b''):
+                digest.update(chunk)
+            staged.seek(0)
+        return f'import_{table.table_name}_{digest.hexdigest()[:40]}'
+
+    def load_ndjson(self, table, staged, idempotency_key=None):
+        """
+        The load_ndjson function appends the rows of the NDJSON file to the table with a single load job,
+        which is not billed and is atomic. The id of the job is derived from the idempotency key or the staged
+        rows, so that an upload which is retried after its response has been lost picks up the existing job
+        instead of loading the rows twice. A failed job has loaded nothing, so the upload is then loaded by the
+        next job id of the sequence, which a later retry finds in the same way.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :param staged: The binary file of the rows, one JSON object per line
+        :param idempotency_key: The key of the upload given by the client, or None for the hash of the rows
+        :return: The number of the loaded rows
+        :doc-author: Kaoushik Kumar
+        """
+        from google.api_core.exceptions import Conflict
+        from google.cloud import bigquery
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+            write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+        )
+        table_ref = self.client.dataset(self.dataset_name).table(table.table_name)
+        base_job_id = self.load_job_id(table, staged, idempotency_key)
+
+        # The upload is not sent again by the library while the policy retries, so that their attempts do not multiply.
+        num_retries = 0 if self.retry_policy.max_attempts > 1 else 6
+
+        def submit():
+            for attempt in itertools.count():
+                job_id = base_job_id if not attempt else f'{base_job_id}_{attempt}'
+                try:
+                    return self.client.load_table_from_file(staged, table_ref, job_id=job_id, rewind=True,
+                                                            num_retries=num_retries, job_config=job_config)
+                except Conflict:
+                    load_job = self.client.get_job(job_id, retry=self.request_retry())
+                    if not (load_job.done() and load_job.error_result):
+                        return load_job
+
+        started = time.perf_counter()
+        try:
+            load_job = self.retry_policy.call('load_table_from_file', submit)
+            load_job.result(retry=self.poll_retry())
+        except Exception:
+            BQ_REQUEST_ERRORS.inc(('load_table_from_file',))
+            raise
+        BQ_JOB_LATENCY.observe(('LOAD',), time.perf_counter() - started)
+        return load_job.output_rows or 0
+
+    @staticmethod
+    def pruning_filter(table, keys, alias='T'):
+        """
+        The pruning_filter function returns the condition on the clustering columns of the table which are key
+        columns, with the values of the keys as constant array parameters. A join with the rows of an array
+        parameter does not prune the blocks of a clustered table, while such a condition does.
+
+        :param table: The BigQueryTable object
+        :param keys: List of the key tuples, in the order of the key_columns
+        :param alias: Alias of the table in the statement
+        :return: A tuple of the condition (or None) and the list of its query parameters
+        :doc-author: Kaoushik Kumar
+        """
+        from google.cloud import bigquery
+        column_types = dict(table.columns())
+        conditions, parameters = [], []
+        for name in table.cluster_columns:
+            if name not in table.key_columns:
+                continue
+            position = table.key_columns.index(name)
+            values = sorted({key[position] for key in keys})
+            conditions.append(f'{alias}.{name} IN UNNEST(@prune_{name})')
+            parameters.append(bigquery.ArrayQueryParameter(f'prune_{name}', column_types[name], values))
+        return (' AND '.join(conditions) or None), parameters
+
+    def merge_statement(self, table, rows):
+        """
+        The merge_statement function returns the MERGE statement which updates the rows of the table,
+        matched by the key columns, reading the new values from an array parameter.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :param rows: List of the row tuples to be updated, with unique keys
+        :return: A tuple of the SQL statement and the list of its query parameters
+        :doc-author: Kaoushik Kumar
+        """
+        from google.cloud import bigquery
+        columns = table.columns()
+        names = [name for name, _ in columns]
+        keys = [tuple(row[names.index(name)] for name in table.key_columns) for row in rows]
+        pruning, parameters = self.pruning_filter(table, keys)
+        on = ' AND '.join([f'T.{name} = S.{name}' for name in table.key_columns] + ([pruning] if pruning else []))
+        updates = ', '.join(f'{name} = S.{name}' for name, _ in columns if name not in table.key_columns)
+        query = f"""
+            MERGE
+                {self.table_id(table.table_name)} T
+            USING
+                UNNEST(@rows) S
+            ON
+                {on}
+            WHEN MATCHED THEN
+                UPDATE SET {updates}
+            """
+        parameters.append(
+            bigquery.ArrayQueryParameter('rows', 'STRUCT', [self.struct_param(row, columns) for row in rows])
+        )
+        return query, parameters
+
+    def insert_missing_statement(self, table, rows):
+        """
+        The insert_missing_statement function returns the multi-statement transaction which inserts the rows of
+        an array parameter whose keys are not in the table yet, and then selects the keys of the inserted rows.
+            The keys are checked and the rows inserted by the same transaction, instead of a read before the write.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :param rows: List of the row tuples to be inserted, with unique keys
+        :return: A tuple of the SQL statement and the list of its query parameters
+        :doc-author: Kaoushik Kumar
+        """
+        from google.cloud import bigquery
+        columns = table.columns()
+        names = [name for name, _ in columns]
+        keys = [tuple(row[names.index(name)] for name in table.key_columns) for row in rows]
+        pruning, parameters = self.pruning_filter(table, keys)
+        matches = ' AND '.join([f'T.{name} = S.{name}' for name in table.key_columns] + ([pruning] if pruning else []))
+        query = f"""
+            BEGIN
+                BEGIN TRANSACTION;
+                CREATE TEMP TABLE missing AS
+                    SELECT S.* FROM UNNEST(@rows) S
+                    WHERE NOT EXISTS (SELECT 1 FROM {self.table_id(table.table_name)} T WHERE {matches});
+                INSERT INTO {self.table_id(table.table_name)} ({', '.join(names)})
+                    SELECT {', '.join(names)} FROM missing;
+                COMMIT TRANSACTION;
+            EXCEPTION WHEN ERROR THEN
+                ROLLBACK TRANSACTION;
+                RAISE USING MESSAGE = @@error.message;
+            END;
+            SELECT {', '.join(table.key_columns)} FROM missing;
+            """
+        parameters.append(
+            bigquery.ArrayQueryParameter('rows', 'STRUCT', [self.struct_param(row, columns) for row in rows])
+        )
+        return query, parameters
+
+    def delete_statement(self, table, keys):
+        """
+        The delete_statement function returns the DELETE statement which deletes all the rows of the given keys.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :param keys: List of the key tuples, in the order of the key_columns
+        :return: A tuple of the SQL statement and the list of its query parameters
+        :doc-author: Kaoushik Kumar
+        """
+        from google.cloud import bigquery
+        key_types = dict(table.columns())
+        if len(table.key_columns) == 1:
+            name = table.key_columns[0]
+            condition = f'{name} IN UNNEST(@keys)'
+            parameters = [bigquery.ArrayQueryParameter('keys', key_types[name], [key[0] for key in keys])]
+        else:
+            columns = [(name, key_types[name]) for name in table.key_columns]
+            matches = ' AND '.join(f'K.{name} = T.{name}' for name in table.key_columns)
+            pruning, parameters = self.pruning_filter(table, keys)
+            condition = f'EXISTS (SELECT 1 FROM UNNEST(@keys) K WHERE {matches})'
+            if pruning:
+                condition = f'{pruning} AND {condition}'
+            parameters.append(
+                bigquery.ArrayQueryParameter('keys', 'STRUCT', [self.struct_param(key, columns) for key in keys])
+            )
+        query = f"""
+            DELETE
+                FROM {self.table_id(table.table_name)} T
+            WHERE
+                {condition}
+            """
+        return query, parameters
+
+    def merge_rows(self, table, rows, wait=True):
+        """
+        The merge_rows function updates all the rows of the table, matched by the key columns,
+        with a single MERGE statement reading the new values from an array parameter.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :param rows: List of the row tuples to be updated, with unique keys
+        :param wait: Whether to wait till the job is finished
+        :return: The number of the updated rows, or the QueryJob object when wait is False
+        :doc-author: Kaoushik Kumar
+        """
+        query_job = self.query(*self.merge_statement(table, rows), wait)
+        return (query_job.num_dml_affected_rows or 0) if wait else query_job
+
+    def insert_missing(self, table, rows):
+        """
+        The insert_missing function inserts the rows whose keys are not in the table yet, with a single
+        multi-statement transaction, which is a single job.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :param rows: List of the row tuples to be inserted, with unique keys
+        :return: The list of the key tuples of the inserted rows
+        :doc-author: Kaoushik Kumar
+        """
+        result = self.query(*self.insert_missing_statement(table, rows)).result(retry=self.poll_retry())
+        return [tuple(row[name] for name in table.key_columns) for row in result]
+
+    def delete_keys(self, table, keys, wait=True):
+        """
+        The delete_keys function deletes all the rows of the given keys with a single DELETE statement.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :param keys: List of the key tuples, in the order of the key_columns
+        :param wait: Whether to wait till the job is finished
+        :return: The number of the deleted rows, or the QueryJob object when wait is False
+        :doc-author: Kaoushik Kumar
+        """
+        query_job = self.query(*self.delete_statement(table, keys), wait)
+        return (query_job.num_dml_affected_rows or 0) if wait else query_job
+
+    def delete_cascade(self, tables, column, value):
+        """
+        The delete_cascade function deletes the rows of all the tables whose column has the value, with a single
+        multi-statement transaction, which is a single job. The transaction is rolled back when any statement fails,
+        and the number of the rows deleted by every statement is returned by the last statement of the script.
+
+        :param self: Represent the instance of the class
+        :param tables: List of the BigQueryTable objects, in the order of the deletes (the children first)
+        :param column: Name of the column, i.e: entity_id
+        :param value: The value of the column
+        :return: A dictionary of the table name and the number of its deleted rows
+        :doc-author: Kaoushik Kumar
+        """
+        from google.cloud import bigquery
+        counts = [f'deleted_{index}' for index in range(len(tables))]
+        deletes = ''.join(f"""
+                DELETE FROM {self.table_id(table.table_name)} WHERE {column} = @value;
+                SET {count} = @@row_count;""" for table, count in zip(tables, counts))
+        query = f"""
+            DECLARE {', '.join(counts)} INT64 DEFAULT 0;
+            BEGIN
+                BEGIN TRANSACTION;{deletes}
+                COMMIT TRANSACTION;
+            EXCEPTION WHEN ERROR THEN
+                ROLLBACK TRANSACTION;
+                RAISE USING MESSAGE = @@error.message;
+            END;
+            SELECT {', '.join(counts)};
+            """
+        parameters = [bigquery.ScalarQueryParameter('value', dict(tables[0].columns())[column], value)]
+        row = next(iter(self.query(query, parameters).result(retry=self.poll_retry())))
+        return {table.table_name: row[count] or 0 for table, count in zip(tables, counts)}
+
+    def read_rows(self, table):
+        """
+        The read_rows function reads all the rows of the table through the tabledata API, which is not billed.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :return: A list of the row dictionaries
+        :doc-author: Kaoushik Kumar
+        """
+        bq_table = self._get_table(table.table_name)
+        retry = self.request_retry()
+        return self._read('list_rows', lambda: [dict(row.items())
+                                                for row in self.client.list_rows(bq_table, retry=retry)])
+
+    def read_pages(self, table, selected_fields=None, page_token=None, page_size=1000):
+        """
+        The read_pages function reads the rows of the table through the tabledata API (which is not billed) one
+        page at a time, with the page tokens of BigQuery. Only the selected columns are transferred.
+            Every page request is retried on the transient errors by the BigQuery client, within the deadline of the
+            retry policy.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :param selected_fields: Names of the columns to be read, or None for all of them
+        :param page_token: The token of the page to start at, or None for the first page
+        :param page_size: Maximum number of the rows of a page
+        :return: A generator of (list of the row dictionaries, token of the next page or None) tuples
+        :doc-author: Kaoushik Kumar
+        """
+        bq_table = self._get_table(table.table_name)
+        fields = [field for field in bq_table.schema if field.name in selected_fields] if selected_fields else None
+        iterator = self.client.list_rows(bq_table, selected_fields=fields, page_token=page_token, page_size=page_size,
+                                         retry=self.poll_retry())
+        for page in iterator.pages:
+            yield [dict(row.items()) for row in page], iterator.next_page_token
+
+    def fingerprint(self, table):
+        """
+        The fingerprint function returns the version of the table data, which changes when the table has been
+        modified, i.e: by the DML or the streaming inserts. It costs one metadata request and no query.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :return: A tuple of the last modified time and the row counts
+        :doc-author: Kaoushik Kumar
+        """
+        bq_table = self._get_table(table.table_name, fresh=True)
+        streaming_rows = bq_table.streaming_buffer.estimated_rows if bq_table.streaming_buffer else None
+        return bq_table.modified, bq_table.num_rows, streaming_rows
+
+    def fingerprint_info(self, fingerprint):
+        """
+        The fingerprint_info function returns the last modified time and the row count of the table, where the row
+        count includes the (estimated) rows of the streaming buffer.
+
+        :param self: Represent the instance of the class
+        :param fingerprint: The (modified, num_rows, streaming_rows) tuple
+        :return: A tuple of the modified time (POSIX timestamp) and the row count
+        :doc-author: Kaoushik Kumar
+        """
+        modified, num_rows, streaming_rows = fingerprint
+        return modified.timestamp() if modified else None, (num_rows or 0) + (streaming_rows or 0)
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    This SQLiteBackend Class will store the tables in an embedded SQLite database, in memory by default.
+    The tables are created on their first use from the columns of the pydantic models, without any unique
+    constraint, so that the duplicate keys behave the same as in BigQuery.
+    """
+    name = 'sqlite'
+
+    def __init__(self, path=':memory:'):
+        """
+        The __init__ function is called when the class is instantiated.
+        It opens the single connection which is shared by all the threads, guarded by a lock.
+
+        :param self: Represent the instance of the class
+        :param path: Path of the SQLite database file, or :memory: for the in-memory database
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._lock = threading.RLock()
+        self._created = set()
+        self._versions = {}
+        self._modified_at = {}
+
+    def _table(self, table):
+        """
+        The _table function creates the table and the index of its key columns, if they are not there already.
+            It must be called while holding the lock.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :return: The quoted name of the table
+        :doc-author: Kaoushik Kumar
+        """
+        name = f'"{table.table_name}"'
+        if table.table_name not in self._created:
+            columns = ', '.join(f'"{column}" {SQLITE_TYPES[type_]}' for column, type_ in table.columns())
+            keys = ', '.join(f'"{column}"' for column in table.key_columns)
+            with self._connection:
+                self._connection.execute(f'CREATE TABLE IF NOT EXISTS {name} ({columns})')
+                if keys:
+                    self._connection.execute(
+                        f'CREATE INDEX IF NOT EXISTS "{table.table_name}_key" ON {name} ({keys})'
+                    )
+            self._created.add(table.table_name)
+        return name
+
+    @staticmethod
+    def _to_sqlite(value):
+        """
+        The _to_sqlite function converts the value of the row into the value stored by SQLite.
+
+        :param value: The value of the column
+        :return: The SQLite value
+        :doc-author: Kaoushik Kumar
+        """
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return value
+
+    @staticmethod
+    def _from_sqlite(value, type_):
+        """
+        The _from_sqlite function converts the value stored by SQLite back into the value of its BigQuery type.
+
+        :param value: The SQLite value
+        :param type_: The BigQuery type of the column
+        :return: The value of the column
+        :doc-author: Kaoushik Kumar
+        """
+        if value is None:
+            return None
+        if type_ == 'BOOL':
+            return bool(value)
+        if type_ == 'DATETIME':
+            return datetime.fromisoformat(value)
+        return value
+
+    @staticmethod
+    def _key_condition(table):
+        """
+        The _key_condition function returns the WHERE condition which matches a row by its key columns.
+
+        :param table: The BigQueryTable object
+        :return: The SQL condition with a parameter per key column
+        :doc-author: Kaoushik Kumar
+        """
+        return ' AND '.join(f'"{column}" = ?' for column in table.key_columns)
+
+    def _modified(self, table):
+        """
+        The _modified function bumps the version of the table after a write.
+            It must be called while holding the lock.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self._versions[table.table_name] = self._versions.get(table.table_name, 0) + 1
+        self._modified_at[table.table_name] = time.time()
+
+    def warmup(self, tables):
+        """
+        The warmup function creates the tables, if they are not there already.
+
+        :param self: Represent the instance of the class
+        :param tables: List of the BigQueryTable objects
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            for table in tables:
+                self._table(table)
+
+    def insert_rows(self, table, rows):
+        """
+        The insert_rows function inserts the rows into the SQLite table within a single transaction.
+            The rows which do not match the columns of the table are returned as the row errors.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :param rows: List of the rows to be inserted
+        :return: The list of the row errors, with the index of the row
+        :doc-author: Kaoushik Kumar
+        """
+        columns = table.columns()
+        errors = [
+            {'index': index, 'errors': [{'reason': 'invalid',
+                                         'message': f'Expected {len(columns)} values, got {len(row)}'}]}
+            for index, row in enumerate(rows) if len(row) != len(columns)
+        ]
+        failed = {error['index'] for error in errors}
+        values = [tuple(self._to_sqlite(value) for value in row)
+                  for index, row in enumerate(rows) if index not in failed]
+        with self._lock:
+            name = self._table(table)
+            with self._connection:
+                self._connection.executemany(
+                    f'INSERT INTO {name} VALUES ({", ".join("?" * len(columns))})', values
+                )
+            self._modified(table)
+        return errors
+
+    def load_ndjson(self, table, staged, idempotency_key=None):
+        """
+        The load_ndjson function appends all the rows of the NDJSON file to the SQLite table within a single
+        transaction. The dates are already in the ISO format stored by SQLite. The uploads are not deduplicated,
+        so the idempotency key is not used.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :param staged: The binary file of the rows, one JSON object per line
+        :param idempotency_key: The key of the upload given by the client, which is ignored
+        :return: The number of the loaded rows
+        :doc-author: Kaoushik Kumar
+        """
+        names = [name for name, _ in table.columns()]
+        values = (tuple(record.get(name) for name in names) for record in map(json.loads, staged))
+        with self._lock:
+            name = self._table(table)
+            with self._connection:
+                cursor = self._connection.executemany(
+                    f'INSERT INTO {name} VALUES ({", ".join("?" * len(names))})', values
+                )
+            self._modified(table)
+        return cursor.rowcount
+
+    def merge_rows(self, table, rows, wait=True):
+        """
+        The merge_rows function updates all the rows of the table matched by the key columns, within a
+        single transaction. The update is always finished before returning, whatever the wait is.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :param rows: List of the row tuples to be updated, with unique keys
+        :param wait: Unused, the SQLite writes are synchronous
+        :return: The number of the updated rows
+        :doc-author: Kaoushik Kumar
+        """
+        names = [name for name, _ in table.columns()]
+        updates = [name for name in names if name not in table.key_columns]
+        key_indexes = [names.index(name) for name in table.key_columns]
+        update_indexes = [names.index(name) for name in updates]
+        affected_rows = 0
+        with self._lock:
+            name = self._table(table)
+            assignments = ', '.join(f'"{column}" = ?' for column in updates)
+            statement = f'UPDATE {name} SET {assignments} WHERE {self._key_condition(table)}'
+            with self._connection:
+                for row in rows:
+                    values = [self._to_sqlite(row[index]) for index in update_indexes + key_indexes]
+                    affected_rows += self._connection.execute(statement, values).rowcount
+            self._modified(table)
+        return affected_rows
+
+    def insert_missing(self, table, rows):
+        """
+        The insert_missing function inserts the rows whose keys are not in the table yet, within a single
+        transaction, with an INSERT ... SELECT ... WHERE NOT EXISTS statement per row.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :param rows: List of the row tuples to be inserted, with unique keys
+        :return: The list of the key tuples of the inserted rows
+        :doc-author: Kaoushik Kumar
+        """
+        names = [name for name, _ in table.columns()]
+        key_indexes = [names.index(name) for name in table.key_columns]
+        inserted = []
+        with self._lock:
+            name = self._table(table)
+            statement = (f'INSERT INTO {name} SELECT {", ".join("?" * len(names))} '
+                         f'WHERE NOT EXISTS (SELECT 1 FROM {name} WHERE {self._key_condition(table)})')
+            with self._connection:
+                for row in rows:
+                    key = tuple(row[index] for index in key_indexes)
+                    values = [self._to_sqlite(value) for value in tuple(row) + key]
+                    if self._connection.execute(statement, values).rowcount:
+                        inserted.append(key)
+            self._modified(table)
+        return inserted
+
+    def delete_keys(self, table, keys, wait=True):
+        """
+        The delete_keys function deletes all the rows of the given keys, within a single transaction.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :param keys: List of the key tuples, in the order of the key_columns
+        :param wait: Unused, the SQLite writes are synchronous
+        :return: The number of the deleted rows
+        :doc-author: Kaoushik Kumar
+        """
+        affected_rows = 0
+        with self._lock:
+            name = self._table(table)
+            statement = f'DELETE FROM {name} WHERE {self._key_condition(table)}'
+            with self._connection:
+                for key in keys:
+                    values = [self._to_sqlite(value) for value in key]
+                    affected_rows += self._connection.execute(statement, values).rowcount
+            self._modified(table)
+        return affected_rows
+
+    def delete_cascade(self, tables, column, value):
+        """
+        The delete_cascade function deletes the rows of all the tables whose column has the value,
+        within a single transaction.
+
+        :param self: Represent the instance of the class
+        :param tables: List of the BigQueryTable objects, in the order of the deletes (the children first)
+        :param column: Name of the column, i.e: entity_id
+        :param value: The value of the column
+        :return: A dictionary of the table name and the number of its deleted rows
+        :doc-author: Kaoushik Kumar
+        """
+        deleted = {}
+        with self._lock:
+            names = [self._table(table) for table in tables]
+            with self._connection:
+                for table, name in zip(tables, names):
+                    statement = f'DELETE FROM {name} WHERE "{column}" = ?'
+                    deleted[table.table_name] = self._connection.execute(statement, [self._to_sqlite(value)]).rowcount
+            for table in tables:
+                self._modified(table)
+        return deleted
+
+    def read_rows(self, table):
+        """
+        The read_rows function reads all the rows of the SQLite table.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :return: A list of the row dictionaries
+        :doc-author: Kaoushik Kumar
+        """
+        columns = table.columns()
+        with self._lock:
+            rows = self._connection.execute(f'SELECT * FROM {self._table(table)}').fetchall()
+        return [{name: self._from_sqlite(value, type_) for (name, type_), value in zip(columns, row)} for row in rows]
+
+    def read_pages(self, table, selected_fields=None, page_token=None, page_size=1000):
+        """
+        The read_pages function reads the rows of the SQLite table one page at a time, in the order of insertion.
+            The page token is the offset of the page.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :param selected_fields: Names of the columns to be read, or None for all of them
+        :param page_token: The token of the page to start at, or None for the first page
+        :param page_size: Maximum number of the rows of a page
+        :return: A generator of (list of the row dictionaries, token of the next page or None) tuples
+        :doc-author: Kaoushik Kumar
+        """
+        columns = [(name, type_) for name, type_ in table.columns() if not selected_fields or name in selected_fields]
+        names = ', '.join(f'"{name}"' for name, _ in columns)
+        offset = int(page_token or 0)
+        while True:
+            with self._lock:
+                rows = self._connection.execute(
+                    f'SELECT {names} FROM {self._table(table)} ORDER BY rowid LIMIT ? OFFSET ?', (page_size, offset)
+                ).fetchall()
+            offset += len(rows)
+            next_token = str(offset) if len(rows) == page_size else None
+            yield [{name: self._from_sqlite(value, type_) for (name, type_), value in zip(columns, row)}
+                   for row in rows], next_token
+            if next_token is None:
+                return
+
+    def fingerprint(self, table):
+        """
+        The fingerprint function returns the version of the table data, which is bumped by every write of this
+        process, along with the data_version of SQLite which changes when another process has written to the file,
+        the row count and the time of the last write of this process.
+
+        :param self: Represent the instance of the class
+        :param table: The BigQueryTable object
+        :return: A tuple of the versions, the row count and the modified time
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            data_version = self._connection.execute('PRAGMA data_version').fetchone()[0]
+            rows = self._connection.execute(f'SELECT COUNT(*) FROM {self._table(table)}').fetchone()[0]
+            return (self._versions.get(table.table_name, 0), data_version, rows,
+                    self._modified_at.get(table.table_name))
+
+    def fingerprint_info(self, fingerprint):
+        """
+        The fingerprint_info function returns the time of the last write of this process and the row count.
+
+        :param self: Represent the instance of the class
+        :param fingerprint: The (version, data_version, rows, modified) tuple
+        :return: A tuple of the modified time (POSIX timestamp) and the row count
+        :doc-author: Kaoushik Kumar
+        """
+        return fingerprint[3], fingerprint[2]
+
+
+# The process-wide storage backend, which will be created on its first use.
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """
+    The get_backend function returns the process-wide storage backend chosen by the STORAGE_BACKEND.
+
+    :return: A StorageBackend object
+    :doc-author: Kaoushik Kumar
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if STORAGE_BACKEND == 'sqlite':
+                _backend = SQLiteBackend(SQLITE_PATH)
+            elif STORAGE_BACKEND == 'bigquery':
+                _backend = BigQueryBackend(PROJECT_ID, DATASET_NAME, TABLE_CACHE_TTL_SECONDS)
+            else:
+                raise ValueError(f'Unknown STORAGE_BACKEND: {STORAGE_BACKEND}')
+        return _backend
@@ -0,0 +1,129 @@
+"""
+This file will be used for caching the BigQuery table metadata (schema), so that the inserts
+will not have to fetch the table from BigQuery before every insert_rows call.
+"""
+import threading
+import time
+
+
+class TableCache:
+    """
+    This TableCache Class will keep the process-wide, thread-safe cache of the BigQuery table objects,
+    keyed by the dataset and the table name.
+    """
+    def __init__(self, ttl_seconds):
+        """
+        The __init__ function is called when the class is instantiated.
+        It sets up the cache entries, the locks and the hit/miss counters.
+
+        :param self: Represent the instance of the class
+        :param ttl_seconds: Time (in seconds) after which a cached table will be expired
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _key_lock(self, key):
+        """
+        The _key_lock function returns the lock of a particular key, so that only one thread
+        will be fetching the same table from BigQuery at a time.
+
+        :param self: Represent the instance of the class
+        :param key: The (dataset, table) key of the cache
+        :return: A lock object
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _lookup(self, key):
+        """
+        The _lookup function returns the cached table if it is present and not expired.
+
+        :param self: Represent the instance of the class
+        :param key: The (dataset, table) key of the cache
+        :return: The table object or None
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+        return None
+
+    def get(self, dataset, table_name, loader):
+        """
+        The get function returns the table from the cache, and if it is not present (or expired)
+        it will be loaded through the loader and stored in the cache.
+
+        :param self: Represent the instance of the class
+        :param dataset: Name of the BigQuery dataset
+        :param table_name: Name of the BigQuery table
+        :param loader: Function which will fetch the table from BigQuery
+        :return: A table object from the bigquery api
+        :doc-author: Kaoushik Kumar
+        """
+        key = (dataset, table_name)
+        table = self._lookup(key)
+        if table is not None:
+            return table
+        with self._key_lock(key):
+            # The other thread might have loaded the same table while we were waiting for the lock.
+            table = self._lookup(key)
+            if table is not None:
+                return table
+            table = loader()
+            with self._lock:
+                self.misses += 1
+                self._entries[key] = (table, time.monotonic() + self.ttl_seconds)
+            return table
+
+    def invalidate(self, dataset, table_name):
+        """
+        The invalidate function removes the table from the cache, i.e: when the schema of the table
+        has been changed in BigQuery.
+
+        :param self: Represent the instance of the class
+        :param dataset: Name of the BigQuery dataset
+        :param table_name: Name of the BigQuery table
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            if self._entries.pop((dataset, table_name), None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        """
+        The clear function removes all the tables from the cache.
+
+        :param self: Represent the instance of the class
+        :return: Nothing
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        """
+        The stats function returns the counters of the cache.
+
+        :param self: Represent the instance of the class
+        :return: A dictionary with the hits, misses, invalidations and size of the cache
+        :doc-author: Kaoushik Kumar
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'size': len(self._entries),
+            }